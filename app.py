@@ -4,12 +4,18 @@ Sistema multi-agente usando A2A e MCP.
 """
 import os
 import logging
+import threading
+import uuid
+from urllib.parse import urlparse
 import streamlit as st
-from app.mcp.agents_data import AGENTS_DB
-from app.services.llm_service import get_llm_response
-from python_a2a import A2AClient, Message, TextContent, MessageRole, ErrorContent
+from app.mcp.agents_data import AGENTS_DB, get_agent_url
+from app.services.a2a_client import A2AClientPool
+from app.services.chat_store import ChatStore
+from app.services.turns import CANCELLED, DONE, TurnExecutor
 from app.utils.logger import setup_logger
-from app.utils.diagnostics import diagnose_agent_server, format_diagnostic_report
+from app.utils.diagnostics import format_diagnostic_report
+from app.utils.health_monitor import HealthMonitor
+from app.utils.tracing import activate, deactivate, format_waterfall, inject, load_trace, start_span, trace_span
 
 # Configurar logging
 logger = setup_logger("devmentor.app", level=logging.INFO)
@@ -17,6 +23,65 @@ logger = setup_logger("devmentor.app", level=logging.INFO)
 # Configuração da página
 st.set_page_config(page_title="DevMentor AI", page_icon="🚀", layout="wide")
 
+# Mensagens por página do histórico; a sessão guarda só a página mais recente
+PAGE_SIZE = int(os.getenv("DEVMENTOR_CHAT_PAGE_SIZE", "20"))
+# Limite de páginas anteriores exibidas de uma vez
+MAX_OLDER_PAGES = 10
+# Intervalo de atualização da resposta em andamento (segundos)
+TURN_POLL_INTERVAL = 0.5
+# Só os agentes ASGI interrompem a chamada ao LLM ao cancelar (definido por start_servers.py --serving)
+AGENTS_ABORT_ON_CANCEL = os.getenv("DEVMENTOR_AGENT_SERVING", "wsgi") == "asgi"
+
+# Trecho da página que se atualiza sozinho (st.fragment; experimental até o Streamlit 1.37)
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+
+@st.cache_resource
+def get_health_monitor() -> HealthMonitor:
+    """Monitor de saúde compartilhado entre sessões (sonda em background)."""
+    monitor = HealthMonitor({key: get_agent_url(key) for key in AGENTS_DB})
+    monitor.start()
+    return monitor
+
+
+@st.cache_resource
+def get_a2a_pool() -> A2AClientPool:
+    """Clientes A2A compartilhados entre sessões, com conexões keep-alive abertas na subida."""
+    urls = {key: get_agent_url(key) for key in AGENTS_DB}
+    pool = A2AClientPool(timeout=60)
+    # Agente que volta ao ar (reinício) ganha cliente e conexão novos
+    pool.watch(get_health_monitor(), urls)
+    threading.Thread(target=pool.warm_up, args=(list(urls.values()),), name="a2a-warmup", daemon=True).start()
+    return pool
+
+
+@st.cache_resource
+def get_chat_store() -> ChatStore:
+    """Histórico persistente (SQLite em WAL) compartilhado entre sessões."""
+    return ChatStore()
+
+
+@st.cache_resource
+def get_turn_executor() -> TurnExecutor:
+    """Envios ao agente em background, compartilhados entre sessões (a página nunca espera o LLM)."""
+    return TurnExecutor(get_a2a_pool(), max_workers=16)
+
+
+health_monitor = get_health_monitor()
+a2a_pool = get_a2a_pool()
+chat_store = get_chat_store()
+turn_executor = get_turn_executor()
+
+# Chave da sessão na URL (?session=...): recarregar a página ou reiniciar o app mantém o histórico
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+    st.session_state.messages = chat_store.recent(st.session_state.session_id, PAGE_SIZE)
+    st.session_state.older_pages = 0
+    # Turno em andamento: id no TurnExecutor, agente e raiz do trace
+    st.session_state.turn = None
+session_id = st.session_state.session_id
+
 # Sidebar
 with st.sidebar:
     st.title("🔌 Configuração")
@@ -37,6 +102,16 @@ with st.sidebar:
     current_agent = next(data for data in AGENTS_DB.values() if data["display_name"] == selected_option)
     st.info(f"{current_agent['description']}")
     
+    # Status em cache (sem sondagem no rerun)
+    current_key = next(key for key, data in AGENTS_DB.items() if data is current_agent)
+    agent_status = health_monitor.get_status(current_key)
+    if agent_status is None:
+        st.caption("⏳ Verificando servidor...")
+    elif agent_status["healthy"]:
+        st.caption(f"🟢 Servidor online (porta {current_agent['port']})")
+    else:
+        st.caption(f"🔴 Servidor {agent_status['status']} (porta {current_agent['port']})")
+    
     st.markdown("---")
     st.caption("**Arquitetura:**")
     st.caption("• MCP Server (porta 5000)")
@@ -44,146 +119,267 @@ with st.sidebar:
     st.caption("• Coordenador (porta 8000)")
     
     if st.button("Limpar Chat"):
+        if st.session_state.turn:
+            turn_executor.cancel(st.session_state.turn["id"])
+            st.session_state.turn = None
+        chat_store.clear(session_id)
         st.session_state.messages = []
+        st.session_state.older_pages = 0
         st.rerun()
 
 # Main area
 st.title("🚀 DevMentor AI")
 st.caption(f"**Mentor:** {selected_option}")
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
 
-# Renderizar histórico
-for msg in st.session_state.messages:
+def render_message(msg: dict):
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
+        if msg.get("waterfall"):
+            with st.expander("⏱️ Tempo por etapa"):
+                st.code(msg["waterfall"])
+
+
+# Páginas anteriores: lidas do banco sob demanda a cada rerun, nunca guardadas na sessão
+oldest_id = next((msg["id"] for msg in st.session_state.messages if "id" in msg), None)
+older = []
+for _ in range(st.session_state.older_pages):
+    if oldest_id is None:
+        break
+    page = chat_store.recent(session_id, PAGE_SIZE, before_id=oldest_id)
+    if not page:
+        break
+    older = page + older
+    oldest_id = page[0]["id"]
+
+if oldest_id is not None and chat_store.has_before(session_id, oldest_id):
+    if st.button("⬆️ Carregar mensagens anteriores", disabled=st.session_state.older_pages >= MAX_OLDER_PAGES):
+        st.session_state.older_pages += 1
+        st.rerun()
+if st.session_state.older_pages and st.button("⬇️ Ocultar mensagens anteriores"):
+    st.session_state.older_pages = 0
+    st.rerun()
+
+# Renderizar histórico (páginas anteriores pedidas + página recente)
+for msg in older + st.session_state.messages:
+    render_message(msg)
+
+def show_agent_error(error_content, agent_key: str):
+    """Erro devolvido pelo agente (ErrorContent)."""
+    logger.error("Resposta de erro do agente: %s", error_content.message)
+    error_msg = f"❌ **Erro na comunicação com o agente**\n\n"
+    error_msg += f"**Mensagem de erro:** {error_content.message}\n\n"
+    error_msg += "**Possíveis causas:**\n"
+    error_msg += "1. Servidor A2A não está configurado corretamente\n"
+    error_msg += "2. Endpoint A2A não está disponível\n"
+    error_msg += "3. Timeout na comunicação\n\n"
+    error_msg += "**Solução:**\n"
+    error_msg += "Verifique os logs do servidor em `start_servers.py`"
+    st.error(error_msg)
+    
+    with st.expander("🔍 Diagnóstico detalhado"):
+        diagnostic = health_monitor.get_or_probe(agent_key)["diagnostic"]
+        st.code(format_diagnostic_report({"servers": {agent_key: diagnostic}}))
+
+
+def show_send_failure(error: Exception, error_details: str, agent_key: str, agent_url: str):
+    """Falha no envio (conexão, timeout): invalida os caches e mostra o diagnóstico."""
+    agent_port = urlparse(agent_url).port
+    error_type = type(error).__name__
+    
+    logger.error("Erro ao comunicar com agente %s em %s: %s: %s", agent_key, agent_url, error_type, error)
+    logger.debug("Traceback completo:\n%s", error_details)
+    
+    # Mensagem de erro mais informativa
+    error_msg = f"❌ **Erro ao comunicar com agente na porta {agent_port}**\n\n"
+    error_msg += f"**Tipo de erro:** `{error_type}`\n\n"
+    error_msg += f"**Mensagem:** {str(error)}\n\n"
+    
+    # Falha real de envio: invalida os caches (status e conexão) e sonda novamente
+    health_monitor.report_failure(agent_key)
+    a2a_pool.invalidate(agent_url)
+    diagnostic = health_monitor.probe_now([agent_key])[agent_key]["diagnostic"]
+    
+    error_msg += "**Status do servidor:**\n"
+    if diagnostic["port_open"]:
+        error_msg += f"✅ Porta {agent_port} está aberta\n"
+        if diagnostic["overall_status"] == "healthy":
+            error_msg += "✅ Servidor está respondendo\n"
+        else:
+            error_msg += f"⚠️ Servidor não está respondendo corretamente ({diagnostic['overall_status']})\n"
+    elif diagnostic["port_open"] is None:
+        error_msg += f"⏱️ Porta {agent_port} não respondeu no prazo (servidor ocupado?)\n"
+    else:
+        error_msg += f"❌ Porta {agent_port} não está aberta\n"
+        error_msg += f"   Causa: {diagnostic['port_error']}\n"
+    
+    error_msg += "\n**Solução:**\n"
+    error_msg += "1. Execute `python start_servers.py` em um terminal separado\n"
+    error_msg += "2. Aguarde alguns segundos para os servidores iniciarem completamente\n"
+    error_msg += "3. Verifique os logs do servidor para erros de inicialização\n"
+    
+    st.error(error_msg)
+    
+    # Mostrar detalhes do erro e diagnóstico
+    with st.expander("🔍 Detalhes técnicos do erro"):
+        st.code(error_details)
+    
+    with st.expander("📊 Diagnóstico do servidor"):
+        st.code(format_diagnostic_report({"servers": {agent_key: diagnostic}}))
+
+
+def finish_turn(pending: dict, turn):
+    """Mostra e grava o resultado de um turno terminado (resposta, erro ou cancelamento)."""
+    from python_a2a import ErrorContent
+    
+    agent_key = pending["agent_key"]
+    messages = st.session_state.messages
+    st.session_state.turn = None
+    root_span = pending["span"]
+    root_span.end()
+    
+    with st.chat_message("assistant"):
+        if turn is None or turn.state == CANCELLED:
+            logger.info("Turno cancelado para o agente %s", agent_key)
+            if AGENTS_ABORT_ON_CANCEL:
+                st.info("⏹️ Geração cancelada.")
+            else:
+                st.info(
+                    "⏹️ Geração cancelada só na interface: o agente (servidor Flask) termina a chamada "
+                    "ao LLM em andamento. Use `--serving asgi` para interrompê-la."
+                )
+            messages.pop()
+            return
+        if turn.state != DONE:
+            show_send_failure(turn.error, turn.error_details, agent_key, pending["agent_url"])
+            messages.pop()  # Remove mensagem do usuário em caso de erro
+            return
+        
+        response = turn.response
+        if isinstance(response.content, ErrorContent):
+            show_agent_error(response.content, agent_key)
+            messages.pop()
+            return
+        
+        # Extrair texto da resposta
+        if hasattr(response.content, 'text'):
+            response_text = response.content.text
+        elif hasattr(response.content, 'message'):
+            response_text = response.content.message
+        else:
+            response_text = str(response.content)
+        
+        logger.info("Resposta recebida do agente %s (tamanho: %d chars)", agent_key, len(response_text))
+        st.markdown(response_text)
+        
+        # Cascata de tempo por etapa (spans gravados por app, coordenador, agentes e MCP)
+        waterfall = format_waterfall(load_trace(root_span.trace_id))
+        with st.expander("⏱️ Tempo por etapa"):
+            st.code(waterfall)
+    
+    # Turno completo vai para o banco; a sessão mantém só a página mais recente
+    messages.append({"role": "assistant", "content": response_text})
+    messages[-2:] = chat_store.append(
+        session_id, [(msg["role"], msg["content"]) for msg in messages[-2:]],
+        persona=agent_key, waterfall=waterfall
+    )
+    del messages[:-PAGE_SIZE]
+
 
-# Input e resposta
-if prompt := st.chat_input("Sua mensagem..."):
+@fragment(run_every=TURN_POLL_INTERVAL)
+def show_running_turn():
+    """Resposta em andamento: progresso, texto parcial e cancelamento, sem rerun da página inteira."""
+    pending = st.session_state.turn
+    turn = turn_executor.get(pending["id"]) if pending else None
+    if turn is None or turn.finished:
+        # Terminou: rerun completo para gravar o turno e liberar o input
+        st.rerun()
+    with st.chat_message("assistant"):
+        if turn.text:
+            st.markdown(turn.text + "▌")
+        status = "na fila" if turn.started_at is None else "gerando resposta"
+        st.caption(f"⏳ {pending['display_name']} {status}... {turn.elapsed:.0f}s")
+        help_text = None if AGENTS_ABORT_ON_CANCEL else "Libera a interface; o agente Flask termina a chamada ao LLM"
+        if st.button("⏹️ Cancelar", key=f"cancel-{turn.id}", help=help_text):
+            turn_executor.cancel(turn.id)
+            st.rerun()
+
+
+pending_turn = st.session_state.turn
+if pending_turn:
+    running = turn_executor.get(pending_turn["id"])
+    if running is None or running.finished:
+        finish_turn(pending_turn, running)
+    else:
+        show_running_turn()
+
+# Input: enviado em background; a página segue respondendo enquanto o agente gera
+if prompt := st.chat_input("Sua mensagem...", disabled=bool(st.session_state.turn)):
     if not api_key:
         st.warning("Por favor, insira a API Key na barra lateral.")
         st.stop()
     
     # Adicionar mensagem do usuário
     st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.chat_message("user"):
-        st.markdown(prompt)
     
     # Determinar agente baseado na seleção
     agent_key = next(key for key, data in AGENTS_DB.items() if data["display_name"] == selected_option)
-    agent_port = current_agent["port"]
+    # Porta própria da persona ou rota do host multi-persona (DEVMENTOR_AGENT_HOST_URL)
+    agent_url = get_agent_url(agent_key)
+    agent_port = urlparse(agent_url).port
     
-    # Chamar agente via A2A
-    with st.chat_message("assistant"):
-        agent_url = f"http://localhost:{agent_port}"
-        logger.info(f"Tentando conectar ao agente {agent_key} em {agent_url}")
+    logger.info("Tentando conectar ao agente %s em %s", agent_key, agent_url)
+    
+    # Raiz do trace: UI → (coordenador) → agente → LLM/MCP; termina quando o turno acaba
+    root_span = start_span("ui.request", service="app", persona=agent_key)
+    trace_token = activate(root_span)
+    
+    try:
+        # Status do servidor: snapshot em cache, sondado sob demanda só se estiver velho
+        with trace_span("ui.health_check"):
+            diagnostic = health_monitor.get_or_probe(agent_key)["diagnostic"]
+        logger.debug("Diagnóstico do servidor: %s", diagnostic)
         
-        try:
-            # Diagnóstico prévio do servidor
-            diagnostic = diagnose_agent_server(agent_port, agent_url)
-            logger.debug(f"Diagnóstico do servidor: {diagnostic}")
-            
-            if not diagnostic["port_open"]:
-                logger.error(f"Porta {agent_port} não está aberta: {diagnostic['port_error']}")
-                error_msg = f"❌ **Servidor não está rodando**\n\n"
-                error_msg += f"O agente na porta {agent_port} não está respondendo.\n\n"
-                error_msg += f"**Causa:** {diagnostic['port_error']}\n\n"
-                error_msg += "**Solução:**\n"
-                error_msg += "1. Execute `python start_servers.py` em um terminal separado\n"
-                error_msg += "2. Aguarde alguns segundos para os servidores iniciarem\n"
-                error_msg += "3. Verifique se não há erros no terminal do start_servers.py"
-                st.error(error_msg)
-                st.session_state.messages.pop()
-                st.stop()
-            
-            if diagnostic["overall_status"] != "healthy":
-                logger.warning(f"Servidor em {agent_url} não está saudável: {diagnostic['overall_status']}")
-                # Ainda tenta conectar, mas loga o aviso
-            
-            # Tentar conectar via A2A
-            logger.info(f"Criando cliente A2A para {agent_url}")
-            client = A2AClient(agent_url, timeout=60)
-            
-            msg = Message(
-                content=TextContent(text=prompt),
-                role=MessageRole.USER
-            )
-            
-            logger.info(f"Enviando mensagem para agente {agent_key}")
-            response = client.send_message(msg)
-            
-            # Verificar se a resposta contém erro
-            if isinstance(response.content, ErrorContent):
-                error_content = response.content
-                logger.error(f"Resposta de erro do agente: {error_content.message}")
-                error_msg = f"❌ **Erro na comunicação com o agente**\n\n"
-                error_msg += f"**Mensagem de erro:** {error_content.message}\n\n"
-                error_msg += "**Possíveis causas:**\n"
-                error_msg += "1. Servidor A2A não está configurado corretamente\n"
-                error_msg += "2. Endpoint A2A não está disponível\n"
-                error_msg += "3. Timeout na comunicação\n\n"
-                error_msg += "**Solução:**\n"
-                error_msg += "Verifique os logs do servidor em `start_servers.py`"
-                st.error(error_msg)
-                
-                with st.expander("🔍 Diagnóstico detalhado"):
-                    st.code(format_diagnostic_report({"servers": {agent_key: diagnostic}}))
-                
-                st.session_state.messages.pop()
-                st.stop()
-            
-            # Extrair texto da resposta
-            if hasattr(response.content, 'text'):
-                response_text = response.content.text
-            elif hasattr(response.content, 'message'):
-                response_text = response.content.message
-            else:
-                response_text = str(response.content)
-            
-            logger.info(f"Resposta recebida do agente {agent_key} (tamanho: {len(response_text)} chars)")
-            st.markdown(response_text)
-            st.session_state.messages.append({"role": "assistant", "content": response_text})
-            
-        except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            error_type = type(e).__name__
-            
-            logger.error(f"Erro ao comunicar com agente {agent_key} em {agent_url}: {error_type}: {str(e)}")
-            logger.debug(f"Traceback completo:\n{error_details}")
-            
-            # Mensagem de erro mais informativa
-            error_msg = f"❌ **Erro ao comunicar com agente na porta {agent_port}**\n\n"
-            error_msg += f"**Tipo de erro:** `{error_type}`\n\n"
-            error_msg += f"**Mensagem:** {str(e)}\n\n"
-            
-            # Diagnóstico automático
-            diagnostic = diagnose_agent_server(agent_port, agent_url)
-            
-            error_msg += "**Status do servidor:**\n"
-            if diagnostic["port_open"]:
-                error_msg += f"✅ Porta {agent_port} está aberta\n"
-                if diagnostic["overall_status"] == "healthy":
-                    error_msg += "✅ Servidor está respondendo\n"
-                else:
-                    error_msg += f"⚠️ Servidor não está respondendo corretamente ({diagnostic['overall_status']})\n"
-            else:
-                error_msg += f"❌ Porta {agent_port} não está aberta\n"
-                error_msg += f"   Causa: {diagnostic['port_error']}\n"
-            
-            error_msg += "\n**Solução:**\n"
+        # Prazo esgotado (port_open None) pode ser agente ocupado: tenta enviar
+        if diagnostic["port_open"] is False:
+            logger.error("Porta %s não está aberta: %s", agent_port, diagnostic["port_error"])
+            error_msg = f"❌ **Servidor não está rodando**\n\n"
+            error_msg += f"O agente na porta {agent_port} não está respondendo.\n\n"
+            error_msg += f"**Causa:** {diagnostic['port_error']}\n\n"
+            error_msg += "**Solução:**\n"
             error_msg += "1. Execute `python start_servers.py` em um terminal separado\n"
-            error_msg += "2. Aguarde alguns segundos para os servidores iniciarem completamente\n"
-            error_msg += "3. Verifique os logs do servidor para erros de inicialização\n"
-            
+            error_msg += "2. Aguarde alguns segundos para os servidores iniciarem\n"
+            error_msg += "3. Verifique se não há erros no terminal do start_servers.py"
+            with st.chat_message("user"):
+                st.markdown(prompt)
             st.error(error_msg)
-            
-            # Mostrar detalhes do erro e diagnóstico
-            with st.expander("🔍 Detalhes técnicos do erro"):
-                st.code(error_details)
-            
-            with st.expander("📊 Diagnóstico do servidor"):
-                st.code(format_diagnostic_report({"servers": {agent_key: diagnostic}}))
-            
-            st.session_state.messages.pop()  # Remove mensagem do usuário em caso de erro
+            st.session_state.messages.pop()
+            root_span.end()
+            st.stop()
+        
+        if diagnostic["overall_status"] != "healthy":
+            logger.warning("Servidor em %s não está saudável: %s", agent_url, diagnostic["overall_status"])
+            # Ainda tenta conectar, mas loga o aviso
+        
+        # python_a2a só é carregado na primeira mensagem
+        from python_a2a import Message, Metadata, TextContent, MessageRole
+        
+        logger.info("Enviando mensagem para agente %s", agent_key)
+        msg = Message(
+            content=TextContent(text=prompt),
+            role=MessageRole.USER,
+            metadata=Metadata(custom_fields=inject({}))
+        )
+        # Envio em background pelo cliente em cache; o span ativo segue para a thread do envio
+        turn = turn_executor.submit(agent_url, msg)
+    finally:
+        deactivate(trace_token)
+    
+    st.session_state.turn = {
+        "id": turn.id,
+        "agent_key": agent_key,
+        "agent_url": agent_url,
+        "display_name": selected_option,
+        "span": root_span,
+    }
+    st.rerun()
@@ -1,27 +1,44 @@
-"""Agentes A2A especializados."""
-from app.agents.base_agent import BaseAgent
-from app.agents.interviewer_agents import AlgoInterviewerAgent, MLSystemInterviewerAgent
-from app.agents.tutor_agents import ConceptTutorAgent
-from app.agents.reviewer_agents import CodeReviewerAgent
-from app.agents.coach_agents import SoftSkillsCoachAgent
-from app.agents.coordinator import CoordinatorAgent
-
-__all__ = [
-    "BaseAgent",
-    "AlgoInterviewerAgent",
-    "MLSystemInterviewerAgent",
-    "ConceptTutorAgent",
-    "CodeReviewerAgent",
-    "SoftSkillsCoachAgent",
-    "CoordinatorAgent",
-]
-
-# Mapeamento de agentes por porta
-AGENT_CLASSES = {
-    "algo_interviewer": AlgoInterviewerAgent,
-    "ml_system_interviewer": MLSystemInterviewerAgent,
-    "concept_tutor": ConceptTutorAgent,
-    "code_reviewer": CodeReviewerAgent,
-    "soft_skills_coach": SoftSkillsCoachAgent,
+"""Agentes A2A especializados.
+
+As classes são carregadas sob demanda (PEP 562): `import app.agents` não
+importa python_a2a nem o SDK da OpenAI até alguma persona ser usada.
+"""
+import importlib
+from typing import Any, Dict
+
+# Classe exportada → módulo que a define
+_LAZY_CLASSES = {
+    "BaseAgent": "app.agents.base_agent",
+    "AlgoInterviewerAgent": "app.agents.interviewer_agents",
+    "MLSystemInterviewerAgent": "app.agents.interviewer_agents",
+    "ConceptTutorAgent": "app.agents.tutor_agents",
+    "CodeReviewerAgent": "app.agents.reviewer_agents",
+    "SoftSkillsCoachAgent": "app.agents.coach_agents",
+    "CoordinatorAgent": "app.agents.coordinator",
+}
+
+# Mapeamento de agentes por chave do AGENTS_DB (nomes das classes; `AGENT_CLASSES` resolve as classes)
+AGENT_CLASS_NAMES = {
+    "algo_interviewer": "AlgoInterviewerAgent",
+    "ml_system_interviewer": "MLSystemInterviewerAgent",
+    "concept_tutor": "ConceptTutorAgent",
+    "code_reviewer": "CodeReviewerAgent",
+    "soft_skills_coach": "SoftSkillsCoachAgent",
 }
 
+__all__ = list(_LAZY_CLASSES)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_CLASSES:
+        value = getattr(importlib.import_module(_LAZY_CLASSES[name]), name)
+    elif name == "AGENT_CLASSES":
+        value: Dict[str, type] = {key: __getattr__(cls) for key, cls in AGENT_CLASS_NAMES.items()}
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # Próximos acessos não passam mais por aqui
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_CLASSES) | {"AGENT_CLASSES"})
@@ -0,0 +1,491 @@
+"""
+Servidor ASGI para os agentes A2A.
+
+Fala o mesmo protocolo do servidor Flask do python_a2a (`tasks/send`,
+`tasks/get`, `tasks/cancel`, `tasks/stream`, mensagem em `/`, agent card), mas
+cada tarefa é uma corrotina que aguarda o LLM e o MCP (`ahandle_task`) em vez
+de prender uma thread do servidor durante a chamada. Um processo segura
+centenas de conversas em andamento; com `--workers N` o uvicorn divide as
+conexões entre N processos. As tarefas (`agent.tasks`, `running`) ficam na
+memória de cada processo: com mais de um worker, `tasks/get` e `tasks/cancel`
+só acham a tarefa se caírem no worker que a executa (um worker ou roteamento
+fixo por cliente); senão respondem 404. O cancelamento confiável é o cliente
+fechar a conexão de `tasks/send`/`tasks/stream`: o servidor não cancela o
+handler sozinho, então cada rota acompanha a desconexão e aborta a corrotina.
+
+Em `tasks/stream` (JSON-RPC `tasks/sendSubscribe`) os eventos SSE `update` e
+`complete` são os do servidor Flask, com eventos `delta` a mais carregando os
+trechos da resposta conforme o LLM gera. Se o cliente desconecta ou cancela,
+a corrotina é cancelada e a chamada ao LLM é abortada.
+
+Uso:
+    python -m app.agents.asgi concept_tutor --port 8003 --workers 2
+    python -m app.agents.asgi host --port 8100 --workers 2
+    python -m app.agents.asgi coordinator --port 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from python_a2a import Message, MessageRole, Task, TextContent
+from python_a2a.models.task import TaskState, TaskStatus
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app.agents import AGENT_CLASS_NAMES, AGENT_CLASSES
+from app.agents.base_agent import reset_delta_sink, set_delta_sink
+from app.mcp.agents_data import AGENT_HOST_PREFIX, get_agent_url
+from app.services.usage_ledger import get_usage_ledger
+from app.utils.logger import get_logger
+from app.utils.metrics import CONTENT_TYPE, ERRORS_TOTAL, REGISTRY, REQUEST_SECONDS, REQUESTS_IN_FLIGHT
+from app.utils.profiler import is_admin_allowed, parse_profile_params, run_profile
+from app.utils.tracing import activate, deactivate, extract_from_task_payload, start_span
+
+logger = get_logger(__name__)
+
+# Alvo servido pela factory `create_app` (chave da persona, "host" ou "coordinator")
+TARGET_ENV = "DEVMENTOR_ASGI_TARGET"
+# Porta pública, usada nas URLs dos agent cards
+PORT_ENV = "DEVMENTOR_ASGI_PORT"
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+def _rpc_error(rpc_id: Any, code: int, message: str, status: int) -> JSONResponse:
+    return JSONResponse({"jsonrpc": "2.0", "id": rpc_id, "error": {"code": code, "message": message}}, status)
+
+
+def _sse(event: str, rpc_id: Any, data: Dict[str, Any]) -> str:
+    """Evento SSE no formato do servidor Flask do python_a2a."""
+    return f"event: {event}\nid: {rpc_id}\ndata: {json.dumps(data)}\n\n"
+
+
+def _admin_forbidden(request: Request) -> Optional[JSONResponse]:
+    """Resposta 403 se o chamador não for loopback (mesma regra do servidor Flask)."""
+    if not is_admin_allowed(request.client.host if request.client else None):
+        return JSONResponse({"error": "endpoint de admin disponível apenas via loopback"}, 403)
+    return None
+
+
+async def metrics(request: Request) -> Response:
+    """Métricas do processo no formato Prometheus."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+async def admin_profile(request: Request) -> Response:
+    """Pilhas amostradas de todas as threads (o sampler roda fora do event loop)."""
+    forbidden = _admin_forbidden(request)
+    if forbidden:
+        return forbidden
+    try:
+        seconds, interval, thread_filter, include_idle, output = parse_profile_params(request.query_params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    profile = await asyncio.to_thread(run_profile, seconds, interval, thread_filter, include_idle)
+    if profile is None:
+        return JSONResponse({"error": "já existe um profiling em andamento"}, 409)
+    if output == "json":
+        return JSONResponse(profile)
+    return PlainTextResponse(profile["collapsed"] + "\n")
+
+
+async def admin_usage(request: Request) -> Response:
+    """Tokens e custo do LLM na janela, como em `/admin/usage` do servidor Flask."""
+    forbidden = _admin_forbidden(request)
+    if forbidden:
+        return forbidden
+    ledger = get_usage_ledger()
+    params = request.query_params
+    try:
+        window = float(params.get("window", 3600))
+        top = ledger.top(
+            by=params.get("by", "persona"),
+            metric=params.get("metric", "total_tokens"),
+            window=window,
+            limit=int(params.get("limit", 5))
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    return JSONResponse({"window_s": window, "totals": ledger.totals(window), "top": top})
+
+
+class AgentEndpoints:
+    """Rotas A2A de um agente, com as tarefas em andamento canceláveis por id."""
+
+    def __init__(self, agent):
+        self.agent = agent
+        # id da tarefa -> (tarefa, corrotina em execução); `tasks/cancel` interrompe a chamada ao LLM
+        self.running: Dict[str, Tuple[Task, asyncio.Task]] = {}
+        self._cancelled = set()
+
+    def _instrumented(self, endpoint: str, handler: Handler) -> Handler:
+        """Latência, requisições em andamento e erros por rota (mesmas métricas do Flask)."""
+        persona = self.agent.persona
+
+        async def wrapper(request: Request) -> Response:
+            start = time.perf_counter()
+            REQUESTS_IN_FLIGHT.labels(persona=persona).inc()
+            try:
+                return await handler(request)
+            except Exception as e:
+                ERRORS_TOTAL.labels(component="a2a_server", persona=persona, model="", error=type(e).__name__).inc()
+                raise
+            finally:
+                REQUESTS_IN_FLIGHT.labels(persona=persona).dec()
+                REQUEST_SECONDS.labels(persona=persona, endpoint=endpoint).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    async def run_task(
+        self,
+        data: Dict[str, Any],
+        path: str,
+        on_delta: Optional[Callable[[str], None]] = None
+    ) -> Task:
+        """
+        Executa uma tarefa A2A como corrotina, dentro do span de servidor.
+
+        Args:
+            data: Tarefa no formato do python_a2a
+            path: Rota que recebeu a tarefa (atributo do span)
+            on_delta: Recebe os trechos da resposta conforme o LLM gera (streaming)
+
+        Raises:
+            Exception: O erro de `ahandle_task`, para o chamador responder no formato da rota
+        """
+        task = Task.from_dict(data)
+        span = start_span("a2a.server", service=self.agent.persona, parent=extract_from_task_payload(data), path=path)
+        token = activate(span)
+        sink_token = set_delta_sink(on_delta)
+        # A corrotina copia o contexto agora: o span ativo e o destino dos trechos seguem para LLM e MCP
+        job = asyncio.ensure_future(self.agent.ahandle_task(task))
+        reset_delta_sink(sink_token)
+        self.running[task.id] = (task, job)
+        try:
+            result = await job
+        except asyncio.CancelledError:
+            if task.id not in self._cancelled:
+                # Cancelamento do próprio servidor (desligamento): propaga
+                raise
+            result = task
+            result.status = TaskStatus(state=TaskState.CANCELED)
+        except Exception as e:
+            span.set_error(e)
+            raise
+        finally:
+            self.running.pop(task.id, None)
+            self._cancelled.discard(task.id)
+            deactivate(token)
+            span.end()
+        self.agent.tasks[result.id] = result
+        return result
+
+    async def _run_while_connected(self, request: Request, params: Dict[str, Any]) -> Task:
+        """
+        `run_task` cancelada se o cliente desconectar antes da resposta.
+
+        Starlette/uvicorn não cancelam o handler quando a conexão cai. Com o corpo
+        já lido, `receive` só retorna no `http.disconnect`.
+        """
+        params = dict(params)
+        params.setdefault("id", str(uuid.uuid4()))
+        runner = asyncio.ensure_future(self.run_task(params, request.url.path))
+        disconnected = asyncio.ensure_future(request.receive())
+        try:
+            await asyncio.wait({runner, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not runner.done():
+                logger.info("Cliente desconectou; cancelando tarefa %s de %s", params["id"], self.agent.persona)
+                self._cancelled.add(params["id"])
+                runner.cancel()
+            return await runner
+        finally:
+            disconnected.cancel()
+            runner.cancel()
+
+    async def tasks_send(self, request: Request) -> Response:
+        data = await request.json()
+        if "jsonrpc" in data:
+            rpc_id = data.get("id", 1)
+            try:
+                result = await self._run_while_connected(request, data.get("params") or {})
+            except Exception as e:
+                logger.error("Erro ao processar tarefa em %s: %s: %s", self.agent.persona, type(e).__name__, e)
+                return _rpc_error(rpc_id, -32603, f"Internal error: {str(e)}", 500)
+            return JSONResponse({"jsonrpc": "2.0", "id": rpc_id, "result": result.to_dict()})
+        try:
+            result = await self._run_while_connected(request, data)
+        except Exception as e:
+            logger.error("Erro ao processar tarefa em %s: %s: %s", self.agent.persona, type(e).__name__, e)
+            return JSONResponse({
+                "id": data.get("id", ""),
+                "sessionId": data.get("sessionId", ""),
+                "status": {"state": "failed", "message": {"error": f"Error processing task: {str(e)}"}},
+            }, 500)
+        return JSONResponse(result.to_dict())
+
+    async def tasks_stream(self, request: Request) -> Response:
+        """
+        Tarefa com a resposta em streaming SSE (`tasks/sendSubscribe`).
+
+        Emite `update` com a tarefa recebida, um `delta` por trecho gerado e
+        `complete` com a tarefa final (concluída, com falha ou cancelada).
+        """
+        data = await request.json()
+        params = dict((data.get("params") or {}) if "jsonrpc" in data else data)
+        rpc_id = data.get("id", 1)
+        params.setdefault("id", str(uuid.uuid4()))
+        task_id = params["id"]
+        deltas: asyncio.Queue = asyncio.Queue()
+        runner = asyncio.ensure_future(self.run_task(params, request.url.path, on_delta=deltas.put_nowait))
+        # Com o corpo já lido, `receive` só retorna quando o cliente desconecta
+        disconnected = asyncio.ensure_future(request.receive())
+
+        def abort():
+            if not runner.done():
+                self._cancelled.add(task_id)
+                runner.cancel()
+
+        async def events():
+            try:
+                yield _sse("update", rpc_id, Task.from_dict(params).to_dict())
+                while True:
+                    getter = asyncio.ensure_future(deltas.get())
+                    await asyncio.wait({getter, runner, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        break
+                    yield _sse("delta", rpc_id, {"id": task_id, "text": getter.result()})
+                if disconnected.done() and not runner.done():
+                    logger.info("Cliente desconectou; cancelando tarefa %s de %s", task_id, self.agent.persona)
+                    abort()
+                    return
+                while not deltas.empty():
+                    yield _sse("delta", rpc_id, {"id": task_id, "text": deltas.get_nowait()})
+                try:
+                    result = runner.result().to_dict()
+                except Exception as e:
+                    logger.error("Erro ao processar tarefa em %s: %s: %s", self.agent.persona, type(e).__name__, e)
+                    result = {
+                        "id": task_id,
+                        "sessionId": params.get("sessionId", ""),
+                        "status": {"state": "failed", "message": {"error": f"Error processing task: {str(e)}"}},
+                    }
+                yield _sse("complete", rpc_id, result)
+            finally:
+                abort()
+                disconnected.cancel()
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def tasks_get(self, request: Request) -> Response:
+        data = await request.json()
+        params = (data.get("params") or {}) if "jsonrpc" in data else data
+        task = self.agent.tasks.get(params.get("id"))
+        if "jsonrpc" not in data:
+            if task is None:
+                return JSONResponse({"error": f"Task not found: {params.get('id')}"}, 404)
+            return JSONResponse(task.to_dict())
+        if task is None:
+            return _rpc_error(data.get("id", 1), -32000, f"Task not found: {params.get('id')}", 404)
+        return JSONResponse({"jsonrpc": "2.0", "id": data.get("id", 1), "result": task.to_dict()})
+
+    async def tasks_cancel(self, request: Request) -> Response:
+        """
+        Cancela a tarefa; se ainda estiver rodando, a chamada ao LLM é interrompida.
+
+        Só vale para tarefas deste processo (com vários workers, veja o docstring do módulo).
+        """
+        data = await request.json()
+        params = (data.get("params") or {}) if "jsonrpc" in data else data
+        task_id = params.get("id")
+        task, job = self.running.get(task_id, (self.agent.tasks.get(task_id), None))
+        if job is not None:
+            self._cancelled.add(task_id)
+            job.cancel()
+        if task is None:
+            if "jsonrpc" in data:
+                return _rpc_error(data.get("id", 1), -32000, f"Task not found: {task_id}", 404)
+            return JSONResponse({"error": f"Task not found: {task_id}"}, 404)
+        task.status = TaskStatus(state=TaskState.CANCELED)
+        if "jsonrpc" in data:
+            return JSONResponse({"jsonrpc": "2.0", "id": data.get("id", 1), "result": task.to_dict()})
+        return JSONResponse(task.to_dict())
+
+    async def root_post(self, request: Request) -> Response:
+        """Tarefa ou mensagem avulsa em `/` (fallback do A2AClient); mensagens viram tarefas."""
+        data = await request.json()
+        if "id" in data and ("message" in data or "status" in data):
+            return await self.tasks_send(request)
+        try:
+            message = Message.from_dict(data)
+            result = await self._run_while_connected(request, {"message": message.to_dict()})
+            text = next(
+                (part.get("text", "") for artifact in result.artifacts for part in artifact.get("parts", [])
+                 if part.get("type") == "text"),
+                ""
+            )
+        except Exception as e:
+            return JSONResponse({
+                "content": {"type": "error", "message": f"Error processing request: {str(e)}"},
+                "role": "system"
+            }, 500)
+        return JSONResponse(Message(
+            content=TextContent(text=text),
+            role=MessageRole.AGENT,
+            parent_message_id=message.message_id,
+            conversation_id=message.conversation_id
+        ).to_dict())
+
+    async def index(self, request: Request) -> Response:
+        card = self.agent.agent_card
+        return JSONResponse({
+            "name": card.name,
+            "description": card.description,
+            "agent_card_url": "/agent.json",
+            "protocol": "a2a",
+            "capabilities": card.capabilities,
+        })
+
+    async def agent_card(self, request: Request) -> Response:
+        return JSONResponse(self.agent.agent_card.to_dict())
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({"status": "ok", "in_flight": len(self.running)})
+
+    def routes(self) -> List[Route]:
+        timed = self._instrumented
+        routes = []
+        for prefix in ("", "/a2a"):
+            routes += [
+                Route(f"{prefix}/tasks/send", timed("/tasks/send", self.tasks_send), methods=["POST"]),
+                Route(f"{prefix}/tasks/get", timed("/tasks/get", self.tasks_get), methods=["POST"]),
+                Route(f"{prefix}/tasks/cancel", timed("/tasks/cancel", self.tasks_cancel), methods=["POST"]),
+                Route(f"{prefix}/tasks/stream", timed("/tasks/stream", self.tasks_stream), methods=["POST"]),
+                Route(f"{prefix}/agent.json", self.agent_card, methods=["GET"]),
+                Route(f"{prefix}/health", self.health, methods=["GET"]),
+            ]
+        routes += [
+            Route("/", self.index, methods=["GET"]),
+            Route("/a2a", self.index, methods=["GET"]),
+            Route("/", timed("/", self.root_post), methods=["POST"]),
+            Route("/a2a", timed("/", self.root_post), methods=["POST"]),
+            Route("/.well-known/agent.json", self.agent_card, methods=["GET"]),
+            Route("/.well-known/agent-card.json", self.agent_card, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/admin/profile", admin_profile, methods=["GET"]),
+            Route("/admin/usage", admin_usage, methods=["GET"]),
+        ]
+        return routes
+
+
+def create_asgi_app(agent) -> Starlette:
+    """App ASGI de um agente (BaseAgent); fecha os clientes assíncronos no desligamento."""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await agent.aclose()
+
+    return Starlette(routes=AgentEndpoints(agent).routes(), lifespan=lifespan)
+
+
+def create_asgi_host_app(
+    keys: Optional[Iterable[str]] = None,
+    base_url: str = "http://localhost:8100",
+    mcp_url: str = "http://localhost:5000"
+) -> Starlette:
+    """Host multi-persona em ASGI: mesmas rotas do AgentHost, com as personas em `/agents/<chave>`."""
+    from app.agents.host import AgentHost
+
+    host = AgentHost(keys, base_url=base_url, mcp_url=mcp_url)
+
+    async def index(request: Request) -> Response:
+        return JSONResponse({
+            "status": "ok",
+            "agents": {key: {"name": agent.name, "url": host.agent_url(key)} for key, agent in host.agents.items()},
+        })
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await host.aclose()
+
+    routes = [
+        Route("/", index, methods=["GET"]),
+        Route("/health", index, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ]
+    routes += [
+        Mount(f"{AGENT_HOST_PREFIX}/{key}", routes=AgentEndpoints(agent).routes())
+        for key, agent in host.agents.items()
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+def create_target_app(target: str, port: int) -> Starlette:
+    """
+    App ASGI de uma persona, do host ("host") ou do coordenador ("coordinator").
+
+    Raises:
+        ValueError: Se o alvo for desconhecido
+    """
+    base_url = f"http://localhost:{port}"
+    if target == "host":
+        return create_asgi_host_app(base_url=base_url)
+    if target == "coordinator":
+        from app.agents.coordinator import CoordinatorAgent
+        from app.utils.health_monitor import HealthMonitor
+
+        coordinator = CoordinatorAgent(url=base_url)
+        # Cada worker mantém seu monitor: o roteamento não sonda portas
+        coordinator.health_monitor = HealthMonitor(dict(coordinator._agent_urls))
+        coordinator.health_monitor.start()
+        return create_asgi_app(coordinator)
+    if target not in AGENT_CLASS_NAMES:
+        raise ValueError(f"alvo ASGI desconhecido: {target}")
+    return create_asgi_app(AGENT_CLASSES[target](url=get_agent_url(target)))
+
+
+def create_app() -> Starlette:
+    """Factory usada pelo uvicorn com vários workers (um app por processo), configurada por env."""
+    return create_target_app(os.getenv(TARGET_ENV, "host"), int(os.getenv(PORT_ENV, "8100")))
+
+
+def run_asgi_server(target: str, host: str = "0.0.0.0", port: int = 8100, workers: int = 1):
+    """
+    Executa uma persona, o host ou o coordenador sob uvicorn (bloqueante).
+
+    Com `workers > 1` cada processo tem seu event loop, clientes e métricas
+    próprios; com um worker o app é criado aqui mesmo (vale em thread).
+    """
+    import uvicorn
+
+    logger.info("⚡ Servidor ASGI de %s em http://%s:%d com %d worker(s)", target, host, port, workers)
+    options = {"host": host, "port": port, "log_level": "warning", "timeout_keep_alive": 30}
+    if workers > 1:
+        os.environ[TARGET_ENV] = target
+        os.environ[PORT_ENV] = str(port)
+        uvicorn.run("app.agents.asgi:create_app", factory=True, workers=workers, **options)
+    else:
+        uvicorn.run(create_target_app(target, port), **options)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Agentes A2A sob ASGI (uvicorn)")
+    parser.add_argument("target", help="Chave da persona, 'host' ou 'coordinator'")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+    run_asgi_server(args.target, args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
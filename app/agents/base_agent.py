@@ -4,10 +4,52 @@ Fornece funcionalidades comuns como acesso ao LLM e ferramentas MCP.
 """
 import os
 import json
+import time
+import asyncio
 import requests
-from typing import Dict, Any, Optional, List
-from openai import OpenAI
+from contextvars import ContextVar, Token
+from typing import TYPE_CHECKING, Callable, Dict, Any, Optional, List
 from python_a2a import A2AServer
+from app.mcp.agents_data import AGENTS_DB
+from app.services.llm_service import get_llm_base_url
+from app.services.concurrency import Slot, get_llm_limiter
+from app.services.usage_ledger import get_usage_ledger, usage_from_response
+from app.utils.metrics import (
+    CONTENT_TYPE, ERRORS_TOTAL, LLM_SECONDS, REGISTRY, REQUEST_SECONDS, REQUESTS_IN_FLIGHT
+)
+from app.utils.profiler import is_admin_allowed, label_current_thread, parse_profile_params, run_profile
+from app.utils.tracing import activate, deactivate, extract_from_task_payload, inject, start_span, trace_span
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+# Destino dos tokens parciais do LLM na tarefa atual (tarefas em streaming do servidor ASGI)
+_delta_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("llm_delta_sink", default=None)
+
+
+def __getattr__(name: str) -> Any:
+    # SDK da OpenAI carregado só ao criar o primeiro cliente: personas, coordenador
+    # e host importam este módulo sem pagar o import (como em `llm_service`)
+    if name in ("OpenAI", "AsyncOpenAI"):
+        import openai
+        globals()[name] = getattr(openai, name)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _openai_class(name: str) -> type:
+    """Classe do SDK pelo nome (respeita `patch('app.agents.base_agent.OpenAI')`)."""
+    return globals().get(name) or __getattr__(name)
+
+
+def set_delta_sink(sink: Optional[Callable[[str], None]]) -> Token:
+    """Faz `acall_llm` transmitir os tokens para `sink` no contexto atual; devolve o token para `reset_delta_sink`."""
+    return _delta_sink.set(sink)
+
+
+def reset_delta_sink(token: Token):
+    _delta_sink.reset(token)
 
 
 class BaseAgent(A2AServer):
@@ -18,22 +60,197 @@ class BaseAgent(A2AServer):
         self.description = description
         self.prompt = prompt
         self.mcp_url = mcp_url
+        # Chave estável do AGENTS_DB (ex: 'code_reviewer') usada como label das métricas
+        self.persona = next((key for key, data in AGENTS_DB.items() if data["display_name"] == name), name)
+        # Rótulo das threads deste servidor no profiler (`/admin/profile`)
+        self.server_label = f"server:{self.persona}"
         self._llm_client = None
+        # Clientes do modo assíncrono (servidor ASGI), criados no primeiro uso
+        self._async_llm_client: Optional["AsyncOpenAI"] = None
+        self._async_http: Optional["httpx.AsyncClient"] = None
+        # Recursos compartilhados pelo host multi-persona (None: cada agente usa os seus)
+        self.llm_client_provider: Optional[Callable[[], "OpenAI"]] = None
+        self.async_llm_client_provider: Optional[Callable[[], "AsyncOpenAI"]] = None
+        self.mcp_session: Optional[requests.Session] = None
         super().__init__(**kwargs)
     
     @property
-    def llm_client(self) -> OpenAI:
+    def llm_client(self) -> "OpenAI":
         """Lazy initialization do cliente LLM."""
+        if self.llm_client_provider is not None:
+            return self.llm_client_provider()
         if self._llm_client is None:
             api_key = os.getenv("OPENROUTER_API_KEY")
             if not api_key:
                 raise ValueError("OPENROUTER_API_KEY não configurada")
-            self._llm_client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=api_key
+            self._llm_client = _openai_class("OpenAI")(
+                base_url=get_llm_base_url(),
+                api_key=api_key,
+                # Recusas (429/5xx) são refeitas pelo limitador de concorrência
+                max_retries=0
             )
         return self._llm_client
     
+    def get_async_llm_client(self) -> "AsyncOpenAI":
+        """Cliente LLM assíncrono (servidor ASGI): aguarda a resposta sem ocupar uma thread."""
+        if self.async_llm_client_provider is not None:
+            return self.async_llm_client_provider()
+        if self._async_llm_client is None:
+            api_key = os.getenv("OPENROUTER_API_KEY")
+            if not api_key:
+                raise ValueError("OPENROUTER_API_KEY não configurada")
+            self._async_llm_client = _openai_class("AsyncOpenAI")(base_url=get_llm_base_url(), api_key=api_key, max_retries=0)
+        return self._async_llm_client
+    
+    def _get_async_http(self) -> "httpx.AsyncClient":
+        """Cliente HTTP assíncrono com keep-alive para o MCP e outros agentes."""
+        if self._async_http is None:
+            import httpx
+            
+            self._async_http = httpx.AsyncClient(limits=httpx.Limits(max_connections=500, max_keepalive_connections=50))
+        return self._async_http
+    
+    async def aclose(self):
+        """Fecha os clientes assíncronos (fim do lifespan do servidor ASGI)."""
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+        if self._async_llm_client is not None:
+            await self._async_llm_client.close()
+            self._async_llm_client = None
+    
+    @staticmethod
+    def _task_text(task) -> str:
+        """Texto da mensagem de uma tarefa A2A."""
+        message_data = task.message or {}
+        content = message_data.get("content", {})
+        return content.get("text", "") if isinstance(content, dict) else str(content)
+    
+    @staticmethod
+    def _complete_task(task, response: str):
+        """Anexa a resposta à tarefa como artefato de texto."""
+        task.artifacts = [{
+            "parts": [{"type": "text", "text": response}]
+        }]
+        return task
+    
+    async def ahandle_task(self, task):
+        """
+        Versão assíncrona de `handle_task`, usada pelo servidor ASGI.
+        
+        O padrão roda `handle_task` em uma thread; personas que aguardam o LLM
+        com `acall_llm` sobrescrevem este método e não ocupam thread nenhuma.
+        """
+        return await asyncio.to_thread(self.handle_task, task)
+    
+    @staticmethod
+    def _chat_messages(system_prompt: str, user_message: str) -> list:
+        """Mensagens padrão de uma persona: prompt de sistema e texto do usuário."""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+    
+    async def _arespond(
+        self,
+        task,
+        system_prompt: Optional[str] = None,
+        build_messages: Optional[Callable[[str, str], list]] = None
+    ):
+        """
+        Responde a tarefa com uma chamada assíncrona ao LLM (base dos `ahandle_task` das personas).
+        
+        Args:
+            task: Tarefa A2A recebida
+            system_prompt: Prompt de sistema (padrão: `self.prompt`)
+            build_messages: Monta as mensagens a partir de (prompt, texto do usuário); padrão: `_chat_messages`
+        
+        Returns:
+            A tarefa com a resposta como artefato
+        """
+        build_messages = build_messages or self._chat_messages
+        messages = build_messages(system_prompt or self.prompt, self._task_text(task))
+        return self._complete_task(task, await self.acall_llm(messages, use_mcp_tools=True))
+    
+    def setup_routes(self, app):
+        """Adiciona `/metrics`, `/admin/profile`, a medição de latência e o span de servidor às rotas A2A padrão."""
+        # Flask só é carregado pelo servidor WSGI (o ASGI não registra estas rotas)
+        from flask import Response, g, jsonify, request
+        
+        super().setup_routes(app)
+        persona = self.persona
+        server_label = self.server_label
+        
+        @app.before_request
+        def _start_request_timer():
+            if request.path not in ("/metrics", "/admin/profile"):
+                # Threads de requisição do werkzeug são atribuídas a este servidor no profiler
+                label_current_thread(server_label)
+                g.metrics_start = time.perf_counter()
+                REQUESTS_IN_FLIGHT.labels(persona=persona).inc()
+                # Continua o trace iniciado pelo chamador (metadados da mensagem A2A)
+                parent = extract_from_task_payload(request.get_json(silent=True)) if request.method == "POST" else None
+                span = start_span("a2a.server", service=persona, parent=parent, path=request.path)
+                g.trace_span, g.trace_token = span, activate(span)
+        
+        @app.teardown_request
+        def _record_request_time(exc=None):
+            start = g.pop("metrics_start", None)
+            if start is None:
+                return
+            label_current_thread(None)
+            span = g.pop("trace_span", None)
+            if span is not None:
+                deactivate(g.pop("trace_token"))
+                if exc is not None:
+                    span.set_error(exc)
+                span.end()
+            REQUESTS_IN_FLIGHT.labels(persona=persona).dec()
+            # Regra da rota (ex: '/tasks/send') mantém a cardinalidade baixa
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_SECONDS.labels(persona=persona, endpoint=endpoint).observe(time.perf_counter() - start)
+            if exc is not None:
+                ERRORS_TOTAL.labels(component="a2a_server", persona=persona, model="", error=type(exc).__name__).inc()
+        
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            """Métricas do processo no formato de exposição do Prometheus."""
+            return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+        
+        @app.route("/admin/profile", methods=["GET"])
+        def admin_profile():
+            """Amostra as pilhas de todas as threads do processo por N segundos."""
+            if not is_admin_allowed(request.remote_addr):
+                return jsonify({"error": "endpoint de admin disponível apenas via loopback"}), 403
+            try:
+                seconds, interval, thread_filter, include_idle, output = parse_profile_params(request.args)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            profile = run_profile(seconds, interval, thread_filter, include_idle)
+            if profile is None:
+                return jsonify({"error": "já existe um profiling em andamento"}), 409
+            if output == "json":
+                return jsonify(profile)
+            return Response(profile["collapsed"] + "\n", content_type="text/plain; charset=utf-8")
+        
+        @app.route("/admin/usage", methods=["GET"])
+        def admin_usage():
+            """Tokens e custo do LLM na janela: totais e maiores grupos (persona, modelo ou trace)."""
+            if not is_admin_allowed(request.remote_addr):
+                return jsonify({"error": "endpoint de admin disponível apenas via loopback"}), 403
+            ledger = get_usage_ledger()
+            try:
+                window = float(request.args.get("window", 3600))
+                top = ledger.top(
+                    by=request.args.get("by", "persona"),
+                    metric=request.args.get("metric", "total_tokens"),
+                    window=window,
+                    limit=int(request.args.get("limit", 5))
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"window_s": window, "totals": ledger.totals(window), "top": top})
+    
     def get_mcp_tools_schema(self) -> Optional[List[Dict]]:
         """Obtém schema das ferramentas MCP para passar ao LLM."""
         # TODO: Implementar obtenção de schema via FastMCP quando disponível
@@ -48,17 +265,127 @@ class BaseAgent(A2AServer):
         
         # TODO: Implementar integração completa quando FastMCP expuser schema
         
-        response = self.llm_client.chat.completions.create(**kwargs)
+        start = time.perf_counter()
+        with trace_span("llm.call", model=model) as span:
+            try:
+                # Limite adaptativo do processo: espera vaga, ajusta o limite pelo resultado e refaz recusas
+                response = get_llm_limiter().call(
+                    lambda slot: self._parse_raw(slot, self.llm_client.chat.completions.with_raw_response.create(**kwargs)),
+                    key=self.persona
+                )
+            except Exception as e:
+                ERRORS_TOTAL.labels(component="llm", persona=self.persona, model=model, error=type(e).__name__).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                LLM_SECONDS.labels(persona=self.persona, model=model).observe(elapsed)
+            self._record_usage(span, model, elapsed, getattr(response, "usage", None))
         return response.choices[0].message.content
     
+    async def acall_llm(self, messages: list, use_mcp_tools: bool = True, model: str = "openai/gpt-4o-mini") -> str:
+        """
+        Versão assíncrona de `call_llm`: a espera pelo LLM não prende thread do servidor.
+        
+        Com um destino de tokens ativo (`set_delta_sink`), a resposta vem em streaming
+        e cada trecho é repassado assim que chega. Cancelar a tarefa fecha a conexão
+        com o provedor, interrompendo a geração.
+        """
+        sink = _delta_sink.get()
+        start = time.perf_counter()
+        with trace_span("llm.call", model=model, stream=sink is not None) as span:
+            try:
+                if sink is None:
+                    response = await get_llm_limiter().acall(
+                        lambda slot: self._acreate_llm(slot, model=model, messages=messages), key=self.persona
+                    )
+                    content, usage = response.choices[0].message.content, getattr(response, "usage", None)
+                else:
+                    content, usage = await get_llm_limiter().acall(
+                        lambda slot: self._astream_llm(model, messages, sink, slot), key=self.persona
+                    )
+            except Exception as e:
+                ERRORS_TOTAL.labels(component="llm", persona=self.persona, model=model, error=type(e).__name__).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                LLM_SECONDS.labels(persona=self.persona, model=model).observe(elapsed)
+            self._record_usage(span, model, elapsed, usage)
+        return content
+    
+    @staticmethod
+    def _parse_raw(slot: Slot, raw):
+        """
+        Resposta completa a partir da resposta crua do SDK, informando a vaga do limitador.
+
+        Os headers de rate limit vão para `slot.headers`. Como o tempo total cresce
+        com o tamanho da resposta, a latência é normalizada em segundos por token gerado.
+        """
+        slot.headers = raw.headers
+        response = raw.parse()
+        completion_tokens = usage_from_response(getattr(response, "usage", None))["completion_tokens"]
+        slot.latency = (time.perf_counter() - slot.started) / max(1, completion_tokens)
+        slot.latency_kind = "per_token"
+        return response
+    
+    async def _acreate_llm(self, slot: Slot, **kwargs):
+        """Chamada sem streaming pelo cliente assíncrono, com headers e latência para a vaga."""
+        raw = await self.get_async_llm_client().chat.completions.with_raw_response.create(**kwargs)
+        return self._parse_raw(slot, raw)
+    
+    async def _astream_llm(self, model: str, messages: list, sink: Callable[[str], None], slot: Optional[Slot] = None):
+        """
+        Resposta do LLM em streaming; devolve (texto completo, usage do último chunk).
+        
+        Headers de rate limit e tempo até o primeiro token vão para a vaga do limitador.
+        """
+        stream = await self.get_async_llm_client().chat.completions.create(
+            model=model, messages=messages, stream=True,
+            extra_body={"stream_options": {"include_usage": True}}
+        )
+        parts, usage = [], None
+        if slot is not None:
+            slot.headers = stream.response.headers
+        try:
+            async for chunk in stream:
+                if slot is not None and slot.latency is None:
+                    slot.latency = time.perf_counter() - slot.started
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    sink(delta)
+        finally:
+            # Em cancelamento a conexão com o provedor é fechada na hora (aborta a geração)
+            await stream.response.aclose()
+        return "".join(parts), usage
+    
+    def _record_usage(self, span, model: str, elapsed: float, raw_usage):
+        """Registra tokens e custo da resposta no span e no ledger de uso."""
+        usage = usage_from_response(raw_usage)
+        span.set_attribute("prompt_tokens", usage["prompt_tokens"])
+        span.set_attribute("completion_tokens", usage["completion_tokens"])
+        span.set_attribute("cost", get_usage_ledger().record(
+            self.persona, model, usage["prompt_tokens"], usage["completion_tokens"],
+            cached_tokens=usage["cached_tokens"], latency_ms=elapsed * 1000, cost=usage["cost"],
+            trace_id=span.trace_id
+        ))
+    
     def _execute_mcp_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """Executa uma ferramenta MCP via HTTP."""
+        with trace_span("mcp.tool", tool=tool_name) as span:
+            result = self._post_mcp_tool(tool_name, arguments)
+            if result.startswith("❌"):
+                span.set_error(result)
+            return result
+    
+    def _post_mcp_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Envia a chamada ao servidor MCP, propagando o trace no header `traceparent`."""
         try:
             # FastMCP expõe ferramentas via endpoint /tools/{tool_name}
-            response = requests.post(
+            response = (self.mcp_session or requests).post(
                 f"{self.mcp_url}/tools/{tool_name}",
                 json=arguments or {},
-                headers={"Content-Type": "application/json"},
+                headers=inject({"Content-Type": "application/json"}),
                 timeout=10
             )
             if response.status_code == 200:
@@ -69,7 +396,91 @@ class BaseAgent(A2AServer):
                     if isinstance(content, list) and len(content) > 0:
                         return content[0].get('text', str(result))
                 return str(result)
+            ERRORS_TOTAL.labels(component="mcp_client", persona=self.persona, model="", error=f"HTTP {response.status_code}").inc()
             return f"❌ Erro HTTP {response.status_code}: {response.text}"
         except Exception as e:
+            ERRORS_TOTAL.labels(component="mcp_client", persona=self.persona, model="", error=type(e).__name__).inc()
             return f"❌ Erro ao chamar ferramenta MCP {tool_name}: {str(e)}"
-
+    
+    def _execute_mcp_tools_batch(self, calls: List[Dict[str, Any]], timeout: float = 30) -> List[Dict[str, Any]]:
+        """
+        Executa várias ferramentas MCP em uma única requisição HTTP.
+        
+        Args:
+            calls: Lista de {"tool": nome, "arguments": {...}} (opcionalmente com "id")
+            timeout: Timeout por chamada em segundos
+        
+        Returns:
+            Resultados na mesma ordem de `calls`, cada um com ok, result/error e elapsed_ms
+        """
+        with trace_span("mcp.batch", calls=len(calls)):
+            return self._post_mcp_batch(calls, timeout)
+    
+    def _post_mcp_batch(self, calls: List[Dict[str, Any]], timeout: float) -> List[Dict[str, Any]]:
+        """Envia o lote ao servidor MCP e remonta os resultados na ordem das chamadas."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        try:
+            response = (self.mcp_session or requests).post(
+                f"{self.mcp_url}/batch",
+                json={"calls": calls, "timeout": timeout},
+                headers=inject({"Content-Type": "application/json"}),
+                timeout=timeout + 5,
+                stream=True
+            )
+            if response.status_code != 200:
+                error = f"❌ Erro HTTP {response.status_code}: {response.text}"
+            else:
+                # Servidor envia uma linha NDJSON por chamada, na ordem de conclusão
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    results[result["index"]] = result
+                error = "❌ Resultado ausente na resposta do lote"
+        except Exception as e:
+            error = f"❌ Erro ao chamar lote de ferramentas MCP: {str(e)}"
+        return self._batch_results(calls, results, error)
+    
+    async def _aexecute_mcp_tools_batch(self, calls: List[Dict[str, Any]], timeout: float = 30) -> List[Dict[str, Any]]:
+        """Versão assíncrona de `_execute_mcp_tools_batch` (mesmo formato de resultado)."""
+        with trace_span("mcp.batch", calls=len(calls)):
+            results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+            try:
+                async with self._get_async_http().stream(
+                    "POST",
+                    f"{self.mcp_url}/batch",
+                    json={"calls": calls, "timeout": timeout},
+                    headers=inject({"Content-Type": "application/json"}),
+                    timeout=timeout + 5
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        error = f"❌ Erro HTTP {response.status_code}: {response.text}"
+                    else:
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            result = json.loads(line)
+                            results[result["index"]] = result
+                        error = "❌ Resultado ausente na resposta do lote"
+            except Exception as e:
+                error = f"❌ Erro ao chamar lote de ferramentas MCP: {str(e)}"
+            return self._batch_results(calls, results, error)
+    
+    @staticmethod
+    def _batch_results(
+        calls: List[Dict[str, Any]],
+        results: List[Optional[Dict[str, Any]]],
+        error: str
+    ) -> List[Dict[str, Any]]:
+        """Resultados na ordem das chamadas; as que não voltaram recebem `error`."""
+        return [
+            result if result is not None else {
+                "index": index,
+                "id": call.get("id", index),
+                "tool": call.get("tool"),
+                "ok": False,
+                "error": error,
+            }
+            for index, (call, result) in enumerate(zip(calls, results))
+        ]
@@ -1,14 +1,27 @@
 """
 Agente coordenador que orquestra os outros agentes especializados.
 """
-from typing import Dict, Any
-from python_a2a import A2AServer, agent, skill, A2AClient, Message, TextContent, MessageRole, ErrorContent
+import logging
+import time
+from typing import Dict, Any, Optional
+from python_a2a import A2AServer, agent, skill, A2AClient, Message, Metadata, TextContent, MessageRole, ErrorContent, Task
+from app.agents import AGENT_CLASS_NAMES
 from app.agents.base_agent import BaseAgent
-from app.mcp.agents_data import AGENTS_DB
+from app.mcp.agents_data import AGENTS_DB, get_agent_url
+from app.utils.health_monitor import HealthMonitor
 from app.utils.logger import get_logger
+from app.utils.metrics import A2A_CALL_SECONDS, ERRORS_TOTAL
+from app.utils.tracing import inject, trace_span
 
 logger = get_logger(__name__)
 
+# Mesmo prazo padrão do A2AClient
+A2A_TIMEOUT = 30
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
 
 @agent(
     name="DevMentor Coordinator",
@@ -17,7 +30,12 @@ logger = get_logger(__name__)
 class CoordinatorAgent(BaseAgent):
     """Agente coordenador que orquestra os outros agentes."""
     
-    def __init__(self, **kwargs):
+    def __init__(
+        self,
+        health_monitor: Optional[HealthMonitor] = None,
+        agent_urls: Optional[Dict[str, str]] = None,
+        **kwargs
+    ):
         super().__init__(
             name="DevMentor Coordinator",
             description="Coordenador do sistema DevMentor AI",
@@ -25,48 +43,57 @@ class CoordinatorAgent(BaseAgent):
             **kwargs
         )
         self._agent_clients = {}
-        self._agent_ports = {
-            "algo_interviewer": 8001,
-            "ml_system_interviewer": 8002,
-            "concept_tutor": 8003,
-            "code_reviewer": 8004,
-            "soft_skills_coach": 8005,
-        }
+        # Personas roteáveis: as servidas pelos agentes (AGENT_CLASS_NAMES), nas portas do AGENTS_DB
+        self._agent_ports = {key: AGENTS_DB[key]["port"] for key in AGENT_CLASS_NAMES}
+        # URL de cada persona: porta própria ou rota do host multi-persona
+        self._agent_urls = agent_urls or {key: get_agent_url(key) for key in self._agent_ports}
+        # Monitor opcional: permite falhar rápido sem sondar no caminho da mensagem
+        self.health_monitor = health_monitor
     
     def _get_agent_client(self, agent_key: str) -> A2AClient:
         """Obtém ou cria cliente A2A para um agente."""
         if agent_key not in self._agent_clients:
-            port = self._agent_ports.get(agent_key, 8001)
-            agent_url = f"http://localhost:{port}"
-            logger.info(f"Criando cliente A2A para agente {agent_key} em {agent_url}")
+            agent_url = self._agent_url(agent_key)
+            logger.info("Criando cliente A2A para agente %s em %s", agent_key, agent_url)
             self._agent_clients[agent_key] = A2AClient(agent_url)
-            logger.debug(f"Cliente A2A criado para {agent_key}")
+            logger.debug("Cliente A2A criado para %s", agent_key)
         return self._agent_clients[agent_key]
     
+    def _agent_url(self, agent_key: str) -> str:
+        """URL A2A do agente (padrão: o da porta 8001, como antes)."""
+        return self._agent_urls.get(agent_key) or f"http://localhost:{self._agent_ports.get(agent_key, 8001)}"
+    
     @skill(name="route_to_agent", description="Roteia mensagem para agente especializado.")
     def route_to_agent(self, agent_key: str, user_message: str) -> str:
         """Roteia mensagem para agente especializado via A2A."""
-        port = self._agent_ports.get(agent_key, 8001)
-        agent_url = f"http://localhost:{port}"
+        agent_url = self._agent_url(agent_key)
+        
+        logger.info("Roteando mensagem para agente %s (%s)", agent_key, agent_url)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Mensagem: %s...", user_message[:100])
         
-        logger.info(f"Roteando mensagem para agente {agent_key} (porta {port})")
-        logger.debug(f"Mensagem: {user_message[:100]}...")
+        unavailable = self._unavailable_reply(agent_key)
+        if unavailable:
+            return unavailable
         
+        start = time.perf_counter()
         try:
             client = self._get_agent_client(agent_key)
-            msg = Message(
-                content=TextContent(text=user_message),
-                role=MessageRole.USER
-            )
             
-            logger.debug(f"Enviando mensagem via A2A para {agent_key}")
-            response = client.send_message(msg)
+            logger.debug("Enviando mensagem via A2A para %s", agent_key)
+            with trace_span("a2a.call", persona=agent_key) as span:
+                # Contexto do trace segue nos metadados para o agente continuar o trace
+                msg = self._a2a_message(user_message)
+                try:
+                    response = client.send_message(msg)
+                finally:
+                    A2A_CALL_SECONDS.labels(persona=agent_key).observe(time.perf_counter() - start)
+                if isinstance(response.content, ErrorContent):
+                    span.set_error(response.content.message)
             
             # Verificar se resposta contém erro
             if isinstance(response.content, ErrorContent):
-                error_msg = response.content.message
-                logger.error(f"Erro recebido do agente {agent_key}: {error_msg}")
-                return f"❌ Erro ao comunicar com agente {agent_key}: {error_msg}"
+                return self._error_reply(agent_key, start, response.content.message)
             
             # Extrair texto da resposta
             if hasattr(response.content, 'text'):
@@ -76,24 +103,139 @@ class CoordinatorAgent(BaseAgent):
             else:
                 response_text = str(response.content)
             
-            logger.info(f"Resposta recebida do agente {agent_key} (tamanho: {len(response_text)} chars)")
-            return response_text
+            return self._ok_reply(agent_key, start, response_text)
+            
+        except Exception as e:
+            return self._exception_reply(agent_key, start, e)
+    
+    async def aroute_to_agent(self, agent_key: str, user_message: str) -> str:
+        """
+        Versão assíncrona de `route_to_agent` (servidor ASGI).
+        
+        Envia `tasks/send` JSON-RPC com httpx, como o A2AClient faz, mas aguardando
+        a resposta em vez de prender uma thread durante a chamada ao agente.
+        """
+        agent_url = self._agent_url(agent_key)
+        logger.info("Roteando mensagem para agente %s (%s)", agent_key, agent_url)
+        
+        unavailable = self._unavailable_reply(agent_key)
+        if unavailable:
+            return unavailable
+        
+        start = time.perf_counter()
+        try:
+            with trace_span("a2a.call", persona=agent_key) as span:
+                task = Task(message=self._a2a_message(user_message).to_dict())
+                payload = {"jsonrpc": "2.0", "id": 1, "method": "tasks/send", "params": task.to_dict()}
+                try:
+                    response = await self._get_async_http().post(
+                        f"{agent_url}/tasks/send", json=payload, timeout=A2A_TIMEOUT
+                    )
+                finally:
+                    A2A_CALL_SECONDS.labels(persona=agent_key).observe(time.perf_counter() - start)
+                if response.is_success:
+                    data = response.json()
+                    error = (data.get("error") or {}).get("message")
+                else:
+                    error = self._http_error(response)
+                if error:
+                    span.set_error(error)
             
+            if error:
+                return self._error_reply(agent_key, start, error)
+            return self._ok_reply(agent_key, start, self._task_result_text(data.get("result") or {}))
+        
         except Exception as e:
-            error_type = type(e).__name__
-            logger.error(f"Exceção ao comunicar com agente {agent_key}: {error_type}: {str(e)}")
-            logger.debug(f"Traceback completo:\n{__import__('traceback').format_exc()}")
-            return f"❌ Erro ao comunicar com agente {agent_key}: {error_type}: {str(e)}"
+            return self._exception_reply(agent_key, start, e)
+    
+    @staticmethod
+    def _http_error(response) -> str:
+        """Mensagem de uma resposta HTTP de erro: o erro JSON-RPC, se houver, ou o status."""
+        try:
+            message = (response.json().get("error") or {}).get("message")
+        except (ValueError, AttributeError):
+            message = None
+        return message or f"HTTP {response.status_code} {response.reason_phrase}".strip()
+    
+    @staticmethod
+    def _a2a_message(user_message: str) -> Message:
+        """Mensagem A2A do usuário com o contexto do trace nos metadados."""
+        return Message(
+            content=TextContent(text=user_message),
+            role=MessageRole.USER,
+            metadata=Metadata(custom_fields=inject({}))
+        )
+    
+    @staticmethod
+    def _task_result_text(result: Dict[str, Any]) -> str:
+        """Primeira parte de texto dos artefatos da tarefa (como o A2AClient lê)."""
+        for artifact in result.get("artifacts") or []:
+            for part in artifact.get("parts") or []:
+                if part.get("type") == "text":
+                    return part.get("text", "")
+        raise ValueError("resposta sem artefato de texto")
+    
+    def _unavailable_reply(self, agent_key: str) -> Optional[str]:
+        """
+        Resposta imediata se o monitor de saúde já sabe que o agente está fora.
+
+        Só a conexão recusada (`port_closed`) conta: sondagem que estourou o
+        prazo pode ser agente ocupado, e a mensagem segue normalmente.
+        """
+        if self.health_monitor is not None:
+            status = self.health_monitor.get_status(agent_key)
+            if self.health_monitor.is_fresh(status) and status["status"] == "port_closed":
+                logger.warning("Agente %s indisponível segundo o monitor de saúde", agent_key)
+                return f"❌ Agente {agent_key} indisponível (porta {status['port']} fechada)"
+        return None
+    
+    def _ok_reply(self, agent_key: str, start: float, response_text: str) -> str:
+        logger.info(
+            "Resposta recebida do agente %s (tamanho: %d chars)", agent_key, len(response_text),
+            extra={"persona": agent_key, "status": "ok", "latency_ms": _elapsed_ms(start)}
+        )
+        return response_text
+    
+    def _error_reply(self, agent_key: str, start: float, error_msg: str) -> str:
+        logger.error(
+            "Erro recebido do agente %s: %s", agent_key, error_msg,
+            extra={"persona": agent_key, "status": "error", "latency_ms": _elapsed_ms(start)}
+        )
+        ERRORS_TOTAL.labels(component="a2a_client", persona=agent_key, model="", error="ErrorContent").inc()
+        return f"❌ Erro ao comunicar com agente {agent_key}: {error_msg}"
+    
+    def _exception_reply(self, agent_key: str, start: float, e: Exception) -> str:
+        error_type = type(e).__name__
+        logger.error(
+            "Exceção ao comunicar com agente %s: %s: %s", agent_key, error_type, e,
+            extra={"persona": agent_key, "status": "error", "latency_ms": _elapsed_ms(start)}
+        )
+        ERRORS_TOTAL.labels(component="a2a_client", persona=agent_key, model="", error=error_type).inc()
+        # exc_info: o traceback só é formatado (na thread de log) se DEBUG estiver ativo
+        logger.debug("Traceback completo:", exc_info=True)
+        if self.health_monitor is not None:
+            self.health_monitor.report_failure(agent_key)
+        return f"❌ Erro ao comunicar com agente {agent_key}: {error_type}: {str(e)}"
     
     def handle_task(self, task):
         """Processa tarefa roteando para agente apropriado."""
         logger.debug("Processando tarefa no coordenador")
         
-        message_data = task.message or {}
-        content = message_data.get("content", {})
-        user_message = content.get("text", "") if isinstance(content, dict) else str(content)
+        agent_key, user_message = self._select_agent(self._task_text(task))
+        response = self.route_to_agent(agent_key, user_message)
         
-        logger.debug(f"Mensagem recebida: {user_message[:100]}...")
+        logger.debug("Tarefa processada com sucesso")
+        return self._complete_task(task, response)
+    
+    async def ahandle_task(self, task):
+        """Processa tarefa roteando para agente apropriado sem bloquear (servidor ASGI)."""
+        agent_key, user_message = self._select_agent(self._task_text(task))
+        return self._complete_task(task, await self.aroute_to_agent(agent_key, user_message))
+    
+    def _select_agent(self, user_message: str):
+        """Separa o agente de destino da mensagem; devolve (agent_key, mensagem)."""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Mensagem recebida: %s...", user_message[:100])
         
         # Extrair agente da mensagem ou usar padrão
         # Formato: "agent_key:mensagem" ou apenas "mensagem" (usa agente padrão)
@@ -103,16 +245,8 @@ class CoordinatorAgent(BaseAgent):
             parts = user_message.split(":", 1)
             agent_key = parts[0]
             user_message = parts[1].strip()
-            logger.info(f"Agente especificado na mensagem: {agent_key}")
+            logger.info("Agente especificado na mensagem: %s", agent_key)
         else:
-            logger.info(f"Usando agente padrão: {agent_key}")
-        
-        response = self.route_to_agent(agent_key, user_message)
-        
-        task.artifacts = [{
-            "parts": [{"type": "text", "text": response}]
-        }]
-        
-        logger.debug("Tarefa processada com sucesso")
-        return task
+            logger.info("Usando agente padrão: %s", agent_key)
+        return agent_key, user_message
 
@@ -0,0 +1,129 @@
+"""
+Host multi-persona: um único servidor (um processo, uma porta) atende todas as
+personas de AGENT_CLASSES em rotas por caminho (`/agents/<chave>/...`).
+
+As personas compartilham o cliente LLM (um pool de conexões), a sessão HTTP do
+MCP e o registro de métricas do processo. O modo de uma porta por persona
+continua disponível; este é o modo para empacotar muitas personas por processo.
+"""
+import os
+import threading
+from typing import Iterable, Optional
+
+import requests
+from flask import Flask, Response, jsonify
+from openai import AsyncOpenAI, OpenAI
+from python_a2a.server.http import create_flask_app
+from requests.adapters import HTTPAdapter
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.serving import run_simple
+
+from app.agents import AGENT_CLASS_NAMES, AGENT_CLASSES
+from app.mcp.agents_data import AGENT_HOST_PREFIX
+from app.services.llm_service import get_llm_base_url
+from app.utils.logger import get_logger
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
+
+logger = get_logger(__name__)
+
+DEFAULT_HOST_PORT = 8100
+
+
+class AgentHost:
+    """Monta as personas em um único app WSGI, com recursos compartilhados."""
+
+    def __init__(
+        self,
+        keys: Optional[Iterable[str]] = None,
+        base_url: str = f"http://localhost:{DEFAULT_HOST_PORT}",
+        mcp_url: str = "http://localhost:5000"
+    ):
+        """
+        Args:
+            keys: Personas servidas (padrão: todas de AGENT_CLASSES)
+            base_url: URL pública do host (usada nos agent cards)
+            mcp_url: Servidor MCP usado por todas as personas
+        """
+        keys = list(keys) if keys is not None else list(AGENT_CLASS_NAMES)
+        unknown = [key for key in keys if key not in AGENT_CLASS_NAMES]
+        if unknown:
+            raise ValueError(f"personas desconhecidas: {unknown}")
+
+        self.base_url = base_url.rstrip("/")
+        self._llm_client: Optional[OpenAI] = None
+        self._async_llm_client: Optional[AsyncOpenAI] = None
+        self._llm_lock = threading.Lock()
+        # Uma sessão keep-alive para o MCP, com pool dimensionado para todas as personas
+        self.mcp_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(16, 8 * len(keys)))
+        self.mcp_session.mount("http://", adapter)
+        self.mcp_session.mount("https://", adapter)
+
+        self.agents = {}
+        for key in keys:
+            agent = AGENT_CLASSES[key](url=self.agent_url(key), mcp_url=mcp_url)
+            agent.llm_client_provider = self.get_llm_client
+            agent.async_llm_client_provider = self.get_async_llm_client
+            agent.mcp_session = self.mcp_session
+            self.agents[key] = agent
+
+        mounts = {f"{AGENT_HOST_PREFIX}/{key}": create_flask_app(agent) for key, agent in self.agents.items()}
+        self.app = DispatcherMiddleware(self._create_root_app(), mounts)
+        logger.info("🏠 Host multi-persona com %d persona(s): %s", len(self.agents), ", ".join(self.agents))
+
+    def agent_url(self, key: str) -> str:
+        """URL A2A de uma persona neste host."""
+        return f"{self.base_url}{AGENT_HOST_PREFIX}/{key}"
+
+    def get_llm_client(self) -> OpenAI:
+        """Cliente LLM único para todas as personas (criado no primeiro uso)."""
+        with self._llm_lock:
+            if self._llm_client is None:
+                api_key = os.getenv("OPENROUTER_API_KEY")
+                if not api_key:
+                    raise ValueError("OPENROUTER_API_KEY não configurada")
+                # Recusas (429/5xx) são refeitas pelo limitador de concorrência
+                self._llm_client = OpenAI(base_url=get_llm_base_url(), api_key=api_key, max_retries=0)
+            return self._llm_client
+
+    def get_async_llm_client(self) -> AsyncOpenAI:
+        """Cliente LLM assíncrono único para todas as personas (servidor ASGI)."""
+        with self._llm_lock:
+            if self._async_llm_client is None:
+                api_key = os.getenv("OPENROUTER_API_KEY")
+                if not api_key:
+                    raise ValueError("OPENROUTER_API_KEY não configurada")
+                self._async_llm_client = AsyncOpenAI(base_url=get_llm_base_url(), api_key=api_key, max_retries=0)
+            return self._async_llm_client
+
+    async def aclose(self):
+        """Fecha os clientes assíncronos das personas e o compartilhado."""
+        for agent in self.agents.values():
+            await agent.aclose()
+        if self._async_llm_client is not None:
+            await self._async_llm_client.close()
+            self._async_llm_client = None
+
+    def _create_root_app(self) -> Flask:
+        """Rotas do host: índice das personas e métricas do processo."""
+        app = Flask(__name__)
+
+        @app.route("/", methods=["GET"])
+        @app.route("/health", methods=["GET"])
+        def index():
+            """Personas servidas e suas URLs A2A."""
+            return jsonify({
+                "status": "ok",
+                "agents": {key: {"name": agent.name, "url": self.agent_url(key)} for key, agent in self.agents.items()},
+            })
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            """Métricas de todas as personas (registro único do processo)."""
+            return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+        return app
+
+    def serve(self, host: str = "0.0.0.0", port: int = DEFAULT_HOST_PORT):
+        """Atende todas as personas na mesma porta (uma thread por requisição)."""
+        run_simple(host, port, self.app, threaded=True, use_reloader=False)
@@ -46,6 +46,10 @@ class AlgoInterviewerAgent(BaseAgent):
             "parts": [{"type": "text", "text": response}]
         }]
         return task
+    
+    async def ahandle_task(self, task):
+        """Processa tarefa A2A aguardando o LLM sem bloquear (servidor ASGI)."""
+        return await self._arespond(task)
 
 
 @agent(
@@ -86,4 +90,8 @@ class MLSystemInterviewerAgent(BaseAgent):
             "parts": [{"type": "text", "text": response}]
         }]
         return task
+    
+    async def ahandle_task(self, task):
+        """Processa tarefa A2A aguardando o LLM sem bloquear (servidor ASGI)."""
+        return await self._arespond(task)
 
@@ -1,10 +1,19 @@
 """
 Agente especializado em code review.
 """
+import re
+import json
 from typing import Dict, Any
 from python_a2a import agent, skill
 from app.agents.base_agent import BaseAgent
 from app.mcp.agents_data import AGENTS_DB
+from app.mcp.lint import format_findings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Blocos de código em markdown (```python ... ``` ou ``` ... ```)
+CODE_BLOCK_PATTERN = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.DOTALL)
 
 
 @agent(
@@ -23,15 +32,67 @@ class CodeReviewerAgent(BaseAgent):
             **kwargs
         )
     
+    def _static_analysis(self, user_message: str) -> str:
+        """
+        Roda `lint_python` no servidor MCP para cada bloco de código da mensagem.
+        
+        Returns:
+            Achados compactos por bloco, ou string vazia se não houver código/servidor
+        """
+        blocks = CODE_BLOCK_PATTERN.findall(user_message)
+        if not blocks:
+            return ""
+        
+        results = self._execute_mcp_tools_batch(self._lint_calls(blocks))
+        return self._format_lint_results(results)
+    
+    async def _astatic_analysis(self, user_message: str) -> str:
+        """Versão assíncrona de `_static_analysis` (lote MCP aguardado, sem thread)."""
+        blocks = CODE_BLOCK_PATTERN.findall(user_message)
+        if not blocks:
+            return ""
+        
+        results = await self._aexecute_mcp_tools_batch(self._lint_calls(blocks))
+        return self._format_lint_results(results)
+    
+    @staticmethod
+    def _lint_calls(blocks) -> list:
+        """Uma chamada `lint_python` por bloco de código."""
+        return [
+            {"tool": "lint_python", "arguments": {"code": block, "max_findings": 40}}
+            for block in blocks
+        ]
+    
+    @staticmethod
+    def _format_lint_results(results) -> str:
+        """Achados compactos por bloco; blocos sem análise ficam de fora."""
+        sections = []
+        for number, result in enumerate(results, start=1):
+            output = result.get("result")
+            if not result["ok"] or not isinstance(output, str) or output.startswith("❌"):
+                logger.debug("Análise estática indisponível para bloco %s: %s", number, result.get("error") or output)
+                continue
+            sections.append(f"Bloco {number}:\n{format_findings(json.loads(output), max_findings=40)}")
+        return "\n\n".join(sections)
+    
     @skill(name="review_code", description="Revisa código focando em estilo, PEP8 e boas práticas.")
     def review_code(self, user_message: str) -> str:
         """Processa mensagem do usuário e responde como revisor."""
-        messages = [
+        findings = self._static_analysis(user_message)
+        return self.call_llm(self._review_messages(user_message, findings), use_mcp_tools=True)
+    
+    def _review_messages(self, user_message: str, findings: str) -> list:
+        """Mensagens do revisor, com os achados do linter anexados ao pedido."""
+        if findings:
+            # O LLM só explica e prioriza; não gasta tokens procurando o que o linter já achou
+            user_message += (
+                "\n\n---\nAchados da análise estática (lint_python):\n" + findings
+            )
+        
+        return [
             {"role": "system", "content": self.prompt},
             {"role": "user", "content": user_message}
         ]
-        
-        return self.call_llm(messages, use_mcp_tools=True)
     
     def handle_task(self, task):
         """Processa tarefa A2A."""
@@ -45,4 +106,10 @@ class CodeReviewerAgent(BaseAgent):
             "parts": [{"type": "text", "text": response}]
         }]
         return task
-
+    
+    async def ahandle_task(self, task):
+        """Processa tarefa A2A aguardando MCP e LLM sem bloquear (servidor ASGI)."""
+        user_message = self._task_text(task)
+        findings = await self._astatic_analysis(user_message)
+        response = await self.acall_llm(self._review_messages(user_message, findings), use_mcp_tools=True)
+        return self._complete_task(task, response)
@@ -45,4 +45,8 @@ class ConceptTutorAgent(BaseAgent):
             "parts": [{"type": "text", "text": response}]
         }]
         return task
+    
+    async def ahandle_task(self, task):
+        """Processa tarefa A2A aguardando o LLM sem bloquear (servidor ASGI)."""
+        return await self._arespond(task)
 
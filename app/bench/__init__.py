@@ -0,0 +1 @@
+"""Ferramentas de benchmark e geração de carga do DevMentor AI."""
@@ -0,0 +1,162 @@
+"""
+Benchmark de tempo de import dos pontos de entrada do DevMentor AI.
+Cada módulo é importado em um interpretador novo (cold start, sem cache de
+sys.modules), N vezes, e o melhor tempo é comparado com o orçamento. Também
+confere que dependências pesadas não vazaram para entradas que devem ser leves.
+
+Uso:
+    python -m app.bench.import_time
+    python -m app.bench.import_time --repeat 5 --output imports.json
+    DEVMENTOR_IMPORT_BUDGET_SCALE=2 python -m app.bench.import_time   # máquinas lentas/CI
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Módulos caros de importar (segundos em cold start)
+HEAVY_MODULES = ("openai", "fastmcp", "python_a2a", "anthropic", "streamlit")
+
+
+class EntryPoint(NamedTuple):
+    """
+    Módulo medido, orçamento (segundos) e dependências pesadas proibidas nele.
+
+    `blocked` torna módulos inimportáveis no interpretador medido: bibliotecas de
+    terceiros que importam uma dependência opcional (o python_a2a carrega o SDK
+    da OpenAI se estiver instalado) deixam de mascarar um import nosso.
+    """
+    module: str
+    budget: float
+    forbidden: Tuple[str, ...] = ()
+    blocked: Tuple[str, ...] = ()
+
+
+ENTRY_POINTS: List[EntryPoint] = [
+    # Supervisor e CLI: só orquestram, não podem carregar nenhum servidor
+    EntryPoint("start_servers", 1.0, HEAVY_MODULES),
+    EntryPoint("app.agents", 0.3, HEAVY_MODULES),
+    EntryPoint("app.services.llm_service", 0.5, HEAVY_MODULES),
+    EntryPoint("app.utils.readiness", 0.5, HEAVY_MODULES),
+    # Servidores: pagam só a própria dependência
+    EntryPoint("app.mcp.server", 3.0, ("python_a2a", "openai", "streamlit")),
+    EntryPoint("app.agents.base_agent", 6.0, ("fastmcp", "streamlit")),
+    # Personas e coordenador só carregam o SDK da OpenAI ao criar o primeiro cliente
+    EntryPoint("app.agents.coordinator", 6.0, ("openai", "fastmcp", "streamlit"), blocked=("openai",)),
+]
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+
+class _Blocked:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in {blocked!r}:
+            raise ImportError(f"{{name}} bloqueado pelo benchmark")
+
+sys.meta_path.insert(0, _Blocked())
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 3, blocked: Tuple[str, ...] = ()) -> Dict:
+    """
+    Importa `module` em `repeat` interpretadores novos.
+
+    Args:
+        module: Módulo a importar
+        repeat: Número de interpretadores (vale o melhor tempo)
+        blocked: Módulos de topo que falham com ImportError nesses interpretadores
+
+    Returns:
+        {"seconds": melhor tempo, "runs": todos os tempos, "loaded": módulos pesados carregados}
+
+    Raises:
+        RuntimeError: Se o import falhar
+    """
+    code = _PROBE.format(root=str(ROOT), module=module, heavy=HEAVY_MODULES, blocked=tuple(blocked))
+    runs, loaded = [], []
+    for _ in range(max(1, repeat)):
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, cwd=str(ROOT),
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"falha ao importar {module}: {result.stderr.strip().splitlines()[-1:]}")
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        runs.append(round(data["seconds"], 4))
+        loaded = data["loaded"]
+    return {"seconds": min(runs), "runs": runs, "loaded": loaded}
+
+
+def run_benchmark(
+    entry_points: Optional[List[EntryPoint]] = None,
+    repeat: int = 3,
+    scale: Optional[float] = None
+) -> Dict:
+    """
+    Mede todas as entradas e verifica orçamento e dependências proibidas.
+
+    Args:
+        entry_points: Entradas a medir (padrão: ENTRY_POINTS)
+        repeat: Interpretadores por entrada (vale o melhor tempo)
+        scale: Multiplicador dos orçamentos (padrão: DEVMENTOR_IMPORT_BUDGET_SCALE ou 1)
+
+    Returns:
+        Relatório com uma linha por entrada e `ok` geral
+    """
+    if scale is None:
+        scale = float(os.getenv("DEVMENTOR_IMPORT_BUDGET_SCALE", "1"))
+    rows = []
+    for entry in entry_points or ENTRY_POINTS:
+        measured = measure_import(entry.module, repeat, entry.blocked)
+        budget = entry.budget * scale
+        leaked = [name for name in measured["loaded"] if name in entry.forbidden]
+        rows.append({
+            "module": entry.module,
+            "seconds": measured["seconds"],
+            "runs": measured["runs"],
+            "budget": budget,
+            "leaked": leaked,
+            "ok": measured["seconds"] <= budget and not leaked,
+        })
+    return {"python": sys.version.split()[0], "scale": scale, "entries": rows, "ok": all(row["ok"] for row in rows)}
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'ponto de entrada':<28} {'import':>8} {'orçamento':>10}  status"]
+    lines.append("-" * 72)
+    for row in report["entries"]:
+        status = "✅" if row["ok"] else "❌"
+        if row["seconds"] > row["budget"]:
+            status += " acima do orçamento"
+        if row["leaked"]:
+            status += f" carregou {', '.join(row['leaked'])}"
+        lines.append(f"{row['module']:<28} {row['seconds']:7.2f}s {row['budget']:9.2f}s  {status}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de import dos pontos de entrada do DevMentor AI")
+    parser.add_argument("--repeat", type=int, default=3, help="Interpretadores por entrada (vale o melhor)")
+    parser.add_argument("--scale", type=float, help="Multiplicador dos orçamentos")
+    parser.add_argument("--output", help="Salva o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(repeat=args.repeat, scale=args.scale)
+    print(format_report(report))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
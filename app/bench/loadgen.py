@@ -0,0 +1,356 @@
+"""
+Gerador de carga para o caminho coordenador → agente → LLM.
+Envia tarefas A2A (JSON-RPC `tasks/send`) ao coordenador ou a um agente com
+uma mistura de mensagens por persona, em malha fechada (N clientes em loop)
+ou aberta (taxa fixa de chegadas, independente das respostas), e produz um
+relatório JSON com vazão, p50/p95/p99 e taxa de erro.
+
+Uso:
+    python -m app.bench.loadgen --target coordinator --mode closed --concurrency 8 --duration 30
+    python -m app.bench.loadgen --target code_reviewer --mode open --rate 5 --output atual.json --baseline base.json
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from app.mcp.agents_data import AGENTS_DB
+
+COORDINATOR_URL = "http://localhost:8000"
+
+# Mensagens representativas do uso de cada persona
+DEFAULT_MESSAGES: Dict[str, List[str]] = {
+    "algo_interviewer": [
+        "Quero praticar um problema de arrays de dificuldade média.",
+        "Minha solução para Two Sum usa dois loops, como melhorar?",
+        "Qual a complexidade de busca binária em uma lista ordenada?",
+    ],
+    "ml_system_interviewer": [
+        "Como você projetaria um sistema de recomendação para um e-commerce?",
+        "Quando usar feature store em um pipeline de ML?",
+        "Explique trade-offs entre inferência batch e online.",
+    ],
+    "concept_tutor": [
+        "Explique o que é um índice B-tree em bancos de dados.",
+        "Qual a diferença entre processo e thread?",
+        "O que é o teorema CAP?",
+    ],
+    "code_reviewer": [
+        "Revise este código:\n```python\ndef Soma(a,b): return a+b\n```",
+        "Revise:\n```python\nimport os\ndef ler(p):\n    f = open(p)\n    return f.read()\n```",
+    ],
+    "soft_skills_coach": [
+        "Como responder 'fale sobre um conflito com um colega' usando STAR?",
+        "Me ajude a estruturar uma resposta sobre meu maior erro profissional.",
+    ],
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Converte 'algo_interviewer=3,code_reviewer=1' em pesos por persona.
+
+    Raises:
+        ValueError: Se algum item não estiver no formato persona=número positivo
+    """
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = 0.0
+        if not name or weight <= 0:
+            raise ValueError(f"Peso inválido: '{item}' (use persona=número positivo)")
+        mix[name.strip()] = weight
+    return mix
+
+
+def load_messages(path: str) -> Dict[str, List[str]]:
+    """Carrega mensagens de um JSONL com linhas {"persona": ..., "text": ...}."""
+    messages: Dict[str, List[str]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                messages.setdefault(item["persona"], []).append(item["text"])
+    return messages
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Percentil por posição mais próxima (nearest-rank) de uma lista ordenada."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _latency_summary(latencies_ms: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(latencies_ms)
+    summary = {f"p{pct}": percentile(values, pct) for pct in (50, 95, 99)}
+    summary["max"] = values[-1] if values else None
+    summary["mean"] = round(sum(values) / len(values), 2) if values else None
+    return {key: round(value, 2) if value is not None else None for key, value in summary.items()}
+
+
+class LoadGenerator:
+    """Dispara tarefas A2A contra um alvo e coleta latência e erros por requisição."""
+
+    def __init__(
+        self,
+        url: str,
+        messages: Dict[str, List[str]],
+        mix: Optional[Dict[str, float]] = None,
+        route_prefix: bool = False,
+        timeout: float = 60.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            url: URL base do servidor A2A
+            messages: Mensagens disponíveis por persona
+            mix: Pesos por persona (padrão: pesos iguais entre as de `messages`)
+            route_prefix: Prefixa 'persona:' na mensagem (formato do coordenador)
+            timeout: Timeout de cada requisição em segundos
+            seed: Semente para reproduzir a sequência de mensagens
+        """
+        mix = mix or {persona: 1.0 for persona in messages}
+        unknown = [persona for persona in mix if not messages.get(persona)]
+        if unknown:
+            raise ValueError(f"Sem mensagens para a(s) persona(s): {', '.join(unknown)}")
+        self.url = url.rstrip("/")
+        self.messages = messages
+        self.personas = list(mix)
+        self.weights = [mix[persona] for persona in self.personas]
+        self.route_prefix = route_prefix
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=256)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._results: List[Dict[str, Any]] = []
+        self._results_lock = threading.Lock()
+
+    def _next_message(self) -> Tuple[str, str]:
+        with self._random_lock:
+            persona = self._random.choices(self.personas, self.weights)[0]
+            text = self._random.choice(self.messages[persona])
+        return persona, f"{persona}:{text}" if self.route_prefix else text
+
+    def _send(self, persona: str, text: str) -> Tuple[bool, Optional[str]]:
+        """Envia uma tarefa e classifica o resultado (ok, tipo do erro)."""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tasks/send",
+            "params": {
+                "id": str(uuid.uuid4()),
+                "message": {"content": {"type": "text", "text": text}, "role": "user"},
+            },
+        }
+        try:
+            response = self._session.post(f"{self.url}/tasks/send", json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return False, type(e).__name__
+        if response.status_code != 200:
+            return False, f"http_{response.status_code}"
+        try:
+            result = response.json().get("result") or {}
+        except ValueError:
+            return False, "invalid_json"
+        texts = [
+            part.get("text", "")
+            for artifact in result.get("artifacts") or []
+            for part in artifact.get("parts", [])
+            if part.get("type") == "text"
+        ]
+        if not texts:
+            return False, "empty_response"
+        # Agentes devolvem falhas como texto iniciado por ❌
+        if texts[0].startswith("❌"):
+            return False, "agent_error"
+        return True, None
+
+    def _execute(self, scheduled_at: float):
+        """Executa uma requisição; a latência conta a partir do horário agendado."""
+        persona, text = self._next_message()
+        ok, error = self._send(persona, text)
+        finished_at = time.perf_counter()
+        with self._results_lock:
+            self._results.append({
+                "persona": persona,
+                "ok": ok,
+                "error": error,
+                "latency_ms": (finished_at - scheduled_at) * 1000,
+                "finished_at": finished_at,
+            })
+
+    def run_closed(self, concurrency: int, duration: float, max_requests: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Malha fechada: `concurrency` clientes enviam a próxima requisição assim que a anterior termina.
+        """
+        deadline = time.perf_counter() + duration
+        issued = [0]
+        issued_lock = threading.Lock()
+
+        def client():
+            while time.perf_counter() < deadline:
+                with issued_lock:
+                    if max_requests is not None and issued[0] >= max_requests:
+                        return
+                    issued[0] += 1
+                self._execute(time.perf_counter())
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._report({"mode": "closed", "concurrency": concurrency}, start)
+
+    def run_open(
+        self,
+        rate: float,
+        duration: float,
+        max_in_flight: int = 256,
+        max_requests: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Malha aberta: chegadas a `rate` req/s independentes das respostas.
+
+        A latência é medida a partir do horário agendado, então filas do lado do
+        cliente ou do servidor aparecem no resultado (sem omissão coordenada).
+        """
+        interval = 1.0 / rate
+        total = int(rate * duration)
+        if max_requests is not None:
+            total = min(total, max_requests)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="loadgen") as pool:
+            for index in range(total):
+                scheduled_at = start + index * interval
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._execute, scheduled_at)
+        return self._report({"mode": "open", "rate": rate, "max_in_flight": max_in_flight}, start)
+
+    def _report(self, config: Dict[str, Any], start: float) -> Dict[str, Any]:
+        """Agrega os resultados coletados em um relatório JSON."""
+        with self._results_lock:
+            results, self._results = self._results, []
+        elapsed = max((r["finished_at"] for r in results), default=time.perf_counter()) - start
+        errors = [r for r in results if not r["ok"]]
+
+        by_persona = {}
+        for persona in sorted({r["persona"] for r in results}):
+            subset = [r for r in results if r["persona"] == persona]
+            failed = sum(1 for r in subset if not r["ok"])
+            by_persona[persona] = {
+                "requests": len(subset),
+                "errors": failed,
+                "latency_ms": _latency_summary([r["latency_ms"] for r in subset if r["ok"]]),
+            }
+
+        errors_by_type: Dict[str, int] = {}
+        for r in errors:
+            errors_by_type[r["error"]] = errors_by_type.get(r["error"], 0) + 1
+
+        return {
+            "target": self.url,
+            "config": config,
+            "started_at": time.time() - elapsed,
+            "duration_s": round(elapsed, 3),
+            "requests": len(results),
+            "ok": len(results) - len(errors),
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+            "throughput_rps": round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": _latency_summary([r["latency_ms"] for r in results if r["ok"]]),
+            "errors_by_type": errors_by_type,
+            "by_persona": by_persona,
+        }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Diferença relativa (%) entre dois relatórios nas métricas principais."""
+    def delta(before, after):
+        if before in (None, 0) or after is None:
+            return None
+        return round((after - before) / before * 100, 2)
+
+    comparison = {
+        "throughput_rps": delta(baseline["throughput_rps"], current["throughput_rps"]),
+        "error_rate": {"baseline": baseline["error_rate"], "current": current["error_rate"]},
+    }
+    for key in ("p50", "p95", "p99"):
+        comparison[f"latency_{key}"] = delta(baseline["latency_ms"][key], current["latency_ms"][key])
+    return comparison
+
+
+def resolve_target(target: str) -> Tuple[str, bool, Optional[str]]:
+    """
+    Resolve o alvo em (URL, usa prefixo de rota, persona fixa).
+
+    'coordinator' usa o formato 'persona:mensagem'; uma chave do AGENTS_DB
+    aponta para a porta do agente; qualquer outra coisa é tratada como URL.
+    """
+    if target == "coordinator":
+        return COORDINATOR_URL, True, None
+    if target in AGENTS_DB:
+        return f"http://localhost:{AGENTS_DB[target]['port']}", False, target
+    return target, False, None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gerador de carga para os servidores A2A do DevMentor AI")
+    parser.add_argument("--target", default="coordinator", help="'coordinator', chave de agente ou URL")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=4, help="Clientes simultâneos (malha fechada)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Requisições por segundo (malha aberta)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Limite de requisições pendentes (malha aberta)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração em segundos")
+    parser.add_argument("--requests", type=int, default=None, help="Número máximo de requisições")
+    parser.add_argument("--mix", default="", help="Pesos por persona (ex: algo_interviewer=3,code_reviewer=1)")
+    parser.add_argument("--messages", default=None, help="JSONL com {persona, text} substituindo as mensagens padrão")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Arquivo para salvar o relatório JSON")
+    parser.add_argument("--baseline", default=None, help="Relatório anterior para comparação")
+    args = parser.parse_args(argv)
+
+    url, route_prefix, fixed_persona = resolve_target(args.target)
+    messages = load_messages(args.messages) if args.messages else DEFAULT_MESSAGES
+    mix = parse_mix(args.mix) if args.mix else None
+    if fixed_persona:
+        mix = {fixed_persona: 1.0}
+
+    generator = LoadGenerator(url, messages, mix, route_prefix, args.timeout, args.seed)
+    if args.mode == "closed":
+        report = generator.run_closed(args.concurrency, args.duration, args.requests)
+    else:
+        report = generator.run_open(args.rate, args.duration, args.max_in_flight, args.requests)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["comparison"] = compare_reports(json.load(f), report)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0 if report["requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Servidor stub compatível com a API de chat completions da OpenAI.
+Responde sem rede e sem chave real, com tempo até o primeiro token, taxa de
+tokens por segundo, injeção de erros 5xx e respostas 429 configuráveis, para
+reproduzir carga e latência de cauda offline e no CI.
+
+Uso:
+    python -m app.bench.stub_llm --port 9100 --ttft 0.3 --tokens-per-second 40 --error-rate 0.02
+    LLM_BASE_URL=http://localhost:9100/v1 OPENROUTER_API_KEY=sk-stub-local-0000000000 python start_servers.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# Vocabulário das respostas geradas (cada palavra conta como um token)
+WORDS = (
+    "Ótima pergunta. Vamos analisar o problema passo a passo, considerando "
+    "complexidade de tempo, espaço e casos de borda antes de escrever o código."
+).split()
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimativa simples de tokens do prompt (~4 caracteres por token)."""
+    chars = sum(len(str(message.get("content") or "")) for message in messages)
+    return max(1, chars // 4)
+
+
+class StubLLMConfig:
+    """Parâmetros de latência e falhas do stub (alteráveis em tempo de execução)."""
+
+    def __init__(
+        self,
+        ttft: float = 0.2,
+        tokens_per_second: float = 50.0,
+        output_tokens: int = 64,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        max_concurrency: Optional[int] = None,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            ttft: Segundos até o primeiro token
+            tokens_per_second: Taxa de geração após o primeiro token (0 = instantâneo)
+            output_tokens: Tokens por resposta (sobrescrito por max_tokens menor)
+            error_rate: Probabilidade de responder 500
+            rate_limit_rate: Probabilidade de responder 429
+            max_concurrency: Acima desse número de requisições simultâneas responde 429
+            retry_after: Valor do header Retry-After das respostas 429
+            seed: Semente para reproduzir a sequência de falhas injetadas
+        """
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in vars(self).items() if key != "random"}
+
+
+def _error(status: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        {"error": {"message": message, "type": error_type, "code": status}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def create_app(config: Optional[StubLLMConfig] = None) -> Starlette:
+    """Cria a aplicação ASGI do stub com a configuração informada."""
+    config = config or StubLLMConfig()
+    stats = {"requests": 0, "in_flight": 0, "completed": 0, "errors_injected": 0, "rate_limited": 0}
+
+    def _rate_limit_headers() -> Dict[str, str]:
+        limit = config.max_concurrency or 0
+        return {
+            "retry-after": str(config.retry_after),
+            "x-ratelimit-limit-requests": str(limit),
+            "x-ratelimit-remaining-requests": str(max(0, limit - stats["in_flight"])),
+        }
+
+    def _injected_failure() -> Optional[Response]:
+        """Decide se a requisição falha antes de começar a gerar."""
+        if config.max_concurrency is not None and stats["in_flight"] >= config.max_concurrency:
+            stats["rate_limited"] += 1
+            return _error(429, "Rate limit exceeded (concorrência)", "rate_limit_error", _rate_limit_headers())
+        roll = config.random.random()
+        if roll < config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return _error(429, "Rate limit exceeded", "rate_limit_error", _rate_limit_headers())
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["errors_injected"] += 1
+            return _error(500, "Erro injetado pelo stub", "server_error")
+        return None
+
+    def _token_delay() -> float:
+        return 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+    async def chat_completions(request: Request) -> Response:
+        try:
+            body = await request.json()
+            messages = body["messages"]
+        except (ValueError, KeyError, TypeError):
+            return _error(400, "Corpo inválido: 'messages' é obrigatório", "invalid_request_error")
+
+        stats["requests"] += 1
+        failure = _injected_failure()
+        if failure is not None:
+            return failure
+
+        model = body.get("model", "stub-model")
+        completion_tokens = min(config.output_tokens, body.get("max_tokens") or config.output_tokens)
+        prompt_tokens = estimate_tokens(messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        tokens = [WORDS[i % len(WORDS)] + " " for i in range(completion_tokens)]
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            stats["in_flight"] += 1
+            try:
+                await asyncio.sleep(config.ttft + _token_delay() * max(0, completion_tokens - 1))
+            finally:
+                stats["in_flight"] -= 1
+                stats["completed"] += 1
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                **extra,
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def stream():
+            stats["in_flight"] += 1
+            try:
+                await asyncio.sleep(config.ttft)
+                yield chunk({"role": "assistant", "content": tokens[0] if tokens else ""})
+                for token in tokens[1:]:
+                    await asyncio.sleep(_token_delay())
+                    yield chunk({"content": token})
+                yield chunk({}, "stop")
+                if include_usage:
+                    yield chunk(None, usage=usage)
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+                stats["completed"] += 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def list_models(request: Request) -> Response:
+        return JSONResponse({"object": "list", "data": [{"id": "stub-model", "object": "model", "owned_by": "stub"}]})
+
+    async def stub_stats(request: Request) -> Response:
+        return JSONResponse({"config": config.to_dict(), **stats})
+
+    async def stub_config(request: Request) -> Response:
+        """Altera a configuração em tempo de execução (ex: subir error_rate no meio de um teste)."""
+        try:
+            updates = await request.json()
+        except ValueError:
+            return _error(400, "JSON inválido", "invalid_request_error")
+        for key, value in updates.items():
+            if key not in config.to_dict():
+                return _error(400, f"Parâmetro desconhecido: {key}", "invalid_request_error")
+            setattr(config, key, value)
+        return JSONResponse(config.to_dict())
+
+    routes = [
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/models", list_models, methods=["GET"]),
+        Route("/stub/stats", stub_stats, methods=["GET"]),
+        Route("/stub/config", stub_config, methods=["POST"]),
+    ]
+    return Starlette(routes=routes)
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor LLM stub compatível com OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Segundos até o primeiro token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidade de 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probabilidade de 429")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="Acima disso responde 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = StubLLMConfig(
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    print(f"🧪 LLM stub em http://{args.host}:{args.port}/v1")
+    print(f"   Use LLM_BASE_URL=http://{args.host}:{args.port}/v1 nos agentes e no app")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
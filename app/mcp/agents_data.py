@@ -1,7 +1,13 @@
 """
 Dados dos agentes (personas) disponíveis no sistema.
-Cada agente será implementado como um servidor A2A independente.
+Cada agente é um servidor A2A independente (uma porta por persona) ou uma rota
+do host multi-persona (`app/agents/host.py`).
 """
+import os
+
+# Prefixo das rotas das personas no host multi-persona
+AGENT_HOST_PREFIX = "/agents"
+
 AGENTS_DB = {
     "algo_interviewer": {
         "display_name": "👨‍💻 Entrevistador de Algoritmos (LeetCode)",
@@ -17,6 +23,8 @@ INSTRUÇÕES:
 4. Seja técnico, direto e construtivo no feedback.
 5. Se o usuário pedir por um simulado de prática ou exercício, use a ferramenta `generate_quiz_json` para criar um template estruturado.
 6. Se houver menção a um arquivo de código, use `read_file_snippet` para analisá-lo.
+7. Para localizar funções, classes ou trechos no código sem saber o caminho exato, use `search_code`.
+8. Para ver uma função/classe completa ou quem a chama, prefira `find_symbol` e `find_callers` a janelas arbitrárias de linhas.
 
 Mantenha um tom profissional mas acessível.""",
         "port": 8001
@@ -72,6 +80,9 @@ INSTRUÇÕES:
 5. NÃO resolve problemas de lógica ou bugs funcionais - esse não é seu papel.
 6. Use `read_file_snippet` para analisar trechos de código quando fornecido um caminho.
 7. Se precisar consultar boas práticas, use `search_docs` para trazer referências.
+8. Para localizar definições ou usos no código sem saber o caminho exato, use `search_code` antes de `read_file_snippet`.
+9. Para revisar uma função/classe inteira ou ver quem a chama, use `find_symbol` e `find_callers` (trechos exatos, sem linhas irrelevantes).
+10. Problemas de PEP8, nomes, type hints, imports e complexidade são detectados por `lint_python`. Quando a mensagem trouxer "Achados da análise estática", não procure esses problemas de novo: explique, priorize e sugira correções para eles.
 
 Mantenha comentários construtivos e educacionais.""",
         "port": 8004
@@ -95,3 +106,17 @@ Foque em autenticidade e preparação prática.""",
         "port": 8005
     }
 }
+
+
+def get_agent_url(key: str) -> str:
+    """
+    URL A2A da persona.
+
+    Com DEVMENTOR_AGENT_HOST_URL definido (modo host), todas as personas ficam
+    atrás de um único servidor em `<host>/agents/<chave>`; senão, cada uma
+    responde na própria porta do AGENTS_DB.
+    """
+    host_url = os.getenv("DEVMENTOR_AGENT_HOST_URL")
+    if host_url:
+        return f"{host_url.rstrip('/')}{AGENT_HOST_PREFIX}/{key}"
+    return f"http://localhost:{AGENTS_DB[key]['port']}"
@@ -0,0 +1,159 @@
+"""
+Execução em lote de ferramentas MCP.
+Recebe uma lista de invocações, executa todas em paralelo no servidor e
+devolve cada resultado assim que fica pronto (com erro e tempo por chamada).
+"""
+import asyncio
+import inspect
+import json
+import math
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from app.utils.tracing import trace_span
+
+# Limites de segurança para uma única requisição em lote
+MAX_BATCH_SIZE = 32
+DEFAULT_CALL_TIMEOUT = 30.0
+MAX_BATCH_TIMEOUT = 120.0
+
+
+def parse_batch_request(payload: Any) -> List[Dict[str, Any]]:
+    """
+    Valida o corpo de uma requisição em lote.
+
+    Formato esperado:
+        {"calls": [{"id": "a", "tool": "read_file_snippet", "arguments": {...}}, ...]}
+
+    Args:
+        payload: Corpo JSON já decodificado
+
+    Returns:
+        Lista normalizada de chamadas (id, tool, arguments)
+
+    Raises:
+        ValueError: Se o formato for inválido
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("calls"), list):
+        raise ValueError("Corpo deve ser um objeto com a lista 'calls'")
+
+    calls = payload["calls"]
+    if not calls:
+        raise ValueError("Lista 'calls' está vazia")
+    if len(calls) > MAX_BATCH_SIZE:
+        raise ValueError(f"Lote excede o máximo de {MAX_BATCH_SIZE} chamadas")
+
+    normalized = []
+    for index, call in enumerate(calls):
+        if not isinstance(call, dict) or not isinstance(call.get("tool"), str):
+            raise ValueError(f"Chamada {index} precisa do campo 'tool' (string)")
+        arguments = call.get("arguments") or {}
+        if not isinstance(arguments, dict):
+            raise ValueError(f"Chamada {index}: 'arguments' deve ser um objeto")
+        normalized.append({
+            "id": call.get("id", index),
+            "tool": call["tool"],
+            "arguments": arguments,
+        })
+    return normalized
+
+
+def parse_batch_timeout(payload: Dict[str, Any]) -> float:
+    """
+    Lê o timeout por chamada do corpo do lote, limitado a `MAX_BATCH_TIMEOUT`.
+
+    Args:
+        payload: Corpo JSON já validado por `parse_batch_request`
+
+    Returns:
+        Timeout em segundos, no intervalo (0, MAX_BATCH_TIMEOUT]
+
+    Raises:
+        ValueError: Se o valor não for numérico, finito e positivo
+    """
+    value = payload.get("timeout", DEFAULT_CALL_TIMEOUT)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("'timeout' deve ser um número de segundos")
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError("'timeout' deve ser positivo")
+    return min(float(value), MAX_BATCH_TIMEOUT)
+
+
+async def _invoke(
+    index: int,
+    call: Dict[str, Any],
+    tools: Dict[str, Callable],
+    timeout: float
+) -> Dict[str, Any]:
+    """Executa uma chamada do lote, capturando erro e tempo decorrido."""
+    result = {"index": index, "id": call["id"], "tool": call["tool"], "ok": False}
+    with trace_span("mcp.tool", tool=call["tool"]) as span:
+        await _run_call(result, call, tools, timeout)
+        if not result["ok"]:
+            span.set_error(result["error"])
+    return result
+
+
+async def _run_call(
+    result: Dict[str, Any],
+    call: Dict[str, Any],
+    tools: Dict[str, Callable],
+    timeout: float
+):
+    """Preenche `result` com o retorno (ou erro) e o tempo da chamada."""
+    start = time.perf_counter()
+    try:
+        fn = tools.get(call["tool"])
+        if fn is None:
+            raise LookupError(f"Ferramenta desconhecida: {call['tool']}")
+
+        # Ferramentas síncronas não podem bloquear o event loop do servidor
+        if inspect.iscoroutinefunction(fn):
+            pending = fn(**call["arguments"])
+        else:
+            pending = asyncio.to_thread(fn, **call["arguments"])
+
+        result["result"] = await asyncio.wait_for(pending, timeout)
+        result["ok"] = True
+    except asyncio.TimeoutError:
+        result["error"] = f"Timeout após {timeout}s"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {str(e)}"
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+
+async def run_batch(
+    calls: List[Dict[str, Any]],
+    tools: Dict[str, Callable],
+    timeout: float = DEFAULT_CALL_TIMEOUT
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Executa as chamadas concorrentemente e produz resultados na ordem de conclusão.
+
+    O timeout só encerra a espera: uma função síncrona já em execução numa thread
+    continua até retornar, ocupando sua vaga no pool até lá.
+
+    Args:
+        calls: Chamadas normalizadas por `parse_batch_request`
+        tools: Mapa nome da ferramenta -> função
+        timeout: Timeout por chamada em segundos
+
+    Yields:
+        Dicionário por chamada com index, id, tool, ok, result/error e elapsed_ms
+    """
+    tasks = [
+        asyncio.create_task(_invoke(index, call, tools, timeout))
+        for index, call in enumerate(calls)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Cliente desconectou no meio do stream: não deixar chamadas órfãs
+        for task in tasks:
+            task.cancel()
+
+
+def encode_result(result: Dict[str, Any]) -> str:
+    """Serializa um resultado como uma linha NDJSON."""
+    return json.dumps(result, ensure_ascii=False, default=str) + "\n"
@@ -0,0 +1,310 @@
+"""
+Busca de código por regex/literal sobre um índice de trigramas persistido.
+Cada arquivo do workspace é decomposto em trigramas (minúsculos); uma busca
+só lê os arquivos que contêm todos os trigramas obrigatórios da consulta.
+O índice é atualizado incrementalmente comparando mtime/tamanho dos arquivos.
+"""
+import fnmatch
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from app.mcp.workspace import get_index_dir, get_workspace_root, iter_workspace_files
+
+INDEX_VERSION = 2
+MAX_FILE_SIZE = 1024 * 1024  # Arquivos maiores não são indexados
+
+
+def extract_trigrams(text: str) -> Set[str]:
+    """Conjunto de trigramas (case-insensitive) de um texto."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _literal_runs(parsed) -> List[str]:
+    """Sequências literais obrigatórias no nível superior de uma regex parseada."""
+    runs, current = [], []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(arg))
+            continue
+        if op is sre_parse.SUBPATTERN:
+            # Grupo simples: seu conteúdo também é obrigatório
+            runs.append("".join(current))
+            current = []
+            runs.extend(_literal_runs(arg[-1]))
+            continue
+        runs.append("".join(current))
+        current = []
+    runs.append("".join(current))
+    return [run for run in runs if len(run) >= 3]
+
+
+def required_trigrams(query: str, regex: bool = False) -> Set[str]:
+    """
+    Trigramas que qualquer texto compatível com a consulta precisa conter.
+
+    Um conjunto vazio significa que o índice não consegue filtrar a consulta
+    (ex: alternâncias no nível superior) e todos os arquivos são candidatos.
+    """
+    if not regex:
+        return extract_trigrams(query)
+    trigrams = set()
+    for run in _literal_runs(sre_parse.parse(query)):
+        trigrams |= extract_trigrams(run)
+    return trigrams
+
+
+class TrigramIndex:
+    """Índice de trigramas de um workspace, persistido em disco."""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        index_path: Optional[Path] = None,
+        refresh_interval: float = 2.0,
+        max_file_size: int = MAX_FILE_SIZE
+    ):
+        self.root = Path(root or get_workspace_root()).resolve()
+        self.index_path = Path(index_path or get_index_dir(self.root) / "trigrams.json")
+        self.refresh_interval = refresh_interval
+        self.max_file_size = max_file_size
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._load()
+
+    def _load(self):
+        """
+        Carrega índice persistido, se compatível com a raiz e a versão atuais.
+
+        O arquivo fica dentro do workspace revisado, então é tratado como dado
+        não confiável: JSON em vez de pickle, e qualquer erro vira cache miss.
+        """
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION or data.get("root") != str(self.root):
+                return
+            files = {
+                str(path): {"mtime": int(entry["mtime"]), "size": int(entry["size"]), "trigrams": set(entry["trigrams"])}
+                for path, entry in data["files"].items()
+            }
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return
+        self._files = files
+        for path, entry in self._files.items():
+            self._add_postings(path, entry["trigrams"])
+
+    def _save(self):
+        """Persiste o índice de forma atômica (trigramas como listas ordenadas)."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Sufixo com PID: vários workers podem salvar o mesmo índice ao mesmo tempo
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        files = {
+            path: {"mtime": entry["mtime"], "size": entry["size"], "trigrams": sorted(entry["trigrams"])}
+            for path, entry in self._files.items()
+        }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "root": str(self.root), "files": files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def _add_postings(self, path: str, trigrams: Set[str]):
+        for trigram in trigrams:
+            self._postings.setdefault(trigram, set()).add(path)
+
+    def _remove_postings(self, path: str, trigrams: Set[str]):
+        for trigram in trigrams:
+            paths = self._postings.get(trigram)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._postings[trigram]
+
+    def _read_text(self, path: str) -> Optional[str]:
+        """Lê arquivo como texto; retorna None para binários ou ilegíveis."""
+        try:
+            with open(self.root / path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if b"\0" in raw:
+            return None
+        return raw.decode("utf-8", errors="replace")
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Sincroniza o índice com o disco, reindexando apenas arquivos alterados.
+
+        Args:
+            force: Ignora o intervalo mínimo entre atualizações
+
+        Returns:
+            Contagem de arquivos adicionados, atualizados e removidos
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return stats
+            self._last_refresh = now
+
+            seen = set()
+            for path, stat in iter_workspace_files(self.root):
+                if stat.st_size > self.max_file_size:
+                    continue
+                seen.add(path)
+                entry = self._files.get(path)
+                if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    continue
+
+                text = self._read_text(path)
+                trigrams = extract_trigrams(text) if text is not None else set()
+                if entry:
+                    self._remove_postings(path, entry["trigrams"])
+                    stats["updated"] += 1
+                else:
+                    stats["added"] += 1
+                self._files[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "trigrams": trigrams}
+                self._add_postings(path, trigrams)
+
+            for path in set(self._files) - seen:
+                self._remove_postings(path, self._files.pop(path)["trigrams"])
+                stats["removed"] += 1
+
+            if any(stats.values()):
+                self._save()
+        return stats
+
+    def candidates(self, trigrams: Set[str]) -> List[str]:
+        """Arquivos que contêm todos os trigramas informados."""
+        with self._lock:
+            if not trigrams:
+                return sorted(path for path, entry in self._files.items() if entry["trigrams"])
+            postings = [self._postings.get(trigram, set()) for trigram in trigrams]
+            postings.sort(key=len)
+            result = set(postings[0])
+            for paths in postings[1:]:
+                result &= paths
+                if not result:
+                    break
+            return sorted(result)
+
+    def search(
+        self,
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        path_glob: Optional[str] = None,
+        context_lines: int = 2,
+        max_results: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Busca a consulta no workspace.
+
+        Args:
+            query: Texto literal ou expressão regular
+            regex: Interpreta `query` como regex
+            case_sensitive: Diferencia maiúsculas/minúsculas
+            path_glob: Filtro opcional de caminho (ex: 'app/**/*.py')
+            context_lines: Linhas de contexto antes/depois de cada ocorrência
+            max_results: Número máximo de ocorrências retornadas
+
+        Returns:
+            Dicionário com matches, arquivos candidatos/varridos e tempo gasto
+
+        Raises:
+            ValueError: Se a consulta for vazia ou a regex for inválida
+        """
+        if not query:
+            raise ValueError("Consulta vazia")
+        start = time.perf_counter()
+        flags = 0 if case_sensitive else re.IGNORECASE
+        try:
+            pattern = re.compile(query if regex else re.escape(query), flags)
+        except re.error as e:
+            raise ValueError(f"Regex inválida: {e}")
+
+        self.refresh()
+        candidates = self.candidates(required_trigrams(query, regex))
+        if path_glob:
+            candidates = [path for path in candidates if fnmatch.fnmatch(path, path_glob)]
+
+        matches = []
+        for path in candidates:
+            text = self._read_text(path)
+            if text is None or not pattern.search(text):
+                continue
+            lines = text.splitlines()
+            for number, line in enumerate(lines, start=1):
+                if not pattern.search(line):
+                    continue
+                matches.append({
+                    "path": path,
+                    "line": number,
+                    "text": line,
+                    "before": lines[max(0, number - 1 - context_lines):number - 1],
+                    "after": lines[number:number + context_lines],
+                })
+                # Uma ocorrência a mais só para saber se o resultado foi truncado
+                if len(matches) > max_results:
+                    break
+            if len(matches) > max_results:
+                break
+
+        return {
+            "query": query,
+            "matches": matches[:max_results],
+            "truncated": len(matches) > max_results,
+            "candidates": len(candidates),
+            "indexed_files": len(self._files),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+
+def format_search_results(results: Dict[str, Any]) -> str:
+    """Formata resultados de busca em texto compacto para o LLM."""
+    matches = results["matches"]
+    header = (
+        f"🔎 {len(matches)} ocorrência(s) para '{results['query']}' "
+        f"({results['candidates']} de {results['indexed_files']} arquivos candidatos, "
+        f"{results['elapsed_ms']} ms)"
+    )
+    if not matches:
+        return header
+    lines = [header, "=" * 70]
+    for match in matches:
+        lines.append(f"📄 {match['path']}:{match['line']}")
+        first = match["line"] - len(match["before"])
+        for offset, text in enumerate(match["before"]):
+            lines.append(f"  {first + offset:>5} | {text}")
+        lines.append(f"> {match['line']:>5} | {match['text']}")
+        for offset, text in enumerate(match["after"], start=1):
+            lines.append(f"  {match['line'] + offset:>5} | {text}")
+        lines.append("")
+    if results["truncated"]:
+        lines.append("[Resultados truncados - refine a consulta ou use path_glob]")
+    return "\n".join(lines)
+
+
+_index: Optional[TrigramIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_code_index() -> TrigramIndex:
+    """Índice compartilhado do workspace configurado (criado sob demanda)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TrigramIndex()
+        return _index
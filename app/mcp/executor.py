@@ -0,0 +1,240 @@
+"""
+Execução não bloqueante das ferramentas do servidor MCP.
+Ferramentas síncronas (I/O de arquivo, indexação) rodam em um pool de threads
+e trabalho CPU-bound em um pool de processos, com limite de concorrência por
+ferramenta. Também mede o atraso (lag) do event loop do servidor.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.metrics import ERRORS_TOTAL, TOOL_QUEUE_SECONDS, TOOL_SECONDS
+
+# Limites padrão de concorrência por ferramenta (sobrescritos por MCP_TOOL_LIMITS)
+DEFAULT_TOOL_LIMITS = {
+    "find_symbol": 4,
+    "find_callers": 4,
+}
+
+
+def parse_tool_limits(spec: str) -> Dict[str, int]:
+    """
+    Converte 'read_file_snippet=8,search_code=4' em dicionário.
+
+    Raises:
+        ValueError: Se algum item não estiver no formato nome=inteiro
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if not name or not value.isdigit() or int(value) < 1:
+            raise ValueError(f"Limite inválido: '{item}' (use nome=inteiro positivo)")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+class ToolExecutor:
+    """Despacha ferramentas para pools de threads/processos com limites por ferramenta."""
+
+    def __init__(
+        self,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        tool_limits: Optional[Dict[str, int]] = None
+    ):
+        self.thread_workers = thread_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.process_workers = process_workers or (os.cpu_count() or 1)
+        self.tool_limits = dict(DEFAULT_TOOL_LIMITS, **(tool_limits or {}))
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Semáforos asyncio pertencem a um event loop; mantém um conjunto por loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        # Contadores atualizados por vários loops e threads
+        self._stats_lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._completed: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "ToolExecutor":
+        """Cria executor a partir de MCP_THREAD_WORKERS, MCP_PROCESS_WORKERS e MCP_TOOL_LIMITS."""
+        return cls(
+            thread_workers=int(os.getenv("MCP_THREAD_WORKERS", "0")) or None,
+            process_workers=int(os.getenv("MCP_PROCESS_WORKERS", "0")) or None,
+            tool_limits=parse_tool_limits(os.getenv("MCP_TOOL_LIMITS", ""))
+        )
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        """Pool de threads (criado sob demanda)."""
+        with self._pool_lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers,
+                    thread_name_prefix="mcp-tool"
+                )
+            return self._thread_pool
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        """
+        Pool de processos para trabalho CPU-bound (criado sob demanda).
+
+        Usa `forkserver` (ou `spawn`) em vez de `fork`: o servidor já tem threads
+        rodando (listener de logs, exportador de spans, pools) e um filho criado
+        com `fork` pode herdar um lock ocupado e travar.
+        """
+        with self._pool_lock:
+            if self._process_pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=context)
+            return self._process_pool
+
+    def _semaphore(self, tool_name: str) -> Optional[asyncio.Semaphore]:
+        limit = self.tool_limits.get(tool_name)
+        if limit is None:
+            return None
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if tool_name not in per_loop:
+            per_loop[tool_name] = asyncio.Semaphore(limit)
+        return per_loop[tool_name]
+
+    async def run(self, tool_name: str, fn: Callable, *args, kind: str = "thread", **kwargs) -> Any:
+        """
+        Executa `fn` sem bloquear o event loop.
+
+        Args:
+            tool_name: Nome usado para limite de concorrência e estatísticas
+            fn: Função síncrona (deve ser importável por nome se kind='process')
+            kind: 'thread', 'process' ou 'inline' (executa no próprio loop)
+
+        Returns:
+            Retorno de `fn`
+        """
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Tipo de execução inválido: {kind}")
+        semaphore = self._semaphore(tool_name)
+        queued_at = time.perf_counter()
+        if semaphore is not None:
+            await semaphore.acquire()
+        started_at = time.perf_counter()
+        TOOL_QUEUE_SECONDS.labels(tool=tool_name).observe(started_at - queued_at)
+        with self._stats_lock:
+            self._in_flight[tool_name] = self._in_flight.get(tool_name, 0) + 1
+        try:
+            if kind == "inline":
+                return fn(*args, **kwargs)
+            pool = self.thread_pool if kind == "thread" else self.process_pool
+            call = functools.partial(fn, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(pool, call)
+        except Exception as e:
+            ERRORS_TOTAL.labels(component="mcp_tool", persona=tool_name, model="", error=type(e).__name__).inc()
+            raise
+        finally:
+            TOOL_SECONDS.labels(tool=tool_name).observe(time.perf_counter() - started_at)
+            with self._stats_lock:
+                self._in_flight[tool_name] -= 1
+                self._completed[tool_name] = self._completed.get(tool_name, 0) + 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado atual: workers, limites, chamadas em andamento e concluídas."""
+        with self._stats_lock:
+            in_flight = {name: count for name, count in self._in_flight.items() if count}
+            completed = dict(self._completed)
+        return {
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "tool_limits": dict(self.tool_limits),
+            "in_flight": in_flight,
+            "completed": completed,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Encerra os pools criados."""
+        with self._pool_lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=wait)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=wait)
+                self._process_pool = None
+
+
+class LoopLagMonitor:
+    """Mede quanto o event loop atrasa para acordar de um sleep (sinal de bloqueio)."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - start - self.interval) * 1000)
+            self.last_ms = round(lag_ms, 2)
+            self.max_ms = max(self.max_ms, self.last_ms)
+            self.samples += 1
+
+    def start(self):
+        """Inicia a medição no event loop corrente."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Interrompe a medição."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        return {"last_ms": self.last_ms, "max_ms": self.max_ms, "samples": self.samples}
+
+
+_executor: Optional[ToolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ToolExecutor:
+    """Executor compartilhado do processo (configurado pelas variáveis de ambiente)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ToolExecutor.from_env()
+        return _executor
+
+
+def offload(kind: str = "thread", name: Optional[str] = None):
+    """
+    Decorator que transforma uma ferramenta síncrona em corrotina despachada ao executor.
+
+    Uso (abaixo de `@mcp.tool()`, preservando a assinatura para o schema):
+        @mcp.tool()
+        @offload("thread")
+        def read_file_snippet(...): ...
+
+    Para o pool de processos, prefira chamar `get_executor().run(..., kind="process")`
+    com uma função auxiliar de módulo: a função decorada por `@mcp.tool()` deixa de
+    ser importável pelo nome e não pode ser serializada para outro processo.
+    """
+    def decorator(fn: Callable) -> Callable:
+        tool_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await get_executor().run(tool_name, fn, *args, kind=kind, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,249 @@
+"""
+Análise estática local (PEP8, nomes, type hints, imports e complexidade).
+Usa apenas `ast` e `tokenize` da biblioteca padrão para produzir achados
+compactos e determinísticos que o Code Reviewer só precisa explicar e priorizar.
+"""
+import ast
+import io
+import re
+import tokenize
+from typing import Any, Dict, List, Set
+
+SNAKE_CASE = re.compile(r"^_{0,2}[a-z][a-z0-9_]*_{0,2}$")
+CAP_WORDS = re.compile(r"^_?[A-Z][a-zA-Z0-9]*$")
+
+# Entradas maiores que isso são analisadas no pool de processos do servidor MCP
+LARGE_INPUT_CHARS = 20_000
+
+
+def _own_nodes(node: ast.AST):
+    """Nós do corpo de uma função, sem entrar em funções e lambdas aninhadas."""
+    pending = list(ast.iter_child_nodes(node))
+    while pending:
+        child = pending.pop()
+        yield child
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            pending.extend(ast.iter_child_nodes(child))
+
+
+def _cyclomatic_complexity(node: ast.AST) -> int:
+    """Complexidade ciclomática (McCabe) aproximada de uma função (aninhadas contam à parte)."""
+    complexity = 1
+    for child in _own_nodes(node):
+        if isinstance(child, (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp,
+                              ast.ExceptHandler, ast.Assert, ast.match_case)):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            complexity += 1 + len(child.ifs)
+    return complexity
+
+
+class _LintVisitor(ast.NodeVisitor):
+    """Coleta achados de nomes, anotações, docstrings, comparações e complexidade."""
+
+    def __init__(self, max_complexity: int):
+        self.max_complexity = max_complexity
+        self.findings: List[Dict[str, Any]] = []
+        self.functions: List[Dict[str, Any]] = []
+        self._class_depth = 0
+
+    def _add(self, node: ast.AST, code: str, message: str):
+        self.findings.append({
+            "line": node.lineno,
+            "col": node.col_offset + 1,
+            "code": code,
+            "message": message,
+        })
+
+    def visit_ClassDef(self, node):
+        if not CAP_WORDS.match(node.name):
+            self._add(node, "N801", f"classe '{node.name}' deveria usar CapWords")
+        if not node.name.startswith("_") and ast.get_docstring(node) is None:
+            self._add(node, "D101", f"classe pública '{node.name}' sem docstring")
+        self._class_depth += 1
+        self.generic_visit(node)
+        self._class_depth -= 1
+
+    def visit_FunctionDef(self, node):
+        name = node.name
+        is_dunder = name.startswith("__") and name.endswith("__")
+        if not is_dunder and not SNAKE_CASE.match(name):
+            self._add(node, "N802", f"função '{name}' deveria usar snake_case")
+
+        args = node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+        if node.args.vararg:
+            args.append(node.args.vararg)
+        if node.args.kwarg:
+            args.append(node.args.kwarg)
+        for index, arg in enumerate(args):
+            if self._class_depth and index == 0 and arg.arg in ("self", "cls"):
+                continue
+            if not SNAKE_CASE.match(arg.arg) and arg.arg != "_":
+                self._add(arg, "N803", f"argumento '{arg.arg}' deveria ser minúsculo")
+            if arg.annotation is None:
+                self._add(arg, "ANN001", f"argumento '{arg.arg}' de '{name}' sem type hint")
+
+        is_public = not name.startswith("_") or is_dunder
+        if is_public and node.returns is None and name != "__init__":
+            self._add(node, "ANN201", f"função '{name}' sem type hint de retorno")
+        if not name.startswith("_") and ast.get_docstring(node) is None:
+            self._add(node, "D103", f"função pública '{name}' sem docstring")
+
+        complexity = _cyclomatic_complexity(node)
+        self.functions.append({"name": name, "line": node.lineno, "complexity": complexity})
+        if complexity > self.max_complexity:
+            self._add(node, "C901", f"'{name}' é complexa demais ({complexity} > {self.max_complexity})")
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Compare(self, node):
+        for op, comparator in zip(node.ops, node.comparators):
+            if not isinstance(op, (ast.Eq, ast.NotEq)) or not isinstance(comparator, ast.Constant):
+                continue
+            if comparator.value is None:
+                self._add(node, "E711", "comparação com None deve usar 'is' / 'is not'")
+            elif isinstance(comparator.value, bool):
+                self._add(node, "E712", f"comparação com {comparator.value} deve ser 'if cond:' / 'if not cond:'")
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.type is None:
+            self._add(node, "E722", "'except:' sem tipo captura inclusive KeyboardInterrupt")
+        self.generic_visit(node)
+
+
+def _annotations(tree: ast.Module):
+    """Expressões de anotação: argumentos, retornos e variáveis anotadas."""
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            arguments = node.args
+            for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs + [arguments.vararg, arguments.kwarg]:
+                if arg is not None and arg.annotation is not None:
+                    yield arg.annotation
+            if node.returns is not None:
+                yield node.returns
+        elif isinstance(node, ast.AnnAssign):
+            yield node.annotation
+
+
+def _unused_imports(tree: ast.Module) -> List[Dict[str, Any]]:
+    """Imports de módulo nunca referenciados (respeitando __all__)."""
+    imported: Dict[str, ast.AST] = {}
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imported[(alias.asname or alias.name).split(".")[0]] = node
+        elif isinstance(node, ast.ImportFrom) and node.module != "__future__":
+            for alias in node.names:
+                if alias.name != "*":
+                    imported[alias.asname or alias.name] = node
+
+    used: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            used.add(node.id)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id == "__all__" and isinstance(node.value, (ast.List, ast.Tuple)):
+                    used.update(elt.value for elt in node.value.elts if isinstance(elt, ast.Constant))
+    # Anotações em string ('OpenAI', List["Dict"]); outras strings, como docstrings, não contam
+    for annotation in _annotations(tree):
+        for node in ast.walk(annotation):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                used.update(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", node.value))
+
+    return [
+        {"line": node.lineno, "col": node.col_offset + 1, "code": "F401", "message": f"'{name}' importado mas não usado"}
+        for name, node in imported.items()
+        if name not in used
+    ]
+
+
+def _token_findings(source: str, max_line_length: int) -> List[Dict[str, Any]]:
+    """Achados de layout: comprimento de linha, espaços finais e ';'."""
+    findings = []
+    for number, line in enumerate(source.splitlines(), start=1):
+        if "# noqa" in line:
+            continue
+        if len(line) > max_line_length:
+            findings.append({
+                "line": number, "col": max_line_length + 1, "code": "E501",
+                "message": f"linha com {len(line)} > {max_line_length} caracteres",
+            })
+        if line != line.rstrip():
+            findings.append({"line": number, "col": len(line.rstrip()) + 1, "code": "W291", "message": "espaços no fim da linha"})
+
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if token.type == tokenize.OP and token.string == ";":
+            findings.append({
+                "line": token.start[0], "col": token.start[1] + 1, "code": "E702",
+                "message": "múltiplas instruções na mesma linha (';')",
+            })
+    return findings
+
+
+def analyze_source(source: str, max_line_length: int = 79, max_complexity: int = 10) -> Dict[str, Any]:
+    """
+    Executa todas as verificações sobre um código Python.
+
+    Função de módulo para poder rodar no pool de processos do servidor MCP.
+
+    Args:
+        source: Código-fonte
+        max_line_length: Limite de caracteres por linha (PEP8: 79)
+        max_complexity: Complexidade ciclomática máxima por função
+
+    Returns:
+        Dicionário com 'findings' (ordenados por linha), 'summary' (contagem por código)
+        e 'metrics' (linhas, funções e complexidade)
+    """
+    try:
+        tree = ast.parse(source)
+        findings = _token_findings(source, max_line_length)
+    except (SyntaxError, tokenize.TokenError) as e:
+        line = getattr(e, "lineno", None) or (e.args[1][0] if len(e.args) > 1 else 1)
+        return {
+            "findings": [{"line": line, "col": 1, "code": "E999", "message": f"erro de sintaxe: {e.args[0]}"}],
+            "summary": {"E999": 1},
+            "metrics": {"lines": len(source.splitlines())},
+        }
+
+    visitor = _LintVisitor(max_complexity)
+    visitor.visit(tree)
+    findings += visitor.findings + _unused_imports(tree)
+    findings.sort(key=lambda f: (f["line"], f["col"], f["code"]))
+
+    summary: Dict[str, int] = {}
+    for finding in findings:
+        summary[finding["code"]] = summary.get(finding["code"], 0) + 1
+
+    complexities = [f["complexity"] for f in visitor.functions]
+    return {
+        "findings": findings,
+        "summary": summary,
+        "metrics": {
+            "lines": len(source.splitlines()),
+            "functions": len(complexities),
+            "max_complexity": max(complexities, default=0),
+            "avg_complexity": round(sum(complexities) / len(complexities), 2) if complexities else 0,
+            "most_complex": sorted(visitor.functions, key=lambda f: -f["complexity"])[:3],
+        },
+    }
+
+
+def format_findings(report: Dict[str, Any], max_findings: int = 50) -> str:
+    """Formata achados em linhas curtas ('L12:5 E501 mensagem') para o prompt do LLM."""
+    findings = report["findings"]
+    lines = [f"L{f['line']}:{f['col']} {f['code']} {f['message']}" for f in findings[:max_findings]]
+    if len(findings) > max_findings:
+        lines.append(f"... [{len(findings) - max_findings} achado(s) omitidos]")
+    metrics = report["metrics"]
+    if "functions" in metrics:
+        lines.append(
+            f"Métricas: {metrics['lines']} linhas, {metrics['functions']} funções, "
+            f"complexidade máx. {metrics['max_complexity']} (média {metrics['avg_complexity']})"
+        )
+    return "\n".join(lines)
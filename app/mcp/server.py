@@ -3,12 +3,41 @@ Servidor MCP HTTP independente expondo ferramentas via FastMCP.
 Roda em porta separada (5000) e pode ser consumido por qualquer cliente.
 """
 import asyncio
+import inspect
 import json
+import os
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Callable, Dict
 from fastmcp import FastMCP
+from pydantic import TypeAdapter
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from app.mcp.batch import encode_result, parse_batch_request, parse_batch_timeout, run_batch
+from app.mcp.executor import LoopLagMonitor, get_executor, offload
+from app.mcp.code_search import format_search_results, get_code_index
+from app.mcp.symbol_index import get_symbol_index
+from app.mcp.lint import LARGE_INPUT_CHARS, analyze_source
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
+from app.utils.profiler import is_admin_allowed, parse_profile_params, run_profile
+from app.utils.tracing import extract, trace_span
+
+# Mede o atraso do event loop enquanto o servidor está no ar
+loop_lag = LoopLagMonitor()
+
+
+@asynccontextmanager
+async def _lifespan(server):
+    """Inicia o monitor de lag do event loop junto com o servidor."""
+    loop_lag.start()
+    try:
+        yield {}
+    finally:
+        loop_lag.stop()
+
 
 # Inicializa servidor MCP
-mcp = FastMCP("DevMentorMCP")
+mcp = FastMCP("DevMentorMCP", lifespan=_lifespan)
 
 
 @mcp.tool()
@@ -60,6 +89,7 @@ def generate_quiz_json(
 
 
 @mcp.tool()
+@offload("thread")
 def read_file_snippet(
     file_path: str,
     start_line: int = 1,
@@ -147,6 +177,262 @@ Sugestões:
 [Implementar integração com Tavily/Google API para resultados reais]"""
 
 
+@mcp.tool()
+@offload("thread")
+def search_code(
+    query: str,
+    regex: bool = False,
+    case_sensitive: bool = False,
+    path_glob: str = "",
+    context_lines: int = 2,
+    max_results: int = 30
+) -> str:
+    """
+    Busca texto ou regex no código do workspace configurado (índice de trigramas).
+    
+    Args:
+        query: Texto literal ou expressão regular (ex: 'def call_llm', 'class \\w+Agent').
+        regex: Se True, interpreta `query` como regex. Padrão: False.
+        case_sensitive: Diferencia maiúsculas/minúsculas. Padrão: False.
+        path_glob: Filtro opcional de caminho (ex: 'app/*.py'). Padrão: todos.
+        context_lines: Linhas de contexto ao redor de cada ocorrência. Padrão: 2.
+        max_results: Máximo de ocorrências retornadas. Padrão: 30.
+    
+    Returns:
+        String com as ocorrências (arquivo:linha e contexto) ou mensagem de erro.
+    """
+    try:
+        results = get_code_index().search(
+            query,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            path_glob=path_glob or None,
+            context_lines=max(0, min(context_lines, 10)),
+            max_results=max(1, min(max_results, 200))
+        )
+        return format_search_results(results)
+    except ValueError as e:
+        return f"❌ Erro: {str(e)}"
+    except Exception as e:
+        return f"❌ Erro inesperado na busca: {type(e).__name__}: {str(e)}"
+
+
+@mcp.tool()
+@offload("thread")
+def find_symbol(
+    name: str,
+    kind: str = "",
+    include_source: bool = True,
+    max_lines: int = 80
+) -> str:
+    """
+    Localiza a definição de uma classe, função ou método Python no workspace.
+    
+    Args:
+        name: Nome simples ou qualificado (ex: 'BaseAgent', 'BaseAgent.call_llm').
+        kind: Filtro opcional - 'class', 'function' ou 'method'. Padrão: todos.
+        include_source: Se True, inclui o trecho exato do símbolo. Padrão: True.
+        max_lines: Máximo de linhas por trecho. Padrão: 80.
+    
+    Returns:
+        String com as definições encontradas (arquivo, linhas e código) ou mensagem de erro.
+    """
+    try:
+        index = get_symbol_index()
+        definitions = index.find_definitions(name, kind or None)
+        if not definitions:
+            return f"❌ Símbolo '{name}' não encontrado no workspace."
+        
+        parts = [f"🏷️  {len(definitions)} definição(ões) para '{name}':"]
+        for symbol in definitions[:10]:
+            parts.append(
+                f"\n📄 {symbol['kind']} {symbol['qualname']} — "
+                f"{symbol['path']}:{symbol['lineno']}-{symbol['end_lineno']}"
+            )
+            if symbol["doc"]:
+                parts.append(f"   {symbol['doc']}")
+            if include_source:
+                parts.append("=" * 70)
+                parts.append(index.get_source(symbol, max(1, min(max_lines, 400))))
+        return "\n".join(parts)
+    except Exception as e:
+        return f"❌ Erro inesperado ao buscar símbolo: {type(e).__name__}: {str(e)}"
+
+
+@mcp.tool()
+@offload("thread")
+def find_callers(name: str, max_results: int = 30) -> str:
+    """
+    Lista os pontos do workspace que chamam uma função ou método Python.
+    
+    Args:
+        name: Nome da função/método (ex: 'call_llm' ou 'BaseAgent.call_llm').
+        max_results: Máximo de chamadas retornadas. Padrão: 30.
+    
+    Returns:
+        String com arquivo:linha, função chamadora e expressão de cada chamada.
+    """
+    try:
+        calls = get_symbol_index().find_callers(name)
+        if not calls:
+            return f"❌ Nenhuma chamada a '{name}' encontrada no workspace."
+        
+        lines = [f"📞 {len(calls)} chamada(s) a '{name}':"]
+        for call in calls[:max(1, max_results)]:
+            lines.append(f"   {call['path']}:{call['lineno']} em {call['caller']} → {call['expr']}()")
+        if len(calls) > max_results:
+            lines.append(f"   ... [{len(calls) - max_results} chamada(s) omitidas]")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"❌ Erro inesperado ao buscar chamadas: {type(e).__name__}: {str(e)}"
+
+
+@mcp.tool()
+async def lint_python(
+    code: str = "",
+    file_path: str = "",
+    max_line_length: int = 79,
+    max_complexity: int = 10,
+    max_findings: int = 100
+) -> str:
+    """
+    Analisa código Python localmente (PEP8, nomes, type hints, imports não usados, complexidade).
+    
+    Args:
+        code: Código-fonte a analisar (ou use file_path).
+        file_path: Caminho de um arquivo .py a analisar, se `code` estiver vazio.
+        max_line_length: Limite de caracteres por linha. Padrão: 79 (PEP8).
+        max_complexity: Complexidade ciclomática máxima por função. Padrão: 10.
+        max_findings: Máximo de achados retornados. Padrão: 100.
+    
+    Returns:
+        String JSON com findings [{line, col, code, message}], summary e metrics.
+    """
+    executor = get_executor()
+    try:
+        if not code and file_path:
+            code = await executor.run("lint_python", Path(file_path).read_text, encoding="utf-8")
+        if not code:
+            return "❌ Erro: informe `code` ou `file_path`."
+        
+        # Entradas grandes vão para o pool de processos para não disputar o GIL do servidor
+        kind = "process" if len(code) > LARGE_INPUT_CHARS else "thread"
+        report = await executor.run(
+            "lint_python", analyze_source, code, max_line_length, max_complexity, kind=kind
+        )
+        total = len(report["findings"])
+        report["findings"] = report["findings"][:max(0, max_findings)]
+        report["truncated"] = total > len(report["findings"])
+        return json.dumps(report, ensure_ascii=False)
+    except (OSError, UnicodeDecodeError) as e:
+        return f"❌ Erro ao ler '{file_path}': {type(e).__name__}: {str(e)}"
+    except Exception as e:
+        return f"❌ Erro inesperado na análise: {type(e).__name__}: {str(e)}"
+
+
+def _validated_tool(name: str, fn: Callable) -> Callable:
+    """
+    Função que valida e converte os argumentos como uma chamada MCP normal.
+
+    O TypeAdapter da função é o mesmo mecanismo do `FunctionTool.run` do FastMCP
+    (ex: "10" vira 10 num parâmetro int). Ferramentas síncronas passam pelo
+    executor, com o pool limitado e os limites por ferramenta.
+    """
+    adapter = TypeAdapter(fn)
+    
+    if inspect.iscoroutinefunction(fn):
+        async def call(**arguments):
+            return await adapter.validate_python(arguments)
+    else:
+        async def call(**arguments):
+            return await get_executor().run(name, adapter.validate_python, arguments)
+    return call
+
+
+async def _get_tool_functions() -> Dict[str, Callable]:
+    """Mapa nome -> função (com validação de argumentos) das ferramentas registradas no servidor."""
+    tools = await mcp.get_tools()
+    return {name: _validated_tool(name, tool.fn) for name, tool in tools.items()}
+
+
+@mcp.custom_route("/batch", methods=["POST"])
+async def batch_tools(request: Request) -> Response:
+    """
+    Executa várias ferramentas em uma única requisição.
+    
+    Os resultados são transmitidos em NDJSON (uma linha por chamada) na ordem
+    em que terminam, cada um com `index`, `ok`, `result`/`error` e `elapsed_ms`.
+    """
+    try:
+        payload = await request.json()
+        calls = parse_batch_request(payload)
+        timeout = parse_batch_timeout(payload)
+    except (ValueError, TypeError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    tools = await _get_tool_functions()
+    parent = extract(request.headers)
+    
+    async def stream_results():
+        # Span ativo durante o stream: as tasks de cada chamada herdam o contexto
+        with trace_span("mcp.batch", service="mcp", parent=parent, calls=len(calls)):
+            async for result in run_batch(calls, tools, timeout):
+                yield encode_result(result)
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def runtime_stats(request: Request) -> Response:
+    """Estado do executor de ferramentas e lag do event loop deste worker."""
+    return JSONResponse({
+        "pid": os.getpid(),
+        "executor": get_executor().stats(),
+        "loop_lag": loop_lag.stats(),
+    })
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> Response:
+    """Métricas deste worker no formato de exposição do Prometheus."""
+    return PlainTextResponse(REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+@mcp.custom_route("/admin/profile", methods=["GET"])
+async def admin_profile(request: Request) -> Response:
+    """Amostra as pilhas de todas as threads do processo por N segundos."""
+    if not is_admin_allowed(request.client.host if request.client else None):
+        return JSONResponse({"error": "endpoint de admin disponível apenas via loopback"}, status_code=403)
+    try:
+        seconds, interval, thread_filter, include_idle, output = parse_profile_params(request.query_params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    # O amostrador roda fora do event loop, que continua atendendo (e sendo amostrado)
+    profile = await asyncio.to_thread(run_profile, seconds, interval, thread_filter, include_idle)
+    if profile is None:
+        return JSONResponse({"error": "já existe um profiling em andamento"}, status_code=409)
+    if output == "json":
+        return JSONResponse(profile)
+    return PlainTextResponse(profile["collapsed"] + "\n")
+
+
+def create_http_app():
+    """Factory ASGI usada pelo uvicorn quando o servidor roda com vários workers."""
+    return mcp.http_app()
+
+
+def run_mcp_server_workers(host: str = "0.0.0.0", port: int = 5000, workers: int = 2):
+    """
+    Executa o servidor MCP em vários processos worker (bloqueante).
+    
+    Cada worker tem seu próprio event loop e pools; os índices em disco são compartilhados.
+    """
+    import uvicorn
+    
+    print(f"🚀 Iniciando DevMentorMCP Server em http://{host}:{port} com {workers} workers")
+    uvicorn.run("app.mcp.server:create_http_app", factory=True, host=host, port=port, workers=workers)
+
+
 async def run_mcp_server(host: str = "0.0.0.0", port: int = 5000):
     """Executa o servidor MCP em modo assíncrono conforme documentação oficial."""
     print(f"🚀 Iniciando DevMentorMCP Server em http://{host}:{port}")
@@ -154,6 +440,14 @@ async def run_mcp_server(host: str = "0.0.0.0", port: int = 5000):
     print("   1. generate_quiz_json(topic, difficulty, num_questions)")
     print("   2. read_file_snippet(file_path, start_line, end_line)")
     print("   3. search_docs(query)")
+    print("   4. search_code(query, regex, case_sensitive, path_glob, context_lines, max_results)")
+    print("   5. find_symbol(name, kind, include_source, max_lines)")
+    print("   6. find_callers(name, max_results)")
+    print("   7. lint_python(code, file_path, max_line_length, max_complexity, max_findings)")
+    print("   • POST /batch - várias ferramentas em uma única requisição")
+    print("   • GET /stats - pools, limites por ferramenta e lag do event loop")
+    print("   • GET /metrics - métricas no formato Prometheus")
+    print("   • GET /admin/profile?seconds=N - pilhas amostradas de todas as threads")
     
     # Usa o método run_async() nativo do FastMCP conforme documentação
     # https://gofastmcp.com/getting-started/quickstart
@@ -161,4 +455,8 @@ async def run_mcp_server(host: str = "0.0.0.0", port: int = 5000):
 
 
 if __name__ == "__main__":
-    asyncio.run(run_mcp_server())
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    if workers > 1:
+        run_mcp_server_workers(workers=workers)
+    else:
+        asyncio.run(run_mcp_server())
@@ -0,0 +1,285 @@
+"""
+Índice de símbolos Python (classes, funções e chamadas) construído com `ast`.
+Os arquivos alterados são parseados no pool de processos do executor MCP,
+o resultado é persistido em disco e atualizado incrementalmente por mtime/tamanho.
+Permite responder "onde X é definido", "mostre Y" e "quem chama Z" com
+trechos exatos de funções/classes.
+"""
+import ast
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.mcp.executor import get_executor
+from app.mcp.workspace import get_index_dir, get_workspace_root, iter_workspace_files
+
+INDEX_VERSION = 1
+# Abaixo disso o custo de subir processos supera o ganho do paralelismo
+PARALLEL_THRESHOLD = 16
+# Campos (e tipos) de cada símbolo e chamada aceitos do índice persistido
+_SYMBOL_FIELDS = {"name": str, "qualname": str, "kind": str, "lineno": int, "end_lineno": int, "doc": str}
+_CALL_FIELDS = {"name": str, "expr": str, "lineno": int, "caller": str}
+
+
+def _is_workspace_path(path: Any) -> bool:
+    """Caminho relativo que não sai da raiz do workspace."""
+    return isinstance(path, str) and not Path(path).is_absolute() and ".." not in Path(path).parts
+
+
+def _checked_records(records: Any, fields: Dict[str, type]) -> List[Dict[str, Any]]:
+    """
+    Valida uma lista de registros lida do disco, mantendo só os campos conhecidos.
+
+    Raises:
+        TypeError: Se não for uma lista de dicionários com os campos e tipos esperados
+    """
+    if not isinstance(records, list):
+        raise TypeError("Registros devem ser uma lista")
+    checked = []
+    for record in records:
+        if not isinstance(record, dict) or any(not isinstance(record.get(key), kind) for key, kind in fields.items()):
+            raise TypeError("Registro em formato inesperado")
+        checked.append({key: record[key] for key in fields})
+    return checked
+
+
+def _call_name(node: ast.Call) -> Optional[str]:
+    """Nome pontilhado de uma chamada (ex: 'self.call_llm'), se resolvível."""
+    parts = []
+    func = node.func
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.append(func.id)
+    elif not parts:
+        return None
+    return ".".join(reversed(parts))
+
+
+class _SymbolVisitor(ast.NodeVisitor):
+    """Coleta definições e chamadas mantendo o escopo (qualname) atual."""
+
+    def __init__(self):
+        self.symbols: List[Dict[str, Any]] = []
+        self.calls: List[Dict[str, Any]] = []
+        self._scope: List[ast.AST] = []
+
+    def _qualname(self, name: str) -> str:
+        return ".".join([getattr(node, "name") for node in self._scope] + [name])
+
+    def _add_definition(self, node, kind: str):
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        self.symbols.append({
+            "name": node.name,
+            "qualname": self._qualname(node.name),
+            "kind": kind,
+            "lineno": start,
+            "end_lineno": node.end_lineno,
+            "doc": (ast.get_docstring(node) or "").strip().split("\n")[0],
+        })
+        self._scope.append(node)
+        self.generic_visit(node)
+        self._scope.pop()
+
+    def visit_ClassDef(self, node):
+        self._add_definition(node, "class")
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self._scope) and isinstance(self._scope[-1], ast.ClassDef)
+        self._add_definition(node, "method" if in_class else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Call(self, node):
+        name = _call_name(node)
+        if name:
+            self.calls.append({
+                "name": name.rsplit(".", 1)[-1],
+                "expr": name,
+                "lineno": node.lineno,
+                "caller": ".".join(getattr(n, "name") for n in self._scope) or "<module>",
+            })
+        self.generic_visit(node)
+
+
+def parse_python_file(root: str, path: str) -> Dict[str, Any]:
+    """
+    Extrai símbolos e chamadas de um arquivo Python.
+
+    Função de módulo (e não método) para poder ser enviada ao pool de processos.
+
+    Returns:
+        Dicionário com 'symbols', 'calls' e 'error' (mensagem de erro de parse ou None)
+    """
+    try:
+        with open(os.path.join(root, path), "rb") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (SyntaxError, ValueError, OSError) as e:
+        return {"symbols": [], "calls": [], "error": f"{type(e).__name__}: {str(e)}"}
+    visitor = _SymbolVisitor()
+    visitor.visit(tree)
+    return {"symbols": visitor.symbols, "calls": visitor.calls, "error": None}
+
+
+class SymbolIndex:
+    """Índice de símbolos de um workspace Python, persistido em JSON."""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        index_path: Optional[Path] = None,
+        refresh_interval: float = 2.0
+    ):
+        self.root = Path(root or get_workspace_root()).resolve()
+        self.index_path = Path(index_path or get_index_dir(self.root) / "symbols.json")
+        self.refresh_interval = refresh_interval
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._definitions: Dict[str, List[Dict[str, Any]]] = {}
+        self._callers: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._load()
+
+    def _load(self):
+        """
+        Carrega índice persistido, se compatível com a raiz e a versão atuais.
+
+        O arquivo fica dentro do workspace revisado, então é tratado como dado não
+        confiável: qualquer formato inesperado vira cache miss (reconstrução completa).
+        """
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION or data.get("root") != str(self.root):
+                return
+            files = {}
+            for path, entry in data["files"].items():
+                if not _is_workspace_path(path):
+                    raise ValueError(f"Caminho inválido no índice: {path}")
+                error = entry.get("error")
+                files[path] = {
+                    "symbols": _checked_records(entry["symbols"], _SYMBOL_FIELDS),
+                    "calls": _checked_records(entry["calls"], _CALL_FIELDS),
+                    "error": None if error is None else str(error),
+                    "mtime": int(entry["mtime"]),
+                    "size": int(entry["size"]),
+                }
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return
+        self._files = files
+        self._rebuild_lookups()
+
+    def _save(self):
+        """Persiste o índice de forma atômica."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Sufixo com PID: vários workers podem salvar o mesmo índice ao mesmo tempo
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "root": str(self.root), "files": self._files}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _rebuild_lookups(self):
+        """Reconstrói os mapas nome -> definições e nome -> chamadas."""
+        definitions, callers = {}, {}
+        for path in sorted(self._files):
+            entry = self._files[path]
+            for symbol in entry["symbols"]:
+                located = dict(symbol, path=path)
+                definitions.setdefault(symbol["name"], []).append(located)
+                if symbol["qualname"] != symbol["name"]:
+                    definitions.setdefault(symbol["qualname"], []).append(located)
+            for call in entry["calls"]:
+                callers.setdefault(call["name"], []).append(dict(call, path=path))
+        self._definitions, self._callers = definitions, callers
+
+    def _parse_many(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Parseia arquivos, usando o pool de processos compartilhado quando há muitos."""
+        root = str(self.root)
+        if len(paths) < PARALLEL_THRESHOLD:
+            return [parse_python_file(root, path) for path in paths]
+        pool = get_executor().process_pool
+        return list(pool.map(parse_python_file, [root] * len(paths), paths, chunksize=8))
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Sincroniza o índice com o disco, reparseando apenas arquivos alterados.
+
+        Args:
+            force: Ignora o intervalo mínimo entre atualizações
+
+        Returns:
+            Contagem de arquivos parseados e removidos
+        """
+        stats = {"parsed": 0, "removed": 0}
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return stats
+            self._last_refresh = now
+
+            changed, stamps = [], {}
+            for path, stat in iter_workspace_files(self.root, suffixes={".py"}):
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+                entry = self._files.get(path)
+                if not entry or (entry["mtime"], entry["size"]) != stamps[path]:
+                    changed.append(path)
+
+            for path, parsed in zip(changed, self._parse_many(changed)):
+                mtime, size = stamps[path]
+                self._files[path] = dict(parsed, mtime=mtime, size=size)
+            removed = set(self._files) - set(stamps)
+            for path in removed:
+                del self._files[path]
+
+            stats = {"parsed": len(changed), "removed": len(removed)}
+            if changed or removed:
+                self._rebuild_lookups()
+                self._save()
+        return stats
+
+    def find_definitions(self, name: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Definições cujo nome ou qualname (ex: 'BaseAgent.call_llm') coincide."""
+        self.refresh()
+        found = self._definitions.get(name, [])
+        return [symbol for symbol in found if not kind or symbol["kind"] == kind]
+
+    def find_callers(self, name: str) -> List[Dict[str, Any]]:
+        """Chamadas a uma função/método pelo nome simples (último componente)."""
+        self.refresh()
+        return list(self._callers.get(name.rsplit(".", 1)[-1], []))
+
+    def get_source(self, symbol: Dict[str, Any], max_lines: int = 80) -> str:
+        """
+        Trecho exato do símbolo (com decorators), limitado a `max_lines`.
+
+        Raises:
+            ValueError: Se o caminho do símbolo sair do workspace
+        """
+        if not _is_workspace_path(symbol["path"]):
+            raise ValueError(f"Caminho fora do workspace: {symbol['path']}")
+        with open(self.root / symbol["path"], "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+        # O arquivo pode ter encolhido desde a última atualização do índice
+        start, end = max(1, symbol["lineno"]), min(symbol["end_lineno"], len(lines))
+        shown_end = min(end, start + max_lines - 1)
+        body = [f"{number:>5} | {lines[number - 1]}" for number in range(start, shown_end + 1)]
+        if shown_end < end:
+            body.append(f"      ... [{end - shown_end} linha(s) omitidas]")
+        return "\n".join(body)
+
+
+_index: Optional[SymbolIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    """Índice compartilhado do workspace configurado (criado sob demanda)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex()
+        return _index
@@ -0,0 +1,56 @@
+"""
+Workspace de código consultado pelas ferramentas de busca do servidor MCP.
+Centraliza a raiz configurada, o diretório dos índices persistidos e a
+varredura dos arquivos (ignorando diretórios de build/cache).
+"""
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+INDEX_DIR_NAME = ".devmentor"
+
+IGNORED_DIRS = {
+    ".git", "__pycache__", ".venv", "venv", "node_modules", ".pytest_cache",
+    ".mypy_cache", ".ruff_cache", ".tox", ".nox", ".idea", ".vscode", INDEX_DIR_NAME,
+}
+
+
+def get_workspace_root() -> Path:
+    """Raiz do workspace (variável DEVMENTOR_WORKSPACE ou diretório atual)."""
+    return Path(os.getenv("DEVMENTOR_WORKSPACE") or os.getcwd()).resolve()
+
+
+def get_index_dir(root: Optional[Path] = None) -> Path:
+    """Diretório onde os índices são persistidos (DEVMENTOR_INDEX_DIR ou <root>/.devmentor)."""
+    index_dir = os.getenv("DEVMENTOR_INDEX_DIR")
+    if index_dir:
+        return Path(index_dir)
+    return (root or get_workspace_root()) / INDEX_DIR_NAME
+
+
+def iter_workspace_files(
+    root: Path,
+    suffixes: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Percorre os arquivos do workspace.
+
+    Args:
+        root: Raiz do workspace
+        suffixes: Extensões aceitas (ex: {'.py'}); None aceita todas
+
+    Yields:
+        Tuplas (caminho relativo em formato POSIX, stat do arquivo)
+    """
+    suffixes = set(suffixes) if suffixes else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        for filename in filenames:
+            if suffixes and os.path.splitext(filename)[1] not in suffixes:
+                continue
+            full_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            yield Path(full_path).relative_to(root).as_posix(), stat
@@ -0,0 +1,333 @@
+"""
+Clientes A2A reutilizáveis para a interface.
+
+Um `A2AClientPool` por processo guarda um cliente por URL de agente e uma
+sessão HTTP keep-alive por origem (host:porta), compartilhados por todas as
+sessões do Streamlit: cada mensagem paga só a requisição `tasks/send`, sem
+construir cliente, buscar o agent card nem abrir conexão TCP nova. Clientes de
+um agente que reiniciou são descartados (monitor de saúde ou conexão morta) e
+recriados na próxima mensagem.
+
+`stream_message` usa `tasks/stream` (`tasks/sendSubscribe`): o servidor ASGI
+manda os trechos da resposta conforme o LLM gera; o servidor Flask manda só a
+tarefa final. `cancel_task` pede ao agente que interrompa a tarefa.
+"""
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def abort_stream(response: requests.Response):
+    """
+    Fecha uma resposta em streaming de outra thread, destravando quem está lendo.
+
+    Só fechar a resposta não acorda um `recv` bloqueado; o `shutdown` do socket
+    acorda (a leitura termina com erro) e derruba a conexão, que o agente ASGI
+    vê como desconexão e aborta a tarefa.
+    """
+    # Socket da conexão (keep-alive) ou, se o http.client já a soltou, o do corpo da resposta
+    sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+    if sock is None:
+        body = getattr(getattr(response.raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(body, "raw", None), "_sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        response.close()
+    except Exception as e:
+        logger.debug("Erro ao fechar stream: %s: %s", type(e).__name__, e)
+
+
+def _sse_events(response: requests.Response) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Eventos (nome, dados JSON) de uma resposta SSE, na ordem em que chegam."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            field, _, value = line.partition(":")
+            if field == "event":
+                event = value.strip()
+            elif field == "data":
+                data.append(value[1:] if value.startswith(" ") else value)
+            continue
+        if data:
+            try:
+                yield event, json.loads("\n".join(data))
+            except ValueError:
+                logger.debug("Evento SSE %s com dados inválidos ignorado", event)
+        event, data = "message", []
+
+
+class A2AConnection:
+    """Cliente A2A de um agente: `tasks/send` JSON-RPC (o protocolo do A2AClient) sobre uma sessão keep-alive."""
+
+    def __init__(self, url: str, session: requests.Session, timeout: float = 60):
+        """
+        Args:
+            url: URL A2A do agente (porta própria ou rota do host multi-persona)
+            session: Sessão compartilhada com os outros agentes da mesma origem
+            timeout: Prazo de cada mensagem (segundos)
+        """
+        self.url = url.rstrip("/")
+        self.session = session
+        self.timeout = timeout
+        self.agent_card: Optional[Dict[str, Any]] = None
+
+    def warm_up(self, timeout: float = 5) -> bool:
+        """Abre a conexão e guarda o agent card; devolve se o agente respondeu."""
+        try:
+            response = self.session.get(f"{self.url}/agent.json", timeout=timeout)
+            response.raise_for_status()
+            self.agent_card = response.json()
+            return True
+        except (requests.RequestException, ValueError) as e:
+            logger.debug("Aquecimento de %s falhou: %s: %s", self.url, type(e).__name__, e)
+            return False
+
+    def send_message(self, message):
+        """
+        Envia a mensagem como tarefa e devolve a resposta do agente (`Message`).
+
+        Erros do agente viram `ErrorContent`, como no A2AClient.
+
+        Raises:
+            requests.RequestException: Se a requisição falhar (conexão, timeout)
+        """
+        from python_a2a import Task
+
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "tasks/send", "params": Task(message=message.to_dict()).to_dict()}
+        response = self.session.post(f"{self.url}/tasks/send", json=payload, timeout=self.timeout)
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+        error = (data.get("error") or {}).get("message")
+        return self._reply(message, data.get("result") or {}, error)
+
+    @staticmethod
+    def _reply(message, task: Dict[str, Any], error: Optional[str] = None):
+        """Resposta (`Message`) a partir da tarefa final; falha e cancelamento viram `ErrorContent`."""
+        from python_a2a import ErrorContent, Message, MessageRole, TextContent
+
+        reply = dict(role=MessageRole.AGENT, parent_message_id=message.message_id, conversation_id=message.conversation_id)
+        status = task.get("status") or {}
+        if not error and status.get("state") == "failed":
+            error = (status.get("message") or {}).get("error") or "Tarefa falhou no agente"
+        if not error and status.get("state") == "canceled":
+            error = "Tarefa cancelada"
+        if error:
+            return Message(content=ErrorContent(message=error), **reply)
+        for artifact in task.get("artifacts") or []:
+            for part in artifact.get("parts") or []:
+                if part.get("type") == "text":
+                    return Message(content=TextContent(text=part.get("text", "")), **reply)
+        return Message(content=ErrorContent(message="Resposta sem artefato de texto"), **reply)
+
+    def stream_message(
+        self,
+        message,
+        task_id: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+        cancelled: Optional[threading.Event] = None,
+        on_open: Optional[Callable[[requests.Response], None]] = None
+    ):
+        """
+        Envia a mensagem por `tasks/stream` e repassa os trechos da resposta conforme chegam.
+
+        Args:
+            message: Mensagem do usuário (`Message`)
+            task_id: Id da tarefa (permite `cancel_task` antes da resposta)
+            on_delta: Recebe cada trecho da resposta
+            cancelled: Se sinalizado, a leitura para e a conexão é fechada (o agente ASGI cancela a tarefa)
+            on_open: Recebe a resposta aberta, para quem cancela poder fechá-la (`abort_stream`)
+                sem esperar o próximo evento
+
+        Returns:
+            A resposta do agente (`Message`), ou None se cancelada pelo chamador
+
+        Raises:
+            requests.RequestException: Se a requisição falhar (conexão, timeout entre eventos)
+        """
+        from python_a2a import Task
+
+        task = Task(message=message.to_dict())
+        if task_id:
+            task.id = task_id
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "tasks/sendSubscribe", "params": task.to_dict()}
+        response = self.session.post(f"{self.url}/tasks/stream", json=payload, timeout=self.timeout, stream=True)
+        with response:
+            if response.status_code in (404, 405):
+                # Agente sem streaming: resposta inteira por `tasks/send`
+                return self.send_message(message)
+            response.raise_for_status()
+            if on_open is not None:
+                on_open(response)
+            try:
+                for event, data in _sse_events(response):
+                    if cancelled is not None and cancelled.is_set():
+                        return None
+                    if event == "delta" and on_delta is not None:
+                        on_delta(data.get("text", ""))
+                    elif event == "complete":
+                        return self._reply(message, data)
+                    elif event == "error":
+                        return self._reply(message, {}, data.get("error") or "Erro no streaming")
+            except requests.RequestException:
+                # Leitura interrompida por `abort_stream` no cancelamento
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                raise
+        if cancelled is not None and cancelled.is_set():
+            return None
+        raise requests.ConnectionError(f"Stream de {self.url} terminou sem a tarefa final")
+
+    def cancel_task(self, task_id: str, timeout: float = 5) -> bool:
+        """Pede ao agente que cancele a tarefa; devolve se ele a encontrou."""
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "tasks/cancel", "params": {"id": task_id}}
+        try:
+            return self.session.post(f"{self.url}/tasks/cancel", json=payload, timeout=timeout).ok
+        except requests.RequestException as e:
+            logger.debug("Cancelamento de %s em %s falhou: %s: %s", task_id, self.url, type(e).__name__, e)
+            return False
+
+
+class A2AClientPool:
+    """Um cliente por URL de agente e uma sessão keep-alive por origem, seguros entre threads."""
+
+    def __init__(self, timeout: float = 60, pool_maxsize: int = 32):
+        """
+        Args:
+            timeout: Prazo de cada mensagem (segundos)
+            pool_maxsize: Conexões keep-alive mantidas por origem (mensagens simultâneas sem nova conexão)
+        """
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self._clients: Dict[str, A2AConnection] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, origin: str) -> requests.Session:
+        session = self._sessions.get(origin)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._sessions[origin] = session
+        return session
+
+    def get(self, url: str) -> A2AConnection:
+        """Cliente em cache para `url` (criado no primeiro uso)."""
+        url = url.rstrip("/")
+        client = self._clients.get(url)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(url)
+                if client is None:
+                    logger.info("Criando cliente A2A para %s", url)
+                    client = A2AConnection(url, self._session(_origin(url)), timeout=self.timeout)
+                    self._clients[url] = client
+        return client
+
+    def invalidate(self, url: str):
+        """Descarta os clientes e as conexões da origem de `url` (agente reiniciado)."""
+        origin = _origin(url)
+        with self._lock:
+            for cached in [cached for cached in self._clients if _origin(cached) == origin]:
+                del self._clients[cached]
+            session = self._sessions.pop(origin, None)
+        if session is not None:
+            session.close()
+            logger.info("Clientes A2A de %s descartados", origin)
+
+    def send_message(self, url: str, message):
+        """
+        Envia pela conexão em cache; se ela morreu (agente reiniciado), refaz uma vez com conexão nova.
+
+        Raises:
+            requests.RequestException: Se a nova tentativa também falhar
+        """
+        try:
+            return self.get(url).send_message(message)
+        except requests.ConnectionError as e:
+            logger.warning("Conexão com %s perdida (%s); recriando cliente", url, type(e).__name__)
+            self.invalidate(url)
+            return self.get(url).send_message(message)
+
+    def stream_message(self, url: str, message, **kwargs):
+        """
+        `A2AConnection.stream_message` pela conexão em cache; refaz uma vez com conexão nova se ela morreu
+        antes de chegar qualquer trecho.
+
+        Raises:
+            requests.RequestException: Se a nova tentativa também falhar
+        """
+        on_delta = kwargs.pop("on_delta", None)
+        received = []
+
+        def deliver(text: str):
+            received.append(True)
+            if on_delta is not None:
+                on_delta(text)
+
+        try:
+            return self.get(url).stream_message(message, on_delta=deliver, **kwargs)
+        except requests.ConnectionError as e:
+            if received:
+                raise
+            logger.warning("Conexão com %s perdida (%s); recriando cliente", url, type(e).__name__)
+            self.invalidate(url)
+            return self.get(url).stream_message(message, on_delta=deliver, **kwargs)
+
+    def cancel_task(self, url: str, task_id: str, timeout: float = 5) -> bool:
+        """Pede ao agente em `url` que cancele a tarefa."""
+        return self.get(url).cancel_task(task_id, timeout)
+
+    def warm_up(self, urls: Iterable[str], timeout: float = 5) -> Dict[str, bool]:
+        """Cria os clientes e abre as conexões em paralelo; devolve quais agentes responderam."""
+        clients = [self.get(url) for url in urls]
+        if not clients:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(clients), thread_name_prefix="a2a-warmup") as executor:
+            results = list(executor.map(lambda client: client.warm_up(timeout), clients))
+        return {client.url: ok for client, ok in zip(clients, results)}
+
+    def watch(self, health_monitor, urls: Dict[str, str]):
+        """
+        Descarta o cliente de um agente quando o monitor o vê voltar ao ar.
+
+        Args:
+            health_monitor: HealthMonitor que sonda os agentes
+            urls: Mapa nome do alvo no monitor -> URL A2A
+        """
+        def on_change(name: str, previous: Dict, status: Dict):
+            if status["healthy"] and name in urls:
+                self.invalidate(urls[name])
+
+        health_monitor.add_listener(on_change)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._clients.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,144 @@
+"""
+Histórico de conversas da interface em SQLite (modo WAL).
+
+Cada sessão do navegador tem uma chave (`session_id`); as mensagens ficam em
+uma tabela indexada por (sessão, id), e a interface lê só a página mais
+recente, buscando as anteriores por paginação por chave (`before_id`), sem
+OFFSET. O histórico sobrevive a reinícios do Streamlit, e a memória de cada
+sessão fica limitada a uma página.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_CHAT_DB = Path(".devmentor") / "chat.db"
+DEFAULT_PAGE_SIZE = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    persona TEXT,
+    waterfall TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+"""
+_COLUMNS = ("id", "role", "content", "persona", "waterfall", "created_at")
+
+
+def get_chat_db_path() -> Path:
+    """Banco do histórico (DEVMENTOR_CHAT_DB, padrão: .devmentor/chat.db)."""
+    return Path(os.getenv("DEVMENTOR_CHAT_DB") or DEFAULT_CHAT_DB)
+
+
+class ChatStore:
+    """Mensagens por sessão em SQLite; uma conexão por thread (sessões do Streamlit rodam em threads)."""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            path: Arquivo do banco (padrão: `get_chat_db_path()`)
+        """
+        self.path = Path(path or get_chat_db_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL: leitores não bloqueiam a escrita de outras sessões
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _rows(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        return [dict(zip(_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def append(
+        self,
+        session_id: str,
+        messages: Iterable[Tuple[str, str]],
+        persona: Optional[str] = None,
+        waterfall: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Grava as mensagens de um turno em uma transação.
+
+        Args:
+            session_id: Chave da sessão
+            messages: Pares (role, content), na ordem
+            persona: Chave da persona que respondeu
+            waterfall: Cascata de tempo, gravada na última mensagem do turno
+
+        Returns:
+            As mensagens gravadas (com `id`), no formato de `recent`
+        """
+        messages = list(messages)
+        now = time.time()
+        saved = []
+        with self._connect() as conn:
+            for index, (role, content) in enumerate(messages):
+                message_waterfall = waterfall if index == len(messages) - 1 else None
+                cursor = conn.execute(
+                    "INSERT INTO messages (session_id, role, content, persona, waterfall, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, role, content, persona, message_waterfall, now)
+                )
+                saved.append(dict(zip(_COLUMNS, (cursor.lastrowid, role, content, persona, message_waterfall, now))))
+        return saved
+
+    def recent(
+        self,
+        session_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        before_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Página de mensagens em ordem cronológica: as `limit` mais recentes antes de `before_id`.
+
+        Args:
+            session_id: Chave da sessão
+            limit: Tamanho da página
+            before_id: Só mensagens com id menor (página anterior); None = mais recentes
+        """
+        query = "SELECT id, role, content, persona, waterfall, created_at FROM messages WHERE session_id = ?"
+        params: List[Any] = [session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return self._rows(self._connect().execute(query, params))[::-1]
+
+    def has_before(self, session_id: str, before_id: int) -> bool:
+        """Indica se existem mensagens mais antigas que `before_id`."""
+        row = self._connect().execute(
+            "SELECT 1 FROM messages WHERE session_id = ? AND id < ? LIMIT 1", (session_id, before_id)
+        ).fetchone()
+        return row is not None
+
+    def count(self, session_id: str) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def clear(self, session_id: str):
+        """Apaga o histórico da sessão."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
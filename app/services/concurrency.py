@@ -0,0 +1,402 @@
+"""
+Controle adaptativo (AIMD) da concorrência das chamadas ao LLM.
+
+Um limite por processo para todas as chamadas ao provedor (`BaseAgent.call_llm`,
+`acall_llm` e o streaming do `llm_service`), vindas de threads ou do event
+loop do servidor ASGI:
+
+- Aumento aditivo: com latência saudável e o limite em uso, cada resposta soma
+  `increase / limite` (≈ +1 por rodada). Antes do primeiro sinal de
+  sobrecarga o aumento é de 1 por resposta (partida lenta, dobra por rodada).
+- Corte multiplicativo: 429, 5xx, timeout ou `x-ratelimit-remaining-requests: 0`
+  multiplicam o limite por `decrease`. Só um corte por rodada: sinais de
+  chamadas iniciadas antes do último corte são ignorados, para uma rajada de
+  429 não derrubar o limite a 1. `retry-after` pausa novas chamadas.
+- Fila justa: quem espera é atendido em rodízio por persona (FIFO dentro de
+  cada uma), então uma persona com rajada não segura as outras.
+- Latência: a saúde compara cada resposta com uma linha de base do mesmo tipo
+  de medida. Streaming informa o tempo até o primeiro token (`ttft`); chamadas
+  sem streaming informam segundos por token gerado (`per_token`), já que o
+  tempo total cresce com o tamanho da resposta.
+- Novas tentativas: `call`/`acall` devolvem a chamada recusada (429, 5xx,
+  timeout, conexão) ao fim da fila, em vez de o SDK repetir às cegas; por isso
+  os clientes do LLM são criados com `max_retries=0`.
+
+Limite e tamanho da fila ficam em `devmentor_llm_concurrency_limit` e
+`devmentor_llm_queue_depth`.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Mapping, Optional, TypeVar
+
+from app.utils.logger import get_logger
+from app.utils.metrics import LLM_CONCURRENCY_LIMIT, LLM_QUEUE_DEPTH, LLM_QUEUE_SECONDS
+
+logger = get_logger(__name__)
+
+# Pausa máxima pedida por `retry-after` (segundos)
+MAX_RETRY_PAUSE = 30.0
+# Novas tentativas de uma chamada recusada por sobrecarga ou falha de conexão
+OVERLOAD_RETRIES = 3
+
+T = TypeVar("T")
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Indica se o erro é sinal de sobrecarga do provedor (429, 5xx ou timeout)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and (status == 429 or status >= 500):
+        return True
+    return "Timeout" in type(error).__name__
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Sobrecarga ou falha de conexão: vale tentar de novo depois de voltar à fila."""
+    return is_overload_error(error) or "Connection" in type(error).__name__
+
+
+def _header(headers: Optional[Mapping[str, Any]], name: str) -> Optional[float]:
+    if headers is None:
+        return None
+    value = headers.get(name)
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class Slot:
+    """Vaga concedida a uma chamada; devolvida com `AdaptiveLimiter.release`."""
+
+    __slots__ = ("key", "epoch", "saturated", "started", "queued", "headers", "latency", "latency_kind", "released")
+
+    def __init__(self, key: str, epoch: int, queued: float, saturated: bool):
+        self.key = key
+        # Corte em vigor quando a chamada começou (sinais de antes do último corte não cortam de novo)
+        self.epoch = epoch
+        # Limite em uso quando a chamada começou (só então o sucesso testa um limite maior)
+        self.saturated = saturated
+        self.started = time.perf_counter()
+        self.queued = queued
+        # Preenchidos pela chamada, se disponíveis: headers da resposta e latência (ex: até o 1º token)
+        self.headers: Optional[Mapping[str, Any]] = None
+        self.latency: Optional[float] = None
+        # Tipo da medida em `latency` (cada tipo tem a própria linha de base)
+        self.latency_kind = "ttft"
+        self.released = False
+
+
+class _Waiter:
+    __slots__ = ("key", "queued_at", "slot", "event", "loop", "future")
+
+    def __init__(self, key: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.key = key
+        self.queued_at = time.perf_counter()
+        self.slot: Optional[Slot] = None
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def grant(self, slot: Slot):
+        self.slot = slot
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(self.slot)
+
+
+class AdaptiveLimiter:
+    """Limite de chamadas simultâneas ajustado por AIMD, seguro entre threads e event loops."""
+
+    def __init__(
+        self,
+        name: str = "llm",
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 512,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0
+    ):
+        """
+        Args:
+            name: Label das métricas
+            initial: Limite inicial
+            min_limit: Limite mínimo (nunca para de vez)
+            max_limit: Limite máximo
+            increase: Aumento por rodada com latência saudável
+            decrease: Fator do corte em sobrecarga
+            latency_tolerance: Latência acima de `tolerância × linha de base` não aumenta o limite
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._slow_start = True
+        self._epoch = 0
+        self._in_flight = 0
+        # Tipo de latência -> linha de base (EWMA)
+        self._baselines: Dict[str, float] = {}
+        self._paused_until = 0.0
+        self._timer: Optional[threading.Timer] = None
+        # persona -> fila FIFO; a ordem das chaves é o rodízio
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveLimiter":
+        """Cria a partir de DEVMENTOR_LLM_CONCURRENCY_INITIAL, _MIN e _MAX."""
+        return cls(
+            initial=int(os.getenv("DEVMENTOR_LLM_CONCURRENCY_INITIAL", "16")),
+            min_limit=int(os.getenv("DEVMENTOR_LLM_CONCURRENCY_MIN", "1")),
+            max_limit=int(os.getenv("DEVMENTOR_LLM_CONCURRENCY_MAX", "512"))
+        )
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def _publish(self):
+        LLM_CONCURRENCY_LIMIT.labels(limiter=self.name).set(self.limit)
+        LLM_QUEUE_DEPTH.labels(limiter=self.name).set(self._queued)
+
+    def _try_grant(self, key: str, queued_at: float) -> Optional[Slot]:
+        """Vaga imediata se há folga, ninguém na fila e nenhuma pausa (com o lock)."""
+        if self._queued or self._in_flight >= self.limit or time.monotonic() < self._paused_until:
+            return None
+        self._in_flight += 1
+        return self._slot(key, queued_at)
+
+    def _slot(self, key: str, queued_at: float) -> Slot:
+        """Vaga para uma chamada já contada em `_in_flight` (com o lock)."""
+        saturated = self._queued > 0 or 2 * self._in_flight >= self.limit
+        return Slot(key, self._epoch, time.perf_counter() - queued_at, saturated)
+
+    def _enqueue(self, waiter: _Waiter):
+        self._queues.setdefault(waiter.key, deque()).append(waiter)
+        self._queued += 1
+        # Agenda a retomada se a fila está parada por `retry-after`
+        self._dispatch()
+        self._publish()
+
+    def _dispatch(self):
+        """Concede vagas livres à fila em rodízio por persona (com o lock)."""
+        remaining = self._paused_until - time.monotonic()
+        if remaining > 0:
+            if self._timer is None and self._queued:
+                self._timer = threading.Timer(remaining, self._resume)
+                self._timer.daemon = True
+                self._timer.start()
+            return
+        while self._queued and self._in_flight < self.limit:
+            key = next(iter(self._queues))
+            queue = self._queues[key]
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._queued -= 1
+            self._in_flight += 1
+            waiter.grant(self._slot(key, waiter.queued_at))
+        self._publish()
+
+    def _resume(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def acquire(self, key: str = "default") -> Slot:
+        """Espera uma vaga (bloqueia a thread) na fila da persona `key`."""
+        queued_at = time.perf_counter()
+        with self._lock:
+            slot = self._try_grant(key, queued_at)
+            if slot is None:
+                waiter = _Waiter(key)
+                self._enqueue(waiter)
+        if slot is None:
+            waiter.event.wait()
+            slot = waiter.slot
+        LLM_QUEUE_SECONDS.labels(persona=key).observe(slot.queued)
+        return slot
+
+    async def aacquire(self, key: str = "default") -> Slot:
+        """Espera uma vaga sem bloquear o event loop; cancelar a espera tira a chamada da fila."""
+        queued_at = time.perf_counter()
+        with self._lock:
+            slot = self._try_grant(key, queued_at)
+            if slot is None:
+                waiter = _Waiter(key, asyncio.get_running_loop())
+                self._enqueue(waiter)
+        if slot is None:
+            try:
+                slot = await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter.slot is None:
+                        self._queues[key].remove(waiter)
+                        if not self._queues[key]:
+                            del self._queues[key]
+                        self._queued -= 1
+                        self._publish()
+                if waiter.slot is not None:
+                    # Vaga concedida junto com o cancelamento: devolve sem afetar o limite
+                    self.release(waiter.slot, ignore=True)
+                raise
+        LLM_QUEUE_SECONDS.labels(persona=key).observe(slot.queued)
+        return slot
+
+    def release(self, slot: Slot, error: Optional[BaseException] = None, ignore: bool = False):
+        """
+        Devolve a vaga e ajusta o limite pelo resultado da chamada (só na primeira vez, se chamado de novo).
+
+        Args:
+            slot: Vaga de `acquire`/`aacquire` (com `headers` e `latency`, se a chamada os preencheu)
+            error: Erro da chamada, se houve (sobrecarga corta o limite; os demais não mudam nada)
+            ignore: Só devolve a vaga (chamada cancelada pelo cliente, sem sinal sobre o provedor)
+        """
+        headers = slot.headers
+        if headers is None and error is not None:
+            headers = getattr(getattr(error, "response", None), "headers", None)
+        remaining = _header(headers, "x-ratelimit-remaining-requests")
+        retry_after = _header(headers, "retry-after")
+        overload = not ignore and (
+            (error is not None and is_overload_error(error)) or remaining == 0
+        )
+        if slot.latency is not None:
+            latency, kind = slot.latency, slot.latency_kind
+        else:
+            latency, kind = time.perf_counter() - slot.started, "total"
+        with self._lock:
+            if slot.released:
+                return
+            slot.released = True
+            self._in_flight -= 1
+            if overload:
+                self._on_overload(slot, retry_after)
+            elif error is None and not ignore:
+                self._on_success(latency, slot.saturated, kind)
+            self._dispatch()
+
+    def _on_overload(self, slot: Slot, retry_after: Optional[float]):
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + min(retry_after, MAX_RETRY_PAUSE))
+        if slot.epoch != self._epoch:
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.decrease)
+        self._slow_start = False
+        self._epoch += 1
+        logger.warning("Sobrecarga do provedor LLM: limite de concorrência %d -> %d", previous, self.limit)
+
+    def _on_success(self, latency: float, saturated: bool, kind: str = "ttft"):
+        baseline = self._baselines.get(kind)
+        healthy = baseline is None or latency <= self.latency_tolerance * baseline
+        self._baselines[kind] = latency if baseline is None else baseline + 0.05 * (latency - baseline)
+        # Só cresce se o limite está sendo usado (senão o limite subiria sem ter sido testado)
+        if not healthy or not saturated:
+            return
+        step = self.increase if self._slow_start else self.increase / self._limit
+        self._limit = min(float(self.max_limit), self._limit + step)
+
+    def call(self, fn: Callable[[Slot], T], key: str = "default", retries: int = OVERLOAD_RETRIES) -> T:
+        """
+        Executa `fn(vaga)` com uma vaga; recusa por sobrecarga volta ao fim da fila até `retries` vezes.
+
+        `fn` pode preencher `vaga.headers` (rate limit) e `vaga.latency` (tempo até o primeiro token,
+        ou segundos por token com `vaga.latency_kind = "per_token"`).
+
+        Raises:
+            Exception: O erro de `fn`, se não for recuperável ou as tentativas acabarem
+        """
+        attempt = 0
+        while True:
+            slot = self.acquire(key)
+            try:
+                result = fn(slot)
+            except Exception as e:
+                self.release(slot, error=e)
+                # Streaming que já entregou o primeiro token não é refeito (duplicaria o texto)
+                if attempt >= retries or not is_retryable_error(e) or slot.latency is not None:
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                self.release(slot, ignore=True)
+                raise
+            self.release(slot)
+            return result
+
+    async def acall(
+        self,
+        fn: Callable[[Slot], Awaitable[T]],
+        key: str = "default",
+        retries: int = OVERLOAD_RETRIES
+    ) -> T:
+        """Versão assíncrona de `call`; cancelamento devolve a vaga sem ajustar o limite."""
+        attempt = 0
+        while True:
+            slot = await self.aacquire(key)
+            try:
+                result = await fn(slot)
+            except Exception as e:
+                self.release(slot, error=e)
+                # Streaming que já entregou o primeiro token não é refeito (duplicaria o texto)
+                if attempt >= retries or not is_retryable_error(e) or slot.latency is not None:
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                self.release(slot, ignore=True)
+                raise
+            self.release(slot)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado atual: limite, chamadas em andamento, fila e latência de referência."""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "slow_start": self._slow_start,
+                "baseline_latency_s": dict(self._baselines),
+                "paused_s": max(0.0, self._paused_until - time.monotonic()),
+            }
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    """Limitador compartilhado do processo (todas as personas, o coordenador e o `llm_service`)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter.from_env()
+        return _limiter
@@ -1,24 +1,116 @@
 """
 Serviço de LLM simplificado para uso direto (sem A2A).
 Usado quando não há necessidade de agentes A2A.
+
+Pedidos idênticos simultâneos compartilham um só stream com o provedor
+(`app/services/stream_tee.py`); DEVMENTOR_LLM_STREAM_TEE=0 desliga.
 """
 import os
-from typing import Optional, List, Dict, Any, Generator
-from openai import OpenAI
+import time
+import weakref
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Generator, Iterable
+from app.services.concurrency import OVERLOAD_RETRIES, Slot, get_llm_limiter, is_retryable_error
+from app.services.stream_tee import get_stream_multiplexer, stream_key
+from app.services.usage_ledger import get_usage_ledger, usage_from_response
+from app.utils.metrics import ERRORS_TOTAL, LLM_SECONDS, LLM_TTFT_SECONDS
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+DEFAULT_LLM_BASE_URL = "https://openrouter.ai/api/v1"
+
+
+def __getattr__(name: str) -> Any:
+    # SDK da OpenAI carregado só no primeiro uso: quem importa este módulo
+    # (ex: app.py) não paga o import até a primeira chamada ao LLM
+    if name == "OpenAI":
+        from openai import OpenAI
+        globals()["OpenAI"] = OpenAI
+        return OpenAI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _openai_class() -> "type[OpenAI]":
+    """Classe `OpenAI` do módulo (respeita `patch('app.services.llm_service.OpenAI')`)."""
+    return globals().get("OpenAI") or __getattr__("OpenAI")
+
+
+def get_llm_base_url() -> str:
+    """
+    URL base da API compatível com OpenAI.
+
+    LLM_BASE_URL permite apontar agentes e serviço para outro provedor ou para
+    o servidor stub local (`python -m app.bench.stub_llm`).
+    """
+    return os.getenv("LLM_BASE_URL") or DEFAULT_LLM_BASE_URL
+
+
+def stream_tee_enabled() -> bool:
+    return os.getenv("DEVMENTOR_LLM_STREAM_TEE", "1") != "0"
+
+
+def _timed_stream(stream: Iterable, persona: str, model: str, start: float, slot: Optional[Slot] = None) -> Generator:
+    """
+    Repassa os chunks registrando tempo até o primeiro token, tempo total e uso no ledger.
+
+    Se o consumidor parar antes do fim, a conexão com o provedor é fechada. A
+    vaga do limitador (`slot`) fica ocupada até o fim do stream.
+    """
+    first_chunk = True
+    usage = None
+    error = None
+    if slot is not None:
+        slot.headers = getattr(getattr(stream, "response", None), "headers", None)
+    try:
+        for chunk in stream:
+            if first_chunk:
+                ttft = time.perf_counter() - start
+                LLM_TTFT_SECONDS.labels(persona=persona, model=model).observe(ttft)
+                if slot is not None:
+                    slot.latency = ttft
+                first_chunk = False
+            # O uso vem no último chunk, sem choices (stream_options.include_usage)
+            if not chunk.choices:
+                usage = chunk.model_dump().get("usage") or usage
+            yield chunk
+    except Exception as e:
+        error = e
+        ERRORS_TOTAL.labels(component="llm", persona=persona, model=model, error=type(e).__name__).inc()
+        raise
+    finally:
+        if slot is not None:
+            # Consumidor que desiste antes do fim não é sinal sobre o provedor
+            get_llm_limiter().release(slot, error=error, ignore=error is None and first_chunk)
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        elapsed = time.perf_counter() - start
+        LLM_SECONDS.labels(persona=persona, model=model).observe(elapsed)
+        tokens = usage_from_response(usage)
+        get_usage_ledger().record(
+            persona, model, tokens["prompt_tokens"], tokens["completion_tokens"],
+            cached_tokens=tokens["cached_tokens"], latency_ms=elapsed * 1000, cost=tokens["cost"]
+        )
 
 
 def get_llm_response(
     messages: List[Dict[str, str]],
     api_key: str,
-    model: str = "openai/gpt-4o-mini"
+    model: str = "openai/gpt-4o-mini",
+    persona: str = "direct"
 ) -> Optional[Generator]:
     """
-    Chama OpenRouter com streaming.
+    Chama OpenRouter (ou LLM_BASE_URL) com streaming.
+    
+    Se um pedido idêntico (mesma chave, modelo e mensagens) já está em
+    andamento, o chamador recebe o mesmo stream desde o início, sem nova
+    geração no provedor; tempo e uso ficam com a persona de quem abriu.
     
     Args:
         messages: Lista de mensagens no formato OpenAI
         api_key: API Key do OpenRouter
         model: Modelo a usar
+        persona: Label das métricas de latência (ex: chave do agente)
     
     Returns:
         Generator com chunks de resposta ou None em caso de erro
@@ -26,17 +118,44 @@ def get_llm_response(
     if not api_key or len(api_key) < 20:
         return None
     
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://openrouter.ai/api/v1"
-    )
+    base_url = get_llm_base_url()
     
-    try:
-        stream = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            stream=True
+    def open_stream() -> Generator:
+        client = _openai_class()(
+            api_key=api_key,
+            base_url=base_url,
+            # Recusas (429/5xx) são refeitas pelo limitador de concorrência
+            max_retries=0
         )
-        return stream
-    except Exception:
+        # Vaga no limite adaptativo do processo, ocupada até o fim do stream
+        limiter = get_llm_limiter()
+        attempt = 0
+        while True:
+            slot = limiter.acquire(persona)
+            start = time.perf_counter()
+            try:
+                stream = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    # O cliente openai desta versão não tem o parâmetro; vai direto no corpo
+                    extra_body={"stream_options": {"include_usage": True}}
+                )
+                break
+            except Exception as e:
+                limiter.release(slot, error=e)
+                if attempt >= OVERLOAD_RETRIES or not is_retryable_error(e):
+                    raise
+                attempt += 1
+        timed = _timed_stream(stream, persona, model, start, slot)
+        # Stream descartado sem ser lido nunca chega ao `finally`: devolve a vaga na coleta
+        weakref.finalize(timed, limiter.release, slot, None, True)
+        return timed
+    
+    try:
+        if not stream_tee_enabled():
+            return open_stream()
+        return get_stream_multiplexer().open(stream_key(model, messages, api_key, base_url), model, open_stream)
+    except Exception as e:
+        ERRORS_TOTAL.labels(component="llm", persona=persona, model=model, error=type(e).__name__).inc()
         return None
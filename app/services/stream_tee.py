@@ -0,0 +1,274 @@
+"""
+Compartilhamento (tee) de streams idênticos do LLM.
+
+Quando várias sessões pedem o mesmo prompt ao mesmo tempo, só a primeira abre
+o stream com o provedor; as seguintes se inscrevem nele e recebem todos os
+chunks desde o início, por um buffer de replay. Uma thread lê o provedor e
+cada assinante consome o buffer no próprio ritmo, então um leitor lento não
+atrasa os outros. Se a abertura com o provedor falhar, quem já tinha se
+inscrito recebe o mesmo erro de `open` que quem abriu.
+
+Memória: o buffer retém no máximo `max_buffer` chunks. Ao passar disso, o
+stream deixa de aceitar novos assinantes (chamadas idênticas abrem um stream
+novo), e os chunks já lidos por todos os assinantes são descartados. Se ainda
+assim o limite for excedido, o assinante mais atrasado é desligado com
+`SlowConsumerError`. Se todos os assinantes desistirem, o stream com o provedor
+é fechado.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Set
+
+from app.utils.logger import get_logger
+from app.utils.metrics import ERRORS_TOTAL, LLM_STREAM_SUBSCRIBERS_TOTAL
+
+logger = get_logger(__name__)
+
+# Chunks retidos por stream (um chunk ≈ um token)
+DEFAULT_MAX_BUFFER = 4096
+
+
+class SlowConsumerError(RuntimeError):
+    """Assinante desligado por ficar atrás do stream além do limite do buffer."""
+
+
+def stream_key(model: str, messages: List[Dict[str, Any]], api_key: str, base_url: str) -> str:
+    """Chave de pedidos idênticos (mesmo provedor, chave de API, modelo e mensagens)."""
+    payload = json.dumps(
+        {"base_url": base_url, "api_key": api_key, "model": model, "messages": messages},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SharedStream:
+    """Um stream do provedor com buffer de replay e um cursor por assinante."""
+
+    def __init__(self, model: str, max_buffer: int = DEFAULT_MAX_BUFFER):
+        """
+        Args:
+            model: Modelo (label das métricas)
+            max_buffer: Chunks retidos no buffer
+        """
+        self.model = model
+        self.max_buffer = max_buffer
+        self.joinable = True
+        self.done = False
+        self.error: Optional[BaseException] = None
+        # Resultado da abertura do provedor: quem se inscreve antes dela espera aqui
+        self.open_error: Optional[BaseException] = None
+        self._opened = threading.Event()
+        self.subscribers_total = 0
+        # Índice absoluto do primeiro chunk retido em `_chunks`
+        self._base = 0
+        self._chunks: List[Any] = []
+        # id do assinante -> índice absoluto do próximo chunk a ler
+        self._cursors: Dict[int, int] = {}
+        self._evicted: Set[int] = set()
+        self._cond = threading.Condition()
+
+    @property
+    def head(self) -> int:
+        return self._base + len(self._chunks)
+
+    @property
+    def subscribers(self) -> int:
+        with self._cond:
+            return len(self._cursors)
+
+    def attach(self) -> Optional[int]:
+        """Inscreve um assinante no início do stream; None se o stream não aceita mais assinantes."""
+        with self._cond:
+            if not self.joinable:
+                return None
+            subscriber = self.subscribers_total
+            self.subscribers_total += 1
+            self._cursors[subscriber] = self._base
+            return subscriber
+
+    def detach(self, subscriber: int):
+        """Remove um assinante que não vai consumir o stream."""
+        with self._cond:
+            self._cursors.pop(subscriber, None)
+            self._trim()
+
+    def mark_opened(self):
+        """Stream com o provedor aberto: assinantes à espera seguem para os chunks."""
+        self._opened.set()
+
+    def wait_opened(self) -> Optional[BaseException]:
+        """Espera a abertura do provedor; devolve o erro dela, se falhou."""
+        self._opened.wait()
+        return self.open_error
+
+    def iterate(self, subscriber: int) -> Generator:
+        """Chunks do assinante, do início ao fim do stream, no ritmo de quem consome."""
+        try:
+            while True:
+                with self._cond:
+                    while (
+                        subscriber not in self._evicted
+                        and self._cursors[subscriber] >= self.head
+                        and not self.done
+                    ):
+                        self._cond.wait()
+                    if subscriber in self._evicted:
+                        raise SlowConsumerError(
+                            f"assinante ficou mais de {self.max_buffer} chunks atrás do stream do LLM"
+                        )
+                    cursor = self._cursors[subscriber]
+                    batch = self._chunks[cursor - self._base:]
+                    self._cursors[subscriber] = self.head
+                    if not batch and self.error is not None:
+                        raise self.error
+                    if not batch:
+                        return
+                    self._trim()
+                yield from batch
+        finally:
+            with self._cond:
+                self._cursors.pop(subscriber, None)
+                self._evicted.discard(subscriber)
+                self._trim()
+
+    def pump(self, upstream: Iterable, on_done: Callable[[], None]):
+        """Lê o provedor para o buffer até o fim, um erro ou todos os assinantes desistirem."""
+        abandoned = False
+        try:
+            for chunk in upstream:
+                with self._cond:
+                    if not self._cursors:
+                        abandoned = True
+                        break
+                    self._chunks.append(chunk)
+                    self._enforce_bounds()
+                    self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self.joinable = False
+                self._cond.notify_all()
+            on_done()
+            if abandoned:
+                logger.info("Stream do LLM (%s) abandonado por todos os assinantes; fechando", self.model)
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                close()
+
+    def fail(self, error: BaseException):
+        """Encerra o stream com erro antes de abrir o provedor (assinantes recebem o erro ao se inscrever)."""
+        with self._cond:
+            self.error = error
+            self.open_error = error
+            self.done = True
+            self.joinable = False
+            self._cond.notify_all()
+        self._opened.set()
+
+    def _trim(self):
+        """Descarta os chunks já lidos por todos (só depois que o stream para de aceitar assinantes)."""
+        if self.joinable:
+            return
+        low = min(self._cursors.values(), default=self.head)
+        if low > self._base:
+            del self._chunks[:low - self._base]
+            self._base = low
+
+    def _enforce_bounds(self):
+        if len(self._chunks) <= self.max_buffer:
+            return
+        # Replay desde o início não cabe mais: novos pedidos idênticos abrem outro stream
+        self.joinable = False
+        self._trim()
+        while len(self._chunks) > self.max_buffer and self._cursors:
+            slowest = min(self._cursors, key=self._cursors.get)
+            del self._cursors[slowest]
+            self._evicted.add(slowest)
+            ERRORS_TOTAL.labels(component="llm_stream", persona="", model=self.model, error="SlowConsumerError").inc()
+            logger.warning("Assinante lento desligado do stream do LLM (%s)", self.model)
+            self._trim()
+
+
+class StreamMultiplexer:
+    """Streams do LLM em andamento por chave de pedido; pedidos idênticos compartilham um só."""
+
+    def __init__(self, max_buffer: int = DEFAULT_MAX_BUFFER):
+        """
+        Args:
+            max_buffer: Chunks retidos por stream
+        """
+        self.max_buffer = max_buffer
+        self._streams: Dict[str, SharedStream] = {}
+        self._lock = threading.Lock()
+
+    def open(self, key: str, model: str, opener: Callable[[], Iterable]) -> Generator:
+        """
+        Assina o stream em andamento da chave, ou abre um com `opener`.
+
+        Args:
+            key: Chave do pedido (`stream_key`)
+            model: Modelo (label das métricas)
+            opener: Abre o stream com o provedor (chamado só por quem não encontrou stream compartilhável)
+
+        Returns:
+            Generator com todos os chunks da resposta
+
+        Raises:
+            Exception: O erro de `opener`, para quem abriu o stream e para quem se inscreveu
+                antes da abertura (pedidos idênticos falham do mesmo jeito)
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            subscriber = shared.attach() if shared is not None else None
+            joined = subscriber is not None
+            if not joined:
+                shared = SharedStream(model, self.max_buffer)
+                subscriber = shared.attach()
+                self._streams[key] = shared
+        if joined:
+            LLM_STREAM_SUBSCRIBERS_TOTAL.labels(model=model, source="shared").inc()
+            # Quem chegou antes da abertura recebe o erro dela aqui, como quem abriu
+            error = shared.wait_opened()
+            if error is not None:
+                shared.detach(subscriber)
+                raise error
+            return shared.iterate(subscriber)
+        LLM_STREAM_SUBSCRIBERS_TOTAL.labels(model=model, source="upstream").inc()
+        try:
+            upstream = opener()
+        except Exception as e:
+            shared.fail(e)
+            self._release(key, shared)
+            raise
+        shared.mark_opened()
+        threading.Thread(
+            target=shared.pump, args=(upstream, lambda: self._release(key, shared)),
+            name="llm-stream-tee", daemon=True
+        ).start()
+        return shared.iterate(subscriber)
+
+    def _release(self, key: str, shared: SharedStream):
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    def active(self) -> int:
+        """Streams com o provedor em andamento."""
+        with self._lock:
+            return len(self._streams)
+
+
+_multiplexer: Optional[StreamMultiplexer] = None
+_multiplexer_lock = threading.Lock()
+
+
+def get_stream_multiplexer() -> StreamMultiplexer:
+    """Multiplexador compartilhado do processo (todas as sessões do Streamlit)."""
+    global _multiplexer
+    with _multiplexer_lock:
+        if _multiplexer is None:
+            _multiplexer = StreamMultiplexer()
+        return _multiplexer
@@ -0,0 +1,215 @@
+"""
+Turnos de conversa da interface executados em background.
+
+O script do Streamlit não espera o agente: `TurnExecutor.submit` entrega a
+mensagem a um pool de threads e devolve um `Turn`, que a página consulta a
+cada rerun (estado, texto parcial, resposta). `TurnExecutor.cancel` libera a
+página na hora, fecha a conexão do stream (a thread do envio volta ao pool sem
+esperar o próximo evento do agente) e pede ao agente que cancele a tarefa; no
+servidor ASGI isso interrompe a corrotina e fecha o stream com o LLM, parando o
+consumo do provedor. No servidor Flask (`--serving wsgi`, o padrão) o
+cancelamento é só do lado do cliente: o agente termina a chamada ao LLM e
+segura a vaga do limitador até o fim.
+"""
+import contextvars
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class Turn:
+    """Um envio ao agente: estado, trechos já recebidos e resultado (resposta ou erro)."""
+
+    def __init__(self, url: str, message):
+        """
+        Args:
+            url: URL A2A do agente
+            message: Mensagem do usuário (`Message`)
+        """
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.message = message
+        self.state = PENDING
+        self.response = None
+        self.error: Optional[Exception] = None
+        self.error_details = ""
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancelled = threading.Event()
+        self.future: Optional[Future] = None
+        self._response = None
+        self._parts: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def text(self) -> str:
+        """Resposta parcial recebida até agora."""
+        with self._lock:
+            return "".join(self._parts)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def elapsed(self) -> float:
+        """Segundos desde o envio (até o fim, se já terminou)."""
+        return (self.finished_at or time.time()) - self.created_at
+
+    def append(self, text: str):
+        with self._lock:
+            self._parts.append(text)
+
+    def attach_response(self, response):
+        """Guarda a resposta aberta do stream; se o turno já foi cancelado, fecha na hora."""
+        with self._lock:
+            self._response = response
+        if self.cancelled.is_set():
+            self.close_response()
+
+    def detach_response(self):
+        """Esquece a resposta (o envio terminou e ela já foi fechada)."""
+        with self._lock:
+            self._response = None
+
+    def close_response(self):
+        """Fecha a resposta do stream, destravando a thread que a lê."""
+        from app.services.a2a_client import abort_stream
+
+        with self._lock:
+            response, self._response = self._response, None
+        if response is not None:
+            abort_stream(response)
+
+    def _transition(self, state: str, allowed) -> bool:
+        with self._lock:
+            if self.state not in allowed:
+                return False
+            self.state = state
+            if state in FINISHED_STATES:
+                self.finished_at = time.time()
+            return True
+
+    def start(self) -> bool:
+        """Marca o início da execução; False se o turno já foi cancelado."""
+        started = self._transition(RUNNING, (PENDING,))
+        if started:
+            self.started_at = time.time()
+        return started
+
+    def finish(self, state: str) -> bool:
+        """Marca o fim (DONE, FAILED ou CANCELLED); False se o turno já tinha terminado."""
+        return self._transition(state, (PENDING, RUNNING))
+
+
+class TurnExecutor:
+    """Pool de threads que envia os turnos pelo `A2AClientPool`, com turnos recentes consultáveis por id."""
+
+    def __init__(self, pool, max_workers: int = 16, retain: int = 256):
+        """
+        Args:
+            pool: A2AClientPool usado nos envios e cancelamentos
+            max_workers: Turnos enviados ao mesmo tempo (os demais esperam na fila, como PENDING)
+            retain: Turnos terminados mantidos para consulta (os mais antigos são descartados)
+        """
+        self.pool = pool
+        self.retain = retain
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-turn")
+        self._turns: "OrderedDict[str, Turn]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, url: str, message) -> Turn:
+        """
+        Envia a mensagem em background e devolve o turno na hora.
+
+        O contexto atual (span ativo do trace) segue para a thread do envio.
+        """
+        turn = Turn(url, message)
+        with self._lock:
+            self._turns[turn.id] = turn
+            self._prune()
+        context = contextvars.copy_context()
+        turn.future = self._executor.submit(context.run, self._run, turn)
+        return turn
+
+    def _prune(self):
+        finished = [turn_id for turn_id, turn in self._turns.items() if turn.finished]
+        for turn_id in finished[:max(0, len(self._turns) - self.retain)]:
+            del self._turns[turn_id]
+
+    def _run(self, turn: Turn):
+        from app.utils.tracing import trace_span
+
+        if not turn.start():
+            return
+        try:
+            with trace_span("a2a.send", url=turn.url):
+                response = self.pool.stream_message(
+                    turn.url, turn.message, task_id=turn.id, on_delta=turn.append,
+                    cancelled=turn.cancelled, on_open=turn.attach_response
+                )
+        except Exception as e:
+            if turn.cancelled.is_set():
+                return
+            turn.error = e
+            turn.error_details = traceback.format_exc()
+            if turn.finish(FAILED):
+                logger.error("Turno %s para %s falhou: %s: %s", turn.id, turn.url, type(e).__name__, e)
+            return
+        finally:
+            turn.detach_response()
+        turn.response = response
+        turn.finish(DONE if response is not None else CANCELLED)
+
+    def get(self, turn_id: str) -> Optional[Turn]:
+        with self._lock:
+            return self._turns.get(turn_id)
+
+    def cancel(self, turn_id: str) -> bool:
+        """
+        Cancela o turno: a página é liberada na hora e o agente é avisado em background.
+
+        Returns:
+            False se o turno não existe ou já terminou
+        """
+        turn = self.get(turn_id)
+        if turn is None:
+            return False
+        was_running = turn.state == RUNNING
+        turn.cancelled.set()
+        if not turn.finish(CANCELLED):
+            return False
+        turn.close_response()
+        if turn.future is not None:
+            turn.future.cancel()
+        if was_running:
+            logger.info("Cancelando turno %s em %s", turn.id, turn.url)
+            threading.Thread(
+                target=self.pool.cancel_task, args=(turn.url, turn.id), name="ui-turn-cancel", daemon=True
+            ).start()
+        return True
+
+    def shutdown(self):
+        """Cancela os turnos em andamento e encerra o pool."""
+        with self._lock:
+            pending = [turn_id for turn_id, turn in self._turns.items() if not turn.finished]
+        for turn_id in pending:
+            self.cancel(turn_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
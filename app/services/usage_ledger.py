@@ -0,0 +1,345 @@
+"""
+Contabilidade de tokens e custo por chamada ao LLM.
+Cada chamada vira uma linha em colunas `array` (timestamp, persona, modelo,
+tokens de prompt/completion/cache, latência, custo e trace), só com append.
+Strings são internadas como ids inteiros. Linhas mais antigas que a retenção
+são compactadas periodicamente em rollups por intervalo (persona × modelo).
+As consultas localizam a janela por busca binária no timestamp e agregam
+fatia a fatia com laços em C (`itertools.compress`, `sum`, `map`).
+"""
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from itertools import compress
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_RETENTION = 24 * 3600
+DEFAULT_ROLLUP_INTERVAL = 60
+
+# Preço em USD por 1M de tokens: (prompt, completion, prompt em cache)
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "openai/gpt-4o-mini": (0.15, 0.60, 0.075),
+    "openai/gpt-4o": (2.50, 10.00, 1.25),
+    "anthropic/claude-3.5-sonnet": (3.00, 15.00, 0.30),
+    "anthropic/claude-3-haiku": (0.25, 1.25, 0.03),
+}
+
+METRICS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens", "latency_ms", "cost")
+# Somas guardadas em cada bucket de rollup, nesta ordem
+ROLLUP_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms", "cost")
+GROUP_BY = ("persona", "model", "trace_id")
+
+
+def parse_prices(spec: Optional[str]) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Converte 'modelo=prompt/completion[/cache],...' (USD por 1M tokens) em tabela de preços.
+
+    Usado por DEVMENTOR_MODEL_PRICES para sobrescrever ou adicionar modelos.
+    """
+    prices = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        model, values = item.rsplit("=", 1)
+        try:
+            parts = [float(value) for value in values.split("/")]
+        except ValueError:
+            continue
+        if len(parts) == 2:
+            parts.append(parts[0])
+        if len(parts) == 3:
+            prices[model.strip()] = tuple(parts)
+    return prices
+
+
+def _as_int(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) else 0
+
+
+def usage_from_response(usage: Any) -> Dict[str, Any]:
+    """
+    Extrai tokens (e custo, se o provedor informar) de `response.usage`.
+
+    Aceita o objeto do cliente OpenAI ou o dict de `chunk.model_dump()["usage"]`.
+    """
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cost": None}
+    data = usage if isinstance(usage, dict) else None
+    if data is None and hasattr(usage, "model_dump"):
+        dumped = usage.model_dump()
+        data = dumped if isinstance(dumped, dict) else None
+    if data is None:
+        data = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+        }
+    details = data.get("prompt_tokens_details") or {}
+    cost = data.get("cost")
+    return {
+        "prompt_tokens": _as_int(data.get("prompt_tokens")),
+        "completion_tokens": _as_int(data.get("completion_tokens")),
+        "cached_tokens": _as_int(details.get("cached_tokens") if isinstance(details, dict) else None),
+        "cost": float(cost) if isinstance(cost, (int, float)) and not isinstance(cost, bool) else None,
+    }
+
+
+class UsageLedger:
+    """Registro append-only de uso do LLM com rollups e consultas agregadas."""
+
+    def __init__(
+        self,
+        retention: float = DEFAULT_RETENTION,
+        rollup_interval: float = DEFAULT_ROLLUP_INTERVAL,
+        prices: Optional[Dict[str, Tuple[float, float, float]]] = None
+    ):
+        """
+        Args:
+            retention: Segundos mantidos linha a linha (o resto vira rollup)
+            rollup_interval: Largura, em segundos, de cada bucket de rollup
+            prices: Tabela de preços por modelo (padrão: MODEL_PRICES)
+        """
+        self.retention = retention
+        self.rollup_interval = rollup_interval
+        self.prices = dict(MODEL_PRICES if prices is None else prices)
+        self._lock = threading.Lock()
+        self._names: Dict[str, Dict[str, int]] = {"persona": {}, "model": {}, "trace_id": {}}
+        self._labels: Dict[str, List[str]] = {"persona": [], "model": [], "trace_id": []}
+        self._ts = array("d")
+        self._persona = array("I")
+        self._model = array("I")
+        self._trace = array("I")
+        self._prompt = array("L")
+        self._completion = array("L")
+        self._cached = array("L")
+        self._latency = array("d")
+        self._cost = array("d")
+        # (bucket, persona_id, model_id) -> [calls, prompt, completion, cached, latency_ms, cost]
+        self._rollups: Dict[Tuple[float, int, int], List[float]] = {}
+        self._last_compact = time.time()
+
+    @classmethod
+    def from_env(cls) -> "UsageLedger":
+        """Ledger com preços extras de DEVMENTOR_MODEL_PRICES e retenção de DEVMENTOR_USAGE_RETENTION."""
+        prices = dict(MODEL_PRICES)
+        prices.update(parse_prices(os.getenv("DEVMENTOR_MODEL_PRICES")))
+        retention = float(os.getenv("DEVMENTOR_USAGE_RETENTION", DEFAULT_RETENTION))
+        return cls(retention=retention, prices=prices)
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def _intern(self, column: str, value: str) -> int:
+        ids = self._names[column]
+        ident = ids.get(value)
+        if ident is None:
+            ident = ids[value] = len(self._labels[column])
+            self._labels[column].append(value)
+        return ident
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        """Custo em USD pela tabela de preços (0 para modelos desconhecidos)."""
+        price = self.prices.get(model)
+        if price is None:
+            return 0.0
+        prompt_price, completion_price, cached_price = price
+        uncached = max(0, prompt_tokens - cached_tokens)
+        return (uncached * prompt_price + cached_tokens * cached_price + completion_tokens * completion_price) / 1e6
+
+    def record(
+        self,
+        persona: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        latency_ms: float = 0.0,
+        cost: Optional[float] = None,
+        trace_id: str = "",
+        ts: Optional[float] = None
+    ) -> float:
+        """
+        Registra uma chamada ao LLM.
+
+        Args:
+            cost: Custo informado pelo provedor; se None, estimado pela tabela
+            trace_id: Trace da requisição (liga o custo à cascata de spans)
+            ts: Timestamp (padrão: agora)
+
+        Returns:
+            Custo registrado em USD
+        """
+        if cost is None:
+            cost = self.estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+        now = time.time() if ts is None else ts
+        with self._lock:
+            # Timestamps fora de ordem (relógio/threads) são ajustados para manter a busca binária
+            if self._ts and now < self._ts[-1]:
+                now = self._ts[-1]
+            self._ts.append(now)
+            self._persona.append(self._intern("persona", persona))
+            self._model.append(self._intern("model", model))
+            self._trace.append(self._intern("trace_id", trace_id))
+            self._prompt.append(max(0, prompt_tokens))
+            self._completion.append(max(0, completion_tokens))
+            self._cached.append(max(0, cached_tokens))
+            self._latency.append(latency_ms)
+            self._cost.append(cost)
+            if now - self._last_compact >= self.rollup_interval:
+                self._compact_locked(now)
+        return cost
+
+    def compact(self, now: Optional[float] = None):
+        """Move para os rollups as linhas mais antigas que a retenção."""
+        with self._lock:
+            self._compact_locked(time.time() if now is None else now)
+
+    def _compact_locked(self, now: float):
+        self._last_compact = now
+        cut = bisect_left(self._ts, now - self.retention)
+        if not cut:
+            return
+        interval = self.rollup_interval
+        for i in range(cut):
+            bucket = self._ts[i] - self._ts[i] % interval
+            key = (bucket, self._persona[i], self._model[i])
+            row = self._rollups.get(key)
+            if row is None:
+                row = self._rollups[key] = [0, 0, 0, 0, 0.0, 0.0]
+            row[0] += 1
+            row[1] += self._prompt[i]
+            row[2] += self._completion[i]
+            row[3] += self._cached[i]
+            row[4] += self._latency[i]
+            row[5] += self._cost[i]
+        for column in (self._ts, self._persona, self._model, self._trace, self._prompt,
+                       self._completion, self._cached, self._latency, self._cost):
+            del column[:cut]
+        # Traces não vão para os rollups: reinterna os restantes para a tabela não crescer sem limite
+        if len(self._labels["trace_id"]) > 2 * len(self._trace) + 1024:
+            old_labels = self._labels["trace_id"]
+            self._names["trace_id"], self._labels["trace_id"] = {}, []
+            self._trace = array("I", (self._intern("trace_id", old_labels[i]) for i in self._trace))
+
+    def _columns(self, since: float) -> Dict[str, array]:
+        """Cópia das colunas a partir de `since` (fatias de array: cópia em C)."""
+        lo = bisect_left(self._ts, since)
+        return {
+            "persona": self._persona[lo:],
+            "model": self._model[lo:],
+            "trace_id": self._trace[lo:],
+            "prompt_tokens": self._prompt[lo:],
+            "completion_tokens": self._completion[lo:],
+            "cached_tokens": self._cached[lo:],
+            "latency_ms": self._latency[lo:],
+            "cost": self._cost[lo:],
+        }
+
+    @staticmethod
+    def _sums(columns: Dict[str, array], rows: List[int]) -> Dict[str, float]:
+        sums = {"calls": len(rows)}
+        for metric in ROLLUP_FIELDS[1:]:
+            sums[metric] = sum(map(columns[metric].__getitem__, rows))
+        return sums
+
+    def aggregate(
+        self,
+        by: str = "persona",
+        window: Optional[float] = 3600,
+        persona: Optional[str] = None,
+        model: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Totais por persona, modelo ou trace na janela (rollups incluídos).
+
+        Args:
+            by: Dimensão de agrupamento ('persona', 'model' ou 'trace_id')
+            window: Segundos até `now` (None: tudo o que existir)
+            persona / model: Filtros opcionais
+
+        Returns:
+            {grupo: {calls, prompt_tokens, completion_tokens, cached_tokens,
+            total_tokens, latency_ms (soma), avg_latency_ms, cost}}
+        """
+        if by not in GROUP_BY:
+            raise ValueError(f"by deve ser um de {GROUP_BY}")
+        now = time.time() if now is None else now
+        since = float("-inf") if window is None else now - window
+        with self._lock:
+            columns = self._columns(since)
+            labels = {column: list(values) for column, values in self._labels.items()}
+            filter_ids = {
+                column: self._names[column].get(value, -1)
+                for column, value in (("persona", persona), ("model", model)) if value is not None
+            }
+            rollups = [(key, row) for key, row in self._rollups.items() if key[0] >= since] if self._rollups else []
+
+        # Filtros viram uma máscara única; uma passada separa as linhas de cada grupo
+        mask = None
+        for column, ident in filter_ids.items():
+            matches = list(map(ident.__eq__, columns[column]))
+            mask = matches if mask is None else list(map(bool.__and__, mask, matches))
+        indexes = range(len(columns[by])) if mask is None else compress(range(len(columns[by])), mask)
+        groups: Dict[int, List[int]] = {}
+        for row, ident in zip(indexes, columns[by] if mask is None else compress(columns[by], mask)):
+            groups.setdefault(ident, []).append(row)
+        result: Dict[str, Dict[str, float]] = {
+            labels[by][ident]: self._sums(columns, rows) for ident, rows in groups.items()
+        }
+
+        # Rollups não guardam o trace: só entram nas visões por persona e modelo
+        if by != "trace_id":
+            for (_, persona_id, model_id), row in rollups:
+                if "persona" in filter_ids and persona_id != filter_ids["persona"]:
+                    continue
+                if "model" in filter_ids and model_id != filter_ids["model"]:
+                    continue
+                name = labels[by][persona_id if by == "persona" else model_id]
+                sums = result.setdefault(name, dict.fromkeys(ROLLUP_FIELDS, 0))
+                for metric, value in zip(ROLLUP_FIELDS, row):
+                    sums[metric] += value
+
+        for sums in result.values():
+            sums["total_tokens"] = sums["prompt_tokens"] + sums["completion_tokens"]
+            sums["avg_latency_ms"] = round(sums["latency_ms"] / sums["calls"], 3) if sums["calls"] else 0.0
+            sums["cost"] = round(sums["cost"], 6)
+        return result
+
+    def top(
+        self,
+        by: str = "persona",
+        metric: str = "total_tokens",
+        window: Optional[float] = 3600,
+        limit: int = 5,
+        now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Maiores grupos pela métrica na janela (ex: personas que mais gastaram tokens na última hora)."""
+        if metric not in METRICS and metric != "avg_latency_ms":
+            raise ValueError(f"metric deve ser um de {METRICS + ('avg_latency_ms',)}")
+        groups = self.aggregate(by=by, window=window, now=now)
+        ranked = sorted(groups.items(), key=lambda item: item[1][metric], reverse=True)[:limit]
+        return [{by: name, **sums} for name, sums in ranked]
+
+    def totals(self, window: Optional[float] = 3600, now: Optional[float] = None) -> Dict[str, float]:
+        """Totais gerais na janela."""
+        totals = dict.fromkeys(METRICS, 0)
+        for sums in self.aggregate(by="model", window=window, now=now).values():
+            for metric in METRICS:
+                totals[metric] += sums[metric]
+        totals["cost"] = round(totals["cost"], 6)
+        return totals
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Ledger compartilhado do processo (agentes e coordenador de start_servers.py)."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger.from_env()
+        return _ledger
@@ -1,16 +1,53 @@
 """
 Utilitário de diagnóstico para verificar status dos servidores e conectividade.
 """
-import requests
+import errno
+import time
 import socket
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Tuple, Optional
 from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Endpoints comuns do A2A testados em cada servidor
+AGENT_ENDPOINTS = [
+    ("/", "root"),
+    ("/health", "health"),
+    ("/api/health", "api_health"),
+    ("/v1/health", "v1_health"),
+]
+
+# Prazo global padrão para um diagnóstico completo (segundos)
+DEFAULT_DEADLINE = 3.0
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Sessão HTTP compartilhada com pool de conexões keep-alive para as sondagens."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=64, pool_maxsize=64)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
 
-def check_port_open(host: str, port: int, timeout: float = 2.0) -> Tuple[bool, Optional[str]]:
+def _remaining(deadline: float) -> float:
+    """Segundos restantes até o prazo (monotônico)."""
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_port_open(host: str, port: int, timeout: float = 2.0) -> Tuple[Optional[bool], Optional[str]]:
     """
     Verifica se uma porta está aberta e aceitando conexões.
     
@@ -20,7 +57,8 @@ def check_port_open(host: str, port: int, timeout: float = 2.0) -> Tuple[bool, O
         timeout: Timeout em segundos
     
     Returns:
-        Tupla (is_open, error_message)
+        Tupla (is_open, error_message); is_open é None se a conexão não
+        terminou no prazo (servidor ocupado não é porta fechada)
     """
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -30,12 +68,15 @@ def check_port_open(host: str, port: int, timeout: float = 2.0) -> Tuple[bool, O
         
         if result == 0:
             return True, None
+        elif result in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT, errno.EINPROGRESS):
+            # connect_ex devolve EAGAIN quando o timeout do socket estoura
+            return None, f"Timeout ao conectar em {host}:{port}"
         else:
             return False, f"Porta {port} não está aceitando conexões (código: {result})"
     except socket.gaierror as e:
         return False, f"Erro de DNS: {str(e)}"
     except socket.timeout:
-        return False, f"Timeout ao conectar em {host}:{port}"
+        return None, f"Timeout ao conectar em {host}:{port}"
     except Exception as e:
         return False, f"Erro inesperado: {type(e).__name__}: {str(e)}"
 
@@ -59,7 +100,7 @@ def check_http_endpoint(
         Tupla (is_ok, error_message, status_code)
     """
     try:
-        response = requests.get(url, timeout=timeout, allow_redirects=False, headers=headers)
+        response = _get_session().get(url, timeout=timeout, allow_redirects=False, headers=headers)
         if response.status_code == expected_status:
             return True, None, response.status_code
         else:
@@ -77,20 +118,14 @@ def check_http_endpoint(
         return False, f"Erro inesperado: {type(e).__name__}: {str(e)}", None
 
 
-def diagnose_agent_server(port: int, base_url: Optional[str] = None) -> Dict:
-    """
-    Diagnostica um servidor de agente A2A.
-    
-    Args:
-        port: Porta do servidor
-        base_url: URL base (padrão: http://localhost:{port})
-    
-    Returns:
-        Dicionário com resultados do diagnóstico
-    """
-    if base_url is None:
-        base_url = f"http://localhost:{port}"
-    
+def _probe_agent_server(
+    port: int,
+    base_url: str,
+    deadline: float,
+    endpoint_pool: ThreadPoolExecutor,
+    endpoint_timeout: float = 1.0
+) -> Dict:
+    """Verifica porta e sonda todos os endpoints em paralelo, respeitando o prazo."""
     parsed = urlparse(base_url)
     host = parsed.hostname or "localhost"
     
@@ -100,17 +135,25 @@ def diagnose_agent_server(port: int, base_url: Optional[str] = None) -> Dict:
         "url": base_url,
         "port": port,
         "host": host,
-        "port_open": False,
+        "port_open": None,
         "port_error": None,
         "endpoints": {},
         "overall_status": "unknown"
     }
     
     # 1. Verificar se porta está aberta
-    port_open, port_error = check_port_open(host, port)
+    port_timeout = min(2.0, _remaining(deadline))
+    if port_timeout <= 0:
+        results["overall_status"] = "timeout"
+        return results
+    port_open, port_error = check_port_open(host, port, timeout=port_timeout)
     results["port_open"] = port_open
     results["port_error"] = port_error
     
+    if port_open is None:
+        results["overall_status"] = "timeout"
+        logger.warning(f"⏱️  Porta {port} não respondeu no prazo: {port_error}")
+        return results
     if not port_open:
         results["overall_status"] = "port_closed"
         logger.warning(f"❌ Porta {port} não está aberta: {port_error}")
@@ -118,17 +161,19 @@ def diagnose_agent_server(port: int, base_url: Optional[str] = None) -> Dict:
     
     logger.info(f"✅ Porta {port} está aberta")
     
-    # 2. Testar endpoints comuns do A2A
-    endpoints_to_test = [
-        ("/", "root"),
-        ("/health", "health"),
-        ("/api/health", "api_health"),
-        ("/v1/health", "v1_health"),
-    ]
-    
-    for endpoint, name in endpoints_to_test:
+    # 2. Testar endpoints comuns do A2A, todos ao mesmo tempo
+    timeout = max(0.05, min(endpoint_timeout, _remaining(deadline)))
+    futures = {}
+    for endpoint, name in AGENT_ENDPOINTS:
         url = f"{base_url.rstrip('/')}{endpoint}"
-        is_ok, error, status_code = check_http_endpoint(url, timeout=1.0)
+        futures[name] = (endpoint, url, endpoint_pool.submit(check_http_endpoint, url, timeout))
+    wait([future for _, _, future in futures.values()], timeout=_remaining(deadline))
+    
+    for name, (endpoint, url, future) in futures.items():
+        if future.done():
+            is_ok, error, status_code = future.result()
+        else:
+            is_ok, error, status_code = False, "Prazo do diagnóstico esgotado", None
         
         results["endpoints"][name] = {
             "url": url,
@@ -151,6 +196,25 @@ def diagnose_agent_server(port: int, base_url: Optional[str] = None) -> Dict:
     return results
 
 
+def diagnose_agent_server(port: int, base_url: Optional[str] = None, deadline: float = DEFAULT_DEADLINE) -> Dict:
+    """
+    Diagnostica um servidor de agente A2A.
+    
+    Args:
+        port: Porta do servidor
+        base_url: URL base (padrão: http://localhost:{port})
+        deadline: Tempo máximo total do diagnóstico em segundos
+    
+    Returns:
+        Dicionário com resultados do diagnóstico
+    """
+    if base_url is None:
+        base_url = f"http://localhost:{port}"
+    
+    with ThreadPoolExecutor(max_workers=len(AGENT_ENDPOINTS), thread_name_prefix="diag") as pool:
+        return _probe_agent_server(port, base_url, time.monotonic() + deadline, pool)
+
+
 def diagnose_mcp_server(port: int = 5000, base_url: Optional[str] = None) -> Dict:
     """
     Diagnostica o servidor MCP (protocolo diferente, requer headers específicos).
@@ -185,6 +249,10 @@ def diagnose_mcp_server(port: int = 5000, base_url: Optional[str] = None) -> Dic
     results["port_open"] = port_open
     results["port_error"] = port_error
     
+    if port_open is None:
+        results["overall_status"] = "timeout"
+        logger.warning(f"⏱️  Porta MCP {port} não respondeu no prazo: {port_error}")
+        return results
     if not port_open:
         results["overall_status"] = "port_closed"
         logger.warning(f"❌ Porta MCP {port} não está aberta: {port_error}")
@@ -194,7 +262,7 @@ def diagnose_mcp_server(port: int = 5000, base_url: Optional[str] = None) -> Dic
     
     # 2. Testar endpoint raiz (sem headers específicos - pode retornar 406, mas indica que servidor está rodando)
     try:
-        response = requests.get(base_url, timeout=1.0, allow_redirects=False)
+        response = _get_session().get(base_url, timeout=1.0, allow_redirects=False)
         # MCP pode retornar 404 ou 406, mas isso indica que o servidor está respondendo
         # 406 Not Acceptable é esperado quando não há headers Accept: text/event-stream
         if response.status_code in [200, 404, 406]:
@@ -213,17 +281,28 @@ def diagnose_mcp_server(port: int = 5000, base_url: Optional[str] = None) -> Dic
     return results
 
 
-def diagnose_all_servers(agents_config: List[Tuple[str, int]]) -> Dict:
+def diagnose_all_servers(
+    agents_config: List[Tuple[str, int]],
+    deadline: float = DEFAULT_DEADLINE,
+    max_workers: int = 64
+) -> Dict:
     """
-    Diagnostica todos os servidores configurados.
+    Diagnostica todos os servidores configurados em paralelo.
+    
+    Todas as portas e endpoints são sondados ao mesmo tempo sob um único prazo
+    global, então o diagnóstico leva cerca de um timeout, e não a soma deles.
     
     Args:
-        agents_config: Lista de tuplas (nome, porta)
+        agents_config: Lista de tuplas (nome, porta) ou (nome, porta, url_base)
+        deadline: Tempo máximo total do diagnóstico em segundos
+        max_workers: Limite de threads para as sondagens HTTP
     
     Returns:
         Dicionário com resultados de todos os servidores
     """
     logger.info("🔍 Iniciando diagnóstico completo de servidores...")
+    start = time.monotonic()
+    deadline_at = start + deadline
     
     results = {
         "servers": {},
@@ -232,29 +311,60 @@ def diagnose_all_servers(agents_config: List[Tuple[str, int]]) -> Dict:
             "healthy": 0,
             "port_closed": 0,
             "port_open_but_no_endpoint": 0,
+            "timeout": 0,
             "unknown": 0
         }
     }
     
-    for name, port in agents_config:
-        server_result = diagnose_agent_server(port)
-        results["servers"][name] = server_result
+    # Dois pools: servidores esperam por endpoints, endpoints nunca esperam (sem deadlock)
+    server_pool = ThreadPoolExecutor(max_workers=max(1, len(agents_config)), thread_name_prefix="diag-server")
+    endpoint_pool = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(agents_config) * len(AGENT_ENDPOINTS))),
+        thread_name_prefix="diag-endpoint"
+    )
+    try:
+        futures = {}
+        for config in agents_config:
+            name, port = config[0], config[1]
+            base_url = config[2] if len(config) > 2 else f"http://localhost:{port}"
+            futures[name] = (port, base_url, server_pool.submit(
+                _probe_agent_server, port, base_url, deadline_at, endpoint_pool
+            ))
+        wait([future for _, _, future in futures.values()], timeout=_remaining(deadline_at) + 0.1)
         
-        status = server_result["overall_status"]
-        if status == "healthy":
-            results["summary"]["healthy"] += 1
-        elif status == "port_closed":
-            results["summary"]["port_closed"] += 1
-        elif status == "port_open_but_no_endpoint":
-            results["summary"]["port_open_but_no_endpoint"] += 1
-        else:
-            results["summary"]["unknown"] += 1
+        for name, (port, base_url, future) in futures.items():
+            if future.done():
+                server_result = future.result()
+            else:
+                server_result = {
+                    "url": base_url,
+                    "port": port,
+                    "host": urlparse(base_url).hostname or "localhost",
+                    "port_open": None,
+                    "port_error": f"Prazo de {deadline}s esgotado",
+                    "endpoints": {},
+                    "overall_status": "timeout"
+                }
+            results["servers"][name] = server_result
+            
+            status = server_result["overall_status"]
+            if status in results["summary"]:
+                results["summary"][status] += 1
+            else:
+                results["summary"]["unknown"] += 1
+    finally:
+        # Não espera sondagens atrasadas: cada uma já tem timeout menor que o prazo
+        server_pool.shutdown(wait=False, cancel_futures=True)
+        endpoint_pool.shutdown(wait=False, cancel_futures=True)
+    
+    results["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
     
     # Log resumo
-    logger.info("📊 Resumo do diagnóstico:")
+    logger.info(f"📊 Resumo do diagnóstico ({results['elapsed_ms']} ms):")
     logger.info(f"   ✅ Saudáveis: {results['summary']['healthy']}")
     logger.info(f"   ❌ Porta fechada: {results['summary']['port_closed']}")
     logger.info(f"   ⚠️  Porta aberta mas sem endpoint: {results['summary']['port_open_but_no_endpoint']}")
+    logger.info(f"   ⏱️  Prazo esgotado: {results['summary']['timeout']}")
     logger.info(f"   ❓ Desconhecido: {results['summary']['unknown']}")
     
     return results
@@ -277,7 +387,8 @@ def format_diagnostic_report(results: Dict) -> str:
     for name, server_result in results["servers"].items():
         lines.append(f"\n🔹 {name} (porta {server_result['port']})")
         lines.append(f"   URL: {server_result['url']}")
-        lines.append(f"   Porta aberta: {'✅ Sim' if server_result['port_open'] else '❌ Não'}")
+        port_open = server_result['port_open']
+        lines.append(f"   Porta aberta: {'❓ Desconhecido' if port_open is None else '✅ Sim' if port_open else '❌ Não'}")
         
         if server_result['port_error']:
             lines.append(f"   Erro: {server_result['port_error']}")
@@ -297,6 +408,7 @@ def format_diagnostic_report(results: Dict) -> str:
             "healthy": "✅ Saudável",
             "port_closed": "❌ Porta fechada",
             "port_open_but_no_endpoint": "⚠️  Porta aberta mas sem endpoint HTTP",
+            "timeout": "⏱️  Prazo do diagnóstico esgotado",
             "unknown": "❓ Status desconhecido"
         }
         lines.append(f"   Status geral: {status_map.get(status, status)}")
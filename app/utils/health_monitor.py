@@ -0,0 +1,175 @@
+"""
+Monitor de saúde em background para os agentes A2A.
+Sonda os servidores periodicamente (com backoff adaptativo para os que estão
+fora do ar) e publica um snapshot em cache com TTL, para que a UI e o
+coordenador consultem o status em O(1) sem fazer sondagens no caminho da mensagem.
+"""
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+from app.utils.diagnostics import diagnose_all_servers
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class HealthMonitor:
+    """Sonda agentes em background e mantém o último status de cada um."""
+
+    def __init__(
+        self,
+        targets: Dict[str, Union[int, str]],
+        interval: float = 5.0,
+        max_interval: float = 60.0,
+        ttl: float = 15.0,
+        deadline: float = 2.0,
+        probe: Callable[..., Dict] = diagnose_all_servers
+    ):
+        """
+        Args:
+            targets: Mapa nome -> porta ou URL base (personas atrás do host multi-persona)
+            interval: Intervalo entre sondagens de servidores saudáveis (segundos)
+            max_interval: Intervalo máximo do backoff para servidores fora do ar
+            ttl: Idade máxima de um status para ser considerado atual
+            deadline: Prazo de cada rodada de sondagem
+            probe: Função de diagnóstico (mesma assinatura de `diagnose_all_servers`)
+        """
+        # URL base só para alvos que não são a raiz de uma porta (ex: http://localhost:8100/agents/x)
+        self._urls = {name: target for name, target in targets.items() if isinstance(target, str)}
+        self.targets = {
+            name: (urlparse(target).port or 80) if isinstance(target, str) else target
+            for name, target in targets.items()
+        }
+        self.interval = interval
+        self.max_interval = max_interval
+        self.ttl = ttl
+        self.deadline = deadline
+        self._probe = probe
+        self._snapshot: Dict[str, Dict] = {}
+        self._next_probe: Dict[str, float] = {name: 0.0 for name in self.targets}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[str, Dict, Dict], None]] = []
+
+    def add_listener(self, callback: Callable[[str, Dict, Dict], None]):
+        """Registra `callback(nome, anterior, atual)`, chamado quando um servidor muda de saudável ↔ fora do ar."""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Inicia a thread de sondagem (idempotente)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"🩺 Monitor de saúde iniciado para {len(self.targets)} servidor(es)")
+
+    def stop(self, timeout: float = 5.0):
+        """Interrompe a thread de sondagem."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_status(self, name: str) -> Optional[Dict]:
+        """Último status publicado (pode estar velho; veja `is_fresh`)."""
+        return self._snapshot.get(name)
+
+    def is_fresh(self, status: Optional[Dict]) -> bool:
+        """Indica se o status existe e está dentro do TTL."""
+        return status is not None and time.monotonic() - status["monotonic"] <= self.ttl
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Cópia rasa do status de todos os servidores."""
+        return dict(self._snapshot)
+
+    def probe_now(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Sonda imediatamente (no thread chamador) e publica o resultado.
+
+        Args:
+            names: Servidores a sondar (padrão: todos)
+
+        Returns:
+            Status publicado de cada servidor sondado
+        """
+        names = [name for name in (names or self.targets) if name in self.targets]
+        if not names:
+            return {}
+        config: List[Tuple] = [
+            (name, self.targets[name], self._urls[name]) if name in self._urls else (name, self.targets[name])
+            for name in names
+        ]
+        results = self._probe(config, deadline=self.deadline)
+        return {name: self._publish(name, results["servers"][name]) for name in names}
+
+    def get_or_probe(self, name: str) -> Dict:
+        """Status em cache se estiver atual; senão sonda o servidor sob demanda."""
+        status = self.get_status(name)
+        if self.is_fresh(status):
+            return status
+        return self.probe_now([name])[name]
+
+    def report_failure(self, name: str):
+        """Invalida o status após uma falha real de envio e antecipa a próxima sondagem."""
+        with self._lock:
+            status = self._snapshot.get(name)
+            if status is not None:
+                self._snapshot[name] = dict(status, monotonic=float("-inf"))
+            self._next_probe[name] = 0.0
+        self._wake.set()
+
+    def _publish(self, name: str, diagnostic: Dict) -> Dict:
+        """Publica o diagnóstico e agenda a próxima sondagem (backoff se falhou)."""
+        healthy = diagnostic["overall_status"] == "healthy"
+        with self._lock:
+            previous = self._snapshot.get(name)
+            failures = 0 if healthy else (previous["failures"] + 1 if previous else 1)
+            status = {
+                "name": name,
+                "port": self.targets[name],
+                "status": diagnostic["overall_status"],
+                "healthy": healthy,
+                "port_open": diagnostic["port_open"],
+                "failures": failures,
+                "checked_at": time.time(),
+                "monotonic": time.monotonic(),
+                "diagnostic": diagnostic,
+            }
+            # Entradas são substituídas, nunca alteradas: leitores não precisam de lock
+            self._snapshot[name] = status
+            delay = min(self.max_interval, self.interval * (2 ** failures)) if failures else self.interval
+            self._next_probe[name] = time.monotonic() + delay
+
+        if previous is not None and previous["healthy"] != healthy:
+            logger.info(f"🩺 {name}: {previous['status']} → {status['status']}")
+            for callback in self._listeners:
+                try:
+                    callback(name, previous, status)
+                except Exception as e:
+                    logger.error(f"Erro em listener do monitor de saúde: {type(e).__name__}: {str(e)}")
+        return status
+
+    def _run(self):
+        """Loop de sondagem: acorda quando algum servidor vence ou há falha reportada."""
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [name for name, at in self._next_probe.items() if at <= now]
+            if due:
+                try:
+                    self.probe_now(due)
+                except Exception as e:
+                    logger.error(f"Erro no monitor de saúde: {type(e).__name__}: {str(e)}")
+                    with self._lock:
+                        for name in due:
+                            self._next_probe[name] = time.monotonic() + self.interval
+
+            with self._lock:
+                wait_for = max(0.0, min(self._next_probe.values(), default=now + self.interval) - time.monotonic())
+            self._wake.wait(wait_for)
+            self._wake.clear()
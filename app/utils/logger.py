@@ -1,17 +1,44 @@
 """
 Sistema de logging centralizado para DevMentor AI.
 Fornece logging estruturado com diferentes níveis e formatação consistente.
+
+Os loggers não escrevem direto no console nem em disco: um `QueueHandler`
+enfileira o registro e uma thread de fundo (`QueueListener`) formata e grava,
+com flush do arquivo em lotes. Threads de requisição nunca bloqueiam em I/O;
+com a fila cheia, o registro é descartado e contado em `dropped_records()`.
+
+No modo estruturado (`structured=True` ou DEVMENTOR_LOG_FORMAT=json) o arquivo
+recebe um objeto JSON por evento; `max_bytes` rotaciona o arquivo por tamanho,
+comprimindo os antigos com gzip em background, e `sampling` (ou
+DEVMENTOR_LOG_SAMPLING) descarta uma fração dos eventos de alto volume.
 """
+import atexit
+import copy
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
-from datetime import datetime
+from typing import Dict, Mapping, Optional, Tuple
+from app.utils.tracing import current_span
+
+QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH = 256
+DEFAULT_BACKUP_COUNT = 5
 
 
 class ColoredFormatter(logging.Formatter):
     """Formatter com cores para terminal."""
-    
+
     COLORS = {
         'DEBUG': '\033[36m',      # Cyan
         'INFO': '\033[32m',       # Green
@@ -20,89 +47,430 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': '\033[35m',   # Magenta
     }
     RESET = '\033[0m'
-    
+
     def format(self, record):
+        # Cópia: o mesmo registro segue para os outros handlers do listener
+        record = copy.copy(record)
         log_color = self.COLORS.get(record.levelname, '')
         record.levelname = f"{log_color}{record.levelname}{self.RESET}"
         return super().format(record)
 
 
+# Atributos padrão do LogRecord: o resto veio de `extra=` e vai para o JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+# Campos estáveis, sempre no topo do objeto (null quando ausentes)
+STABLE_FIELDS = ("trace_id", "span_id", "persona", "latency_ms", "status")
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com campos estáveis e os `extra=` do registro."""
+
+    def format(self, record):
+        event = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STABLE_FIELDS:
+            event[field] = getattr(record, field, None)
+        event["source"] = f"{record.filename}:{record.lineno}"
+        event["thread"] = record.threadName
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in event:
+                event[key] = value
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            event["exc"] = record.exc_text
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Mantém só uma fração dos eventos por logger e nível.
+
+    As regras usam 'logger' ou 'logger:NIVEL' (prefixo na hierarquia de nomes);
+    vale a regra mais específica. WARNING e acima nunca são amostrados. A taxa
+    aplicada vai em `sample_rate` para reponderar contagens nas consultas.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = {key: max(0.0, min(1.0, float(rate))) for key, rate in rates.items()}
+        self._cache: Dict[Tuple[str, int], float] = {}
+
+    def rate_for(self, name: str, levelno: int) -> float:
+        key = (name, levelno)
+        rate = self._cache.get(key)
+        if rate is None:
+            rate = 1.0
+            level = logging.getLevelName(levelno)
+            parts = name.split(".")
+            for size in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:size])
+                if f"{prefix}:{level}" in self.rates:
+                    rate = self.rates[f"{prefix}:{level}"]
+                    break
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._cache[key] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name, record.levelno)
+        if rate >= 1.0:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+def parse_sampling(spec: Optional[str]) -> Dict[str, float]:
+    """Converte 'app.agents:DEBUG=0.01,devmentor.app=0.5' em regras de amostragem."""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        key, rate = item.rsplit("=", 1)
+        try:
+            rates[key.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+class BatchingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    FileHandler que faz flush a cada N registros, a cada intervalo ou em erros.
+
+    Com `max_bytes` rotaciona por tamanho (contando os bytes escritos, sem seek
+    por registro) e, com `compress`, os arquivos antigos viram `.N.gz` em uma
+    thread de fundo.
+    """
+
+    def __init__(
+        self,
+        filename,
+        batch_size: int = FLUSH_BATCH,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_bytes: int = 0,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        compress: bool = True,
+        **kwargs
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._size: Optional[int] = None
+        self._compressor: Optional[threading.Thread] = None
+        # Sem backups a rotação só reabriria o mesmo arquivo: mantém ao menos um
+        backup_count = max(1, backup_count) if max_bytes > 0 else backup_count
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, **kwargs)
+        if compress and max_bytes > 0:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = self._rotate_compressed
+
+    def _rotate_compressed(self, source: str, dest: str):
+        """Renomeia já (o log segue em arquivo novo) e comprime em background."""
+        self.wait_compression()
+        pending = dest[:-len(".gz")] + ".pending"
+        os.replace(source, pending)
+        self._compressor = threading.Thread(
+            target=_gzip_file, args=(pending, dest), name="devmentor-log-gzip", daemon=True
+        )
+        self._compressor.start()
+
+    def wait_compression(self, timeout: Optional[float] = None):
+        """Aguarda a compressão em andamento (antes de deslocar os backups)."""
+        if self._compressor is not None:
+            self._compressor.join(timeout)
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self._size is None:
+                self.stream.seek(0, os.SEEK_END)
+                self._size = self.stream.tell()
+            size = len(message.encode(self.encoding or "utf-8", "replace"))
+            if self.maxBytes > 0 and self._size and self._size + size > self.maxBytes:
+                self.wait_compression()
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                self._size = 0
+            self.stream.write(message)
+            self._size += size
+            self._pending += 1
+        except Exception:
+            self.handleError(record)
+            return
+        if (
+            self._pending >= self.batch_size
+            or record.levelno >= logging.ERROR
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        super().flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        super().close()
+        self.wait_compression(5)
+
+
+def _gzip_file(source: str, dest: str):
+    """Comprime `source` em `dest` (via arquivo temporário) e remove a origem."""
+    tmp = dest + ".tmp"
+    try:
+        with open(source, "rb") as f_in, gzip.open(tmp, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(tmp, dest)
+        os.remove(source)
+    except OSError:
+        pass  # Mantém o .pending: melhor um arquivo sem compressão do que perder logs
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia: descarta (e conta) quando a fila está cheia."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        Congela a mensagem (os args podem mudar depois) sem formatar o traceback.
+
+        O listener roda no mesmo processo, então `exc_info` segue na cópia e o
+        traceback só é formatado na thread de fundo.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        # O span ativo só existe na thread que loga, não na de escrita
+        span = current_span()
+        if span is not None and not hasattr(record, "trace_id"):
+            record.trace_id, record.span_id = span.trace_id, span.span_id
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener que faz flush dos handlers quando a fila esvazia."""
+
+    def __init__(self, log_queue: queue.Queue, *handlers, flush_interval: float = FLUSH_INTERVAL):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush_handlers()
+
+    def handle(self, record):
+        super().handle(record)
+        # Sem backlog: grava já (latência baixa); sob carga os flushes se agrupam
+        if self.queue.empty():
+            self._flush_handlers()
+
+    def _flush_handlers(self):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+
+    def start(self):
+        super().start()
+        self._thread.name = "devmentor-log-writer"
+
+
+# Um listener (thread de fundo) por destino: console e/ou arquivo, formato e rotação
+_SinkKey = Tuple[bool, Optional[str], bool, int, int]
+_listeners: Dict[_SinkKey, BatchingQueueListener] = {}
+_queue_handlers: Dict[_SinkKey, NonBlockingQueueHandler] = {}
+_sinks_lock = threading.Lock()
+
+
+def _build_sink_handlers(
+    console: bool,
+    log_file: Optional[str],
+    structured: bool = False,
+    max_bytes: int = 0,
+    backup_count: int = DEFAULT_BACKUP_COUNT
+) -> list:
+    """Handlers reais (executados na thread de fundo) para um destino."""
+    detailed_format = (
+        '%(asctime)s | %(levelname)-8s | %(name)s | '
+        '%(filename)s:%(lineno)d | %(message)s'
+    )
+    simple_format = '%(asctime)s | %(levelname)-8s | %(message)s'
+    handlers = []
+
+    # Handler para console (com cores); o nível é filtrado no logger
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ColoredFormatter(simple_format, datefmt='%H:%M:%S'))
+        handlers.append(console_handler)
+
+    # Handler para arquivo (sem cores, mais detalhado ou JSON)
+    if log_file:
+        log_path = Path(log_file)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = BatchingFileHandler(
+            log_path, max_bytes=max_bytes, backup_count=backup_count, encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)  # Arquivo sempre DEBUG
+        if structured:
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(detailed_format, datefmt='%Y-%m-%d %H:%M:%S'))
+        handlers.append(file_handler)
+
+    return handlers
+
+
+def _get_queue_handler(
+    console: bool,
+    log_file: Optional[str],
+    structured: bool = False,
+    max_bytes: int = 0,
+    backup_count: int = DEFAULT_BACKUP_COUNT
+) -> NonBlockingQueueHandler:
+    """QueueHandler compartilhado do destino, iniciando o listener na primeira vez."""
+    key = (console, str(Path(log_file).resolve()) if log_file else None, structured, max_bytes, backup_count)
+    with _sinks_lock:
+        handler = _queue_handlers.get(key)
+        if handler is None:
+            log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+            sink_handlers = _build_sink_handlers(console, log_file, structured, max_bytes, backup_count)
+            listener = BatchingQueueListener(log_queue, *sink_handlers)
+            listener.start()
+            handler = NonBlockingQueueHandler(log_queue)
+            _listeners[key] = listener
+            _queue_handlers[key] = handler
+        return handler
+
+
+def flush_logging():
+    """Bloqueia até as filas esvaziarem e grava o que estiver em buffer."""
+    with _sinks_lock:
+        listeners = list(_listeners.values())
+    for listener in listeners:
+        listener.queue.join()
+        listener._flush_handlers()
+
+
+def shutdown_logging():
+    """Esvazia as filas e encerra as threads de escrita (chamado no atexit)."""
+    with _sinks_lock:
+        listeners = list(_listeners.values())
+        _listeners.clear()
+        _queue_handlers.clear()
+    for listener in listeners:
+        try:
+            listener.stop()
+        except queue.Full:
+            pass
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+def dropped_records() -> int:
+    """Total de registros descartados por fila cheia."""
+    with _sinks_lock:
+        return sum(handler.dropped for handler in _queue_handlers.values())
+
+
 def setup_logger(
     name: str = "devmentor",
     level: int = logging.INFO,
     log_file: Optional[str] = None,
-    console: bool = True
+    console: bool = True,
+    structured: Optional[bool] = None,
+    max_bytes: Optional[int] = None,
+    backup_count: int = DEFAULT_BACKUP_COUNT,
+    sampling: Optional[Mapping[str, float]] = None
 ) -> logging.Logger:
     """
     Configura logger com handlers para console e arquivo.
-    
+
     Args:
         name: Nome do logger
         level: Nível de logging (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Caminho do arquivo de log (opcional)
         console: Se True, adiciona handler para console
-    
+        structured: Arquivo em JSON por linha (padrão: DEVMENTOR_LOG_FORMAT=json)
+        max_bytes: Tamanho para rotacionar o arquivo, 0 desliga (padrão: DEVMENTOR_LOG_MAX_BYTES)
+        backup_count: Arquivos rotacionados (.N.gz) mantidos
+        sampling: Taxas por 'logger' ou 'logger:NIVEL' (padrão: DEVMENTOR_LOG_SAMPLING)
+
     Returns:
         Logger configurado
     """
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+
     # Evitar duplicação de handlers
     if logger.handlers:
         return logger
-    
-    # Formato de log
-    detailed_format = (
-        '%(asctime)s | %(levelname)-8s | %(name)s | '
-        '%(filename)s:%(lineno)d | %(message)s'
-    )
-    simple_format = '%(asctime)s | %(levelname)-8s | %(message)s'
-    
-    # Handler para console (com cores)
-    if console:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(level)
-        console_formatter = ColoredFormatter(simple_format, datefmt='%H:%M:%S')
-        console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
-    
-    # Handler para arquivo (sem cores, mais detalhado)
-    if log_file:
-        log_path = Path(log_file)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        file_handler = logging.FileHandler(log_path, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)  # Arquivo sempre DEBUG
-        file_formatter = logging.Formatter(detailed_format, datefmt='%Y-%m-%d %H:%M:%S')
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-    
+
+    if structured is None:
+        structured = os.getenv("DEVMENTOR_LOG_FORMAT", "text").lower() == "json"
+    if max_bytes is None:
+        max_bytes = int(os.getenv("DEVMENTOR_LOG_MAX_BYTES", "0") or 0)
+    if sampling is None:
+        sampling = parse_sampling(os.getenv("DEVMENTOR_LOG_SAMPLING"))
+
+    if sampling:
+        # No logger (thread de quem loga): eventos descartados nem entram na fila
+        logger.addFilter(SamplingFilter(sampling))
+    if console or log_file:
+        logger.addHandler(_get_queue_handler(console, log_file, structured, max_bytes, backup_count))
+
     return logger
 
 
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
     Obtém logger configurado. Se não existir, cria um novo.
-    
+
     Args:
         name: Nome do logger (padrão: 'devmentor')
-    
+
     Returns:
         Logger configurado
     """
     if name is None:
         name = "devmentor"
-    
+
     logger = logging.getLogger(name)
-    
+
     # Se logger não tem handlers, configura um padrão
     if not logger.handlers:
         setup_logger(name)
-    
+
     return logger
 
 
 # Logger padrão do sistema
 default_logger = setup_logger("devmentor", level=logging.INFO)
-
@@ -0,0 +1,316 @@
+"""
+Métricas no formato de exposição de texto do Prometheus.
+Contadores, gauges e histogramas com buckets fixos, rotulados por persona,
+modelo ou ferramenta. Registrar um valor custa um lookup de dicionário e um
+lock por série (sem contenção entre séries diferentes), e o texto só é
+montado quando alguém lê `/metrics`.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Em segundos: cobre de chamadas de ferramenta locais até respostas longas do LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """Escapa um valor de label conforme o formato de exposição."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    """Série de um contador (valor monotônico)."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Contadores só podem aumentar")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _GaugeChild:
+    """Série de um gauge (valor que sobe e desce)."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _HistogramChild:
+    """Série de um histograma: contagem por bucket, soma e total."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # último = acima do maior bucket
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Mede a duração do bloco em segundos."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Contagens cumulativas por bucket (incluindo +Inf) e soma."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class _Metric:
+    """Métrica com nome, descrição e séries indexadas pelos valores dos labels."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels: str):
+        """
+        Série correspondente aos labels informados (criada na primeira vez).
+
+        Raises:
+            ValueError: Se os labels não coincidirem com os declarados
+        """
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera os labels {self.labelnames}, recebeu {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            # Lock só na criação da série; leituras e atualizações seguem sem ele
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Contador monotônico (ex: total de erros)."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    """Valor instantâneo (ex: requisições em andamento)."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    """Distribuição de latências em buckets fixos."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        bounds = self.buckets + (float("inf"),)
+        for values, child in self._series():
+            cumulative, total = child.snapshot()
+            for bound, count in zip(bounds, cumulative):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {count}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas de um processo, renderizado em `/metrics`."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Métrica '{metric.name}' já registrada com outro tipo/labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Registra (ou retorna o já registrado) contador."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Registra (ou retorna o já registrado) gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Registra (ou retorna o já registrado) histograma."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Todas as métricas no formato de exposição de texto."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro do processo (coordenador, agentes e MCP podem rodar no mesmo processo)
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "devmentor_request_seconds",
+    "Tempo de atendimento de requisições HTTP pelos servidores A2A",
+    ["persona", "endpoint"],
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "devmentor_requests_in_flight",
+    "Requisições HTTP em andamento nos servidores A2A",
+    ["persona"],
+)
+A2A_CALL_SECONDS = REGISTRY.histogram(
+    "devmentor_a2a_call_seconds",
+    "Tempo das chamadas A2A do coordenador aos agentes especializados",
+    ["persona"],
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "devmentor_llm_seconds",
+    "Tempo total das chamadas ao LLM",
+    ["persona", "model"],
+)
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "devmentor_llm_ttft_seconds",
+    "Tempo até o primeiro token em respostas do LLM com streaming",
+    ["persona", "model"],
+)
+LLM_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "devmentor_llm_concurrency_limit",
+    "Limite adaptativo (AIMD) de chamadas simultâneas ao LLM no processo",
+    ["limiter"],
+)
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "devmentor_llm_queue_depth",
+    "Chamadas ao LLM esperando vaga no limite de concorrência",
+    ["limiter"],
+)
+LLM_QUEUE_SECONDS = REGISTRY.histogram(
+    "devmentor_llm_queue_seconds",
+    "Tempo de espera das chamadas ao LLM pelo limite de concorrência",
+    ["persona"],
+)
+LLM_STREAM_SUBSCRIBERS_TOTAL = REGISTRY.counter(
+    "devmentor_llm_stream_subscribers_total",
+    "Leitores de streams do LLM, por origem (upstream: abriu o stream; shared: reaproveitou um idêntico)",
+    ["model", "source"],
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "devmentor_tool_seconds",
+    "Tempo de execução das ferramentas MCP",
+    ["tool"],
+)
+TOOL_QUEUE_SECONDS = REGISTRY.histogram(
+    "devmentor_tool_queue_seconds",
+    "Tempo de espera das ferramentas MCP pelo limite de concorrência",
+    ["tool"],
+)
+ERRORS_TOTAL = REGISTRY.counter(
+    "devmentor_errors_total",
+    "Erros por componente, persona (ou ferramenta MCP), modelo e tipo de exceção",
+    ["component", "persona", "model", "error"],
+)
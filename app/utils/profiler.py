@@ -0,0 +1,250 @@
+"""
+Profiler estatístico (amostragem) de todas as threads do processo.
+Captura `sys._current_frames()` em intervalos fixos, sem instrumentar o
+código, e agrega as pilhas no formato "collapsed" (uma linha por pilha,
+frames separados por ';' e a contagem no fim), pronto para flamegraph.pl,
+speedscope ou inferno. A raiz de cada pilha é o servidor/thread de origem,
+já que `start_servers.py` roda todos os servidores no mesmo processo.
+"""
+import ipaddress
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+MAX_DURATION = 60.0
+MIN_INTERVAL = 0.001
+
+# Folhas que indicam thread bloqueada em espera (I/O, lock, fila), não em CPU
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("connection.py", "wait"),
+    ("ssl.py", "read"),
+}
+
+# Rótulos explícitos por thread (ex: requisições A2A marcadas com a persona)
+_thread_labels: Dict[int, str] = {}
+
+_profile_lock = threading.Lock()
+
+
+def label_current_thread(label: Optional[str]):
+    """Associa (ou remove, com None) um rótulo de servidor à thread atual."""
+    ident = threading.get_ident()
+    if label is None:
+        _thread_labels.pop(ident, None)
+    else:
+        _thread_labels[ident] = label
+
+
+@lru_cache(maxsize=4096)
+def _short_path(path: str) -> str:
+    """Caminho curto: relativo a site-packages ou ao diretório atual."""
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    try:
+        relative = os.path.relpath(path)
+    except ValueError:
+        return os.path.basename(path)
+    return relative if not relative.startswith("..") else os.path.basename(path)
+
+
+@lru_cache(maxsize=16384)
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+
+def _thread_cpu_seconds() -> Dict[int, float]:
+    """CPU (user+system) por thread nativa, lido de /proc (apenas Linux)."""
+    cpu = {}
+    ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    task_dir = f"/proc/{os.getpid()}/task"
+    try:
+        native_ids = os.listdir(task_dir)
+    except OSError:
+        return cpu
+    for native_id in native_ids:
+        try:
+            with open(f"{task_dir}/{native_id}/stat", "r") as f:
+                # O nome da thread pode ter espaços: campos começam após o último ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu[int(native_id)] = (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu
+
+
+class SamplingProfiler:
+    """Amostra as pilhas de todas as threads e agrega em pilhas colapsadas."""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 128, include_idle: bool = False):
+        """
+        Args:
+            interval: Segundos entre amostras (padrão: 100 Hz)
+            max_depth: Frames máximos por pilha
+            include_idle: Mantém amostras de threads bloqueadas em espera
+        """
+        self.interval = max(MIN_INTERVAL, interval)
+        self.max_depth = max_depth
+        self.include_idle = include_idle
+
+    def _thread_label(self, ident: int, names: Dict[int, str]) -> str:
+        return _thread_labels.get(ident) or names.get(ident) or f"thread-{ident}"
+
+    def sample(self, stacks: Counter, threads: Counter, thread_filter: Optional[str] = None):
+        """Coleta uma amostra de cada thread (exceto a do próprio profiler)."""
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if not self.include_idle and _is_idle(frame):
+                continue
+            label = self._thread_label(ident, names)
+            if thread_filter and thread_filter not in label:
+                continue
+            frames = []
+            while frame is not None and len(frames) < self.max_depth:
+                frames.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            frames.append(label)
+            stacks[";".join(reversed(frames))] += 1
+            threads[label] += 1
+
+    def run(self, duration: float, thread_filter: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Amostra durante `duration` segundos.
+
+        Args:
+            duration: Janela de amostragem (limitada a MAX_DURATION)
+            thread_filter: Mantém só threads cujo rótulo contém este texto
+
+        Returns:
+            Dicionário com pilhas colapsadas, amostras por thread, funções mais
+            frequentes no topo da pilha e CPU por thread na janela (Linux)
+        """
+        duration = min(max(duration, self.interval), MAX_DURATION)
+        stacks: Counter = Counter()
+        threads: Counter = Counter()
+        cpu_before = _thread_cpu_seconds()
+        start = time.perf_counter()
+        deadline = start + duration
+        next_sample = start
+        rounds = 0
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            self.sample(stacks, threads, thread_filter)
+            rounds += 1
+            next_sample += self.interval
+        elapsed = time.perf_counter() - start
+        cpu_after = _thread_cpu_seconds()
+
+        return {
+            "duration_s": round(elapsed, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "rounds": rounds,
+            "samples": sum(threads.values()),
+            "threads": dict(threads.most_common()),
+            "top_functions": self._top_functions(stacks),
+            "thread_cpu_s": self._cpu_by_label(cpu_before, cpu_after),
+            "collapsed": collapsed_text(stacks),
+        }
+
+    @staticmethod
+    def _top_functions(stacks: Counter, limit: int = 20) -> Dict[str, int]:
+        """Funções no topo da pilha (tempo próprio) com mais amostras."""
+        leaves: Counter = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return dict(leaves.most_common(limit))
+
+    def _cpu_by_label(self, before: Dict[int, float], after: Dict[int, float]) -> Dict[str, float]:
+        """CPU consumida por thread durante a janela, pelo rótulo de servidor."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        by_native = {thread.native_id: thread.ident for thread in threading.enumerate()}
+        usage: Dict[str, float] = {}
+        for native_id, seconds in after.items():
+            delta = seconds - before.get(native_id, 0.0)
+            if delta <= 0:
+                continue
+            ident = by_native.get(native_id)
+            label = self._thread_label(ident, names) if ident is not None else f"native-{native_id}"
+            usage[label] = round(usage.get(label, 0.0) + delta, 3)
+        return dict(sorted(usage.items(), key=lambda item: -item[1]))
+
+
+def collapsed_text(stacks: Counter) -> str:
+    """Pilhas no formato collapsed ('raiz;...;folha contagem'), mais frequentes primeiro."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def parse_profile_params(params: Dict[str, Any]) -> Tuple[float, float, Optional[str], bool, str]:
+    """
+    Valida os parâmetros de `/admin/profile` (seconds, interval_ms, thread, idle, format).
+
+    Raises:
+        ValueError: Se algum parâmetro for inválido
+    """
+    try:
+        seconds = float(params.get("seconds", 5))
+        interval = float(params.get("interval_ms", 10)) / 1000
+    except (TypeError, ValueError):
+        raise ValueError("seconds e interval_ms devem ser números")
+    if not 0 < seconds <= MAX_DURATION:
+        raise ValueError(f"seconds deve estar entre 0 e {MAX_DURATION:g}")
+    if interval < MIN_INTERVAL:
+        raise ValueError(f"interval_ms deve ser ao menos {MIN_INTERVAL * 1000:g}")
+    output = params.get("format", "collapsed")
+    if output not in ("collapsed", "json"):
+        raise ValueError("format deve ser 'collapsed' ou 'json'")
+    include_idle = str(params.get("idle", "0")).lower() in ("1", "true", "yes")
+    return seconds, interval, params.get("thread") or None, include_idle, output
+
+
+def is_admin_allowed(remote_addr: Optional[str]) -> bool:
+    """Endpoints de admin só atendem loopback, salvo DEVMENTOR_ADMIN_ALLOW_REMOTE=1."""
+    if os.getenv("DEVMENTOR_ADMIN_ALLOW_REMOTE") == "1":
+        return True
+    try:
+        return ipaddress.ip_address(remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
+def run_profile(
+    seconds: float,
+    interval: float = 0.01,
+    thread_filter: Optional[str] = None,
+    include_idle: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Executa uma sessão de profiling; None se já houver outra em andamento.
+
+    Uma sessão por processo: todos os servidores compartilham as mesmas threads.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(interval=interval, include_idle=include_idle)
+        return profiler.run(seconds, thread_filter)
+    finally:
+        _profile_lock.release()
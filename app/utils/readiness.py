@@ -0,0 +1,209 @@
+"""
+Inicialização guiada por readiness em vez de esperas fixas.
+Cada servidor é iniciado assim que suas dependências ficam prontas;
+servidores independentes sobem em paralelo. "Pronto" significa que a porta
+aceita conexões e o endpoint de saúde responde (status < 500).
+"""
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_HEALTH_PATH = "/metrics"
+POLL_MIN = 0.01
+POLL_MAX = 0.1
+
+
+def is_ready(port: int, path: str = DEFAULT_HEALTH_PATH, host: str = "127.0.0.1", timeout: float = 0.5) -> bool:
+    """True se a porta aceita conexões e `path` responde sem erro de servidor."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    except OSError:
+        return False
+    try:
+        return requests.get(f"http://{host}:{port}{path}", timeout=timeout).status_code < 500
+    except requests.RequestException:
+        return False
+
+
+def wait_until_ready(
+    port: int,
+    path: str = DEFAULT_HEALTH_PATH,
+    timeout: float = 30.0,
+    host: str = "127.0.0.1"
+) -> float:
+    """
+    Espera o servidor ficar pronto, sondando com intervalo crescente (10 ms → 100 ms).
+
+    Returns:
+        Segundos até ficar pronto
+
+    Raises:
+        TimeoutError: Se não ficar pronto dentro do prazo
+    """
+    start = time.perf_counter()
+    interval = POLL_MIN
+    while not is_ready(port, path, host):
+        if time.perf_counter() - start >= timeout:
+            raise TimeoutError(f"porta {port} não ficou pronta em {timeout:.0f}s")
+        time.sleep(interval)
+        interval = min(POLL_MAX, interval * 2)
+    return time.perf_counter() - start
+
+
+class _Gate:
+    """Um servidor do plano: como iniciar, onde sondar e de quem depende."""
+
+    def __init__(self, name: str, start: Callable[[], None], port: int, path: str, depends_on: List[str]):
+        self.name = name
+        self.start = start
+        self.port = port
+        self.path = path
+        self.depends_on = depends_on
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.degraded = False  # Iniciado sem todas as dependências prontas
+
+
+class StartupPlan:
+    """Grafo de inicialização: inicia em paralelo o que já pode subir e espera readiness."""
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self._gates: Dict[str, _Gate] = {}
+
+    def add(
+        self,
+        name: str,
+        start: Callable[[], None],
+        port: int,
+        path: str = DEFAULT_HEALTH_PATH,
+        depends_on: Iterable[str] = ()
+    ) -> "StartupPlan":
+        """
+        Registra um servidor.
+
+        Args:
+            name: Nome do servidor no relatório
+            start: Função que dispara o servidor sem bloquear (thread ou processo)
+            port: Porta sondada para readiness
+            path: Endpoint de saúde
+            depends_on: Servidores que precisam estar prontos antes
+        """
+        self._gates[name] = _Gate(name, start, port, path, list(depends_on))
+        return self
+
+    def run(
+        self,
+        timeout: float = 60.0,
+        stop: Optional[threading.Event] = None,
+        on_poll: Optional[Callable[[], None]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Executa o plano até todos ficarem prontos, o prazo acabar ou `stop` ser sinalizado.
+
+        Dependências que estouram o prazo não bloqueiam para sempre: os
+        dependentes são iniciados mesmo assim e marcados como `degraded`.
+
+        Args:
+            timeout: Prazo total em segundos
+            stop: Evento que interrompe o plano (ex: Ctrl+C no supervisor)
+            on_poll: Chamado a cada rodada de sondagem (ex: reiniciar filhos que caíram)
+
+        Returns:
+            Relatório por servidor (tempos em segundos desde o início do plano);
+            `_total.aborted` indica se o plano foi interrompido
+        """
+        unknown = {dep for gate in self._gates.values() for dep in gate.depends_on} - set(self._gates)
+        if unknown:
+            raise ValueError(f"dependências desconhecidas: {sorted(unknown)}")
+
+        origin = time.perf_counter()
+        deadline = origin + timeout
+        interval = POLL_MIN
+        aborted = False
+        while True:
+            if stop is not None and stop.is_set():
+                aborted = True
+                logger.info("Inicialização interrompida")
+                break
+            if on_poll is not None:
+                on_poll()
+            timed_out = time.perf_counter() >= deadline
+            progressed = False
+            for gate in self._gates.values():
+                if gate.started_at is not None:
+                    continue
+                deps = [self._gates[dep] for dep in gate.depends_on]
+                if all(dep.ready_at is not None for dep in deps) or timed_out:
+                    gate.degraded = any(dep.ready_at is None for dep in deps)
+                    gate.started_at = time.perf_counter() - origin
+                    gate.start()
+                    progressed = True
+            for gate in self._gates.values():
+                if gate.started_at is not None and gate.ready_at is None:
+                    if is_ready(gate.port, gate.path, self.host):
+                        gate.ready_at = time.perf_counter() - origin
+                        logger.info("✅ %s pronto em %.2fs", gate.name, gate.ready_at)
+                        progressed = True
+            if all(gate.ready_at is not None for gate in self._gates.values()) or timed_out:
+                break
+            # Algo mudou: sonda logo de novo; senão, espera cada vez mais (até 100 ms)
+            interval = POLL_MIN if progressed else min(POLL_MAX, interval * 2)
+            if stop is not None:
+                stop.wait(interval)
+            else:
+                time.sleep(interval)
+
+        for gate in self._gates.values():
+            if gate.ready_at is None and not aborted:
+                logger.warning("⏱️  %s não ficou pronto em %.0fs (porta %s)", gate.name, timeout, gate.port)
+        return self.report(time.perf_counter() - origin, aborted)
+
+    def report(self, total: Optional[float] = None, aborted: bool = False) -> Dict[str, Dict]:
+        """Tempos de cada servidor: início (espera por dependências), boot e readiness."""
+        report = {}
+        for gate in self._gates.values():
+            report[gate.name] = {
+                "port": gate.port,
+                "depends_on": gate.depends_on,
+                "started_at": gate.started_at,
+                "ready_at": gate.ready_at,
+                "boot": gate.ready_at - gate.started_at if gate.ready_at is not None else None,
+                "ready": gate.ready_at is not None,
+                "degraded": gate.degraded,
+            }
+        if total is not None:
+            report["_total"] = {"seconds": round(total, 3), "aborted": aborted}
+        return report
+
+
+def format_startup_report(report: Dict[str, Dict]) -> str:
+    """Tabela com início, boot (início → pronto) e instante de readiness de cada servidor."""
+    lines = [f"{'servidor':<24} {'porta':>5} {'início':>8} {'boot':>8} {'pronto':>8}  dependências"]
+    lines.append("-" * 80)
+    def fmt(value):
+        return f"{value:7.2f}s" if value is not None else "       —"
+
+    for name, row in report.items():
+        if name.startswith("_"):
+            continue
+        deps = ", ".join(row["depends_on"]) if len(row["depends_on"]) <= 2 else f"{len(row['depends_on'])} servidores"
+        status = "" if row["ready"] else "  ❌ não ficou pronto"
+        if row["degraded"]:
+            status += "  ⚠️  iniciado sem todas as dependências"
+        lines.append(
+            f"{name:<24} {row['port']:>5} {fmt(row['started_at'])} {fmt(row['boot'])} {fmt(row['ready_at'])}  "
+            f"{deps or '—'}{status}"
+        )
+    if "_total" in report:
+        suffix = "  (interrompido)" if report["_total"].get("aborted") else ""
+        lines.append(f"Total: {report['_total']['seconds']:.2f}s{suffix}")
+    return "\n".join(lines)
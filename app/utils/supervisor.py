@@ -0,0 +1,227 @@
+"""
+Supervisor de processos para rodar cada servidor em seu próprio interpretador.
+Cada processo filho tem GIL próprio; se cair, é reiniciado com backoff
+exponencial. A saída de todos os filhos é agregada (linha a linha, com o nome
+do servidor como prefixo) no console e, opcionalmente, em arquivo.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, TextIO
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProcessSpec(NamedTuple):
+    """Processo supervisionado: nome (prefixo dos logs), comando e env extra."""
+    name: str
+    command: List[str]
+    env: Optional[Dict[str, str]] = None
+
+
+class _Child:
+    """Estado de um processo supervisionado."""
+
+    def __init__(self, spec: ProcessSpec):
+        self.spec = spec
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0  # Falhas seguidas (zera depois de rodar por `stable_after`)
+        self.next_start = 0.0
+        self.last_exit: Optional[int] = None
+        self.reader: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+
+class ProcessSupervisor:
+    """Inicia, monitora, reinicia e encerra um conjunto de processos."""
+
+    def __init__(
+        self,
+        specs: List[ProcessSpec],
+        backoff_initial: float = 0.1,
+        backoff_max: float = 30.0,
+        stable_after: float = 30.0,
+        stop_timeout: float = 10.0,
+        poll_interval: float = 0.1,
+        output: Optional[TextIO] = None,
+        log_file: Optional[str] = None
+    ):
+        """
+        Args:
+            specs: Processos, iniciados na ordem da lista
+            backoff_initial: Espera antes do primeiro reinício
+            backoff_max: Espera máxima entre reinícios (backoff dobra a cada falha)
+            stable_after: Segundos rodando para a falha seguinte voltar ao backoff inicial
+            stop_timeout: Prazo para encerrar com SIGTERM antes do SIGKILL
+            poll_interval: Intervalo de verificação dos processos
+            output: Destino da saída agregada (padrão: sys.stdout)
+            log_file: Arquivo que também recebe a saída agregada
+        """
+        self.children = {spec.name: _Child(spec) for spec in specs}
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.stop_timeout = stop_timeout
+        self.poll_interval = poll_interval
+        self.output = output or sys.stdout
+        self._log_file = open(log_file, "a", encoding="utf-8") if log_file else None
+        self._output_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._name_width = max((len(spec.name) for spec in specs), default=0)
+
+    @property
+    def stop_event(self) -> threading.Event:
+        """Sinalizado por `stop()` ou SIGINT/SIGTERM (interrompe também o plano de inicialização)."""
+        return self._stopping
+
+    def _spawn(self, child: _Child):
+        env = os.environ.copy()
+        env.update(child.spec.env or {})
+        # Filhos sem buffer: a saída chega ao supervisor linha a linha
+        env["PYTHONUNBUFFERED"] = "1"
+        child.process = subprocess.Popen(
+            child.spec.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            env=env,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            # Sessão própria: Ctrl+C no terminal chega só ao supervisor, que encerra em ordem
+            start_new_session=os.name == "posix",
+        )
+        child.started_at = time.monotonic()
+        child.reader = threading.Thread(
+            target=self._pump_output, args=(child.spec.name, child.process.stdout),
+            name=f"supervisor-log:{child.spec.name}", daemon=True
+        )
+        child.reader.start()
+        logger.info("▶️  %s iniciado (pid %s)", child.spec.name, child.process.pid)
+
+    def _pump_output(self, name: str, stream: TextIO):
+        """Copia a saída de um filho para o destino agregado, com prefixo."""
+        prefix = f"[{name:<{self._name_width}}] "
+        for line in stream:
+            self._write(prefix + line if line.endswith("\n") else prefix + line + "\n")
+        stream.close()
+
+    def _write(self, text: str):
+        with self._output_lock:
+            try:
+                self.output.write(text)
+                self.output.flush()
+                if self._log_file is not None:
+                    self._log_file.write(text)
+                    self._log_file.flush()
+            except (OSError, ValueError):
+                pass
+
+    def start(self, start_delay: float = 0.0):
+        """Inicia todos os processos na ordem das specs."""
+        for child in self.children.values():
+            if self._stopping.is_set():
+                return
+            self._spawn(child)
+            if start_delay:
+                self._stopping.wait(start_delay)
+
+    def start_one(self, name: str):
+        """Inicia um único processo (usado pelo plano de readiness para respeitar dependências)."""
+        child = self.children[name]
+        if not self._stopping.is_set() and not child.running:
+            self._spawn(child)
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.backoff_max, self.backoff_initial * 2 ** max(0, failures - 1))
+
+    def check(self):
+        """Reinicia (respeitando o backoff) os processos que terminaram."""
+        now = time.monotonic()
+        for child in self.children.values():
+            if self._stopping.is_set():
+                return
+            if child.process is None:
+                if child.next_start and now >= child.next_start:
+                    child.next_start = 0.0
+                    child.restarts += 1
+                    self._spawn(child)
+                continue
+            code = child.process.poll()
+            if code is None:
+                continue
+            child.last_exit = code
+            child.process = None
+            child.failures = 1 if now - child.started_at >= self.stable_after else child.failures + 1
+            delay = self._backoff(child.failures)
+            child.next_start = now + delay
+            logger.warning(
+                "💥 %s terminou (código %s); reiniciando em %.1fs (falha %d seguida)",
+                child.spec.name, code, delay, child.failures
+            )
+
+    def run(self):
+        """Monitora até `stop()` (ou SIGINT/SIGTERM, se `install_signal_handlers`)."""
+        try:
+            while not self._stopping.wait(self.poll_interval):
+                self.check()
+        finally:
+            logger.info("Encerrando %d processo(s)...", len(self.children))
+            self.stop()
+
+    def install_signal_handlers(self):
+        """SIGINT/SIGTERM no supervisor encerram todos os filhos de forma ordenada."""
+        def handle(signum, frame):
+            # Só sinaliza: logging dentro do handler pode travar em locks já adquiridos
+            self._stopping.set()
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+
+    def stop(self):
+        """Envia SIGTERM a todos (ordem inversa), espera `stop_timeout` e mata os restantes."""
+        self._stopping.set()
+        children = [child for child in reversed(list(self.children.values())) if child.running]
+        for child in children:
+            child.process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for child in children:
+            try:
+                child.process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning("%s não encerrou em %.0fs, enviando SIGKILL", child.spec.name, self.stop_timeout)
+                child.process.kill()
+                child.process.wait()
+        for child in self.children.values():
+            if child.reader is not None:
+                child.reader.join(2)
+        if self._log_file is not None:
+            with self._output_lock:
+                self._log_file.close()
+                self._log_file = None
+
+    def status(self) -> List[Dict]:
+        """Estado de cada processo: pid, reinícios, uptime e último código de saída."""
+        now = time.monotonic()
+        return [
+            {
+                "name": name,
+                "pid": child.process.pid if child.running else None,
+                "running": child.running,
+                "restarts": child.restarts,
+                "uptime_s": round(now - child.started_at, 1) if child.running else 0.0,
+                "last_exit": child.last_exit,
+            }
+            for name, child in self.children.items()
+        ]
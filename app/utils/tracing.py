@@ -0,0 +1,391 @@
+"""
+Rastreamento distribuído (tracing) leve entre UI, coordenador, agentes, LLM e MCP.
+O span atual vive em um `contextvars.ContextVar`; o contexto atravessa processos
+no formato W3C `traceparent`, dentro dos metadados da mensagem A2A
+(`metadata.custom_fields`) ou como header HTTP nas chamadas ao MCP. Spans
+finalizados são gravados em JSONL (um por linha) para montar a cascata
+(waterfall) de tempo por etapa. A gravação usa a fila e a thread de fundo dos
+logs (`app.utils.logger`), com rotação por tamanho do arquivo.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Mapping, NamedTuple, Optional
+
+TRACEPARENT = "traceparent"
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+DEFAULT_TRACE_FILE = Path(".devmentor") / "traces.jsonl"
+# Ao montar a cascata, lê só o fim do arquivo (traces recentes)
+TAIL_BYTES = 4 * 1024 * 1024
+# Rotação do arquivo de traces (DEVMENTOR_TRACE_MAX_BYTES, 0 desliga)
+DEFAULT_TRACE_MAX_BYTES = 16 * 1024 * 1024
+TRACE_BACKUP_COUNT = 2
+
+
+class SpanContext(NamedTuple):
+    """Identificação de um span remoto (pai de spans locais)."""
+    trace_id: str
+    span_id: str
+
+
+class Span:
+    """Uma etapa cronometrada de um trace."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        service: str = "devmentor",
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.service = service
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: Any):
+        """Marca o span como falho (exceção ou mensagem)."""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    def end(self):
+        """Finaliza o span (idempotente) e o envia ao exportador."""
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("devmentor_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Span ativo no contexto atual (thread ou task asyncio)."""
+    return _current_span.get()
+
+
+def start_span(
+    name: str,
+    service: Optional[str] = None,
+    parent: Optional[SpanContext] = None,
+    **attributes: Any
+) -> Span:
+    """
+    Cria um span filho do span ativo (ou de `parent`, vindo de outro processo).
+
+    O span não é ativado; use `activate` ou prefira o context manager `trace_span`.
+    """
+    active = current_span()
+    if parent is None and active is not None:
+        parent = active.context
+    if service is None:
+        service = active.service if active is not None else "devmentor"
+    trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+    return Span(name, trace_id, parent.span_id if parent else None, service, attributes)
+
+
+def activate(span: Optional[Span]) -> Token:
+    """Torna `span` o span ativo; devolve o token para `deactivate`."""
+    return _current_span.set(span)
+
+
+def deactivate(token: Token):
+    _current_span.reset(token)
+
+
+@contextmanager
+def trace_span(
+    name: str,
+    service: Optional[str] = None,
+    parent: Optional[SpanContext] = None,
+    **attributes: Any
+) -> Iterator[Span]:
+    """Cronometra o bloco como um span ativo; exceções marcam o span com erro."""
+    span = start_span(name, service, parent, **attributes)
+    token = activate(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        deactivate(token)
+        span.end()
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-01"
+
+
+def parse_traceparent(value: Any) -> Optional[SpanContext]:
+    """Converte um `traceparent` W3C em SpanContext (None se inválido)."""
+    match = TRACEPARENT_PATTERN.match(value) if isinstance(value, str) else None
+    return SpanContext(match.group(1), match.group(2)) if match else None
+
+
+def inject(carrier: Dict[str, Any]) -> Dict[str, Any]:
+    """Grava o contexto do span ativo em `carrier` (custom_fields ou headers)."""
+    span = current_span()
+    if span is not None:
+        carrier[TRACEPARENT] = format_traceparent(span.context)
+    return carrier
+
+
+def extract(carrier: Optional[Mapping[str, Any]]) -> Optional[SpanContext]:
+    """Lê o contexto de `carrier` (custom_fields ou headers)."""
+    if not carrier:
+        return None
+    return parse_traceparent(carrier.get(TRACEPARENT))
+
+
+def extract_from_task_payload(payload: Any) -> Optional[SpanContext]:
+    """
+    Procura o `traceparent` nos metadados da mensagem de uma requisição A2A.
+
+    Aceita o corpo JSON-RPC (`params.message`), uma tarefa (`message`) ou a
+    própria mensagem.
+    """
+    if not isinstance(payload, dict):
+        return None
+    if isinstance(payload.get("params"), dict):
+        payload = payload["params"]
+    message = payload.get("message") if isinstance(payload.get("message"), dict) else payload
+    metadata = message.get("metadata") or {}
+    if not isinstance(metadata, dict):
+        return None
+    return extract(metadata.get("custom_fields") or metadata)
+
+
+class _SpanFormatter(logging.Formatter):
+    """Serializa o span (dict em `record.msg`) na thread de escrita."""
+
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+class JsonlSpanExporter:
+    """
+    Grava spans em JSONL e mantém os mais recentes em memória.
+
+    `export` só enfileira o span; a serialização e a escrita em lote ficam na
+    thread de fundo dos logs (`BatchingQueueListener`). Com a fila cheia o span
+    é descartado e contado em `dropped`. O arquivo rotaciona ao passar de
+    `max_bytes`, guardando `backup_count` arquivos antigos sem compressão (lidos
+    por `load_trace`). Cada processo conta só o que escreveu, então com vários
+    processos no mesmo arquivo a rotação é aproximada.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        keep_recent: int = 2048,
+        max_bytes: int = DEFAULT_TRACE_MAX_BYTES,
+        backup_count: int = TRACE_BACKUP_COUNT
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=keep_recent)
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def _start(self):
+        """Abre a fila e a thread de escrita no primeiro span."""
+        # Import tardio: o logger importa este módulo (current_span)
+        from app.utils.logger import QUEUE_SIZE, BatchingFileHandler, BatchingQueueListener
+
+        with self._lock:
+            if self._listener is not None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                pass
+            handler = BatchingFileHandler(
+                self.path, max_bytes=self.max_bytes, backup_count=self.backup_count,
+                compress=False, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(_SpanFormatter())
+            # Tracing nunca deve derrubar a requisição nem poluir o stderr
+            handler.handleError = lambda record: None
+            listener = BatchingQueueListener(queue.Queue(maxsize=QUEUE_SIZE), handler)
+            listener.start()
+            listener._thread.name = "devmentor-trace-writer"
+            self._listener = listener
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        self.recent.append(record)
+        if self._listener is None:
+            self._start()
+        try:
+            self._listener.queue.put_nowait(logging.makeLogRecord({
+                "name": "devmentor.trace", "msg": record, "levelno": logging.INFO, "levelname": "INFO",
+            }))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Bloqueia até os spans enfileirados serem gravados."""
+        listener = self._listener
+        if listener is not None:
+            listener.queue.join()
+            listener._flush_handlers()
+
+    def close(self):
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            try:
+                listener.stop()
+            except queue.Full:
+                pass
+            for handler in listener.handlers:
+                handler.close()
+
+
+_exporter: Optional[JsonlSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_trace_file() -> Path:
+    """Arquivo de traces (DEVMENTOR_TRACE_FILE, padrão: .devmentor/traces.jsonl)."""
+    return Path(os.getenv("DEVMENTOR_TRACE_FILE") or DEFAULT_TRACE_FILE)
+
+
+def get_exporter() -> Optional[JsonlSpanExporter]:
+    """Exportador do processo; None se DEVMENTOR_TRACING=0."""
+    global _exporter
+    if os.getenv("DEVMENTOR_TRACING", "1") == "0":
+        return None
+    path = get_trace_file()
+    if _exporter is None or _exporter.path != path:
+        with _exporter_lock:
+            if _exporter is None or _exporter.path != path:
+                if _exporter is not None:
+                    _exporter.close()
+                max_bytes = int(os.getenv("DEVMENTOR_TRACE_MAX_BYTES", str(DEFAULT_TRACE_MAX_BYTES)) or 0)
+                _exporter = JsonlSpanExporter(path, max_bytes=max_bytes)
+    return _exporter
+
+
+def _close_exporter():
+    """Grava os spans pendentes ao sair do processo."""
+    if _exporter is not None:
+        _exporter.close()
+
+
+atexit.register(_close_exporter)
+
+
+def _read_tail(path: Path, size: int) -> bytes:
+    """Últimos `size` bytes do arquivo (vazio se não existe)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - size))
+            return f.read()
+    except OSError:
+        return b""
+
+
+def load_trace(trace_id: str, path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Spans de um trace, lidos do fim do arquivo JSONL, ordenados pelo início.
+
+    Se o arquivo atual tem menos de `TAIL_BYTES`, completa a janela com o fim
+    do arquivo rotacionado anterior (`.1`).
+    """
+    path = Path(path or get_trace_file())
+    exporter = _exporter
+    if exporter is not None and exporter.path == path:
+        exporter.flush()
+    data = _read_tail(path, TAIL_BYTES)
+    if len(data) < TAIL_BYTES:
+        data = _read_tail(Path(f"{path}.1"), TAIL_BYTES - len(data)) + b"\n" + data
+    spans, seen = [], set()
+    needle = trace_id.encode()
+    for line in data.splitlines():
+        if needle not in line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # Linha cortada no início da janela
+        if record.get("trace_id") == trace_id and record.get("span_id") not in seen:
+            seen.add(record.get("span_id"))
+            spans.append(record)
+    return sorted(spans, key=lambda span: span["start"])
+
+
+def format_waterfall(spans: List[Dict[str, Any]], width: int = 40) -> str:
+    """Cascata em texto: uma linha por span, indentada pela hierarquia."""
+    if not spans:
+        return "(nenhum span registrado)"
+    by_id = {span["span_id"]: span for span in spans}
+
+    def depth(span):
+        level, parent = 0, by_id.get(span.get("parent_id"))
+        while parent is not None and level < 32:
+            level, parent = level + 1, by_id.get(parent.get("parent_id"))
+        return level
+
+    origin = min(span["start"] for span in spans)
+    total_ms = max(
+        (span["start"] - origin) * 1000 + (span["duration_ms"] or 0) for span in spans
+    ) or 1.0
+    lines = [f"{'etapa':<34} {'serviço':<22} {'início':>9} {'duração':>10}", "-" * (80 + width)]
+    for span in spans:
+        offset_ms = (span["start"] - origin) * 1000
+        duration_ms = span["duration_ms"] or 0
+        start_col = int(offset_ms / total_ms * width)
+        bar_len = max(1, int(round(duration_ms / total_ms * width)))
+        bar = " " * start_col + "█" * min(bar_len, width - start_col)
+        marker = " ❌" if span.get("status") == "error" else ""
+        name = ("  " * depth(span) + span["name"])[:34]
+        lines.append(
+            f"{name:<34} {span['service'][:22]:<22} {offset_ms:>7.1f}ms {duration_ms:>8.1f}ms |{bar:<{width}}|{marker}"
+        )
+    return "\n".join(lines)
@@ -1,44 +1,71 @@
 """
 Script para iniciar todos os servidores da aplicação DevMentor AI.
-Inicializa na ordem correta:
+Inicializa guiado por readiness (sem esperas fixas):
   1. MCP Server (porta 5000) - Ferramentas e utilitários
-  2. Agentes Especializados (portas 8001-8005) - Agentes independentes
+  2. Agentes Especializados (portas 8001-8005, do AGENTS_DB) - Agentes independentes
+     (sobem em paralelo com o MCP)
      - Entrevistador de Algoritmos (8001)
      - Entrevistador de ML & Eng. Software (8002)
      - Professor Universitário (8003)
      - Code Reviewer (8004)
      - Soft Skills Coach (8005)
   3. Coordenador A2A (porta 8000) - Orquestra agentes especializados
-     (deve ser iniciado após os agentes, pois depende deles)
+     (iniciado assim que todos os agentes respondem em /metrics)
 
 Executar ANTES de rodar o Streamlit (streamlit run app.py).
+
+Modos:
+  --mode threads     (padrão) todos os servidores em threads deste processo
+  --mode supervisor  cada servidor em seu próprio processo, reiniciado se cair
+  --agents host      todas as personas em um único servidor (porta 8100),
+                     em /agents/<chave>, em vez de uma porta por persona
+  --serving asgi     agentes e coordenador sob uvicorn (tarefas como corrotinas,
+                     sem thread por requisição); --agent-workers N processos
+                     por servidor no modo supervisor
 """
 import os
 import sys
 import time
+import signal
 import logging
+import argparse
 import threading
 import subprocess
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.mcp.server import run_mcp_server
-from app.agents.coordinator import CoordinatorAgent
-from app.agents.interviewer_agents import AlgoInterviewerAgent, MLSystemInterviewerAgent
-from app.agents.tutor_agents import ConceptTutorAgent
-from app.agents.reviewer_agents import CodeReviewerAgent
-from app.agents.coach_agents import SoftSkillsCoachAgent
+# fastmcp, python_a2a e as personas são importados só pelo servidor que os usa:
+# o supervisor e cada processo filho carregam apenas o necessário
+from app import agents
+from app.mcp.agents_data import AGENTS_DB, get_agent_url
 from app.utils.logger import setup_logger
 from app.utils.diagnostics import diagnose_all_servers, diagnose_mcp_server, format_diagnostic_report
-from python_a2a.server.http import run_server
+from app.utils.health_monitor import HealthMonitor
+from app.utils.supervisor import ProcessSpec, ProcessSupervisor
+from app.utils.readiness import StartupPlan, format_startup_report
 
 # Configurar logging
 logger = setup_logger("devmentor.servers", level=logging.INFO)
 
+MCP_PORT = 5000
+COORDINATOR_PORT = 8000
+# Porta do host multi-persona (`--agents host`): todas as personas em /agents/<chave>
+AGENT_HOST_PORT = int(os.getenv("DEVMENTOR_AGENT_HOST_PORT", "8100"))
+# Prazo para todos os servidores ficarem prontos
+STARTUP_TIMEOUT = float(os.getenv("DEVMENTOR_STARTUP_TIMEOUT", "60"))
+
+# Agentes especializados por chave do AGENTS_DB: (classe em app.agents, nome, porta).
+# Derivado do registro das personas: uma persona nova só precisa de AGENTS_DB e AGENT_CLASS_NAMES
+AGENT_SERVERS = {
+    key: (class_name, AGENTS_DB[key]["display_name"], AGENTS_DB[key]["port"])
+    for key, class_name in agents.AGENT_CLASS_NAMES.items()
+}
+
 
 def check_environment():
     """Verifica variáveis de ambiente essenciais."""
@@ -62,12 +89,17 @@ def run_mcp_server_thread():
     """Executa servidor MCP em thread separada usando asyncio."""
     import asyncio
     import traceback
+    from app.mcp.server import run_mcp_server
     
     logger.info("📡 Iniciando Servidor MCP (porta 5000)...")
     logger.info("   Ferramentas disponíveis:")
     logger.info("   • generate_quiz_json(topic, difficulty, num_questions)")
     logger.info("   • read_file_snippet(file_path, start_line, end_line)")
     logger.info("   • search_docs(query)")
+    logger.info("   • search_code(query, regex, case_sensitive, path_glob, context_lines, max_results)")
+    logger.info("   • find_symbol(name, kind, include_source, max_lines)")
+    logger.info("   • find_callers(name, max_results)")
+    logger.info("   • lint_python(code, file_path, max_line_length, max_complexity, max_findings)")
     
     try:
         # Executa a função assíncrona em um novo event loop na thread
@@ -102,8 +134,16 @@ def run_coordinator_server(port: int = 8000):
     logger.info(f"🎯 Iniciando Coordenador A2A (porta {port})...")
     
     try:
+        if asgi_serving_enabled():
+            run_asgi("coordinator", port)
+            return
+        from python_a2a.server.http import run_server
         logger.debug(f"Criando instância do CoordinatorAgent na porta {port}")
-        coordinator = CoordinatorAgent(url=f"http://localhost:{port}")
+        coordinator = agents.CoordinatorAgent(url=f"http://localhost:{port}")
+        # Status dos agentes em background: o roteamento não sonda portas
+        coordinator.health_monitor = HealthMonitor(dict(coordinator._agent_urls))
+        coordinator.health_monitor.start()
+        threading.current_thread().name = coordinator.server_label
         logger.info("✓ Coordenador instanciado, iniciando servidor...")
         # Usar run_server() com host e port corretos
         run_server(coordinator, host="0.0.0.0", port=port, debug=False)
@@ -116,12 +156,21 @@ def run_coordinator_server(port: int = 8000):
 
 
 def run_agent_server(agent_class, agent_name: str, port: int):
-    """Executa servidor de agente em thread separada."""
+    """Executa servidor de agente em thread separada (`agent_class`: classe ou nome em app.agents)."""
     logger.info(f"Iniciando {agent_name} (porta {port})...")
     
     try:
+        if asgi_serving_enabled():
+            class_name = agent_class if isinstance(agent_class, str) else agent_class.__name__
+            run_asgi(next(key for key, name in agents.AGENT_CLASS_NAMES.items() if name == class_name), port)
+            return
+        from python_a2a.server.http import run_server
+        if isinstance(agent_class, str):
+            agent_class = getattr(agents, agent_class)
         logger.debug(f"Criando instância de {agent_name} na porta {port}")
         agent = agent_class(url=f"http://localhost:{port}")
+        # Nome da thread identifica o servidor no profiler (`/admin/profile`)
+        threading.current_thread().name = agent.server_label
         logger.info(f"✓ {agent_name} instanciado, iniciando servidor...")
         # Usar run_server() com host e port corretos
         run_server(agent, host="0.0.0.0", port=port, debug=False)
@@ -133,35 +182,164 @@ def run_agent_server(agent_class, agent_name: str, port: int):
         print(f"   Traceback: {traceback.format_exc()}")
 
 
-def start_agents_servers():
-    """Inicia todos os servidores de agentes em threads separadas."""
-    print("\n👥 Iniciando Agentes Especializados:")
+def run_agent_host(port: int = AGENT_HOST_PORT):
+    """Executa todas as personas em um único servidor (host multi-persona)."""
+    logger.info(f"🏠 Iniciando host multi-persona (porta {port})...")
     
-    agents_config = [
-        (AlgoInterviewerAgent, "Entrevistador de Algoritmos", 8001),
-        (MLSystemInterviewerAgent, "Entrevistador de ML & Eng. Software", 8002),
-        (ConceptTutorAgent, "Professor Universitário", 8003),
-        (CodeReviewerAgent, "Code Reviewer", 8004),
-        (SoftSkillsCoachAgent, "Soft Skills Coach", 8005),
-    ]
+    try:
+        if asgi_serving_enabled():
+            run_asgi("host", port)
+            return
+        from app.agents.host import AgentHost
+        host = AgentHost(base_url=f"http://localhost:{port}")
+        threading.current_thread().name = "server:agents"
+        host.serve(host="0.0.0.0", port=port)
+    except Exception as e:
+        import traceback
+        logger.error(f"Erro ao iniciar host multi-persona: {type(e).__name__}: {str(e)}")
+        logger.debug(f"Traceback completo:\n{traceback.format_exc()}")
+        print(f"❌ Erro ao iniciar host multi-persona: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+
+
+def use_agent_host(enabled: bool):
+    """Liga/desliga o modo host; o endereço vai por env para o coordenador e os processos filhos."""
+    if enabled:
+        os.environ["DEVMENTOR_AGENT_HOST_URL"] = f"http://localhost:{AGENT_HOST_PORT}"
+    else:
+        os.environ.pop("DEVMENTOR_AGENT_HOST_URL", None)
+
+
+def agent_host_enabled() -> bool:
+    return bool(os.getenv("DEVMENTOR_AGENT_HOST_URL"))
+
+
+def use_asgi_serving(enabled: bool, workers: int = 1):
+    """Liga/desliga o serviço ASGI dos agentes; vai por env para os processos filhos."""
+    os.environ["DEVMENTOR_AGENT_SERVING"] = "asgi" if enabled else "wsgi"
+    os.environ["DEVMENTOR_AGENT_WORKERS"] = str(max(1, workers))
+
+
+def asgi_serving_enabled() -> bool:
+    return os.getenv("DEVMENTOR_AGENT_SERVING") == "asgi"
+
+
+def run_asgi(target: str, port: int):
+    """Serve `target` (persona, "host" ou "coordinator") sob uvicorn."""
+    from app.agents.asgi import run_asgi_server
+
+    threading.current_thread().name = f"server:{target}"
+    # Vários workers só fazem sentido com o servidor no próprio processo (modo supervisor)
+    workers = int(os.getenv("DEVMENTOR_AGENT_WORKERS", "1"))
+    if threading.current_thread() is not threading.main_thread():
+        workers = 1
+    run_asgi_server(target, host="0.0.0.0", port=port, workers=workers)
+
+
+def start_server_thread(target, args: tuple, name: str) -> threading.Thread:
+    """Dispara um servidor em thread daemon (não espera ele ficar pronto)."""
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def build_startup_plan(start) -> StartupPlan:
+    """
+    Grafo de inicialização: MCP e agentes em paralelo; coordenador depois dos agentes.
+
+    Args:
+        start: Função `start(nome)` que dispara o servidor sem bloquear
+    """
+    plan = StartupPlan()
+    plan.add("mcp", lambda: start("mcp"), MCP_PORT)
+    if agent_host_enabled():
+        plan.add("agents", lambda: start("agents"), AGENT_HOST_PORT)
+        agent_servers = ["agents"]
+    else:
+        for key, (_, _, port) in AGENT_SERVERS.items():
+            plan.add(key, lambda key=key: start(key), port)
+        agent_servers = list(AGENT_SERVERS)
+    plan.add("coordinator", lambda: start("coordinator"), COORDINATOR_PORT, depends_on=agent_servers)
+    return plan
+
+
+def start_in_thread(name: str) -> threading.Thread:
+    """Inicia o servidor `name` em thread deste processo."""
+    if name == "mcp":
+        return start_server_thread(run_mcp_server_thread, (), "server:mcp")
+    if name == "coordinator":
+        return start_server_thread(run_coordinator_server, (COORDINATOR_PORT,), f"server:{COORDINATOR_PORT}")
+    if name == "agents":
+        return start_server_thread(run_agent_host, (AGENT_HOST_PORT,), "server:agents")
+    agent_class, agent_name, port = AGENT_SERVERS[name]
+    # Renomeada com a persona ao instanciar o agente
+    return start_server_thread(run_agent_server, (agent_class, agent_name, port), f"server:{port}")
+
+
+def print_startup_report(report: dict):
+    """Mostra quanto tempo cada servidor levou para ficar pronto."""
+    print("\n⏱️  TEMPOS DE INICIALIZAÇÃO (segundos desde o início):")
+    print(format_startup_report(report))
+
+
+def serve_single(name: str):
+    """Executa um único servidor neste processo (filho do modo supervisor)."""
+    # SIGTERM do supervisor vira SystemExit: os handlers de atexit (logs, traces) rodam
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if name == "mcp":
+        workers = int(os.getenv("MCP_WORKERS", "1"))
+        if workers > 1:
+            from app.mcp.server import run_mcp_server_workers
+            run_mcp_server_workers(port=5000, workers=workers)
+        else:
+            run_mcp_server_thread()
+    elif name == "coordinator":
+        run_coordinator_server()
+    elif name == "agents":
+        run_agent_host()
+    elif name in AGENT_SERVERS:
+        run_agent_server(*AGENT_SERVERS[name])
+    else:
+        raise SystemExit(f"Servidor desconhecido: {name}")
+
+
+def build_supervisor_specs(mcp_workers: int = 1) -> List[ProcessSpec]:
+    """Um processo por servidor, na ordem de dependência (MCP, agentes ou host, coordenador)."""
+    script = str(Path(__file__).resolve())
+    command = lambda name: [sys.executable, script, "--serve", name]
+    specs = [ProcessSpec("mcp", command("mcp"), {"MCP_WORKERS": str(mcp_workers)})]
+    agent_servers = ["agents"] if agent_host_enabled() else list(AGENT_SERVERS)
+    specs += [ProcessSpec(key, command(key)) for key in agent_servers]
+    specs.append(ProcessSpec("coordinator", command("coordinator")))
+    return specs
+
+
+def run_supervisor_mode(mcp_workers: int = 1, log_file: Optional[str] = None):
+    """Roda cada servidor em processo próprio e os mantém de pé até Ctrl+C."""
+    print("\n" * 2)
+    print("╔" + "=" * 78 + "╗")
+    print("║" + " " * 14 + "🚀 DEVMENTOR AI - INICIALIZANDO (MODO SUPERVISOR)" + " " * 14 + "║")
+    print("╚" + "=" * 78 + "╝")
     
-    # Iniciar cada agente em uma thread separada
-    threads = []
-    for agent_class, agent_name, port in agents_config:
-        thread = threading.Thread(
-            target=run_agent_server, 
-            args=(agent_class, agent_name, port),
-            daemon=True # Mantém a thread rodando em background
-        )
-        thread.start()
-        threads.append(thread)
-        time.sleep(0.5)  # Pequeno delay para evitar race conditions
+    check_environment()
     
-    return threads
+    supervisor = ProcessSupervisor(build_supervisor_specs(mcp_workers), log_file=log_file)
+    supervisor.install_signal_handlers()
+    # Cada processo sobe assim que suas dependências respondem; quem cai no boot já é
+    # reiniciado durante o plano, e Ctrl+C interrompe a espera
+    report = build_startup_plan(supervisor.start_one).run(
+        timeout=STARTUP_TIMEOUT, stop=supervisor.stop_event, on_poll=supervisor.check
+    )
+    print_startup_report(report)
+    if not supervisor.stop_event.is_set():
+        report_startup()
+    # Monitora e reinicia os processos até SIGINT/SIGTERM
+    supervisor.run()
+    print("\n⛔ Aplicação DevMentor AI encerrada.")
 
 
-def main():
-    """Inicializa toda a aplicação."""
+def run_thread_mode():
+    """Inicializa toda a aplicação em threads deste processo (desenvolvimento)."""
     print("\n" * 2)
     print("╔" + "=" * 78 + "╗")
     print("║" + " " * 20 + "🚀 DEVMENTOR AI - INICIALIZANDO APLICAÇÃO" + " " * 15 + "║")
@@ -169,66 +347,63 @@ def main():
     
     # 1. Verificar ambiente
     check_environment()
-    
-    # 2. Iniciar MCP Server (thread separada)
-    print("\n" + "-" * 80)
-    print("ETAPA 1: Servidor MCP")
-    print("-" * 80)
-    mcp_thread = threading.Thread(target=run_mcp_server_thread, daemon=True)
-    mcp_thread.start()
-    time.sleep(2)  # Aguardar inicialização do MCP
-    
-    # 3. Iniciar todos os agentes especializados (threads separadas)
-    # IMPORTANTE: Agentes devem ser iniciados ANTES do coordenador
-    # pois o coordenador depende deles para funcionar
+
+    # Neste modo todos os servidores dividem o processo: importa tudo de uma vez
+    # na thread principal, em vez de disputar os locks de import entre as threads
+    import app.mcp.server  # noqa: F401
+    import python_a2a.server.http  # noqa: F401
+    agents.AGENT_CLASSES
+    if agent_host_enabled():
+        import app.agents.host  # noqa: F401
+    if asgi_serving_enabled():
+        import app.agents.asgi  # noqa: F401
+
+    # 2. MCP e agentes em paralelo; coordenador assim que os agentes estiverem prontos
     print("\n" + "-" * 80)
-    print("ETAPA 2: Agentes Especializados")
+    print("Iniciando servidores (MCP e agentes em paralelo, coordenador após os agentes)")
     print("-" * 80)
-    agent_threads = start_agents_servers()
-    time.sleep(3)  # Aguardar inicialização de todos os agentes
+    report = build_startup_plan(start_in_thread).run(timeout=STARTUP_TIMEOUT)
+    print_startup_report(report)
     
-    # 4. Iniciar Coordenador (thread separada)
-    # Coordenador é iniciado por último pois depende dos agentes estarem prontos
-    print("\n" + "-" * 80)
-    print("ETAPA 3: Coordenador A2A")
-    print("-" * 80)
-    coordinator_thread = threading.Thread(target=run_coordinator_server, daemon=True)
-    coordinator_thread.start()
-    time.sleep(2)  # Aguardar inicialização do coordenador
+    report_startup()
     
-    # 5. Status final e diagnóstico
+    # Manter aplicação rodando
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n\n⛔ Encerrando aplicação DevMentor AI...")
+        print("=" * 80)
+        sys.exit(0)
+
+
+def report_startup():
+    """Diagnóstico dos servidores e resumo final da inicialização."""
+    # Status final e diagnóstico
     print("\n" + "=" * 80)
     print("✅ APLICAÇÃO DEVMENTOR AI INICIALIZADA!")
     print("=" * 80)
     
-    logger.info("Aguardando servidores estabilizarem antes do diagnóstico...")
-    time.sleep(2)  # Aguardar servidores estabilizarem
-    
     # Executar diagnóstico do MCP server (protocolo diferente)
     logger.info("Executando diagnóstico do servidor MCP...")
     mcp_diagnostic = diagnose_mcp_server(5000)
     
     # Executar diagnóstico dos servidores A2A
+    # (nome, porta, URL): no modo host as personas dividem a porta e diferem no caminho
     agents_config = [
-        ("Algo Interviewer", 8001),
-        ("ML & Eng. Interviewer", 8002),
-        ("Concept Tutor", 8003),
-        ("Code Reviewer", 8004),
-        ("Soft Skills Coach", 8005),
-        ("Coordinator", 8000),
+        (agent_name, port, get_agent_url(key)) for key, (_, agent_name, port) in AGENT_SERVERS.items()
     ]
+    if agent_host_enabled():
+        agents_config = [(name, AGENT_HOST_PORT, url) for name, _, url in agents_config]
+    agents_config.append(("Coordinator", COORDINATOR_PORT, f"http://localhost:{COORDINATOR_PORT}"))
     
     logger.info("Executando diagnóstico dos servidores A2A...")
     diagnostic_results = diagnose_all_servers(agents_config)
     
     print("\n📊 SERVIDORES ATIVOS:")
-    print("   • MCP Server:           http://localhost:5000")
-    print("   • Coordenador A2A:      http://localhost:8000")
-    print("   • Algo Interviewer:     http://localhost:8001")
-    print("   • ML & Eng. Interviewer: http://localhost:8002")
-    print("   • Concept Tutor:        http://localhost:8003")
-    print("   • Code Reviewer:        http://localhost:8004")
-    print("   • Soft Skills Coach:    http://localhost:8005")
+    print(f"   • {'MCP Server:':<38} http://localhost:{MCP_PORT}")
+    for name, _, url in agents_config:
+        print(f"   • {name + ':':<38} {url}")
     
     # Mostrar status do MCP server
     mcp_status = "✅ Saudável" if mcp_diagnostic["overall_status"] == "healthy" else "⚠️  Verificar"
@@ -258,15 +433,45 @@ def main():
     print("   Execute em outro terminal:")
     print("   $ streamlit run app.py")
     print("\n" + "=" * 80 + "\n")
+
+
+def main(argv=None):
+    """Inicializa a aplicação no modo escolhido."""
+    parser = argparse.ArgumentParser(description="Inicia os servidores do DevMentor AI.")
+    parser.add_argument(
+        "--mode", choices=("threads", "supervisor"), default=os.getenv("DEVMENTOR_SERVER_MODE", "threads"),
+        help="threads: um processo (desenvolvimento); supervisor: um processo por servidor"
+    )
+    parser.add_argument(
+        "--mcp-workers", type=int, default=int(os.getenv("MCP_WORKERS", "1")),
+        help="Processos worker do servidor MCP no modo supervisor"
+    )
+    parser.add_argument(
+        "--agents", choices=("ports", "host"), default=os.getenv("DEVMENTOR_AGENT_MODE", "ports"),
+        help="ports: uma porta por persona; host: todas as personas em um servidor (porta %d)" % AGENT_HOST_PORT
+    )
+    parser.add_argument(
+        "--serving", choices=("wsgi", "asgi"), default=os.getenv("DEVMENTOR_AGENT_SERVING", "wsgi"),
+        help="wsgi: servidor Flask do python_a2a; asgi: uvicorn, tarefas como corrotinas"
+    )
+    parser.add_argument(
+        "--agent-workers", type=int, default=int(os.getenv("DEVMENTOR_AGENT_WORKERS", "1")),
+        help="Processos uvicorn por servidor de agente com --serving asgi (modo supervisor)"
+    )
+    parser.add_argument("--log-file", help="Arquivo que recebe a saída agregada dos processos (modo supervisor)")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)  # Uso interno: filho do supervisor
+    args = parser.parse_args(argv)
     
-    # Manter aplicação rodando
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n\n⛔ Encerrando aplicação DevMentor AI...")
-        print("=" * 80)
-        sys.exit(0)
+    if args.serve:
+        # Filho do supervisor: o modo dos agentes chega por env
+        serve_single(args.serve)
+        return
+    use_agent_host(args.agents == "host")
+    use_asgi_serving(args.serving == "asgi", args.agent_workers)
+    if args.mode == "supervisor":
+        run_supervisor_mode(args.mcp_workers, args.log_file)
+    else:
+        run_thread_mode()
 
 
 if __name__ == "__main__":
@@ -41,3 +41,11 @@ def sample_quiz_data():
         "difficulty": "Mid",
         "num_questions": 3
     }
+
+
+@pytest.fixture(autouse=True)
+def isolated_trace_file(tmp_path, monkeypatch):
+    """Grava os spans de cada teste em arquivo temporário."""
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("DEVMENTOR_TRACE_FILE", str(trace_file))
+    return trace_file
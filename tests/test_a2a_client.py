@@ -0,0 +1,114 @@
+"""
+Testes para o pool de clientes A2A da interface.
+"""
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import uvicorn
+from python_a2a import ErrorContent, Message, MessageRole, TextContent
+from app.agents.asgi import create_asgi_app
+from app.agents.base_agent import BaseAgent
+from app.services.a2a_client import A2AClientPool
+from app.utils.health_monitor import HealthMonitor
+
+
+def _free_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@contextmanager
+def _echo_agent(port: int):
+    """Agente A2A real (eco do A2AServer) na porta; devolve (url, agente)."""
+    agent = BaseAgent(name="Echo Agent", description="d", prompt="p", url=f"http://127.0.0.1:{port}")
+    server = uvicorn.Server(uvicorn.Config(create_asgi_app(agent), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}", agent
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+
+def _message(text: str) -> Message:
+    return Message(content=TextContent(text=text), role=MessageRole.USER)
+
+
+def _new_connections(pool: A2AClientPool, url: str) -> int:
+    """Conexões TCP abertas pela sessão da origem de `url` até agora."""
+    session = pool.get(url).session
+    pools = session.get_adapter(url).poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+
+class TestA2AClientPool:
+    """Testes de cache de clientes, keep-alive e invalidação."""
+
+    def test_reuses_client_and_connection(self):
+        """Mensagens seguidas devem usar o mesmo cliente e a mesma conexão TCP."""
+        with _echo_agent(_free_port()) as (url, agent):
+            pool = A2AClientPool()
+            replies = [pool.send_message(url, _message(f"oi {i}")) for i in range(20)]
+
+            assert [reply.content.text for reply in replies] == [f"oi {i}" for i in range(20)]
+            assert pool.get(url) is pool.get(url + "/")
+            assert _new_connections(pool, url) == 1
+
+    def test_warm_up_opens_connections_and_fetches_card(self):
+        """O aquecimento deve buscar o card e indicar agentes fora do ar."""
+        dead = f"http://127.0.0.1:{_free_port()}"
+        with _echo_agent(_free_port()) as (url, agent):
+            pool = A2AClientPool()
+            result = pool.warm_up([url, dead], timeout=1)
+
+            assert result == {url: True, dead: False}
+            assert pool.get(url).agent_card["name"] == agent.agent_card.name
+            pool.send_message(url, _message("oi"))
+            assert _new_connections(pool, url) == 1
+
+    def test_survives_agent_restart(self):
+        """Após o agente reiniciar na mesma porta, a próxima mensagem deve funcionar."""
+        port = _free_port()
+        pool = A2AClientPool()
+        with _echo_agent(port) as (url, agent):
+            assert pool.send_message(url, _message("antes")).content.text == "antes"
+        with _echo_agent(port) as (url, agent):
+            assert pool.send_message(url, _message("depois")).content.text == "depois"
+
+    def test_health_monitor_recovery_invalidates_client(self):
+        """Agente que volta ao ar segundo o monitor deve ganhar cliente novo."""
+        statuses = {"echo": "port_closed"}
+        probe = lambda config, deadline: {"servers": {
+            name: {"overall_status": statuses[name], "port_open": statuses[name] != "port_closed"}
+            for name, *_ in config
+        }}
+        monitor = HealthMonitor({"echo": "http://127.0.0.1:8999"}, probe=probe)
+        pool = A2AClientPool()
+        pool.watch(monitor, {"echo": "http://127.0.0.1:8999"})
+        before = pool.get("http://127.0.0.1:8999")
+
+        monitor.probe_now()
+        statuses["echo"] = "healthy"
+        monitor.probe_now()
+
+        assert pool.get("http://127.0.0.1:8999") is not before
+
+    def test_rpc_error_becomes_error_content(self):
+        """Erro JSON-RPC do agente deve virar ErrorContent, como no A2AClient."""
+        with _echo_agent(_free_port()) as (url, agent):
+            async def fail(task):
+                raise RuntimeError("LLM indisponível")
+
+            agent.ahandle_task = fail
+            reply = A2AClientPool().send_message(url, _message("oi"))
+
+        assert isinstance(reply.content, ErrorContent)
+        assert "LLM indisponível" in reply.content.message
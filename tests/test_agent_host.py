@@ -0,0 +1,93 @@
+"""
+Testes para o host multi-persona.
+"""
+from unittest.mock import MagicMock, patch
+import pytest
+from werkzeug.test import Client
+from app.agents.coordinator import CoordinatorAgent
+from app.agents.host import AgentHost
+from app.mcp.agents_data import get_agent_url
+from app.utils.health_monitor import HealthMonitor
+
+
+def _task(text: str) -> dict:
+    return {"jsonrpc": "2.0", "id": 1, "method": "tasks/send", "params": {
+        "id": "t1", "message": {"content": {"type": "text", "text": text}, "role": "user"},
+    }}
+
+
+@pytest.fixture
+def host(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+    return AgentHost(keys=["concept_tutor", "soft_skills_coach"], base_url="http://localhost:8100")
+
+
+class TestAgentHost:
+    """Testes de roteamento por caminho e recursos compartilhados."""
+
+    def test_index_lists_personas_with_path_urls(self, host):
+        """A raiz deve listar as personas servidas e suas URLs."""
+        client = Client(host.app)
+
+        data = client.get("/health").get_json()
+
+        assert set(data["agents"]) == {"concept_tutor", "soft_skills_coach"}
+        assert data["agents"]["concept_tutor"]["url"] == "http://localhost:8100/agents/concept_tutor"
+        assert client.get("/metrics").status_code == 200
+        assert client.get("/agents/code_reviewer/tasks/send").status_code == 404
+
+    def test_personas_share_one_llm_client(self, host):
+        """Tarefas de personas diferentes devem usar o mesmo cliente LLM."""
+        response = MagicMock()
+        response.choices[0].message.content = "resposta"
+        response.usage = {"prompt_tokens": 1, "completion_tokens": 1}
+        client = Client(host.app)
+
+        with patch("app.agents.host.OpenAI") as mock_openai:
+            mock_openai.return_value.chat.completions.with_raw_response.create.return_value.parse.return_value = response
+            for key in ("concept_tutor", "soft_skills_coach"):
+                reply = client.post(f"/agents/{key}/tasks/send", json=_task("Explique recursão"))
+                assert reply.status_code == 200
+                assert "resposta" in reply.get_data(as_text=True)
+
+        mock_openai.assert_called_once()
+        assert mock_openai.return_value.chat.completions.with_raw_response.create.call_count == 2
+        assert host.agents["concept_tutor"].mcp_session is host.agents["soft_skills_coach"].mcp_session
+
+    def test_unknown_persona_is_rejected(self):
+        """Personas fora de AGENT_CLASSES devem falhar na criação do host."""
+        with pytest.raises(ValueError):
+            AgentHost(keys=["inexistente"])
+
+
+class TestHostAddressing:
+    """Testes dos endereços das personas no modo host."""
+
+    def test_agent_url_follows_host_env(self, monkeypatch):
+        """Com DEVMENTOR_AGENT_HOST_URL, as URLs viram rotas do host."""
+        monkeypatch.delenv("DEVMENTOR_AGENT_HOST_URL", raising=False)
+        assert get_agent_url("code_reviewer") == "http://localhost:8004"
+
+        monkeypatch.setenv("DEVMENTOR_AGENT_HOST_URL", "http://localhost:8100/")
+        assert get_agent_url("code_reviewer") == "http://localhost:8100/agents/code_reviewer"
+
+    def test_coordinator_routes_to_host_urls(self, monkeypatch):
+        """O coordenador deve criar clientes A2A com as URLs do host."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        monkeypatch.setenv("DEVMENTOR_AGENT_HOST_URL", "http://localhost:8100")
+        coordinator = CoordinatorAgent(port=8000, url="http://localhost:8000")
+
+        with patch("app.agents.coordinator.A2AClient") as mock_client:
+            coordinator._get_agent_client("concept_tutor")
+
+        mock_client.assert_called_once_with("http://localhost:8100/agents/concept_tutor")
+
+    def test_health_monitor_probes_url_targets(self):
+        """Alvos por URL devem ser sondados na URL, com a porta extraída dela."""
+        probe = MagicMock(return_value={"servers": {"a": {"overall_status": "healthy", "port_open": True}}})
+        monitor = HealthMonitor({"a": "http://localhost:8100/agents/a"}, probe=probe)
+
+        status = monitor.probe_now()["a"]
+
+        assert probe.call_args[0][0] == [("a", 8100, "http://localhost:8100/agents/a")]
+        assert status["port"] == 8100 and status["healthy"]
@@ -0,0 +1,243 @@
+"""
+Testes para o servidor ASGI dos agentes A2A.
+"""
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import httpx
+import uvicorn
+from python_a2a import A2AClient, Message, MessageRole, TextContent
+from app.agents.asgi import create_asgi_app, create_asgi_host_app
+from app.agents.coordinator import CoordinatorAgent
+from app.agents.tutor_agents import ConceptTutorAgent
+from app.bench import stub_llm
+from app.bench.stub_llm import StubLLMConfig
+
+
+@contextmanager
+def _serve(app):
+    """App ASGI rodando em porta local real durante o bloco."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+
+@contextmanager
+def _tutor(monkeypatch, config: StubLLMConfig):
+    """Tutor sob ASGI falando com o LLM stub; devolve (url do agente, agente)."""
+    with _serve(stub_llm.create_app(config)) as llm_url:
+        monkeypatch.setenv("LLM_BASE_URL", f"{llm_url}/v1")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-stub-local-0000000000")
+        agent = ConceptTutorAgent(url="http://localhost:8003")
+        with _serve(create_asgi_app(agent)) as url:
+            yield url, agent
+
+
+def _task(task_id: str, text: str) -> dict:
+    return {"jsonrpc": "2.0", "id": 1, "method": "tasks/send", "params": {
+        "id": task_id, "message": {"content": {"type": "text", "text": text}, "role": "user"},
+    }}
+
+
+class TestAsgiAgent:
+    """Testes do protocolo A2A e da concorrência sem thread por requisição."""
+
+    def test_hundreds_of_concurrent_tasks(self, monkeypatch):
+        """200 tarefas simultâneas devem esperar o LLM juntas, sem uma thread cada."""
+        config = StubLLMConfig(ttft=0.5, tokens_per_second=0, output_tokens=4)
+        with _tutor(monkeypatch, config) as (url, agent):
+            threads_before = threading.active_count()
+
+            async def send_all():
+                async with httpx.AsyncClient(limits=httpx.Limits(max_connections=300), timeout=30) as client:
+                    return await asyncio.gather(*[
+                        client.post(f"{url}/tasks/send", json=_task(f"t{i}", "Explique recursão"))
+                        for i in range(200)
+                    ])
+
+            start = time.perf_counter()
+            replies = asyncio.run(send_all())
+            elapsed = time.perf_counter() - start
+            threads_after = threading.active_count()
+
+        assert all(reply.status_code == 200 for reply in replies)
+        assert all(reply.json()["result"]["artifacts"][0]["parts"][0]["text"] for reply in replies)
+        # Em série seriam 100 s de TTFT; juntas, pouco mais que um
+        assert elapsed < 10
+        assert threads_after - threads_before < 10
+        assert len(agent.tasks) == 200
+
+    def test_a2a_client_round_trip_and_card(self, monkeypatch):
+        """O A2AClient do python_a2a deve conversar com o servidor ASGI sem mudanças."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=0, tokens_per_second=0, output_tokens=3)) as (url, agent):
+            reply = A2AClient(url).send_message(
+                Message(content=TextContent(text="O que é um heap?"), role=MessageRole.USER)
+            )
+            card = httpx.get(f"{url}/agent.json").json()
+            health = httpx.get(f"{url}/a2a/health").json()
+
+        assert len(reply.content.text.split()) == 3
+        assert card["name"] == agent.agent_card.name
+        assert health["status"] == "ok"
+
+    def test_cancel_interrupts_running_task(self, monkeypatch):
+        """`tasks/cancel` deve interromper a tarefa em andamento e marcá-la como cancelada."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=10, tokens_per_second=0)) as (url, agent):
+
+            async def send_and_cancel():
+                async with httpx.AsyncClient(timeout=30) as client:
+                    sending = asyncio.ensure_future(client.post(f"{url}/tasks/send", json=_task("longa", "oi")))
+                    while "longa" not in agent.tasks and not sending.done():
+                        cancel = await client.post(f"{url}/tasks/cancel", json={"id": "longa"})
+                        if cancel.status_code == 200:
+                            break
+                        await asyncio.sleep(0.02)
+                    return cancel, await sending
+
+            start = time.perf_counter()
+            cancel, reply = asyncio.run(send_and_cancel())
+
+        assert time.perf_counter() - start < 5
+        assert cancel.json()["status"]["state"] == "canceled"
+        assert reply.json()["result"]["status"]["state"] == "canceled"
+
+    def test_stream_sends_deltas_then_complete(self, monkeypatch):
+        """`tasks/stream` deve emitir `update`, os trechos do LLM em `delta` e a tarefa final em `complete`."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=0, tokens_per_second=0, output_tokens=5)) as (url, agent):
+            payload = _task("s1", "O que é uma fila?")
+            payload["method"] = "tasks/sendSubscribe"
+            with httpx.stream("POST", f"{url}/tasks/stream", json=payload, timeout=10) as reply:
+                events = [line.split(": ", 1)[1] for line in reply.iter_lines() if line.startswith("event:")]
+
+        assert events[0] == "update"
+        assert events[-1] == "complete"
+        assert events.count("delta") == 5
+        assert len(agent.tasks["s1"].artifacts[0]["parts"][0]["text"].split()) == 5
+
+    def test_stream_disconnect_aborts_llm_call(self, monkeypatch):
+        """Cliente que fecha o stream deve fazer o agente cancelar a tarefa e largar o LLM."""
+        with _serve(stub_llm.create_app(StubLLMConfig(ttft=0, tokens_per_second=2, output_tokens=100))) as llm_url:
+            monkeypatch.setenv("LLM_BASE_URL", f"{llm_url}/v1")
+            monkeypatch.setenv("OPENROUTER_API_KEY", "sk-stub-local-0000000000")
+            agent = ConceptTutorAgent(url="http://localhost:8003")
+            with _serve(create_asgi_app(agent)) as url:
+                with httpx.stream("POST", f"{url}/tasks/stream", json=_task("s2", "oi"), timeout=10) as reply:
+                    for line in reply.iter_lines():
+                        if line == "event: delta":
+                            break
+                deadline = time.monotonic() + 5
+                while "s2" not in agent.tasks and time.monotonic() < deadline:
+                    time.sleep(0.02)
+                in_flight = httpx.get(f"{llm_url}/stub/stats").json()["in_flight"]
+
+        assert agent.tasks["s2"].status.state.value == "canceled"
+        assert in_flight == 0
+
+    def test_send_disconnect_aborts_llm_call(self, monkeypatch):
+        """Cliente que fecha a conexão de `tasks/send` deve fazer o agente cancelar a tarefa em andamento."""
+        with _serve(stub_llm.create_app(StubLLMConfig(ttft=30, tokens_per_second=0))) as llm_url:
+            monkeypatch.setenv("LLM_BASE_URL", f"{llm_url}/v1")
+            monkeypatch.setenv("OPENROUTER_API_KEY", "sk-stub-local-0000000000")
+            agent = ConceptTutorAgent(url="http://localhost:8003")
+            with _serve(create_asgi_app(agent)) as url:
+
+                async def send_and_disconnect():
+                    async with httpx.AsyncClient(timeout=30) as client:
+                        sending = asyncio.ensure_future(client.post(f"{url}/tasks/send", json=_task("d1", "oi")))
+                        deadline = time.monotonic() + 5
+                        while httpx.get(f"{llm_url}/stub/stats").json()["in_flight"] == 0 and time.monotonic() < deadline:
+                            await asyncio.sleep(0.02)
+                        sending.cancel()
+
+                start = time.perf_counter()
+                asyncio.run(send_and_disconnect())
+                deadline = time.monotonic() + 5
+                while "d1" not in agent.tasks and time.monotonic() < deadline:
+                    time.sleep(0.02)
+
+        # O stub só responde após 30 s; a tarefa termina antes porque foi cancelada
+        assert time.perf_counter() - start < 10
+        assert agent.tasks["d1"].status.state.value == "canceled"
+
+    def test_unknown_task_is_not_found(self, monkeypatch):
+        """`tasks/get` de id desconhecido deve responder o erro JSON-RPC do python_a2a."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=0)) as (url, agent):
+            reply = httpx.post(f"{url}/tasks/get", json={"jsonrpc": "2.0", "id": 7, "params": {"id": "x"}})
+
+        assert reply.status_code == 404
+        assert reply.json()["error"]["code"] == -32000
+
+
+class TestAsgiRouting:
+    """Testes do coordenador assíncrono e do host ASGI."""
+
+    def test_coordinator_routes_asynchronously(self, monkeypatch):
+        """O coordenador deve rotear por `tasks/send` aguardado até o agente ASGI."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=0, tokens_per_second=0, output_tokens=2)) as (url, agent):
+            coordinator = CoordinatorAgent(url="http://localhost:8000", agent_urls={"concept_tutor": url})
+
+            async def route():
+                try:
+                    return await coordinator.aroute_to_agent("concept_tutor", "O que é um grafo?")
+                finally:
+                    await coordinator.aclose()
+
+            reply = asyncio.run(route())
+            missing = asyncio.run(CoordinatorAgent(
+                url="http://localhost:8000", agent_urls={"concept_tutor": "http://127.0.0.1:9"}
+            ).aroute_to_agent("concept_tutor", "oi"))
+
+        assert len(reply.split()) == 2
+        assert missing.startswith("❌ Erro ao comunicar com agente concept_tutor")
+
+    def test_coordinator_reports_http_errors(self, monkeypatch):
+        """Resposta HTML de erro (ex: 502 do proxy) deve virar erro com o status, não JSONDecodeError."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        def reply(request):
+            if request.url.path.startswith("/html"):
+                return httpx.Response(502, text="<html>Bad Gateway</html>")
+            return httpx.Response(404, json={"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "Task not found"}})
+
+        coordinator = CoordinatorAgent(url="http://localhost:8000", agent_urls={
+            "concept_tutor": "http://agente/html", "code_reviewer": "http://agente/rpc",
+        })
+        coordinator._async_http = httpx.AsyncClient(transport=httpx.MockTransport(reply))
+
+        async def route():
+            try:
+                return [await coordinator.aroute_to_agent(key, "oi") for key in ("concept_tutor", "code_reviewer")]
+            finally:
+                await coordinator.aclose()
+
+        html, rpc = asyncio.run(route())
+
+        assert html == "❌ Erro ao comunicar com agente concept_tutor: HTTP 502 Bad Gateway"
+        assert rpc == "❌ Erro ao comunicar com agente code_reviewer: Task not found"
+
+    def test_host_mounts_personas(self, monkeypatch):
+        """O host ASGI deve servir as personas em /agents/<chave>."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        app = create_asgi_host_app(keys=["concept_tutor"], base_url="http://localhost:8100")
+
+        with _serve(app) as url:
+            index = httpx.get(f"{url}/health").json()
+            card = httpx.get(f"{url}/agents/concept_tutor/agent.json")
+            missing = httpx.post(f"{url}/agents/code_reviewer/tasks/send", json=_task("t", "oi"))
+
+        assert index["agents"]["concept_tutor"]["url"] == "http://localhost:8100/agents/concept_tutor"
+        assert card.status_code == 200
+        assert missing.status_code == 404
@@ -3,7 +3,7 @@ Testes para o agente base.
 """
 import pytest
 import os
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from app.agents.base_agent import BaseAgent
 
 
@@ -36,7 +36,7 @@ class TestBaseAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Test response"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = BaseAgent(
@@ -72,3 +72,108 @@ class TestBaseAgent:
         
         result = agent._execute_mcp_tool("test_tool", {"arg": "value"})
         assert result == "Tool result"
+    
+    @patch('app.agents.base_agent.requests.post')
+    def test_execute_mcp_tools_batch_orders_results(self, mock_post):
+        """Deve devolver resultados do lote na ordem das chamadas."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.iter_lines.return_value = [
+            '{"index": 1, "id": 1, "tool": "b", "ok": true, "result": "B", "elapsed_ms": 1.0}',
+            '{"index": 0, "id": 0, "tool": "a", "ok": true, "result": "A", "elapsed_ms": 2.0}',
+        ]
+        mock_post.return_value = mock_response
+        
+        agent = BaseAgent(
+            name="Test",
+            description="Test",
+            prompt="Test",
+            port=9000,
+            url="http://localhost:9000"
+        )
+        
+        results = agent._execute_mcp_tools_batch([{"tool": "a"}, {"tool": "b"}])
+        
+        assert [r["result"] for r in results] == ["A", "B"]
+        assert mock_post.call_args[0][0] == "http://localhost:5000/batch"
+    
+    @patch('app.agents.base_agent.requests.post')
+    def test_execute_mcp_tools_batch_connection_error(self, mock_post):
+        """Falha de conexão deve virar erro em cada chamada."""
+        mock_post.side_effect = Exception("Connection refused")
+        
+        agent = BaseAgent(
+            name="Test",
+            description="Test",
+            prompt="Test",
+            port=9000,
+            url="http://localhost:9000"
+        )
+        
+        results = agent._execute_mcp_tools_batch([{"tool": "a"}, {"tool": "b"}])
+        
+        assert all(not r["ok"] and "Connection refused" in r["error"] for r in results)
+    
+    def test_acall_llm_streams_to_delta_sink(self, mock_env):
+        """Com destino de tokens ativo, deve transmitir os trechos, registrar o usage do último chunk e fechar o stream."""
+        import asyncio
+        from types import SimpleNamespace
+        from app.agents.base_agent import reset_delta_sink, set_delta_sink
+        
+        usage = SimpleNamespace(prompt_tokens=7, completion_tokens=2)
+        chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Olá "))], usage=None),
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="mundo"))], usage=None),
+            SimpleNamespace(choices=[], usage=usage),
+        ]
+        
+        class FakeStream:
+            def __init__(self):
+                self.response = MagicMock()
+                self.response.aclose = AsyncMock()
+            
+            def __aiter__(self):
+                return self._iterate()
+            
+            async def _iterate(self):
+                for chunk in chunks:
+                    yield chunk
+        
+        stream = FakeStream()
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=stream)
+        agent = BaseAgent(name="Test", description="Test", prompt="Test", port=9000, url="http://localhost:9000")
+        agent.async_llm_client_provider = lambda: client
+        agent._record_usage = Mock()
+        deltas = []
+        
+        token = set_delta_sink(deltas.append)
+        try:
+            response = asyncio.run(agent.acall_llm([{"role": "user", "content": "oi"}]))
+        finally:
+            reset_delta_sink(token)
+        
+        assert response == "Olá mundo"
+        assert deltas == ["Olá ", "mundo"]
+        assert client.chat.completions.create.call_args.kwargs["stream"] is True
+        assert agent._record_usage.call_args.args[3] is usage
+        stream.response.aclose.assert_awaited_once()
+    
+    def test_arespond_builds_messages_and_completes_task(self):
+        """`_arespond` deve montar as mensagens (padrão ou da persona) e anexar a resposta à tarefa."""
+        import asyncio
+        from types import SimpleNamespace
+        
+        agent = BaseAgent(name="Test", description="Test", prompt="Prompt", port=9000, url="http://localhost:9000")
+        agent.acall_llm = AsyncMock(return_value="resposta")
+        task = SimpleNamespace(message={"content": {"type": "text", "text": "oi"}}, artifacts=None)
+        
+        result = asyncio.run(agent._arespond(task))
+        
+        assert result.artifacts[0]["parts"][0]["text"] == "resposta"
+        assert agent.acall_llm.call_args.args[0] == [
+            {"role": "system", "content": "Prompt"},
+            {"role": "user", "content": "oi"},
+        ]
+        asyncio.run(agent._arespond(task, "Outro", lambda prompt, text: [{"role": "user", "content": prompt + text}]))
+        assert agent.acall_llm.call_args.args[0] == [{"role": "user", "content": "Outrooi"}]
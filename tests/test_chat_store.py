@@ -0,0 +1,77 @@
+"""
+Testes para o histórico de conversas em SQLite.
+"""
+import sqlite3
+import threading
+import time
+from app.services.chat_store import ChatStore
+
+
+def _fill(store: ChatStore, session_id: str, turns: int):
+    for turn in range(turns):
+        store.append(session_id, [("user", f"pergunta {turn}"), ("assistant", f"resposta {turn}")], persona="concept_tutor")
+
+
+class TestChatStore:
+    """Testes de persistência, paginação e concorrência."""
+
+    def test_recent_page_and_older_pages(self, tmp_path):
+        """Deve devolver a página mais recente e as anteriores por `before_id`, em ordem."""
+        store = ChatStore(tmp_path / "chat.db")
+        _fill(store, "s1", 25)
+
+        page = store.recent("s1", limit=10)
+        older = store.recent("s1", limit=10, before_id=page[0]["id"])
+
+        assert [msg["content"] for msg in page[-2:]] == ["pergunta 24", "resposta 24"]
+        assert older[-1]["id"] < page[0]["id"]
+        assert [msg["role"] for msg in older[:2]] == ["user", "assistant"]
+        assert store.has_before("s1", older[0]["id"])
+        assert store.count("s1") == 50
+
+    def test_sessions_are_isolated_and_clearable(self, tmp_path):
+        """Cada sessão deve ver só o próprio histórico."""
+        store = ChatStore(tmp_path / "chat.db")
+        _fill(store, "s1", 2)
+        _fill(store, "s2", 1)
+
+        store.clear("s1")
+
+        assert store.recent("s1") == []
+        assert [msg["content"] for msg in store.recent("s2")] == ["pergunta 0", "resposta 0"]
+
+    def test_history_survives_restart_in_wal_mode(self, tmp_path):
+        """O histórico deve sobreviver a outra instância (reinício) com o banco em WAL."""
+        path = tmp_path / "chat.db"
+        saved = ChatStore(path).append("s1", [("user", "oi"), ("assistant", "olá")], waterfall="ui.request 10ms")
+
+        reopened = ChatStore(path).recent("s1")
+
+        assert [msg["id"] for msg in reopened] == [msg["id"] for msg in saved]
+        assert reopened[-1]["waterfall"] == "ui.request 10ms"
+        assert reopened[0]["waterfall"] is None
+        assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_concurrent_sessions(self, tmp_path):
+        """Sessões em threads diferentes devem gravar em paralelo sem perder turnos."""
+        store = ChatStore(tmp_path / "chat.db")
+        threads = [threading.Thread(target=_fill, args=(store, f"s{n}", 20)) for n in range(8)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(store.count(f"s{n}") == 40 for n in range(8))
+
+    def test_page_cost_does_not_grow_with_history(self, tmp_path):
+        """Ler a página recente de uma sessão longa deve continuar rápido (índice, sem OFFSET)."""
+        store = ChatStore(tmp_path / "chat.db")
+        store.append("longa", [("user" if n % 2 == 0 else "assistant", "x" * 200) for n in range(20000)])
+
+        start = time.perf_counter()
+        for _ in range(100):
+            store.recent("longa", limit=20)
+        elapsed = (time.perf_counter() - start) / 100
+
+        assert elapsed < 0.005
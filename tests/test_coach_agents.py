@@ -28,14 +28,14 @@ class TestSoftSkillsCoachAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Use o método STAR..."
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = SoftSkillsCoachAgent(port=8005, url="http://localhost:8005")
         result = agent.coach_interview("Como responder sobre conflitos?")
         
         assert result == "Use o método STAR..."
-        mock_client.chat.completions.create.assert_called_once()
+        mock_client.chat.completions.with_raw_response.create.assert_called_once()
     
     @patch('app.agents.base_agent.OpenAI')
     def test_handle_task_with_text_content(self, mock_openai, mock_env):
@@ -43,7 +43,7 @@ class TestSoftSkillsCoachAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Resposta do coach"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = SoftSkillsCoachAgent(port=8005, url="http://localhost:8005")
@@ -62,7 +62,7 @@ class TestSoftSkillsCoachAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Resposta"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = SoftSkillsCoachAgent(port=8005, url="http://localhost:8005")
@@ -81,7 +81,7 @@ class TestSoftSkillsCoachAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Olá, como posso ajudar?"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = SoftSkillsCoachAgent(port=8005, url="http://localhost:8005")
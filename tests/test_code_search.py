@@ -0,0 +1,113 @@
+"""
+Testes para a busca de código com índice de trigramas.
+"""
+import os
+import pytest
+from app.mcp.code_search import TrigramIndex, extract_trigrams, required_trigrams, format_search_results
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """Workspace pequeno com alguns arquivos de código."""
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "agent.py").write_text(
+        "class AlgoAgent:\n    def call_llm(self):\n        return 'ok'\n"
+    )
+    (tmp_path / "app" / "utils.py").write_text("def helper():\n    pass\n")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "agent.cpython.pyc").write_bytes(b"\0call_llm")
+    return tmp_path
+
+
+def _index(root, **kwargs):
+    return TrigramIndex(root=root, index_path=root / ".devmentor" / "trigrams.json", refresh_interval=0, **kwargs)
+
+
+class TestTrigrams:
+    """Testes essenciais de extração de trigramas."""
+    
+    def test_extract_trigrams_is_case_insensitive(self):
+        """Trigramas devem ser normalizados em minúsculas."""
+        assert extract_trigrams("AbCd") == {"abc", "bcd"}
+    
+    def test_required_trigrams_from_regex(self):
+        """Literais obrigatórios da regex devem virar trigramas."""
+        assert required_trigrams(r"def \w+_llm", regex=True) == {"def", "ef ", "_ll", "llm"}
+    
+    def test_required_trigrams_alternation_disables_filter(self):
+        """Alternância no nível superior não permite filtrar."""
+        assert required_trigrams("foo|bar", regex=True) == set()
+
+
+class TestTrigramIndex:
+    """Testes essenciais do índice persistido."""
+    
+    def test_search_literal_with_context(self, workspace):
+        """Deve encontrar literal com linha e contexto."""
+        results = _index(workspace).search("call_llm", context_lines=1)
+        
+        assert len(results["matches"]) == 1
+        match = results["matches"][0]
+        assert match["path"] == "app/agent.py"
+        assert match["line"] == 2
+        assert match["before"] == ["class AlgoAgent:"]
+        assert results["candidates"] == 1
+    
+    def test_search_regex(self, workspace):
+        """Deve suportar regex e filtro por caminho."""
+        results = _index(workspace).search(r"def \w+\(", regex=True, path_glob="app/utils.py")
+        
+        assert [m["line"] for m in results["matches"]] == [1]
+    
+    def test_truncated_only_when_more_matches(self, workspace):
+        """`truncated` só deve ser verdadeiro se houver mais ocorrências que `max_results`."""
+        index = _index(workspace)
+        
+        exact = index.search("def ", max_results=2)
+        assert len(exact["matches"]) == 2 and exact["truncated"] is False
+        more = index.search("def ", max_results=1)
+        assert len(more["matches"]) == 1 and more["truncated"] is True
+    
+    def test_invalid_regex_raises(self, workspace):
+        """Regex inválida deve gerar ValueError."""
+        with pytest.raises(ValueError):
+            _index(workspace).search("(", regex=True)
+    
+    def test_incremental_refresh(self, workspace):
+        """Alterações em disco devem ser refletidas sem reindexar tudo."""
+        index = _index(workspace)
+        index.refresh(force=True)
+        
+        (workspace / "app" / "new.py").write_text("NEEDLE = 1\n")
+        stats = index.refresh(force=True)
+        assert stats == {"added": 1, "updated": 0, "removed": 0}
+        assert index.search("needle")["matches"]
+        
+        os.remove(workspace / "app" / "new.py")
+        stats = index.refresh(force=True)
+        assert stats["removed"] == 1
+        assert not index.search("needle")["matches"]
+    
+    def test_index_is_persisted(self, workspace):
+        """Índice salvo deve ser recarregado sem reler arquivos."""
+        _index(workspace).refresh(force=True)
+        
+        reloaded = _index(workspace)
+        assert len(reloaded._files) == 2
+        assert reloaded.refresh(force=True) == {"added": 0, "updated": 0, "removed": 0}
+    
+    def test_untrusted_index_file_is_cache_miss(self, workspace):
+        """Índice corrompido ou em formato inesperado deve ser ignorado e reconstruído."""
+        index_path = workspace / ".devmentor" / "trigrams.json"
+        index_path.parent.mkdir()
+        for content in ["não é json", "[1, 2]", '{"version": 2, "root": "%s", "files": {"a.py": 3}}' % workspace.resolve()]:
+            index_path.write_text(content)
+            index = _index(workspace)
+            assert index._files == {}
+            assert index.search("call_llm")["matches"][0]["path"] == "app/agent.py"
+    
+    def test_format_search_results(self, workspace):
+        """Formato textual deve indicar arquivo:linha."""
+        text = format_search_results(_index(workspace).search("helper"))
+        
+        assert "app/utils.py:1" in text
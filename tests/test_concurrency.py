@@ -0,0 +1,249 @@
+"""
+Testes para o limite adaptativo (AIMD) de concorrência do LLM.
+"""
+import asyncio
+import socket
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+from unittest.mock import MagicMock
+from app.agents.base_agent import BaseAgent
+from app.bench import stub_llm
+from app.bench.stub_llm import StubLLMConfig
+from app.services import concurrency
+from app.services.concurrency import AdaptiveLimiter, is_overload_error
+from app.utils.metrics import LLM_CONCURRENCY_LIMIT, LLM_QUEUE_DEPTH
+
+
+class ProviderError(Exception):
+    """Erro HTTP do provedor, no formato do SDK (status_code e response.headers)."""
+
+    def __init__(self, status_code: int, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+def _wait(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def _acquire_in_thread(limiter: AdaptiveLimiter, key: str, order: list) -> threading.Thread:
+    def run():
+        slot = limiter.acquire(key)
+        order.append(key)
+        limiter.release(slot, ignore=True)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestAdaptiveLimiter:
+    """Testes de fila, aumento aditivo, corte multiplicativo e pausa."""
+
+    def test_queues_above_limit_and_publishes_metrics(self):
+        """Acima do limite a chamada deve esperar na fila, visível nas métricas."""
+        limiter = AdaptiveLimiter(name="t-queue", initial=2)
+        slots = [limiter.acquire(), limiter.acquire()]
+        order = []
+        thread = _acquire_in_thread(limiter, "default", order)
+
+        assert _wait(lambda: limiter.queue_depth == 1)
+        assert LLM_QUEUE_DEPTH.labels(limiter="t-queue").value == 1
+        assert LLM_CONCURRENCY_LIMIT.labels(limiter="t-queue").value == 2
+        assert order == []
+        limiter.release(slots[0], ignore=True)
+        thread.join(5)
+        assert order == ["default"]
+        assert limiter.queue_depth == 0
+
+    def test_fair_round_robin_between_personas(self):
+        """Uma persona com rajada não deve passar na frente das outras."""
+        limiter = AdaptiveLimiter(initial=1)
+        busy = limiter.acquire("tutor")
+        order = []
+        threads = []
+        for key in ["tutor"] * 4 + ["coach"]:
+            threads.append(_acquire_in_thread(limiter, key, order))
+            assert _wait(lambda: limiter.queue_depth == len(threads))
+        limiter.release(busy, ignore=True)
+        for thread in threads:
+            thread.join(5)
+
+        assert order[:2] == ["tutor", "coach"]
+
+    def test_slow_start_then_additive_increase(self):
+        """Antes da sobrecarga deve crescer 1 por resposta; depois, no máximo 1 por rodada."""
+        limiter = AdaptiveLimiter(initial=4)
+        slots = [limiter.acquire() for _ in range(4)]
+        for slot in slots:
+            limiter.release(slot)
+        # A primeira vaga da rodada não tinha o limite em uso
+        assert limiter.limit == 7
+
+        limiter.release(limiter.acquire(), ProviderError(429))
+        assert limiter.limit == 3
+        limits = [limiter.limit]
+        for _ in range(6):
+            slots = [limiter.acquire() for _ in range(limiter.limit)]
+            for slot in slots:
+                limiter.release(slot)
+            limits.append(limiter.limit)
+        assert all(0 <= after - before <= 1 for before, after in zip(limits, limits[1:]))
+        assert limits[-1] > 4
+
+    def test_burst_of_429_cuts_once(self):
+        """429 de chamadas da mesma rodada devem cortar o limite uma vez só."""
+        limiter = AdaptiveLimiter(initial=16)
+        slots = [limiter.acquire() for _ in range(10)]
+        for slot in slots:
+            limiter.release(slot, ProviderError(429))
+
+        assert limiter.limit == 8
+        limiter.release(limiter.acquire(), ProviderError(503))
+        assert limiter.limit == 4
+
+    def test_non_overload_errors_and_slow_responses_do_not_grow(self):
+        """Erro do cliente não muda o limite; latência muito acima da referência não aumenta."""
+        limiter = AdaptiveLimiter(initial=1)
+        limiter.release(limiter.acquire(), ProviderError(400))
+        assert limiter.limit == 1
+
+        fast = limiter.acquire()
+        fast.latency = 0.1
+        limiter.release(fast)
+        slow = limiter.acquire()
+        slow.latency = 1.0
+        limiter.release(slow)
+        assert limiter.limit == 2
+
+    def test_rate_limit_headers_cut_and_pause(self):
+        """`x-ratelimit-remaining-requests: 0` deve cortar e `retry-after` pausar novas chamadas."""
+        limiter = AdaptiveLimiter(initial=8)
+        slot = limiter.acquire()
+        slot.headers = {"x-ratelimit-remaining-requests": "0", "retry-after": "0.3"}
+        limiter.release(slot)
+
+        start = time.perf_counter()
+        limiter.release(limiter.acquire(), ignore=True)
+        assert limiter.limit == 4
+        assert time.perf_counter() - start >= 0.25
+
+    def test_latency_kinds_have_separate_baselines(self):
+        """Latência por token não deve ser comparada com a referência do tempo até o primeiro token."""
+        limiter = AdaptiveLimiter(initial=1)
+        ttft = limiter.acquire()
+        ttft.latency = 0.5
+        limiter.release(ttft)
+        per_token = limiter.acquire()
+        per_token.latency, per_token.latency_kind = 0.01, "per_token"
+        limiter.release(per_token)
+        assert limiter.limit == 3
+
+        slow = limiter.acquire()
+        slow.latency, slow.latency_kind = 0.2, "per_token"
+        limiter.release(slow)
+        assert limiter.limit == 3
+        assert limiter.stats()["baseline_latency_s"].keys() == {"ttft", "per_token"}
+
+    def test_async_waiter_cancel_leaves_queue(self):
+        """Corrotina cancelada na fila deve sair dela sem ocupar vaga."""
+        limiter = AdaptiveLimiter(initial=1)
+
+        async def scenario():
+            busy = await limiter.aacquire()
+            waiting = asyncio.ensure_future(limiter.aacquire())
+            await asyncio.sleep(0.01)
+            depth = limiter.queue_depth
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            limiter.release(busy)
+            return depth
+
+        assert asyncio.run(scenario()) == 1
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 0
+
+    def test_is_overload_error(self):
+        """429, 5xx e timeouts são sobrecarga; erros do cliente não."""
+        class APITimeoutError(Exception):
+            pass
+
+        assert is_overload_error(ProviderError(429))
+        assert is_overload_error(ProviderError(502))
+        assert is_overload_error(APITimeoutError())
+        assert not is_overload_error(ProviderError(401))
+        assert not is_overload_error(ValueError("x"))
+
+
+class TestAgentFeedback:
+    """Testes da vaga preenchida pelo agente em chamadas sem streaming."""
+
+    def test_successful_response_headers_reach_limiter(self, monkeypatch):
+        """Headers de rate limit de uma resposta bem-sucedida devem cortar o limite e pausar."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        limiter = AdaptiveLimiter(initial=8)
+        monkeypatch.setattr(concurrency, "_limiter", limiter)
+        agent = BaseAgent(name="Test", description="d", prompt="p", url="http://localhost:9000")
+        raw = MagicMock()
+        raw.headers = {"x-ratelimit-remaining-requests": "0", "retry-after": "0.3"}
+        raw.parse.return_value.choices[0].message.content = "resposta"
+        raw.parse.return_value.usage = {"prompt_tokens": 5, "completion_tokens": 10}
+        agent._llm_client = MagicMock()
+        agent._llm_client.chat.completions.with_raw_response.create.return_value = raw
+
+        assert agent.call_llm([{"role": "user", "content": "oi"}]) == "resposta"
+        assert limiter.limit == 4
+        start = time.perf_counter()
+        limiter.release(limiter.acquire(), ignore=True)
+        assert time.perf_counter() - start >= 0.25
+
+
+class TestLimiterWithProvider:
+    """Teste de ponta a ponta contra o LLM stub com limite de concorrência."""
+
+    def test_converges_to_provider_limit(self, monkeypatch):
+        """Com o provedor aceitando 8 chamadas simultâneas, o limite deve ficar perto de 8 sem perder respostas."""
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        config = StubLLMConfig(ttft=0.1, tokens_per_second=0, output_tokens=2, max_concurrency=8, retry_after=0.1)
+        server = uvicorn.Server(uvicorn.Config(stub_llm.create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        assert _wait(lambda: server.started)
+        monkeypatch.setenv("LLM_BASE_URL", f"http://127.0.0.1:{port}/v1")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-stub-local-0000000000")
+        limiter = AdaptiveLimiter(name="t-provider", initial=2)
+        monkeypatch.setattr(concurrency, "_limiter", limiter)
+        agent = BaseAgent(name="Test", description="d", prompt="p", url="http://localhost:9000")
+
+        async def run_all():
+            try:
+                return await asyncio.gather(*[
+                    agent.acall_llm([{"role": "user", "content": f"pergunta {i}"}]) for i in range(150)
+                ], return_exceptions=True)
+            finally:
+                await agent.aclose()
+
+        try:
+            replies = asyncio.run(run_all())
+            stats = httpx.get(f"http://127.0.0.1:{port}/stub/stats").json()
+        finally:
+            server.should_exit = True
+            thread.join(5)
+
+        assert all(isinstance(reply, str) for reply in replies)
+        assert 4 <= limiter.limit <= 16
+        # Sem o controle seriam 142 recusas na primeira rodada
+        assert stats["rate_limited"] < 40
@@ -24,6 +24,21 @@ class TestCoordinatorAgent:
         assert coordinator._agent_ports["algo_interviewer"] == 8001
         assert coordinator._agent_ports["soft_skills_coach"] == 8005
     
+    @patch('app.agents.coordinator.A2AClient')
+    def test_new_persona_is_routable(self, mock_client_class, mock_env, monkeypatch):
+        """Persona registrada só em AGENTS_DB e AGENT_CLASS_NAMES deve ser roteável pelo coordenador."""
+        from app import agents
+        from app.mcp import agents_data
+        monkeypatch.setitem(agents.AGENT_CLASS_NAMES, "sql_tutor", "SqlTutorAgent")
+        monkeypatch.setitem(agents_data.AGENTS_DB, "sql_tutor", {"display_name": "SQL", "port": 8009})
+        coordinator = CoordinatorAgent(port=8000, url="http://localhost:8000")
+        
+        agent_key, message = coordinator._select_agent("sql_tutor: O que é um índice?")
+        coordinator._get_agent_client(agent_key)
+        
+        assert (agent_key, message) == ("sql_tutor", "O que é um índice?")
+        mock_client_class.assert_called_once_with("http://localhost:8009")
+    
     def test_get_agent_client_creates_new(self, mock_env):
         """Deve criar novo cliente A2A quando não existir."""
         coordinator = CoordinatorAgent(port=8000, url="http://localhost:8000")
@@ -79,6 +94,24 @@ class TestCoordinatorAgent:
         assert "❌ Erro ao comunicar com agente" in result
         assert "Connection failed" in result
     
+    @patch('app.agents.coordinator.A2AClient')
+    def test_health_monitor_fails_fast_only_on_closed_port(self, mock_client_class, mock_env):
+        """Porta recusada deve responder na hora; sondagem com prazo esgotado deve rotear normalmente."""
+        monitor = MagicMock()
+        monitor.is_fresh.return_value = True
+        coordinator = CoordinatorAgent(port=8000, url="http://localhost:8000", health_monitor=monitor)
+        mock_response = MagicMock()
+        mock_response.content.text = "Resposta do agente"
+        mock_client_class.return_value.send_message.return_value = mock_response
+        
+        monitor.get_status.return_value = {"status": "port_closed", "port_open": False, "port": 8001}
+        closed = coordinator.route_to_agent("algo_interviewer", "Hello")
+        monitor.get_status.return_value = {"status": "timeout", "port_open": None, "port": 8001}
+        busy = coordinator.route_to_agent("algo_interviewer", "Hello")
+        
+        assert "indisponível" in closed
+        assert busy == "Resposta do agente"
+    
     @patch('app.agents.coordinator.A2AClient')
     def test_handle_task_with_default_agent(self, mock_client_class, mock_env):
         """Deve usar agente padrão quando não especificado."""
@@ -0,0 +1,115 @@
+"""
+Testes para o diagnóstico concorrente de servidores.
+"""
+import socket
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.utils import diagnostics
+from app.utils.diagnostics import diagnose_agent_server, diagnose_all_servers, format_diagnostic_report
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    """Responde 200 apenas em /health."""
+    
+    def do_GET(self):
+        self.send_response(200 if self.path == "/health" else 404)
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def healthy_server():
+    """Servidor HTTP local saudável."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+
+
+@pytest.fixture
+def silent_server():
+    """Porta que aceita conexões mas nunca responde HTTP."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(64)
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+def _closed_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestDiagnoseAgentServer:
+    """Testes essenciais do diagnóstico de um servidor."""
+    
+    def test_healthy_server(self, healthy_server):
+        """Servidor com /health respondendo deve ser saudável."""
+        result = diagnose_agent_server(healthy_server, f"http://127.0.0.1:{healthy_server}")
+        
+        assert result["overall_status"] == "healthy"
+        assert result["endpoints"]["health"]["ok"] is True
+        assert result["endpoints"]["root"]["status_code"] == 404
+    
+    def test_closed_port(self):
+        """Porta fechada deve ser reportada sem sondar endpoints."""
+        port = _closed_port()
+        result = diagnose_agent_server(port, f"http://127.0.0.1:{port}")
+        
+        assert result["overall_status"] == "port_closed"
+        assert result["endpoints"] == {}
+    
+    def test_connect_timeout_is_unknown_not_closed(self, monkeypatch):
+        """Conexão que estoura o prazo deve virar `timeout` com porta desconhecida, não porta fechada."""
+        monkeypatch.setattr(diagnostics, "check_port_open", lambda host, port, timeout: (None, "Timeout"))
+        result = diagnose_agent_server(8001, "http://127.0.0.1:8001")
+        
+        assert result["overall_status"] == "timeout"
+        assert result["port_open"] is None
+    
+    def test_endpoints_are_probed_in_parallel(self, silent_server):
+        """Quatro endpoints sem resposta devem custar ~1 timeout, não 4."""
+        start = time.monotonic()
+        result = diagnose_agent_server(silent_server, f"http://127.0.0.1:{silent_server}")
+        
+        assert time.monotonic() - start < 2.0
+        assert result["overall_status"] == "port_open_but_no_endpoint"
+
+
+class TestDiagnoseAllServers:
+    """Testes essenciais do diagnóstico concorrente."""
+    
+    def test_all_servers_under_global_deadline(self, healthy_server, silent_server):
+        """Vários servidores lentos devem terminar dentro do prazo global."""
+        config = [("ok", healthy_server, f"http://127.0.0.1:{healthy_server}")]
+        config += [(f"silent{i}", silent_server, f"http://127.0.0.1:{silent_server}") for i in range(6)]
+        closed = _closed_port()
+        config += [("closed", closed, f"http://127.0.0.1:{closed}")]
+        
+        start = time.monotonic()
+        results = diagnose_all_servers(config, deadline=0.5)
+        elapsed = time.monotonic() - start
+        
+        assert elapsed < 1.0
+        summary = results["summary"]
+        assert summary["total"] == 8
+        assert summary["healthy"] == 1
+        assert summary["port_closed"] == 1
+        assert summary["port_open_but_no_endpoint"] == 6
+        assert "elapsed_ms" in results
+    
+    def test_format_report_includes_servers(self, healthy_server):
+        """Relatório textual deve listar cada servidor."""
+        results = diagnose_all_servers([("ok", healthy_server, f"http://127.0.0.1:{healthy_server}")])
+        
+        report = format_diagnostic_report(results)
+        assert "ok (porta" in report
+        assert "Saudável" in report
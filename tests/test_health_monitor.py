@@ -0,0 +1,110 @@
+"""
+Testes para o monitor de saúde em background.
+"""
+import threading
+import time
+from app.utils.health_monitor import HealthMonitor
+
+
+class _FakeProbe:
+    """Substitui `diagnose_all_servers` com status controlado pelo teste."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, agents_config, deadline):
+        names = [name for name, _ in agents_config]
+        self.calls.append(names)
+        self.called.set()
+        return {"servers": {
+            name: {"overall_status": self.statuses[name], "port_open": self.statuses[name] != "port_closed"}
+            for name in names
+        }}
+
+
+class TestHealthMonitor:
+    """Testes do snapshot em cache, backoff e sondagem sob demanda."""
+
+    def test_get_status_does_not_probe(self):
+        """Deve ler o snapshot sem sondar."""
+        probe = _FakeProbe({"a": "healthy"})
+        monitor = HealthMonitor({"a": 8001}, probe=probe)
+
+        assert monitor.get_status("a") is None
+        assert probe.calls == []
+
+    def test_get_or_probe_uses_fresh_cache(self):
+        """Deve sondar apenas quando o status está ausente ou velho."""
+        probe = _FakeProbe({"a": "healthy"})
+        monitor = HealthMonitor({"a": 8001}, ttl=60, probe=probe)
+
+        first = monitor.get_or_probe("a")
+        second = monitor.get_or_probe("a")
+
+        assert first is second
+        assert first["healthy"] is True
+        assert len(probe.calls) == 1
+
+    def test_report_failure_invalidates_cache(self):
+        """Deve sondar novamente após uma falha real de envio."""
+        probe = _FakeProbe({"a": "healthy"})
+        monitor = HealthMonitor({"a": 8001}, ttl=60, probe=probe)
+        monitor.get_or_probe("a")
+
+        monitor.report_failure("a")
+
+        assert not monitor.is_fresh(monitor.get_status("a"))
+        monitor.get_or_probe("a")
+        assert len(probe.calls) == 2
+
+    def test_backoff_for_failing_server(self):
+        """Deve espaçar sondagens de servidores fora do ar até o máximo."""
+        probe = _FakeProbe({"a": "port_closed", "b": "healthy"})
+        monitor = HealthMonitor({"a": 8001, "b": 8002}, interval=1.0, max_interval=5.0, probe=probe)
+
+        for _ in range(4):
+            monitor.probe_now()
+        now = time.monotonic()
+
+        assert monitor.get_status("a")["failures"] == 4
+        assert monitor._next_probe["a"] - now > 4.0
+        assert monitor._next_probe["b"] - now <= 1.0
+
+        probe.statuses["a"] = "healthy"
+        monitor.probe_now(["a"])
+        assert monitor.get_status("a")["failures"] == 0
+
+    def test_background_thread_publishes_snapshot(self):
+        """Deve publicar o status de todos os servidores em background."""
+        probe = _FakeProbe({"a": "healthy", "b": "port_closed"})
+        monitor = HealthMonitor({"a": 8001, "b": 8002}, interval=10, probe=probe)
+
+        monitor.start()
+        try:
+            assert probe.called.wait(2)
+            deadline = time.monotonic() + 2
+            while len(monitor.snapshot()) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            monitor.stop()
+
+        snapshot = monitor.snapshot()
+        assert snapshot["a"]["healthy"] is True
+        assert snapshot["b"]["port_open"] is False
+
+    def test_listeners_see_health_transitions(self):
+        """Deve avisar os listeners só quando o servidor muda de estado."""
+        probe = _FakeProbe({"a": "port_closed"})
+        monitor = HealthMonitor({"a": 8001}, probe=probe)
+        changes = []
+        monitor.add_listener(lambda name, previous, status: changes.append((name, status["healthy"])))
+        monitor.add_listener(lambda *args: 1 / 0)  # Erro em um listener não derruba o monitor
+
+        monitor.probe_now()
+        monitor.probe_now()
+        probe.statuses["a"] = "healthy"
+        monitor.probe_now()
+
+        assert changes == [("a", True)]
@@ -0,0 +1,45 @@
+"""
+Testes de orçamento de import e do carregamento sob demanda.
+"""
+import pytest
+import app.agents
+from app.bench.import_time import ENTRY_POINTS, format_report, run_benchmark
+
+# Entradas leves: medidas a cada execução da suíte (as de servidor ficam para o benchmark)
+LIGHT_ENTRY_POINTS = [entry for entry in ENTRY_POINTS if entry.budget <= 1.0]
+
+
+class TestImportBudget:
+    """Regressão de tempo de import dos pontos de entrada."""
+
+    def test_light_entry_points_within_budget(self):
+        """Entradas leves devem caber no orçamento e não carregar dependências pesadas."""
+        report = run_benchmark(LIGHT_ENTRY_POINTS, repeat=2)
+
+        assert {row["module"] for row in report["entries"]} >= {"start_servers", "app.agents"}
+        assert report["ok"], "\n" + format_report(report)
+
+
+    def test_coordinator_does_not_load_openai(self):
+        """Importar o coordenador (e o base_agent) não deve carregar o SDK da OpenAI."""
+        entry = next(entry for entry in ENTRY_POINTS if entry.module == "app.agents.coordinator")
+        row = run_benchmark([entry], repeat=1, scale=100)["entries"][0]
+
+        assert row["leaked"] == []
+
+
+class TestLazyAgents:
+    """Testes do carregamento sob demanda de app.agents."""
+
+    def test_classes_resolve_on_first_access(self):
+        """As personas devem ser resolvidas pelo nome exportado."""
+        from app.agents.reviewer_agents import CodeReviewerAgent
+
+        assert app.agents.CodeReviewerAgent is CodeReviewerAgent
+        assert app.agents.AGENT_CLASSES["code_reviewer"] is CodeReviewerAgent
+        assert set(app.agents.__all__) <= set(dir(app.agents))
+
+    def test_unknown_attribute_raises(self):
+        """Nomes desconhecidos continuam gerando AttributeError."""
+        with pytest.raises(AttributeError, match="NaoExiste"):
+            app.agents.NaoExiste
@@ -28,14 +28,14 @@ class TestAlgoInterviewerAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Vamos começar com arrays..."
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = AlgoInterviewerAgent(port=8001, url="http://localhost:8001")
         result = agent.conduct_interview("Quero praticar algoritmos")
         
         assert result == "Vamos começar com arrays..."
-        mock_client.chat.completions.create.assert_called_once()
+        mock_client.chat.completions.with_raw_response.create.assert_called_once()
     
     @patch('app.agents.base_agent.OpenAI')
     def test_handle_task_with_text_content(self, mock_openai, mock_env):
@@ -43,7 +43,7 @@ class TestAlgoInterviewerAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Resposta do entrevistador"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = AlgoInterviewerAgent(port=8001, url="http://localhost:8001")
@@ -62,7 +62,7 @@ class TestAlgoInterviewerAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Resposta"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = AlgoInterviewerAgent(port=8001, url="http://localhost:8001")
@@ -98,7 +98,7 @@ class TestMLSystemInterviewerAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Vamos discutir ML..."
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = MLSystemInterviewerAgent(port=8002, url="http://localhost:8002")
@@ -112,7 +112,7 @@ class TestMLSystemInterviewerAgent:
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Resposta ML"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         mock_openai.return_value = mock_client
         
         agent = MLSystemInterviewerAgent(port=8002, url="http://localhost:8002")
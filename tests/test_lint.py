@@ -0,0 +1,98 @@
+"""
+Testes para a análise estática local (lint_python).
+"""
+import pytest
+from app.mcp.lint import analyze_source, format_findings
+
+
+def _codes(source, **kwargs):
+    return [f["code"] for f in analyze_source(source, **kwargs)["findings"]]
+
+
+class TestAnalyzeSource:
+    """Testes essenciais das verificações de estilo."""
+    
+    def test_clean_code_has_no_findings(self):
+        """Código limpo não deve gerar achados."""
+        source = 'def soma(a: int, b: int) -> int:\n    """Soma dois números."""\n    return a + b\n'
+        assert analyze_source(source)["findings"] == []
+    
+    def test_layout_findings(self):
+        """Deve detectar linha longa, espaço final e ';'."""
+        source = "x = 1; y = 2   \n" + "z = '" + "a" * 90 + "'\n"
+        codes = _codes(source)
+        
+        assert "E702" in codes
+        assert "W291" in codes
+        assert "E501" in codes
+    
+    def test_naming_and_annotations(self):
+        """Deve detectar nomes fora do padrão e falta de type hints."""
+        source = (
+            "class my_class:\n"
+            "    def DoThing(self, Value):\n"
+            "        return Value\n"
+        )
+        codes = _codes(source)
+        
+        assert {"N801", "N802", "N803", "ANN001", "ANN201", "D101", "D103"} <= set(codes)
+    
+    def test_unused_imports_and_comparisons(self):
+        """Deve detectar import não usado, '== None' e except sem tipo."""
+        source = (
+            "import os\n"
+            "import sys\n"
+            "__all__ = ['os']\n"
+            "try:\n"
+            "    ok = sys.argv == None\n"
+            "except:\n"
+            "    pass\n"
+        )
+        findings = analyze_source(source)["findings"]
+        
+        assert [f["code"] for f in findings if f["code"] == "F401"] == []
+        assert {"E711", "E722"} <= {f["code"] for f in findings}
+        assert "'json'" in analyze_source("import json\n")["findings"][0]["message"]
+    
+    def test_docstring_mention_does_not_count_as_use(self):
+        """Nome citado em docstring não conta como uso; anotação em string conta."""
+        source = (
+            '"""Lê arquivos json."""\n'
+            "import json\n"
+            "from typing import List\n"
+            "def f(items: 'List[int]') -> None:\n"
+            "    return None\n"
+        )
+        unused = [f["message"] for f in analyze_source(source)["findings"] if f["code"] == "F401"]
+        
+        assert unused == ["'json' importado mas não usado"]
+    
+    def test_complexity_metrics(self):
+        """Deve calcular complexidade e sinalizar funções complexas."""
+        body = "".join(f"    if x == {i}:\n        return {i}\n" for i in range(5))
+        source = f"def f(x: int) -> int:\n    \"\"\"Doc.\"\"\"\n{body}    return -1\n"
+        report = analyze_source(source, max_complexity=3)
+        
+        assert report["metrics"]["max_complexity"] == 6
+        assert report["summary"] == {"C901": 1}
+    
+    def test_nested_functions_are_measured_separately(self):
+        """Ramos de funções e lambdas aninhadas não somam na função externa."""
+        body = "".join(f"        if y == {i}:\n            return {i}\n" for i in range(5))
+        source = f"def outer(x):\n    def inner(y):\n{body}        return -1\n    key = lambda v: v if v else 0\n    return inner(key(x))\n"
+        complexities = {f["name"]: f["complexity"] for f in analyze_source(source)["metrics"]["most_complex"]}
+        
+        assert complexities["outer"] == 1
+        assert complexities["inner"] == 6
+    
+    def test_syntax_error(self):
+        """Erro de sintaxe deve virar achado E999."""
+        report = analyze_source("def broken(:\n")
+        
+        assert report["summary"] == {"E999": 1}
+    
+    def test_format_findings_is_compact(self):
+        """Formato textual deve ter uma linha curta por achado."""
+        text = format_findings(analyze_source("import json\n"))
+        
+        assert text.splitlines()[0] == "L1:1 F401 'json' importado mas não usado"
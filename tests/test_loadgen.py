@@ -0,0 +1,113 @@
+"""
+Testes para o gerador de carga.
+"""
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.bench.loadgen import (
+    LoadGenerator, compare_reports, parse_mix, percentile, resolve_target
+)
+
+
+class _FakeA2AHandler(BaseHTTPRequestHandler):
+    """Responde tarefas A2A ecoando a mensagem; 'falhe' vira erro do agente."""
+
+    received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        text = body["params"]["message"]["content"]["text"]
+        self.received.append(text)
+        reply = "❌ Erro simulado" if "falhe" in text else f"eco: {text}"
+        data = json.dumps({"jsonrpc": "2.0", "id": 1, "result": {
+            "artifacts": [{"parts": [{"type": "text", "text": reply}]}],
+        }}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_agent():
+    """Servidor A2A falso em porta local."""
+    _FakeA2AHandler.received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeA2AHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+class TestHelpers:
+    """Testes das funções auxiliares."""
+
+    def test_parse_mix(self):
+        """Deve converter a especificação em pesos."""
+        assert parse_mix("a=3, b=0.5") == {"a": 3.0, "b": 0.5}
+        with pytest.raises(ValueError):
+            parse_mix("a=0")
+
+    def test_percentile_nearest_rank(self):
+        """Deve usar o método nearest-rank."""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([7], 95) == 7
+        assert percentile([], 50) is None
+
+    def test_resolve_target(self):
+        """Deve resolver coordenador, agentes e URLs."""
+        assert resolve_target("coordinator") == ("http://localhost:8000", True, None)
+        assert resolve_target("code_reviewer") == ("http://localhost:8004", False, "code_reviewer")
+        assert resolve_target("http://x:1") == ("http://x:1", False, None)
+
+    def test_compare_reports(self):
+        """Deve calcular variação percentual entre relatórios."""
+        base = {"throughput_rps": 10, "error_rate": 0.0, "latency_ms": {"p50": 100, "p95": 200, "p99": None}}
+        current = {"throughput_rps": 12, "error_rate": 0.1, "latency_ms": {"p50": 50, "p95": 300, "p99": 10}}
+
+        comparison = compare_reports(base, current)
+
+        assert comparison["throughput_rps"] == 20.0
+        assert comparison["latency_p50"] == -50.0
+        assert comparison["latency_p95"] == 50.0
+        assert comparison["latency_p99"] is None
+
+
+class TestLoadGenerator:
+    """Testes das malhas fechada e aberta contra um servidor local."""
+
+    def test_closed_loop_with_route_prefix(self, fake_agent):
+        """Deve respeitar o limite de requisições e prefixar a persona."""
+        generator = LoadGenerator(fake_agent, {"concept_tutor": ["o que é CAP?"]}, route_prefix=True, seed=1)
+
+        report = generator.run_closed(concurrency=3, duration=5, max_requests=9)
+
+        assert report["requests"] == 9
+        assert report["errors"] == 0
+        assert report["latency_ms"]["p99"] is not None
+        assert report["by_persona"]["concept_tutor"]["requests"] == 9
+        assert all(text == "concept_tutor:o que é CAP?" for text in _FakeA2AHandler.received)
+
+    def test_open_loop_counts_agent_errors(self, fake_agent):
+        """Deve contabilizar erros por tipo e por persona."""
+        messages = {"ok": ["olá"], "ruim": ["falhe agora"]}
+        generator = LoadGenerator(fake_agent, messages, mix={"ok": 1, "ruim": 1}, seed=3)
+
+        report = generator.run_open(rate=50, duration=0.4)
+
+        assert report["requests"] == 20
+        assert report["errors"] == report["by_persona"]["ruim"]["requests"]
+        assert report["errors_by_type"] == {"agent_error": report["errors"]}
+        assert 0 < report["error_rate"] < 1
+        json.dumps(report)
+
+    def test_unknown_persona_in_mix(self):
+        """Deve rejeitar pesos para personas sem mensagens."""
+        with pytest.raises(ValueError):
+            LoadGenerator("http://localhost:1", {"a": ["x"]}, mix={"b": 1})
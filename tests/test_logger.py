@@ -0,0 +1,180 @@
+"""
+Testes para o logging assíncrono baseado em fila.
+"""
+import gzip
+import json
+import logging
+import queue
+import threading
+import uuid
+from app.utils.logger import (
+    BatchingFileHandler, ColoredFormatter, NonBlockingQueueHandler, SamplingFilter, flush_logging,
+    parse_sampling, setup_logger
+)
+from app.utils.tracing import trace_span
+
+
+def _unique_logger(tmp_path, level=logging.INFO):
+    """Logger novo gravando apenas em arquivo temporário."""
+    log_file = tmp_path / "app.log"
+    logger = setup_logger(f"devmentor.test.{uuid.uuid4().hex}", level=level, log_file=str(log_file), console=False)
+    logger.propagate = False
+    return logger, log_file
+
+
+class _Explosive:
+    """Objeto cujo __str__ não deve ser chamado quando o nível está filtrado."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "explosivo"
+
+
+class TestQueueLogging:
+    """Testes do caminho logger → fila → thread de escrita."""
+
+    def test_records_are_written_by_background_thread(self, tmp_path):
+        """O registro deve chegar ao arquivo, escrito por outra thread."""
+        logger, log_file = _unique_logger(tmp_path)
+        assert [type(h) for h in logger.handlers] == [NonBlockingQueueHandler]
+
+        logger.info("olá %s", "mundo")
+        flush_logging()
+
+        content = log_file.read_text(encoding="utf-8")
+        assert "olá mundo" in content
+        assert "| INFO" in content
+        assert any(t.name == "devmentor-log-writer" for t in threading.enumerate())
+
+    def test_filtered_calls_do_not_format_arguments(self, tmp_path):
+        """Chamadas abaixo do nível não devem formatar os argumentos."""
+        logger, log_file = _unique_logger(tmp_path, level=logging.INFO)
+        value = _Explosive()
+
+        logger.debug("valor: %s", value)
+        logger.info("valor: %s", value)
+        flush_logging()
+
+        assert value.calls == 1
+        assert log_file.read_text(encoding="utf-8").count("explosivo") == 1
+
+    def test_message_is_frozen_and_traceback_written(self, tmp_path):
+        """Args mutáveis devem ser congelados na chamada e o traceback gravado."""
+        logger, log_file = _unique_logger(tmp_path)
+        items = ["a"]
+        logger.info("itens: %s", items)
+        items.append("b")
+        try:
+            raise ValueError("falhou")
+        except ValueError:
+            logger.error("erro tratado", exc_info=True)
+        flush_logging()
+
+        content = log_file.read_text(encoding="utf-8")
+        assert "itens: ['a']" in content
+        assert "Traceback" in content and "ValueError: falhou" in content
+
+    def test_full_queue_drops_without_blocking(self):
+        """Com a fila cheia o registro é descartado e contado, sem bloquear."""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        logger = logging.getLogger(f"devmentor.test.{uuid.uuid4().hex}")
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        done = threading.Event()
+
+        def log_many():
+            for _ in range(5):
+                logger.warning("mensagem")
+            done.set()
+
+        threading.Thread(target=log_many, daemon=True).start()
+
+        assert done.wait(2)
+        assert handler.dropped == 4
+
+
+class TestHandlers:
+    """Testes dos handlers executados na thread de escrita."""
+
+    def test_batching_file_handler_flushes_in_batches(self, tmp_path):
+        """Deve acumular até o lote e fazer flush imediato em erros."""
+        path = tmp_path / "lote.log"
+        handler = BatchingFileHandler(path, batch_size=3, flush_interval=60, encoding="utf-8")
+        make = lambda level, msg: logging.LogRecord("t", level, __file__, 1, msg, None, None)
+
+        handler.handle(make(logging.INFO, "um"))
+        handler.handle(make(logging.INFO, "dois"))
+        assert path.read_text(encoding="utf-8") == ""
+
+        handler.handle(make(logging.INFO, "três"))
+        assert path.read_text(encoding="utf-8").splitlines() == ["um", "dois", "três"]
+
+        handler.handle(make(logging.ERROR, "erro"))
+        assert path.read_text(encoding="utf-8").splitlines()[-1] == "erro"
+        handler.close()
+
+    def test_colored_formatter_does_not_mutate_record(self):
+        """As cores não podem vazar para os outros handlers do mesmo registro."""
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, "msg", None, None)
+
+        assert "\033[32m" in ColoredFormatter("%(levelname)s").format(record)
+        assert record.levelname == "INFO"
+
+
+class TestStructuredLogging:
+    """Testes do modo JSON, da amostragem e da rotação."""
+
+    def test_json_lines_with_stable_fields(self, tmp_path):
+        """Cada evento deve virar um objeto JSON com campos estáveis e extras."""
+        log_file = tmp_path / "app.jsonl"
+        logger = setup_logger(f"devmentor.test.{uuid.uuid4().hex}", log_file=str(log_file),
+                              console=False, structured=True, sampling={})
+        logger.propagate = False
+
+        with trace_span("ui.request") as span:
+            logger.info("resposta de %s", "code_reviewer",
+                        extra={"persona": "code_reviewer", "latency_ms": 12.5, "status": "ok", "chars": 40})
+        logger.info("sem contexto")
+        flush_logging()
+
+        first, second = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+        assert first["message"] == "resposta de code_reviewer"
+        assert first["trace_id"] == span.trace_id and first["span_id"] == span.span_id
+        assert (first["persona"], first["latency_ms"], first["status"], first["chars"]) == ("code_reviewer", 12.5, "ok", 40)
+        assert first["level"] == "INFO" and first["ts"].endswith("+00:00")
+        assert second["trace_id"] is None and second["persona"] is None
+
+    def test_sampling_rules(self, monkeypatch):
+        """Deve aplicar a regra mais específica e nunca amostrar WARNING+."""
+        sampler = SamplingFilter(parse_sampling("app.agents:DEBUG=0, app=0.5, lixo, app.x=abc"))
+        make = lambda name, level: logging.LogRecord(name, level, __file__, 1, "m", None, None)
+
+        assert sampler.rate_for("app.agents.coordinator", logging.DEBUG) == 0.0
+        assert sampler.rate_for("app.agents.coordinator", logging.INFO) == 0.5
+        assert sampler.rate_for("outro", logging.DEBUG) == 1.0
+        assert not sampler.filter(make("app.agents.coordinator", logging.DEBUG))
+        assert sampler.filter(make("app.agents.coordinator", logging.ERROR))
+
+        monkeypatch.setattr("app.utils.logger.random.random", lambda: 0.4)
+        record = make("app.mcp", logging.INFO)
+        assert sampler.filter(record) and record.sample_rate == 0.5
+
+    def test_rotation_compresses_old_files(self, tmp_path):
+        """Ao passar de max_bytes o arquivo deve rotacionar e virar .gz."""
+        path = tmp_path / "rot.log"
+        handler = BatchingFileHandler(path, max_bytes=200, backup_count=2, encoding="utf-8")
+        for i in range(30):
+            handler.handle(logging.LogRecord("t", logging.INFO, __file__, 1, f"linha {i:02d} " + "x" * 20, None, None))
+        handler.close()
+
+        backups = sorted(p.name for p in tmp_path.iterdir())
+        assert backups == ["rot.log", "rot.log.1.gz", "rot.log.2.gz"]
+        assert path.stat().st_size <= 200
+        with gzip.open(tmp_path / "rot.log.1.gz", "rt", encoding="utf-8") as f:
+            rotated = f.read().splitlines()
+        assert rotated and all(line.startswith("linha") for line in rotated)
+        assert "linha 29" in path.read_text(encoding="utf-8")
@@ -0,0 +1,101 @@
+"""
+Testes para a execução em lote de ferramentas MCP.
+"""
+import asyncio
+import time
+import pytest
+from app.mcp.batch import parse_batch_request, parse_batch_timeout, run_batch, MAX_BATCH_SIZE, MAX_BATCH_TIMEOUT
+
+
+def _collect(calls, tools, timeout=5.0):
+    """Executa o lote e retorna os resultados na ordem de conclusão."""
+    async def collect():
+        return [result async for result in run_batch(calls, tools, timeout)]
+    return asyncio.run(collect())
+
+
+class TestParseBatchRequest:
+    """Testes essenciais de validação do lote."""
+    
+    def test_parse_valid_batch(self):
+        """Deve normalizar chamadas válidas."""
+        calls = parse_batch_request({"calls": [{"tool": "search_docs", "arguments": {"query": "x"}}]})
+        
+        assert calls == [{"id": 0, "tool": "search_docs", "arguments": {"query": "x"}}]
+    
+    def test_parse_rejects_invalid_payload(self):
+        """Deve rejeitar lote vazio, grande demais ou sem nome de ferramenta."""
+        with pytest.raises(ValueError):
+            parse_batch_request({"calls": []})
+        with pytest.raises(ValueError):
+            parse_batch_request({"calls": [{"tool": "t"}] * (MAX_BATCH_SIZE + 1)})
+        with pytest.raises(ValueError):
+            parse_batch_request({"calls": [{"arguments": {}}]})
+    
+    def test_parse_timeout_is_bounded(self):
+        """Timeout deve ser numérico e positivo, limitado a MAX_BATCH_TIMEOUT."""
+        assert parse_batch_timeout({"timeout": 2}) == 2.0
+        assert parse_batch_timeout({"timeout": 10 ** 9}) == MAX_BATCH_TIMEOUT
+        for value in (0, -1, "10", None, True, float("nan")):
+            with pytest.raises(ValueError):
+                parse_batch_timeout({"timeout": value})
+
+
+class TestRunBatch:
+    """Testes essenciais de execução concorrente."""
+    
+    def test_run_batch_is_concurrent(self):
+        """Chamadas síncronas lentas devem rodar em paralelo."""
+        def slow(value):
+            time.sleep(0.2)
+            return value
+        
+        calls = parse_batch_request({"calls": [{"tool": "slow", "arguments": {"value": i}} for i in range(4)]})
+        start = time.perf_counter()
+        results = _collect(calls, {"slow": slow})
+        
+        assert time.perf_counter() - start < 0.6
+        assert sorted(r["result"] for r in results) == [0, 1, 2, 3]
+        assert all("elapsed_ms" in r for r in results)
+    
+    def test_run_batch_streams_in_completion_order(self):
+        """Resultado mais rápido deve chegar primeiro."""
+        async def wait(delay):
+            await asyncio.sleep(delay)
+            return delay
+        
+        calls = parse_batch_request({"calls": [
+            {"id": "slow", "tool": "wait", "arguments": {"delay": 0.2}},
+            {"id": "fast", "tool": "wait", "arguments": {"delay": 0.01}},
+        ]})
+        results = _collect(calls, {"wait": wait})
+        
+        assert [r["id"] for r in results] == ["fast", "slow"]
+        assert results[0]["index"] == 1
+    
+    def test_run_batch_reports_per_call_errors(self):
+        """Erros devem ser isolados por chamada."""
+        def boom():
+            raise RuntimeError("falhou")
+        
+        calls = parse_batch_request({"calls": [
+            {"tool": "boom"},
+            {"tool": "missing"},
+            {"tool": "ok"},
+        ]})
+        results = {r["index"]: r for r in _collect(calls, {"boom": boom, "ok": lambda: "fine"})}
+        
+        assert results[0]["ok"] is False and "falhou" in results[0]["error"]
+        assert results[1]["ok"] is False and "missing" in results[1]["error"]
+        assert results[2]["ok"] is True and results[2]["result"] == "fine"
+    
+    def test_run_batch_timeout(self):
+        """Chamada lenta demais deve falhar por timeout sem afetar as outras."""
+        async def hang():
+            await asyncio.sleep(5)
+        
+        calls = parse_batch_request({"calls": [{"tool": "hang"}, {"tool": "ok"}]})
+        results = {r["index"]: r for r in _collect(calls, {"hang": hang, "ok": lambda: 1}, timeout=0.05)}
+        
+        assert "Timeout" in results[0]["error"]
+        assert results[1]["ok"] is True
@@ -0,0 +1,106 @@
+"""
+Testes para o executor de ferramentas do servidor MCP.
+"""
+import asyncio
+import inspect
+import os
+import time
+import pytest
+from app.mcp import executor as executor_module
+from app.mcp.executor import ToolExecutor, LoopLagMonitor, offload, parse_tool_limits
+
+
+def _pid(_):
+    """Função de módulo usada no pool de processos."""
+    return os.getpid()
+
+
+class TestParseToolLimits:
+    """Testes essenciais de configuração dos limites."""
+    
+    def test_parse_tool_limits(self):
+        """Deve converter especificação em dicionário."""
+        assert parse_tool_limits("read_file_snippet=8, search_code=2") == {"read_file_snippet": 8, "search_code": 2}
+        assert parse_tool_limits("") == {}
+    
+    def test_parse_tool_limits_invalid(self):
+        """Deve rejeitar itens mal formados."""
+        with pytest.raises(ValueError):
+            parse_tool_limits("search_code=zero")
+
+
+class TestToolExecutor:
+    """Testes essenciais do despacho para pools."""
+    
+    def test_thread_pool_does_not_block_loop(self):
+        """Ferramentas lentas em threads devem rodar em paralelo."""
+        executor = ToolExecutor(thread_workers=4)
+        
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*[executor.run("slow", time.sleep, 0.2) for _ in range(4)])
+            return time.perf_counter() - start
+        
+        try:
+            assert asyncio.run(main()) < 0.6
+            assert executor.stats()["completed"] == {"slow": 4}
+        finally:
+            executor.shutdown()
+    
+    def test_per_tool_limit(self):
+        """Limite por ferramenta deve serializar as chamadas excedentes."""
+        executor = ToolExecutor(thread_workers=4, tool_limits={"slow": 1})
+        
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*[executor.run("slow", time.sleep, 0.1) for _ in range(3)])
+            return time.perf_counter() - start
+        
+        try:
+            assert asyncio.run(main()) >= 0.3
+        finally:
+            executor.shutdown()
+    
+    def test_process_pool(self):
+        """Trabalho CPU-bound deve rodar em outro processo."""
+        executor = ToolExecutor(process_workers=1)
+        
+        async def main():
+            return await executor.run("cpu", _pid, None, kind="process")
+        
+        try:
+            assert asyncio.run(main()) != os.getpid()
+            # `fork` num processo com threads pode herdar locks ocupados
+            assert executor.process_pool._mp_context.get_start_method() != "fork"
+        finally:
+            executor.shutdown()
+    
+    def test_offload_preserves_signature(self, monkeypatch):
+        """Decorator deve gerar corrotina com a mesma assinatura."""
+        monkeypatch.setattr(executor_module, "_executor", ToolExecutor(thread_workers=1))
+        
+        @offload("thread")
+        def tool(path: str, limit: int = 5) -> str:
+            return f"{path}:{limit}"
+        
+        assert inspect.iscoroutinefunction(tool)
+        assert list(inspect.signature(tool).parameters) == ["path", "limit"]
+        assert asyncio.run(tool("a.py")) == "a.py:5"
+
+
+class TestLoopLagMonitor:
+    """Testes essenciais da medição de lag do event loop."""
+    
+    def test_detects_blocking_call(self):
+        """Chamada bloqueante no loop deve aparecer como lag."""
+        monitor = LoopLagMonitor(interval=0.01)
+        
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.02)
+            time.sleep(0.1)  # bloqueia o loop de propósito
+            await asyncio.sleep(0.05)
+            monitor.stop()
+        
+        asyncio.run(main())
+        assert monitor.max_ms >= 50
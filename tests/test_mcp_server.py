@@ -1,10 +1,12 @@
 """
 Testes para o servidor MCP e suas ferramentas.
 """
+import asyncio
 import pytest
 import json
 from pathlib import Path
 from unittest.mock import mock_open, patch
+from app.mcp import server
 from app.mcp.server import generate_quiz_json, read_file_snippet, search_docs
 
 
@@ -63,3 +65,18 @@ class TestSearchDocs:
         result = search_docs("python decorators")
         assert isinstance(result, str)
         assert len(result) > 0
+
+
+class TestBatchTools:
+    """Testes das funções usadas pelo endpoint /batch."""
+    
+    def test_batch_tools_validate_arguments_like_mcp(self):
+        """Argumentos devem ser convertidos e validados como numa chamada MCP normal."""
+        async def call(name, **arguments):
+            tools = await server._get_tool_functions()
+            return await tools[name](**arguments)
+        
+        quiz = json.loads(asyncio.run(call("generate_quiz_json", topic="t", num_questions="1")))
+        assert len(quiz["questions"]) == 1
+        with pytest.raises(ValueError):
+            asyncio.run(call("generate_quiz_json", topic="t", num_questions="muitas"))
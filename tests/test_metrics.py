@@ -0,0 +1,107 @@
+"""
+Testes para o registro de métricas e o endpoint /metrics dos agentes.
+"""
+import threading
+import pytest
+from python_a2a.server.http import create_flask_app
+from app.agents.base_agent import BaseAgent
+from app.utils.metrics import CONTENT_TYPE, MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Testes de contadores, gauges, histogramas e renderização."""
+
+    def test_counter_render(self):
+        """Deve renderizar contador com labels escapados."""
+        registry = MetricsRegistry()
+        errors = registry.counter("test_errors_total", "Erros", ["persona"])
+        errors.labels(persona='a"b').inc()
+        errors.labels(persona='a"b').inc(2)
+
+        text = registry.render()
+
+        assert "# TYPE test_errors_total counter" in text
+        assert 'test_errors_total{persona="a\\"b"} 3' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Deve acumular contagens por bucket e expor soma e total."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_seconds", "Latência", ["tool"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.labels(tool="x").observe(value)
+
+        text = registry.render()
+
+        assert 'test_seconds_bucket{tool="x",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{tool="x",le="1"} 3' in text
+        assert 'test_seconds_bucket{tool="x",le="+Inf"} 4' in text
+        assert 'test_seconds_sum{tool="x"} 6.05' in text
+        assert 'test_seconds_count{tool="x"} 4' in text
+
+    def test_gauge_inc_dec(self):
+        """Deve subir e descer o valor do gauge."""
+        registry = MetricsRegistry()
+        in_flight = registry.gauge("test_in_flight", "Em andamento")
+        in_flight.labels().inc()
+        in_flight.labels().inc()
+        in_flight.labels().dec()
+
+        assert "test_in_flight 1" in registry.render()
+
+    def test_labels_must_match(self):
+        """Deve rejeitar labels diferentes dos declarados."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_seconds", "Latência", ["persona", "model"])
+
+        with pytest.raises(ValueError):
+            latency.labels(persona="x")
+
+    def test_register_is_idempotent(self):
+        """Deve devolver a mesma métrica ao registrar o mesmo nome e labels."""
+        registry = MetricsRegistry()
+        first = registry.counter("test_total", "Total", ["a"])
+
+        assert registry.counter("test_total", "Total", ["a"]) is first
+        with pytest.raises(ValueError):
+            registry.gauge("test_total", "Total", ["a"])
+
+    def test_concurrent_observations(self):
+        """Não deve perder observações com várias threads na mesma série."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_seconds", "Latência", ["tool"])
+
+        def worker():
+            for _ in range(1000):
+                latency.labels(tool="x").observe(0.01)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert 'test_seconds_count{tool="x"} 8000' in registry.render()
+
+
+class TestAgentMetricsEndpoint:
+    """Testes da rota /metrics adicionada pelo BaseAgent."""
+
+    def test_metrics_route_records_requests(self, monkeypatch):
+        """Deve expor /metrics e medir as requisições atendidas."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        agent = BaseAgent(
+            name="Metrics Agent",
+            description="Test Description",
+            prompt="Test Prompt",
+            url="http://localhost:9000"
+        )
+        client = create_flask_app(agent).test_client()
+
+        assert client.get("/agent.json").status_code == 200
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.content_type == CONTENT_TYPE
+        text = response.data.decode()
+        assert 'devmentor_request_seconds_count{persona="Metrics Agent",endpoint="/agent.json"} 1' in text
+        assert 'endpoint="/metrics"' not in text
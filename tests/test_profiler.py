@@ -0,0 +1,132 @@
+"""
+Testes para o profiler por amostragem.
+"""
+import threading
+import pytest
+from python_a2a.server.http import create_flask_app
+from app.agents.base_agent import BaseAgent
+from app.utils.profiler import (
+    SamplingProfiler, is_admin_allowed, label_current_thread, parse_profile_params, run_profile
+)
+
+
+def _burn_cpu(stop: threading.Event):
+    """Laço ocupado para aparecer nas amostras."""
+    total = 0
+    while not stop.is_set():
+        total += sum(i * i for i in range(200))
+
+
+@pytest.fixture
+def busy_thread():
+    """Thread nomeada consumindo CPU durante o teste."""
+    stop = threading.Event()
+    thread = threading.Thread(target=_burn_cpu, args=(stop,), name="server:teste", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join(2)
+
+
+class TestSamplingProfiler:
+    """Testes da amostragem e do formato collapsed."""
+
+    def test_collapsed_stacks_rooted_at_thread_name(self, busy_thread):
+        """Cada pilha deve começar pelo nome da thread e terminar com a contagem."""
+        profile = SamplingProfiler(interval=0.005).run(0.3, thread_filter="server:teste")
+
+        assert profile["rounds"] > 10
+        assert set(profile["threads"]) == {"server:teste"}
+        lines = profile["collapsed"].splitlines()
+        assert lines and all(line.startswith("server:teste;") for line in lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert any("_burn_cpu" in line for line in lines)
+
+    def test_explicit_label_overrides_thread_name(self):
+        """Rótulos explícitos devem atribuir a thread a outro servidor."""
+        stop, labeled = threading.Event(), threading.Event()
+
+        def worker():
+            label_current_thread("server:rotulado")
+            labeled.set()
+            _burn_cpu(stop)
+            label_current_thread(None)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        labeled.wait(2)
+        try:
+            profile = SamplingProfiler(interval=0.005).run(0.2)
+        finally:
+            stop.set()
+            thread.join(2)
+
+        assert "server:rotulado" in profile["threads"]
+
+    def test_idle_threads_are_skipped_by_default(self):
+        """Threads bloqueadas em espera só aparecem com include_idle."""
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait, name="server:ocioso", daemon=True)
+        thread.start()
+        try:
+            idle = SamplingProfiler(interval=0.005).run(0.1, thread_filter="server:ocioso")
+            with_idle = SamplingProfiler(interval=0.005, include_idle=True).run(0.1, thread_filter="server:ocioso")
+        finally:
+            stop.set()
+            thread.join(2)
+
+        assert idle["samples"] == 0
+        assert with_idle["samples"] > 0
+
+    def test_single_session_per_process(self, busy_thread):
+        """Uma segunda sessão simultânea deve ser recusada."""
+        results = []
+        first = threading.Thread(target=lambda: results.append(run_profile(0.3)))
+        first.start()
+        threading.Event().wait(0.1)
+
+        assert run_profile(0.05) is None
+        first.join(2)
+        assert results[0] is not None
+
+
+class TestProfileParams:
+    """Testes de validação e acesso ao endpoint."""
+
+    def test_parse_params(self):
+        """Deve aplicar padrões e rejeitar valores inválidos."""
+        assert parse_profile_params({}) == (5.0, 0.01, None, False, "collapsed")
+        assert parse_profile_params({"seconds": "2", "interval_ms": "5", "thread": "mcp", "idle": "1",
+                                     "format": "json"}) == (2.0, 0.005, "mcp", True, "json")
+        for params in ({"seconds": "0"}, {"seconds": "999"}, {"seconds": "x"}, {"interval_ms": "0.1"},
+                       {"format": "svg"}):
+            with pytest.raises(ValueError):
+                parse_profile_params(params)
+
+    def test_admin_only_on_loopback(self, monkeypatch):
+        """Sem opt-in, só clientes locais podem usar o endpoint."""
+        monkeypatch.delenv("DEVMENTOR_ADMIN_ALLOW_REMOTE", raising=False)
+        assert is_admin_allowed("127.0.0.1")
+        assert is_admin_allowed("::1")
+        assert not is_admin_allowed("10.0.0.5")
+        assert not is_admin_allowed(None)
+        monkeypatch.setenv("DEVMENTOR_ADMIN_ALLOW_REMOTE", "1")
+        assert is_admin_allowed("10.0.0.5")
+
+    def test_agent_endpoint(self, busy_thread, monkeypatch):
+        """O agente deve expor /admin/profile em texto collapsed e JSON."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        agent = BaseAgent(name="🔍 Code Reviewer (Clean Code & PEP8)", description="d", prompt="p", url="http://localhost:9000")
+        client = create_flask_app(agent).test_client()
+
+        text = client.get("/admin/profile?seconds=0.2&thread=server:teste")
+        data = client.get("/admin/profile?seconds=0.2&format=json").get_json()
+
+        assert agent.server_label == "server:code_reviewer"
+        assert text.status_code == 200
+        assert text.get_data(as_text=True).startswith("server:teste;")
+        assert data["threads"].get("server:teste", 0) > 0
+        assert client.get("/admin/profile?seconds=-1").status_code == 400
+        remote = client.get("/admin/profile", environ_base={"REMOTE_ADDR": "10.0.0.5"})
+        assert remote.status_code == 403
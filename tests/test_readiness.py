@@ -0,0 +1,159 @@
+"""
+Testes para a inicialização guiada por readiness.
+"""
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.utils.readiness import StartupPlan, format_startup_report, is_ready, wait_until_ready
+
+
+class _Handler(BaseHTTPRequestHandler):
+    status = 200
+
+    def do_GET(self):
+        self.send_response(self.server.status)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _Server:
+    """Servidor HTTP local que só passa a escutar quando `start()` é chamado."""
+
+    def __init__(self, status: int = 200, delay: float = 0.0):
+        self.port = _free_port()
+        self.status = status
+        self.delay = delay
+        self.started = None
+        self.httpd = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        time.sleep(self.delay)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", self.port), _Handler)
+        self.httpd.status = self.status
+        self.httpd.serve_forever(poll_interval=0.05)
+
+    def close(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+@pytest.fixture
+def servers():
+    created = []
+
+    def make(**kwargs):
+        server = _Server(**kwargs)
+        created.append(server)
+        return server
+
+    yield make
+    for server in created:
+        server.close()
+
+
+class TestReadinessProbe:
+    """Testes da sonda de porta + endpoint de saúde."""
+
+    def test_is_ready_requires_listening_port_and_healthy_endpoint(self, servers):
+        """Porta fechada ou resposta 5xx não contam como pronto."""
+        healthy, broken = servers(), servers(status=503)
+        assert not is_ready(healthy.port)
+
+        healthy.start()
+        broken.start()
+
+        assert wait_until_ready(healthy.port, timeout=5) < 5
+        with pytest.raises(TimeoutError):
+            wait_until_ready(broken.port, timeout=0.3)
+
+
+class TestStartupPlan:
+    """Testes da ordem e dos tempos do plano de inicialização."""
+
+    def test_independent_servers_start_in_parallel_and_dependents_wait(self, servers):
+        """Servidores sem dependências sobem juntos; o dependente só após todos ficarem prontos."""
+        a, b, top = servers(delay=0.3), servers(delay=0.3), servers()
+        plan = StartupPlan()
+        plan.add("a", a.start, a.port)
+        plan.add("b", b.start, b.port)
+        plan.add("top", top.start, top.port, depends_on=["a", "b"])
+
+        start = time.perf_counter()
+        report = plan.run(timeout=10)
+        elapsed = time.perf_counter() - start
+
+        assert all(row["ready"] for name, row in report.items() if not name.startswith("_"))
+        assert abs(a.started - b.started) < 0.1
+        assert report["top"]["started_at"] >= max(report["a"]["ready_at"], report["b"]["ready_at"])
+        # Sem esperas fixas: o custo de orquestração fica bem abaixo de um segundo
+        assert elapsed < 0.3 + 0.6
+        assert "top" in format_startup_report(report)
+
+    def test_timeout_starts_dependents_degraded(self, servers):
+        """Dependência que nunca fica pronta não bloqueia para sempre."""
+        broken, top = servers(status=500), servers()
+        plan = StartupPlan()
+        plan.add("broken", broken.start, broken.port)
+        plan.add("top", top.start, top.port, depends_on=["broken"])
+
+        report = plan.run(timeout=0.5)
+
+        assert not report["broken"]["ready"]
+        assert report["top"]["degraded"]
+        assert "não ficou pronto" in format_startup_report(report)
+
+    def test_unknown_dependency_is_rejected(self):
+        """Dependências inexistentes devem falhar antes de iniciar qualquer servidor."""
+        started = []
+        plan = StartupPlan().add("x", lambda: started.append("x"), _free_port(), depends_on=["y"])
+
+        with pytest.raises(ValueError):
+            plan.run()
+        assert started == []
+
+    def test_stop_event_interrupts_plan(self, servers):
+        """Ctrl+C durante o plano deve interrompê-lo na hora, sem esperar o prazo."""
+        broken = servers(status=500)
+        stop = threading.Event()
+        plan = StartupPlan().add("broken", broken.start, broken.port)
+        threading.Timer(0.2, stop.set).start()
+
+        start = time.perf_counter()
+        report = plan.run(timeout=30, stop=stop)
+
+        assert time.perf_counter() - start < 1
+        assert report["_total"]["aborted"]
+        assert "interrompido" in format_startup_report(report)
+
+    def test_on_poll_can_recover_crashed_server(self, servers):
+        """O plano deve chamar `on_poll` enquanto espera, para reiniciar quem caiu no boot."""
+        server = servers()
+        polls = []
+
+        def restart():
+            polls.append(1)
+            if len(polls) == 3:
+                server.start()
+
+        plan = StartupPlan().add("x", lambda: None, server.port)
+        report = plan.run(timeout=5, on_poll=restart)
+
+        assert report["x"]["ready"]
+        assert len(polls) >= 3
+        assert not report["_total"]["aborted"]
@@ -0,0 +1,66 @@
+"""
+Testes para o agente de code review.
+"""
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from app.agents.reviewer_agents import CodeReviewerAgent
+from app.mcp.lint import analyze_source
+
+
+class TestCodeReviewerAgent:
+    """Testes para o agente revisor de código."""
+    
+    @pytest.fixture
+    def mock_env(self, monkeypatch):
+        """Mock da variável de ambiente."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+    
+    @patch('app.agents.base_agent.OpenAI')
+    def test_review_code_includes_static_findings(self, mock_openai, mock_env):
+        """Achados do lint_python devem ser enviados ao LLM junto com o código."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value.choices[0].message.content = "Revisão"
+        mock_openai.return_value = mock_client
+        
+        agent = CodeReviewerAgent(port=8004, url="http://localhost:8004")
+        report = json.dumps(analyze_source("import os\n"))
+        
+        with patch.object(agent, "_execute_mcp_tools_batch", return_value=[{"ok": True, "result": report}]) as mock_batch:
+            result = agent.review_code("Revise:\n```python\nimport os\n```")
+        
+        assert result == "Revisão"
+        assert mock_batch.call_args[0][0][0]["arguments"]["code"] == "import os\n"
+        user_content = mock_client.chat.completions.with_raw_response.create.call_args[1]["messages"][1]["content"]
+        assert "L1:1 F401" in user_content
+    
+    @patch('app.agents.base_agent.OpenAI')
+    def test_review_code_without_code_skips_lint(self, mock_openai, mock_env):
+        """Mensagem sem bloco de código não deve chamar o servidor MCP."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value.choices[0].message.content = "Ok"
+        mock_openai.return_value = mock_client
+        
+        agent = CodeReviewerAgent(port=8004, url="http://localhost:8004")
+        
+        with patch.object(agent, "_execute_mcp_tools_batch") as mock_batch:
+            agent.review_code("O que é PEP8?")
+        
+        mock_batch.assert_not_called()
+    
+    @patch('app.agents.base_agent.OpenAI')
+    def test_review_code_when_mcp_unavailable(self, mock_openai, mock_env):
+        """Falha do servidor MCP não deve impedir a revisão."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.with_raw_response.create.return_value.parse.return_value.choices[0].message.content = "Revisão"
+        mock_openai.return_value = mock_client
+        
+        agent = CodeReviewerAgent(port=8004, url="http://localhost:8004")
+        failed = [{"ok": False, "error": "❌ Erro ao chamar lote"}]
+        
+        with patch.object(agent, "_execute_mcp_tools_batch", return_value=failed):
+            result = agent.review_code("```\nx=1\n```")
+        
+        assert result == "Revisão"
+        user_content = mock_client.chat.completions.with_raw_response.create.call_args[1]["messages"][1]["content"]
+        assert "análise estática" not in user_content
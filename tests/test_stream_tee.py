@@ -0,0 +1,218 @@
+"""
+Testes para o compartilhamento de streams idênticos do LLM.
+"""
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import uvicorn
+import httpx
+from app.bench import stub_llm
+from app.bench.stub_llm import StubLLMConfig
+from app.services.llm_service import get_llm_response
+from app.services.stream_tee import SlowConsumerError, StreamMultiplexer, stream_key
+
+_END = object()
+
+
+class FakeUpstream:
+    """Stream do provedor controlado pelo teste: `put` entrega um chunk, `end` termina."""
+
+    def __init__(self):
+        self.chunks = queue.Queue()
+        self.closed = threading.Event()
+        self.opened = 0
+
+    def opener(self):
+        self.opened += 1
+        return self._iterate()
+
+    def _iterate(self):
+        try:
+            while True:
+                chunk = self.chunks.get(timeout=10)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            self.closed.set()
+
+    def put(self, *chunks):
+        for chunk in chunks:
+            self.chunks.put(chunk)
+
+    def end(self):
+        self.chunks.put(_END)
+
+
+def _wait(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class TestStreamMultiplexer:
+    """Testes de replay, limites de memória e abandono do stream."""
+
+    def test_late_subscriber_replays_from_start(self):
+        """Quem chega depois deve receber todos os chunks desde o início, sem abrir outro stream."""
+        mux = StreamMultiplexer()
+        upstream = FakeUpstream()
+        first = mux.open("k", "m", upstream.opener)
+        upstream.put(1, 2, 3)
+        assert [next(first) for _ in range(3)] == [1, 2, 3]
+
+        second = mux.open("k", "m", upstream.opener)
+        upstream.put(4)
+        upstream.end()
+
+        assert list(first) == [4]
+        assert list(second) == [1, 2, 3, 4]
+        assert upstream.opened == 1
+        assert _wait(lambda: mux.active() == 0)
+
+    def test_distinct_keys_do_not_share(self):
+        """Pedidos diferentes devem abrir streams próprios."""
+        mux = StreamMultiplexer()
+        a, b = FakeUpstream(), FakeUpstream()
+        stream_a = mux.open("a", "m", a.opener)
+        stream_b = mux.open("b", "m", b.opener)
+        a.put("x")
+        a.end()
+        b.put("y")
+        b.end()
+
+        assert list(stream_a) == ["x"]
+        assert list(stream_b) == ["y"]
+        assert (a.opened, b.opened) == (1, 1)
+
+    def test_slow_consumer_is_evicted_and_buffer_bounded(self):
+        """O leitor parado deve ser desligado sem travar os outros nem passar do limite do buffer."""
+        mux = StreamMultiplexer(max_buffer=5)
+        upstream = FakeUpstream()
+        fast = mux.open("k", "m", upstream.opener)
+        slow = mux.open("k", "m", upstream.opener)
+        upstream.put(0)
+        assert next(slow) == 0
+        shared = mux._streams["k"]
+
+        received = []
+        for chunk in range(50):
+            if chunk:
+                upstream.put(chunk)
+            received.append(next(fast))
+        # Replay completo não cabe mais no buffer: pedido idêntico abre stream novo
+        other = FakeUpstream()
+        late = mux.open("k", "m", other.opener)
+        other.end()
+        upstream.end()
+        received += list(fast)
+
+        assert received == list(range(50))
+        assert len(shared._chunks) <= 5
+        with pytest.raises(SlowConsumerError):
+            next(slow)
+        assert other.opened == 1
+        assert list(late) == []
+        assert shared.subscribers_total == 2
+
+    def test_all_subscribers_leaving_closes_upstream(self):
+        """Se todos desistem, o stream com o provedor deve ser fechado."""
+        mux = StreamMultiplexer()
+        upstream = FakeUpstream()
+        first = mux.open("k", "m", upstream.opener)
+        second = mux.open("k", "m", upstream.opener)
+        upstream.put("a")
+        next(first)
+        next(second)
+        first.close()
+        second.close()
+        upstream.put("b")
+
+        assert upstream.closed.wait(5)
+        assert _wait(lambda: mux.active() == 0)
+
+    def test_opener_error_reaches_caller(self):
+        """Erro ao abrir o provedor deve chegar a quem abriu e não deixar stream registrado."""
+        mux = StreamMultiplexer()
+
+        def failing():
+            raise ConnectionError("provedor fora")
+
+        with pytest.raises(ConnectionError):
+            mux.open("k", "m", failing)
+        assert mux.active() == 0
+
+    def test_opener_error_reaches_joined_subscribers(self):
+        """Quem se inscreveu antes da abertura falhar deve receber o mesmo erro de `open`, como quem abriu."""
+        mux = StreamMultiplexer()
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise ConnectionError("provedor fora")
+
+        def call(opener):
+            try:
+                mux.open("k", "m", opener)
+            except ConnectionError as e:
+                return str(e)
+            return "sem erro"
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(call, failing)
+            assert _wait(lambda: mux.active() == 1)
+            second = executor.submit(call, lambda: pytest.fail("não deve abrir outro stream"))
+            assert _wait(lambda: mux._streams["k"].subscribers == 2)
+            release.set()
+
+            assert first.result(5) == second.result(5) == "provedor fora"
+        assert mux.active() == 0
+
+    def test_stream_key_identifies_identical_requests(self):
+        """A chave deve mudar com mensagens, modelo ou credencial."""
+        messages = [{"role": "user", "content": "oi"}]
+        key = stream_key("m", messages, "sk", "http://x")
+
+        assert key == stream_key("m", [{"content": "oi", "role": "user"}], "sk", "http://x")
+        assert key != stream_key("m2", messages, "sk", "http://x")
+        assert key != stream_key("m", messages, "sk2", "http://x")
+
+
+class TestLLMServiceTee:
+    """Testes de ponta a ponta com o LLM stub."""
+
+    def test_identical_concurrent_requests_share_upstream(self, monkeypatch):
+        """Sessões com o mesmo prompt ao mesmo tempo devem receber a mesma resposta de uma só geração."""
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        app = stub_llm.create_app(StubLLMConfig(ttft=0.3, tokens_per_second=100, output_tokens=20))
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        assert _wait(lambda: server.started)
+        monkeypatch.setenv("LLM_BASE_URL", f"http://127.0.0.1:{port}/v1")
+        messages = [{"role": "user", "content": "Explique o teorema CAP"}]
+
+        def ask(_):
+            stream = get_llm_response(messages, "sk-stub-local-0000000000")
+            return "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                answers = list(executor.map(ask, range(4)))
+            stats = httpx.get(f"http://127.0.0.1:{port}/stub/stats").json()
+        finally:
+            server.should_exit = True
+            thread.join(5)
+
+        assert len(set(answers)) == 1
+        assert len(answers[0].split()) == 20
+        assert stats["requests"] == 1
@@ -0,0 +1,115 @@
+"""
+Testes para o servidor LLM stub compatível com OpenAI.
+"""
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import pytest
+import requests
+import uvicorn
+from openai import OpenAI, RateLimitError, InternalServerError
+from app.agents.base_agent import BaseAgent
+from app.bench.stub_llm import StubLLMConfig, create_app
+from app.services.llm_service import get_llm_response
+
+MESSAGES = [{"role": "user", "content": "Explique busca binária."}]
+
+
+@contextmanager
+def _serve(config: StubLLMConfig):
+    """Stub rodando em porta local real durante o bloco."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+
+@contextmanager
+def _client(config: StubLLMConfig):
+    """Cliente OpenAI real falando com o stub."""
+    with _serve(config) as base_url:
+        yield OpenAI(base_url=base_url, api_key="sk-stub", max_retries=0)
+
+
+class TestStubLLM:
+    """Testes do protocolo e das falhas injetadas."""
+
+    def test_completion_with_usage(self):
+        """Deve responder chat completion com conteúdo e usage."""
+        with _client(StubLLMConfig(ttft=0, tokens_per_second=0, output_tokens=8)) as client:
+            response = client.chat.completions.create(model="m", messages=MESSAGES, max_tokens=4)
+
+        assert response.choices[0].message.content
+        assert response.usage.completion_tokens == 4
+        assert response.usage.total_tokens == response.usage.prompt_tokens + 4
+
+    def test_streaming_chunks_and_usage(self):
+        """Deve transmitir um chunk por token e o usage ao final."""
+        with _client(StubLLMConfig(ttft=0, tokens_per_second=0, output_tokens=6)) as client:
+            chunks = list(client.chat.completions.create(
+                model="m", messages=MESSAGES, stream=True,
+                extra_body={"stream_options": {"include_usage": True}}
+            ))
+
+        content = [c.choices[0].delta.content for c in chunks if c.choices and c.choices[0].delta.content]
+        assert len(content) == 6
+        assert chunks[-2].choices[0].finish_reason == "stop"
+        assert chunks[-1].model_dump()["usage"]["completion_tokens"] == 6
+
+    def test_latency_follows_config(self):
+        """Deve respeitar TTFT e tokens por segundo."""
+        with _client(StubLLMConfig(ttft=0.1, tokens_per_second=50, output_tokens=6)) as client:
+            start = time.perf_counter()
+            client.chat.completions.create(model="m", messages=MESSAGES)
+            elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.1 + 5 / 50
+
+    def test_rate_limit_and_error_injection(self):
+        """Deve responder 429 com Retry-After e 500 conforme as probabilidades."""
+        with _client(StubLLMConfig(ttft=0, rate_limit_rate=1.0, retry_after=2)) as client:
+            with pytest.raises(RateLimitError) as exc_info:
+                client.chat.completions.create(model="m", messages=MESSAGES)
+        assert exc_info.value.response.headers["retry-after"] == "2"
+
+        with _client(StubLLMConfig(ttft=0, error_rate=1.0)) as client:
+            with pytest.raises(InternalServerError):
+                client.chat.completions.create(model="m", messages=MESSAGES)
+
+    def test_runtime_config_and_stats(self):
+        """Deve permitir alterar a configuração e expor estatísticas."""
+        with _serve(StubLLMConfig(ttft=0)) as base_url:
+            root = base_url[:-len("/v1")]
+            assert requests.post(f"{root}/stub/config", json={"error_rate": 1.0}).json()["error_rate"] == 1.0
+            assert requests.post(f"{base_url}/chat/completions", json={"messages": MESSAGES}).status_code == 500
+            assert requests.post(f"{root}/stub/config", json={"nope": 1}).status_code == 400
+            assert requests.get(f"{root}/stub/stats").json()["errors_injected"] == 1
+
+
+class TestLLMBaseUrl:
+    """Testes do redirecionamento dos componentes via LLM_BASE_URL."""
+
+    def test_agent_and_service_use_base_url(self, monkeypatch):
+        """BaseAgent e llm_service devem falar com o stub configurado."""
+        with _serve(StubLLMConfig(ttft=0.01, tokens_per_second=0, output_tokens=5)) as base_url:
+            monkeypatch.setenv("LLM_BASE_URL", base_url)
+            monkeypatch.setenv("OPENROUTER_API_KEY", "sk-stub-local-0000000000")
+            agent = BaseAgent(name="Stub Agent", description="d", prompt="p", url="http://localhost:9000")
+
+            assert agent.call_llm(MESSAGES)
+
+            stream = get_llm_response(MESSAGES, api_key="sk-stub-local-0000000000")
+            text = "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+            assert len(text.split()) == 5
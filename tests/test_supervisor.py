@@ -0,0 +1,96 @@
+"""
+Testes para o supervisor de processos.
+"""
+import io
+import sys
+import threading
+import time
+from app.utils.supervisor import ProcessSpec, ProcessSupervisor
+
+
+def _python(code: str):
+    return [sys.executable, "-c", code]
+
+
+def _wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestProcessSupervisor:
+    """Testes de logs agregados, reinício e encerramento."""
+
+    def test_output_is_aggregated_with_prefix(self, tmp_path):
+        """A saída de cada filho deve chegar prefixada ao destino e ao arquivo."""
+        output = io.StringIO()
+        log_file = tmp_path / "servers.log"
+        specs = [
+            ProcessSpec("um", _python("print('olá'); import time; time.sleep(5)")),
+            ProcessSpec("dois", _python("import os; print(os.environ['EXTRA']); import time; time.sleep(5)"),
+                        {"EXTRA": "valor"}),
+        ]
+        supervisor = ProcessSupervisor(specs, output=output, log_file=str(log_file))
+        supervisor.start()
+        try:
+            assert _wait_until(lambda: "valor" in output.getvalue() and "olá" in output.getvalue())
+        finally:
+            supervisor.stop()
+
+        lines = output.getvalue().splitlines()
+        assert "[um  ] olá" in lines
+        assert "[dois] valor" in lines
+        assert log_file.read_text(encoding="utf-8") == output.getvalue()
+
+    def test_crashed_process_restarts_with_backoff(self):
+        """Processos que caem devem voltar, com espera crescente entre tentativas."""
+        supervisor = ProcessSupervisor(
+            [ProcessSpec("falha", _python("raise SystemExit(3)"))],
+            backoff_initial=0.05, backoff_max=0.2, poll_interval=0.01, output=io.StringIO()
+        )
+        runner = threading.Thread(target=supervisor.run, daemon=True)
+        supervisor.start()
+        runner.start()
+        try:
+            assert _wait_until(lambda: supervisor.status()[0]["restarts"] >= 3)
+        finally:
+            supervisor.stop()
+            runner.join(5)
+
+        status = supervisor.status()[0]
+        assert status["last_exit"] == 3
+        assert supervisor.children["falha"].failures >= 3
+        assert [supervisor._backoff(n) for n in (1, 2, 3, 10)] == [0.05, 0.1, 0.2, 0.2]
+
+    def test_stop_terminates_running_processes(self):
+        """stop() deve encerrar os filhos com SIGTERM e não reiniciá-los."""
+        supervisor = ProcessSupervisor(
+            [ProcessSpec("dorme", _python("import time; time.sleep(60)"))],
+            stop_timeout=5, output=io.StringIO()
+        )
+        supervisor.start()
+        pid = supervisor.status()[0]["pid"]
+        assert pid and supervisor.status()[0]["running"]
+
+        start = time.monotonic()
+        supervisor.stop()
+        supervisor.check()
+
+        assert time.monotonic() - start < 5
+        assert not supervisor.status()[0]["running"]
+        assert supervisor.status()[0]["restarts"] == 0
+
+    def test_stubborn_process_is_killed_after_timeout(self):
+        """Filhos que ignoram SIGTERM devem receber SIGKILL após o prazo."""
+        code = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('pronto'); time.sleep(60)"
+        output = io.StringIO()
+        supervisor = ProcessSupervisor([ProcessSpec("teimoso", _python(code))], stop_timeout=0.3, output=output)
+        supervisor.start()
+        assert _wait_until(lambda: "pronto" in output.getvalue())
+
+        supervisor.stop()
+
+        assert supervisor.children["teimoso"].process.returncode < 0
@@ -0,0 +1,133 @@
+"""
+Testes para o índice de símbolos Python.
+"""
+import json
+import pytest
+from app.mcp import symbol_index
+from app.mcp.symbol_index import SymbolIndex, parse_python_file
+
+
+SOURCE = '''class Agent:
+    """Agente de teste."""
+
+    @property
+    def name(self):
+        return "a"
+
+    def run(self):
+        return helper(self.name)
+
+
+def helper(value):
+    return value.upper()
+'''
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """Workspace com um módulo Python simples."""
+    (tmp_path / "agent.py").write_text(SOURCE)
+    (tmp_path / "broken.py").write_text("def broken(:\n")
+    return tmp_path
+
+
+def _index(root):
+    return SymbolIndex(root=root, index_path=root / ".devmentor" / "symbols.json", refresh_interval=0)
+
+
+class TestParsePythonFile:
+    """Testes essenciais de extração via ast."""
+    
+    def test_parse_symbols_and_calls(self, workspace):
+        """Deve extrair classes, métodos, funções e chamadas."""
+        parsed = parse_python_file(str(workspace), "agent.py")
+        
+        kinds = {s["qualname"]: s["kind"] for s in parsed["symbols"]}
+        assert kinds == {"Agent": "class", "Agent.name": "method", "Agent.run": "method", "helper": "function"}
+        assert {"name": "helper", "expr": "helper", "lineno": 9, "caller": "Agent.run"} in parsed["calls"]
+    
+    def test_parse_syntax_error(self, workspace):
+        """Erro de sintaxe deve ser reportado sem exceção."""
+        parsed = parse_python_file(str(workspace), "broken.py")
+        
+        assert parsed["symbols"] == []
+        assert "SyntaxError" in parsed["error"]
+
+
+class TestSymbolIndex:
+    """Testes essenciais do índice persistido."""
+    
+    def test_find_definitions_by_name_and_qualname(self, workspace):
+        """Deve localizar símbolos pelo nome simples ou qualificado."""
+        index = _index(workspace)
+        
+        assert [s["qualname"] for s in index.find_definitions("run")] == ["Agent.run"]
+        assert index.find_definitions("Agent.run")[0]["path"] == "agent.py"
+        assert index.find_definitions("Agent", kind="function") == []
+    
+    def test_get_source_is_bounded(self, workspace):
+        """Trecho deve incluir decorators e respeitar o limite de linhas."""
+        index = _index(workspace)
+        symbol = index.find_definitions("Agent.name")[0]
+        
+        assert "@property" in index.get_source(symbol)
+        truncated = index.get_source(index.find_definitions("Agent")[0], max_lines=2)
+        assert "omitidas" in truncated
+    
+    def test_find_callers(self, workspace):
+        """Deve listar quem chama uma função."""
+        callers = _index(workspace).find_callers("helper")
+        
+        assert [(c["path"], c["caller"]) for c in callers] == [("agent.py", "Agent.run")]
+    
+    def test_incremental_refresh_and_persistence(self, workspace):
+        """Só arquivos alterados devem ser reparseados; índice deve ser recarregado do disco."""
+        index = _index(workspace)
+        assert index.refresh(force=True) == {"parsed": 2, "removed": 0}
+        assert index.refresh(force=True) == {"parsed": 0, "removed": 0}
+        
+        (workspace / "extra.py").write_text("def extra():\n    pass\n")
+        assert index.refresh(force=True) == {"parsed": 1, "removed": 0}
+        
+        reloaded = _index(workspace)
+        assert reloaded.find_definitions("extra")
+        assert reloaded.refresh(force=True) == {"parsed": 0, "removed": 0}
+    
+    def test_untrusted_index_file_is_cache_miss(self, workspace):
+        """Índice corrompido, em formato inesperado ou com caminho fora do workspace deve ser reconstruído."""
+        index_path = workspace / ".devmentor" / "symbols.json"
+        index_path.parent.mkdir()
+        header = '"version": %d, "root": %s' % (symbol_index.INDEX_VERSION, json.dumps(str(workspace.resolve())))
+        entry = '{"mtime": 1, "size": 1, "symbols": [], "calls": [], "error": null}'
+        for content in [
+            "[1, 2]",
+            '{%s, "files": {"a.py": 3}}' % header,
+            '{%s, "files": {"a.py": {"mtime": 1, "size": 1, "symbols": [1], "calls": []}}}' % header,
+            '{%s, "files": {"../fora.py": %s}}' % (header, entry),
+        ]:
+            index_path.write_text(content)
+            index = _index(workspace)
+            assert index._files == {}
+            assert index.find_definitions("helper")[0]["path"] == "agent.py"
+    
+    def test_get_source_rejects_outside_paths_and_shrunk_files(self, workspace):
+        """Caminhos fora do workspace devem ser recusados; arquivo encolhido não deve quebrar o trecho."""
+        index = _index(workspace)
+        symbol = index.find_definitions("helper")[0]
+        
+        with pytest.raises(ValueError):
+            index.get_source(dict(symbol, path="/etc/passwd"))
+        with pytest.raises(ValueError):
+            index.get_source(dict(symbol, path="../agent.py"))
+        (workspace / "agent.py").write_text(SOURCE.split("def helper")[0] + "def helper(value):\n")
+        assert "def helper" in index.get_source(symbol)
+    
+    def test_process_pool_for_many_files(self, workspace, monkeypatch):
+        """Muitos arquivos alterados devem ser parseados no pool de processos."""
+        monkeypatch.setattr(symbol_index, "PARALLEL_THRESHOLD", 2)
+        for i in range(4):
+            (workspace / f"mod{i}.py").write_text(f"def func{i}():\n    pass\n")
+        
+        index = _index(workspace)
+        
+        assert index.find_definitions("func3")[0]["path"] == "mod3.py"
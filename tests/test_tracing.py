@@ -0,0 +1,146 @@
+"""
+Testes para o rastreamento distribuído.
+"""
+import asyncio
+from unittest.mock import MagicMock
+from python_a2a.server.http import create_flask_app
+from app.agents.base_agent import BaseAgent
+from app.mcp.batch import run_batch
+from app.utils.tracing import (
+    JsonlSpanExporter, Span, current_span, extract, extract_from_task_payload, format_waterfall, inject,
+    load_trace, trace_span
+)
+
+
+class _EchoAgent(BaseAgent):
+    """Agente mínimo que chama o LLM dentro do handle_task."""
+
+    def handle_task(self, task):
+        text = self.call_llm([{"role": "user", "content": task.message["content"]["text"]}])
+        task.artifacts = [{"parts": [{"type": "text", "text": text}]}]
+        return task
+
+
+class TestSpans:
+    """Testes de hierarquia, propagação e exportação."""
+
+    def test_nested_spans_share_trace(self, isolated_trace_file):
+        """Spans aninhados devem herdar trace e serviço do pai."""
+        with trace_span("raiz", service="app") as root:
+            with trace_span("filho", etapa=1) as child:
+                assert current_span() is child
+        assert current_span() is None
+
+        spans = load_trace(root.trace_id, isolated_trace_file)
+        assert [span["name"] for span in spans] == ["raiz", "filho"]
+        assert spans[1]["parent_id"] == root.span_id
+        assert spans[1]["service"] == "app"
+        assert spans[1]["attributes"] == {"etapa": 1}
+
+    def test_exception_marks_error(self, isolated_trace_file):
+        """Exceções devem marcar o span com erro e ser repropagadas."""
+        try:
+            with trace_span("falha") as span:
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+        record = load_trace(span.trace_id, isolated_trace_file)[0]
+        assert record["status"] == "error"
+        assert "boom" in record["error"]
+
+    def test_exporter_rotates_by_size(self, tmp_path):
+        """O arquivo de traces deve rotacionar e o trace recente continuar legível no backup."""
+        path = tmp_path / "traces.jsonl"
+        exporter = JsonlSpanExporter(path, max_bytes=2000, backup_count=1)
+        spans = [Span(f"etapa-{i}", trace_id="a" * 32) for i in range(40)]
+        try:
+            for span in spans:
+                span.duration_ms = 1.0
+                exporter.export(span)
+            exporter.flush()
+        finally:
+            exporter.close()
+
+        assert path.stat().st_size <= 2000
+        assert (tmp_path / "traces.jsonl.1").exists()
+        assert not (tmp_path / "traces.jsonl.2").exists()
+        loaded = load_trace("a" * 32, path)
+        assert 0 < len(loaded) < 40
+        assert loaded[-1]["name"] == "etapa-39"
+
+    def test_inject_extract_roundtrip(self):
+        """Contexto injetado em metadados deve ser extraído no outro lado."""
+        assert inject({}) == {}
+        with trace_span("envio") as span:
+            fields = inject({})
+
+        assert extract(fields) == span.context
+        payload = {"params": {"message": {"metadata": {"custom_fields": fields}}}}
+        assert extract_from_task_payload(payload) == span.context
+        assert extract({"traceparent": "lixo"}) is None
+
+    def test_format_waterfall(self):
+        """Deve indentar spans filhos e marcar erros."""
+        spans = [
+            {"span_id": "a", "parent_id": None, "name": "ui.request", "service": "app",
+             "start": 100.0, "duration_ms": 200.0, "status": "ok"},
+            {"span_id": "b", "parent_id": "a", "name": "llm.call", "service": "code_reviewer",
+             "start": 100.05, "duration_ms": 100.0, "status": "error"},
+        ]
+
+        text = format_waterfall(spans, width=20)
+
+        assert "ui.request" in text
+        assert "  llm.call" in text
+        assert "❌" in text
+        assert format_waterfall([]) == "(nenhum span registrado)"
+
+
+class TestPropagation:
+    """Testes da propagação entre componentes."""
+
+    def test_agent_continues_trace_from_message_metadata(self, isolated_trace_file, monkeypatch):
+        """O agente deve continuar o trace recebido e registrar o span do LLM."""
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        agent = _EchoAgent(name="Echo", description="d", prompt="p", url="http://localhost:9000")
+        response = MagicMock()
+        response.choices[0].message.content = "resposta"
+        response.usage.prompt_tokens, response.usage.completion_tokens = 10, 3
+        agent._llm_client = MagicMock()
+        agent._llm_client.chat.completions.with_raw_response.create.return_value.parse.return_value = response
+        client = create_flask_app(agent).test_client()
+
+        with trace_span("ui.request", service="app") as root:
+            payload = {"jsonrpc": "2.0", "id": 1, "method": "tasks/send", "params": {
+                "id": "t1",
+                "message": {
+                    "content": {"type": "text", "text": "oi"}, "role": "user",
+                    "metadata": {"custom_fields": inject({})},
+                },
+            }}
+            assert client.post("/tasks/send", json=payload).status_code == 200
+
+        spans = {span["name"]: span for span in load_trace(root.trace_id, isolated_trace_file)}
+        assert spans["a2a.server"]["parent_id"] == root.span_id
+        assert spans["a2a.server"]["service"] == "Echo"
+        assert spans["llm.call"]["parent_id"] == spans["a2a.server"]["span_id"]
+        assert spans["llm.call"]["attributes"]["completion_tokens"] == 3
+
+    def test_batch_calls_are_children_of_batch_span(self, isolated_trace_file):
+        """Cada chamada do lote deve virar span filho do span ativo."""
+        def ok():
+            return "ok"
+
+        async def run():
+            with trace_span("mcp.batch", service="mcp") as batch:
+                calls = [{"id": 0, "tool": "ok", "arguments": {}}, {"id": 1, "tool": "nope", "arguments": {}}]
+                [result async for result in run_batch(calls, {"ok": ok}, timeout=5)]
+            return batch
+
+        batch = asyncio.run(run())
+
+        tools = [span for span in load_trace(batch.trace_id, isolated_trace_file) if span["name"] == "mcp.tool"]
+        assert len(tools) == 2
+        assert all(span["parent_id"] == batch.span_id for span in tools)
+        assert sorted(span["status"] for span in tools) == ["error", "ok"]
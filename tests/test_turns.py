@@ -0,0 +1,183 @@
+"""
+Testes para os turnos da interface executados em background.
+"""
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import uvicorn
+from python_a2a import ErrorContent, Message, MessageRole, TextContent
+from app.agents.asgi import create_asgi_app
+from app.agents.tutor_agents import ConceptTutorAgent
+from app.bench import stub_llm
+from app.bench.stub_llm import StubLLMConfig
+from app.services.a2a_client import A2AClientPool
+from app.services.turns import CANCELLED, DONE, FAILED, PENDING, RUNNING, TurnExecutor
+
+
+@contextmanager
+def _serve(app):
+    """App ASGI rodando em porta local real durante o bloco."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+
+@contextmanager
+def _tutor(monkeypatch, config: StubLLMConfig):
+    """Tutor sob ASGI falando com o LLM stub; devolve (url do agente, url do stub, agente)."""
+    with _serve(stub_llm.create_app(config)) as llm_url:
+        monkeypatch.setenv("LLM_BASE_URL", f"{llm_url}/v1")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-stub-local-0000000000")
+        agent = ConceptTutorAgent(url="http://localhost:8003")
+        with _serve(create_asgi_app(agent)) as url:
+            yield url, llm_url, agent
+
+
+class _SilentStreamHandler(BaseHTTPRequestHandler):
+    """Abre o stream SSE e não manda nada (como o servidor Flask até a tarefa terminar)."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        self.wfile.flush()
+        if self.path.endswith("/tasks/stream"):
+            self.server.release.wait(30)
+
+    def log_message(self, *args):
+        pass
+
+
+def _message(text: str) -> Message:
+    return Message(content=TextContent(text=text), role=MessageRole.USER)
+
+
+def _wait(condition, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestTurnExecutor:
+    """Testes de envio em background, texto parcial e cancelamento."""
+
+    def test_partial_text_then_response(self, monkeypatch):
+        """O turno deve expor o texto parcial enquanto o LLM gera e a resposta completa no fim."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=0, tokens_per_second=20, output_tokens=10)) as (url, _, agent):
+            executor = TurnExecutor(A2AClientPool())
+            start = time.perf_counter()
+            turn = executor.submit(url, _message("Explique recursão"))
+            submit_seconds = time.perf_counter() - start
+            assert _wait(lambda: turn.state == RUNNING and turn.text)
+            partial = turn.text
+            assert _wait(lambda: turn.finished)
+            executor.shutdown()
+
+        assert submit_seconds < 0.1
+        assert turn.state == DONE
+        assert len(partial.split()) < 10
+        assert turn.response.content.text == turn.text
+        assert len(turn.text.split()) == 10
+        assert executor.get(turn.id) is turn
+
+    def test_cancel_aborts_upstream_generation(self, monkeypatch):
+        """Cancelar deve liberar o turno na hora e fazer o agente abandonar a chamada ao LLM."""
+        config = StubLLMConfig(ttft=0, tokens_per_second=2, output_tokens=100)
+        with _tutor(monkeypatch, config) as (url, llm_url, agent):
+            executor = TurnExecutor(A2AClientPool())
+            turn = executor.submit(url, _message("Explique grafos"))
+            assert _wait(lambda: turn.text)
+            assert executor.cancel(turn.id)
+            cancelled_state = turn.state
+            # 100 tokens a 2/s levariam 50 s; o stub deve ver o stream fechado logo
+            aborted = _wait(lambda: httpx.get(f"{llm_url}/stub/stats").json()["in_flight"] == 0, timeout=5)
+            task_state = _wait(lambda: agent.tasks.get(turn.id) is not None, timeout=5) and agent.tasks[turn.id].status.state
+            executor.shutdown()
+
+        assert cancelled_state == CANCELLED
+        assert aborted
+        assert task_state.value == "canceled"
+        assert not executor.cancel(turn.id)
+
+    def test_cancel_frees_worker_without_waiting_for_agent(self):
+        """Cancelar deve fechar a conexão e devolver a thread ao pool, mesmo sem evento do agente."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _SilentStreamHandler)
+        server.release = threading.Event()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            executor = TurnExecutor(A2AClientPool(), max_workers=1)
+            turn = executor.submit(f"http://127.0.0.1:{server.server_address[1]}", _message("oi"))
+            assert _wait(lambda: turn.state == RUNNING and turn._response is not None)
+            start = time.perf_counter()
+            assert executor.cancel(turn.id)
+            freed = _wait(lambda: turn.future.done(), timeout=2)
+            elapsed = time.perf_counter() - start
+            executor.shutdown()
+        finally:
+            server.release.set()
+            server.shutdown()
+            server.server_close()
+
+        assert freed
+        assert elapsed < 1
+        assert turn.state == CANCELLED
+        assert turn.error is None
+
+    def test_cancel_pending_turn_never_sends(self, monkeypatch):
+        """Turno cancelado ainda na fila não deve chegar ao agente."""
+        config = StubLLMConfig(ttft=0, tokens_per_second=5, output_tokens=10)
+        with _tutor(monkeypatch, config) as (url, llm_url, agent):
+            executor = TurnExecutor(A2AClientPool(), max_workers=1)
+            busy = executor.submit(url, _message("primeira"))
+            queued = executor.submit(url, _message("segunda"))
+            queued_state = queued.state
+            assert executor.cancel(queued.id)
+            assert _wait(lambda: busy.finished)
+            requests_seen = httpx.get(f"{llm_url}/stub/stats").json()["requests"]
+            executor.shutdown()
+
+        assert queued_state == PENDING
+        assert queued.state == CANCELLED
+        assert busy.state == DONE
+        assert requests_seen == 1
+
+    def test_connection_failure_is_reported(self):
+        """Agente fora do ar deve terminar o turno como falha, com o erro para o diagnóstico."""
+        executor = TurnExecutor(A2AClientPool(timeout=2))
+        turn = executor.submit("http://127.0.0.1:9", _message("oi"))
+        assert _wait(lambda: turn.finished)
+        executor.shutdown()
+
+        assert turn.state == FAILED
+        assert turn.error is not None
+        assert "Traceback" in turn.error_details
+
+    def test_agent_error_becomes_error_content(self, monkeypatch):
+        """Falha do agente durante o stream deve virar `ErrorContent` na resposta."""
+        with _tutor(monkeypatch, StubLLMConfig(ttft=0, error_rate=1.0)) as (url, _, agent):
+            executor = TurnExecutor(A2AClientPool())
+            turn = executor.submit(url, _message("oi"))
+            assert _wait(lambda: turn.finished)
+            executor.shutdown()
+
+        assert turn.state == DONE
+        assert isinstance(turn.response.content, ErrorContent)
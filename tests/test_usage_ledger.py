@@ -0,0 +1,139 @@
+"""
+Testes para o ledger de tokens e custo.
+"""
+import time
+from unittest.mock import MagicMock
+import pytest
+from python_a2a.server.http import create_flask_app
+from app.agents.base_agent import BaseAgent
+from app.services import usage_ledger
+from app.services.usage_ledger import UsageLedger, parse_prices, usage_from_response
+
+NOW = 1_700_000_000.0
+
+
+def _ledger_with_calls() -> UsageLedger:
+    """Ledger com chamadas de duas personas e dois modelos na última hora."""
+    ledger = UsageLedger(retention=3600, rollup_interval=60)
+    ledger.record("code_reviewer", "openai/gpt-4o-mini", 1000, 500, latency_ms=800, trace_id="t1", ts=NOW - 1800)
+    ledger.record("code_reviewer", "openai/gpt-4o", 2000, 1000, cached_tokens=1000, latency_ms=1200, ts=NOW - 600)
+    ledger.record("concept_tutor", "openai/gpt-4o-mini", 300, 100, latency_ms=400, trace_id="t1", ts=NOW - 60)
+    return ledger
+
+
+class TestUsageLedger:
+    """Testes de registro, custo e consultas agregadas."""
+
+    def test_cost_estimate_uses_price_table(self):
+        """Deve cobrar tokens em cache pelo preço reduzido."""
+        ledger = UsageLedger()
+
+        assert ledger.estimate_cost("openai/gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(0.75)
+        assert ledger.estimate_cost("openai/gpt-4o", 1_000_000, 0, cached_tokens=1_000_000) == pytest.approx(1.25)
+        assert ledger.estimate_cost("desconhecido", 1000, 1000) == 0.0
+        assert ledger.record("p", "m", 10, 10, cost=0.5) == 0.5
+
+    def test_top_personas_by_tokens(self):
+        """Deve ordenar as personas pelos tokens da janela."""
+        top = _ledger_with_calls().top(by="persona", metric="total_tokens", window=3600, now=NOW)
+
+        assert [row["persona"] for row in top] == ["code_reviewer", "concept_tutor"]
+        assert top[0]["calls"] == 2
+        assert top[0]["total_tokens"] == 4500
+        assert top[0]["cached_tokens"] == 1000
+        assert top[0]["avg_latency_ms"] == 1000.0
+
+    def test_window_and_filters(self):
+        """A janela e os filtros devem restringir as linhas agregadas."""
+        ledger = _ledger_with_calls()
+
+        recent = ledger.aggregate(by="persona", window=900, now=NOW)
+        assert set(recent) == {"code_reviewer", "concept_tutor"}
+        assert recent["code_reviewer"]["calls"] == 1
+
+        by_model = ledger.aggregate(by="model", window=3600, persona="code_reviewer", now=NOW)
+        assert set(by_model) == {"openai/gpt-4o-mini", "openai/gpt-4o"}
+        assert ledger.aggregate(by="trace_id", window=3600, now=NOW)["t1"]["calls"] == 2
+        assert ledger.aggregate(persona="inexistente", now=NOW) == {}
+        with pytest.raises(ValueError):
+            ledger.aggregate(by="sessao")
+
+    def test_aggregate_by_trace_is_linear(self):
+        """Agrupar milhares de traces distintos deve custar uma passada, não uma por grupo."""
+        ledger = UsageLedger(retention=86400)
+        for i in range(20000):
+            ledger.record(f"p{i % 4}", "m", 10, 5, latency_ms=2, trace_id=f"t{i}", ts=NOW - 20000 + i)
+
+        start = time.perf_counter()
+        by_trace = ledger.aggregate(by="trace_id", window=None, persona="p1", now=NOW)
+        elapsed = time.perf_counter() - start
+
+        assert len(by_trace) == 5000
+        assert by_trace["t1"] == {
+            "calls": 1, "prompt_tokens": 10, "completion_tokens": 5, "cached_tokens": 0, "latency_ms": 2.0,
+            "cost": 0.0, "total_tokens": 15, "avg_latency_ms": 2.0,
+        }
+        # Com uma máscara por grupo eram dezenas de segundos
+        assert elapsed < 2
+
+    def test_compaction_keeps_totals_in_rollups(self):
+        """Linhas antigas viram rollups sem mudar os totais por persona."""
+        ledger = _ledger_with_calls()
+        before = ledger.aggregate(by="persona", window=None, now=NOW + 3300)
+
+        ledger.compact(now=NOW + 3300)
+
+        assert len(ledger) == 1
+        after = ledger.aggregate(by="persona", window=None, now=NOW + 3300)
+        for persona, sums in before.items():
+            for metric in ("calls", "total_tokens", "cost"):
+                assert after[persona][metric] == pytest.approx(sums[metric])
+        assert ledger.totals(window=None, now=NOW + 3300)["calls"] == 3
+
+    def test_out_of_order_timestamps_are_clamped(self):
+        """Timestamps atrasados não podem quebrar a busca binária."""
+        ledger = UsageLedger()
+        ledger.record("a", "m", 1, 1, ts=NOW)
+        ledger.record("b", "m", 1, 1, ts=NOW - 100)
+
+        assert set(ledger.aggregate(window=10, now=NOW)) == {"a", "b"}
+
+
+class TestUsageParsing:
+    """Testes de leitura do usage e da tabela de preços."""
+
+    def test_usage_from_response(self):
+        """Deve aceitar dicts (stream) e objetos, ignorando valores não inteiros."""
+        data = {"prompt_tokens": 12, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 4},
+                "cost": 0.001}
+        assert usage_from_response(data) == {"prompt_tokens": 12, "completion_tokens": 5, "cached_tokens": 4,
+                                             "cost": 0.001}
+        assert usage_from_response(None)["prompt_tokens"] == 0
+        assert usage_from_response(MagicMock())["completion_tokens"] == 0
+
+    def test_parse_prices(self):
+        """Deve ler preços com e sem o valor de cache."""
+        assert parse_prices("a=1/2,b=1/2/0.5,ruim=x/y,lixo") == {"a": (1.0, 2.0, 1.0), "b": (1.0, 2.0, 0.5)}
+
+
+class TestAgentIntegration:
+    """Testes do registro feito pelo BaseAgent."""
+
+    def test_call_llm_records_usage_and_endpoint(self, monkeypatch):
+        """call_llm deve registrar o uso e /admin/usage deve expô-lo."""
+        monkeypatch.setattr(usage_ledger, "_ledger", UsageLedger())
+        monkeypatch.setenv("OPENROUTER_API_KEY", "sk-test-key-123456789")
+        agent = BaseAgent(name="🔍 Code Reviewer (Clean Code & PEP8)", description="d", prompt="p",
+                          url="http://localhost:9000")
+        response = MagicMock()
+        response.choices[0].message.content = "ok"
+        response.usage = {"prompt_tokens": 100, "completion_tokens": 20}
+        agent._llm_client = MagicMock()
+        agent._llm_client.chat.completions.with_raw_response.create.return_value.parse.return_value = response
+
+        agent.call_llm([{"role": "user", "content": "oi"}])
+        data = create_flask_app(agent).test_client().get("/admin/usage?window=60").get_json()
+
+        assert data["totals"]["total_tokens"] == 120
+        assert data["top"][0]["persona"] == "code_reviewer"
+        assert data["top"][0]["cost"] > 0